@@ -1,18 +1,130 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.exceptions import NotRegistered
+from django.contrib.admin.utils import lookup_spawns_duplicates
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.urls import reverse
 from django.utils.html import format_html
+from django.utils.text import smart_split, unescape_string_literal
 from django.contrib.auth.admin import UserAdmin
 
 from .models import *
-from .models.despesas import DespesaRateada, DespesaSocio
+from .models.despesas import DespesaRateada, DespesaSocio, ItemDespesa
 from .models.relatorios_apuracao_irpj_mensal import ApuracaoIRPJMensal
+from .models.relatorios import SnapshotPeriodo
+from .models.eventos import EventoDominio
+from .paginacao import PaginadorContagemEstimada
+from .services.busca import filtro_busca
 
 # Register your models here.
 
+
+class BuscaNormalizadaAdminMixin:
+    """
+    Busca do admin em que os search_fields terminados em `_busca` (colunas
+    normalizadas, ver medicos/services/busca.py) recebem o termo sem acentos
+    e em minúsculas com `contains` (índice de trigramas no PostgreSQL); os
+    demais campos seguem com icontains sobre o termo digitado.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        campos = list(self.get_search_fields(request))
+        normalizados = [campo for campo in campos if campo.endswith('_busca')]
+        if not search_term or not normalizados:
+            return super().get_search_results(request, queryset, search_term)
+
+        for termo in smart_split(search_term):
+            if termo.startswith(('"', "'")) and termo[0] == termo[-1]:
+                termo = unescape_string_literal(termo)
+            condicao = Q()
+            for campo in campos:
+                condicao |= filtro_busca(campo, termo) if campo in normalizados else Q(**{f'{campo}__icontains': termo})
+            queryset = queryset.filter(condicao)
+        duplicados = any(lookup_spawns_duplicates(self.opts, campo) for campo in campos)
+        return queryset, duplicados
+
+
+class FiltroAutocomplete(admin.RelatedFieldListFilter):
+    """
+    Filtro por FK com select2 alimentado pelo endpoint de autocomplete do
+    admin, no lugar da lista com todas as linhas da tabela relacionada a cada
+    abertura da changelist. Só para FKs do próprio model (field_path sem
+    '__'); o admin do model relacionado precisa de search_fields.
+    """
+    template = 'admin/medicos/filtro_autocomplete.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.app_label = field.model._meta.app_label
+        self.model_name = field.model._meta.model_name
+        self.field_name = field.name
+        self.url_autocomplete = reverse(f'{model_admin.admin_site.name}:autocomplete')
+        self.selecionado = self._obter_selecionado(field, request, model_admin)
+
+    def _obter_selecionado(self, field, request, model_admin):
+        valor = self.lookup_val[-1] if isinstance(self.lookup_val, list) else self.lookup_val
+        if not valor:
+            return None
+        relacionado = field.remote_field.model
+        try:
+            queryset = model_admin.admin_site.get_model_admin(relacionado).get_queryset(request)
+        except NotRegistered:
+            queryset = relacionado._default_manager.all()
+        try:
+            return queryset.filter(**{field.target_field.name: valor}).first()
+        except (ValueError, ValidationError):
+            return None
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+
+class ChangeListProjetada(ChangeList):
+    """ChangeList que carrega só as colunas de `campos_lista` do ModelAdmin."""
+
+    def get_results(self, request):
+        if self.model_admin.campos_lista:
+            self.queryset = self.queryset.only(*self.model_admin.campos_lista)
+        super().get_results(request)
+
+
+class ListaOtimizadaAdminMixin:
+    """
+    Changelist para tabelas grandes:
+
+    - sem o COUNT(*) da tabela inteira (show_full_result_count = False) e com
+      a contagem da paginação estimada no PostgreSQL (PaginadorContagemEstimada);
+    - `campos_lista`: projeção only() com as colunas exibidas, incluindo as
+      dos relacionamentos de list_select_related;
+    - assets do select2 para os filtros FiltroAutocomplete.
+    """
+    show_full_result_count = False
+    paginator = PaginadorContagemEstimada
+    campos_lista = ()
+
+    def get_changelist(self, request, **kwargs):
+        return ChangeListProjetada
+
+    @property
+    def media(self):
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=['medicos/js/filtro_autocomplete.js'])
+        )
+
+
 @admin.register(Pessoa)
-class PessoaAdmin(admin.ModelAdmin):
+class PessoaAdmin(BuscaNormalizadaAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'cpf', 'email')
-    search_fields = ('name', 'cpf', 'email')
-    list_filter = ('created_at',)
+    search_fields = ('name_busca', 'cpf', 'email')
+    date_hierarchy = 'created_at'
 
 @admin.register(Empresa)
 class EmpresaAdmin(admin.ModelAdmin):
@@ -21,17 +133,30 @@ class EmpresaAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
 
 @admin.register(Socio)
-class SocioAdmin(admin.ModelAdmin):
+class SocioAdmin(BuscaNormalizadaAdminMixin, ListaOtimizadaAdminMixin, admin.ModelAdmin):
     list_display = ('pessoa', 'empresa', 'ativo', 'data_entrada')
-    search_fields = ('pessoa__name', 'empresa__name')
-    list_filter = ('empresa', 'ativo', 'data_entrada')
+    search_fields = ('pessoa__name_busca', 'empresa__name')
+    list_filter = (('empresa', FiltroAutocomplete), 'ativo')
+    date_hierarchy = 'data_entrada'
+    ordering = ('pessoa__name',)
+
+    def get_queryset(self, request):
+        """pessoa e empresa entram no __str__ (lista e autocomplete dos filtros)"""
+        return super().get_queryset(request).select_related('pessoa', 'empresa')
 
 @admin.register(NotaFiscal)
-class NotaFiscalAdmin(admin.ModelAdmin):
-    list_display = ('numero', 'empresa_destinataria', 'tomador', 'get_tipo_aliquota_display', 'dtEmissao', 'val_bruto', 'val_liquido', 'get_status_recebimento_display', 'get_meio_pagamento_display')
-    list_filter = ('status_recebimento', 'dtEmissao', 'empresa_destinataria', 'meio_pagamento')
-    search_fields = ('numero', 'tomador', 'empresa_destinataria__name', 'meio_pagamento__nome')
+class NotaFiscalAdmin(BuscaNormalizadaAdminMixin, ListaOtimizadaAdminMixin, admin.ModelAdmin):
+    list_display = ('numero', 'empresa_destinataria', 'tomador', 'get_tipo_servico_display', 'dtEmissao', 'val_bruto', 'val_liquido', 'get_status_recebimento_display', 'get_meio_pagamento_display')
+    list_filter = ('status_recebimento', ('empresa_destinataria', FiltroAutocomplete), ('meio_pagamento', FiltroAutocomplete))
+    search_fields = ('numero', 'tomador_busca', 'empresa_destinataria__name', 'meio_pagamento__nome')
     ordering = ('-dtEmissao', 'numero')
+    date_hierarchy = 'dtEmissao'
+    list_select_related = ('empresa_destinataria', 'meio_pagamento')
+    campos_lista = (
+        'numero', 'tomador', 'tipo_servico', 'dtEmissao', 'val_bruto', 'val_liquido', 'status_recebimento',
+        'empresa_destinataria__name', 'empresa_destinataria__nome_fantasia',
+        'meio_pagamento__nome', 'meio_pagamento__observacoes',
+    )
     
     fieldsets = (
         ('📄 NOTA FISCAL', {
@@ -62,26 +187,19 @@ class NotaFiscalAdmin(admin.ModelAdmin):
         })
     )
     
-    def get_queryset(self, request):
-        """Otimizar consultas incluindo relacionamentos"""
-        return super().get_queryset(request).select_related(
-            'empresa_destinataria', 'meio_pagamento', 'conta'
-        )
-    
-    def get_tipo_aliquota_display(self, obj):
+    @admin.display(description='Tipo de Serviço', ordering='tipo_servico')
+    def get_tipo_servico_display(self, obj):
         """Display service type with color coding"""
         colors = {
-            1: '#28a745',  # Green - Consultas
-            2: '#007bff',  # Blue - Plantão
-            3: '#ffc107'   # Yellow - Outros
+            NotaFiscal.TIPO_SERVICO_CONSULTAS: '#28a745',  # Green
+            NotaFiscal.TIPO_SERVICO_OUTROS: '#007bff',     # Blue
         }
-        color = colors.get(obj.tipo_aliquota, '#6c757d')
+        color = colors.get(obj.tipo_servico, '#6c757d')
         return format_html(
             '<span style="color: {}; font-weight: bold;">{}</span>',
             color,
-            obj.get_tipo_aliquota_display()
+            obj.get_tipo_servico_display()
         )
-    get_tipo_aliquota_display.short_description = 'Tipo de Serviço'
     
     def get_status_recebimento_display(self, obj):
         """Display status with color coding"""
@@ -119,14 +237,16 @@ class NotaFiscalAdmin(admin.ModelAdmin):
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 @admin.register(Aliquotas)
-class AliquotasAdmin(admin.ModelAdmin):
+class AliquotasAdmin(ListaOtimizadaAdminMixin, admin.ModelAdmin):
     list_display = (
         'empresa', 'ISS', 'PIS', 'COFINS',
         'IRPJ_ALIQUOTA', 'IRPJ_PRESUNCAO_OUTROS', 'IRPJ_PRESUNCAO_CONSULTA', 'IRPJ_VALOR_BASE_INICIAR_CAL_ADICIONAL', 'IRPJ_ADICIONAL',
         'CSLL_ALIQUOTA', 'CSLL_PRESUNCAO_OUTROS', 'CSLL_PRESUNCAO_CONSULTA',
         'data_vigencia_inicio', 'data_vigencia_fim', 'ativa'
     )
-    list_filter = ('data_vigencia_inicio', 'data_vigencia_fim', 'empresa', 'ativa')
+    list_filter = (('empresa', FiltroAutocomplete), 'ativa')
+    date_hierarchy = 'data_vigencia_inicio'
+    list_select_related = ('empresa',)
     search_fields = ('empresa__name', 'observacoes')
     ordering = ('-data_vigencia_inicio',)
     
@@ -161,24 +281,49 @@ class AliquotasAdmin(admin.ModelAdmin):
 
 # Admin para DespesaRateada
 @admin.register(DespesaRateada)
-class DespesaRateadaAdmin(admin.ModelAdmin):
+class DespesaRateadaAdmin(BuscaNormalizadaAdminMixin, ListaOtimizadaAdminMixin, admin.ModelAdmin):
     list_display = ('data', 'item_despesa', 'empresa')
-    list_filter = ('item_despesa', 'data')
-    search_fields = ('item_despesa__descricao', 'item_despesa__grupo_despesa__empresa__name')
+    list_filter = (('item_despesa', FiltroAutocomplete),)
+    search_fields = ('item_despesa__descricao_busca', 'item_despesa__grupo_despesa__empresa__name')
     ordering = ('-data',)
+    date_hierarchy = 'data'
+    list_select_related = ('item_despesa__grupo_despesa__empresa',)
+    campos_lista = (
+        'data', 'item_despesa__descricao', 'item_despesa__grupo_despesa__codigo',
+        'item_despesa__grupo_despesa__empresa__name', 'item_despesa__grupo_despesa__empresa__nome_fantasia',
+    )
 
 # Admin para DespesaSocio
 @admin.register(DespesaSocio)
-class DespesaSocioAdmin(admin.ModelAdmin):
+class DespesaSocioAdmin(BuscaNormalizadaAdminMixin, ListaOtimizadaAdminMixin, admin.ModelAdmin):
     list_display = ('data', 'item_despesa', 'empresa', 'socio')
-    list_filter = ('item_despesa', 'socio', 'data')
-    search_fields = ('item_despesa__descricao', 'socio__pessoa__name', 'item_despesa__grupo_despesa__empresa__name')
+    list_filter = (('item_despesa', FiltroAutocomplete), ('socio', FiltroAutocomplete))
+    search_fields = ('item_despesa__descricao_busca', 'socio__pessoa__name_busca', 'item_despesa__grupo_despesa__empresa__name')
     ordering = ('-data',)
+    date_hierarchy = 'data'
+    list_select_related = ('item_despesa__grupo_despesa__empresa', 'socio__pessoa', 'socio__empresa')
+    campos_lista = (
+        'data', 'item_despesa__descricao', 'item_despesa__grupo_despesa__codigo',
+        'item_despesa__grupo_despesa__empresa__name', 'item_despesa__grupo_despesa__empresa__nome_fantasia',
+        'socio__pessoa__name', 'socio__empresa__name',
+    )
+
+
+@admin.register(ItemDespesa)
+class ItemDespesaAdmin(BuscaNormalizadaAdminMixin, admin.ModelAdmin):
+    """Cadastro de itens; também atende o autocomplete dos filtros de despesas."""
+    list_display = ('codigo', 'descricao', 'grupo_despesa')
+    search_fields = ('descricao_busca', 'codigo', 'grupo_despesa__codigo')
+    list_select_related = ('grupo_despesa',)
+    ordering = ('grupo_despesa__codigo', 'codigo')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('grupo_despesa')
 
 # Desc_movimentacao_financeiro admin removed - replaced by DescricaoMovimentacao
 
 @admin.register(Financeiro)
-class FinanceiroAdmin(admin.ModelAdmin):
+class FinanceiroAdmin(BuscaNormalizadaAdminMixin, ListaOtimizadaAdminMixin, admin.ModelAdmin):
     def changelist_view(self, request, extra_context=None):
         """
         Força filtro padrão para o mês/ano de competência atual na lista do admin,
@@ -198,10 +343,20 @@ class FinanceiroAdmin(admin.ModelAdmin):
             params['_filter_applied'] = '1'
             url = request.path + '?' + params.urlencode()
             return HttpResponseRedirect(url)
+        if '_filter_applied' in request.GET:
+            # Marcador do redirecionamento, não é lookup: na ChangeList viraria ?e=1
+            request.GET = request.GET.copy()
+            del request.GET['_filter_applied']
         return super().changelist_view(request, extra_context=extra_context)
     list_display = ('data_movimentacao', 'socio', 'descricao_movimentacao_financeira', 'valor_formatado')
-    list_filter = ('socio', 'data_movimentacao')
-    search_fields = ('socio__pessoa__name', 'descricao_movimentacao_financeira__nome', 'descricao_movimentacao_financeira__descricao')
+    list_filter = (('socio', FiltroAutocomplete),)
+    date_hierarchy = 'data_movimentacao'
+    list_select_related = ('socio__pessoa', 'socio__empresa', 'descricao_movimentacao_financeira')
+    campos_lista = (
+        'data_movimentacao', 'valor', 'socio__pessoa__name', 'socio__empresa__name',
+        'descricao_movimentacao_financeira__descricao',
+    )
+    search_fields = ('socio__pessoa__name_busca', 'descricao_movimentacao_financeira__descricao')
     ordering = ('-data_movimentacao', '-created_at')
     readonly_fields = ('created_at', 'updated_at')
     
@@ -260,9 +415,9 @@ class FinanceiroAdmin(admin.ModelAdmin):
         """Valor formatado com cor: verde para positivo, vermelho para negativo"""
         valor = obj.valor
         if valor >= 0:
-            return format_html('<span style="color:green;">R$ {:,.2f}</span>', valor)
+            return format_html('<span style="color:green;">R$ {}</span>', f'{valor:,.2f}')
         else:
-            return format_html('<span style="color:red;">R$ {:,.2f}</span>', valor)
+            return format_html('<span style="color:red;">R$ {}</span>', f'{valor:,.2f}')
     valor_formatado.short_description = 'Valor'
     
     def origem_lancamento_manual(self, obj):
@@ -367,7 +522,7 @@ class CustomUserAdmin(UserAdmin):
     add_fieldsets = UserAdmin.add_fieldsets
 
 @admin.register(ApuracaoIRPJMensal)
-class ApuracaoIRPJMensalAdmin(admin.ModelAdmin):
+class ApuracaoIRPJMensalAdmin(ListaOtimizadaAdminMixin, admin.ModelAdmin):
     """
     Admin para Apuração IRPJ Mensal - Pagamento por Estimativa
     Conforme Lei 9.430/1996, Art. 2º
@@ -376,8 +531,9 @@ class ApuracaoIRPJMensalAdmin(admin.ModelAdmin):
         'empresa', 'competencia', 'receita_bruta', 'base_calculo_total',
         'imposto_devido', 'adicional', 'imposto_a_pagar_formatado', 'data_calculo'
     )
-    list_filter = ('empresa', 'competencia', 'data_calculo')
+    list_filter = (('empresa', FiltroAutocomplete), 'competencia')
     search_fields = ('empresa__name', 'competencia')
+    list_select_related = ('empresa',)
     ordering = ('-competencia', 'empresa__name')
     readonly_fields = ('data_calculo',)
     
@@ -411,9 +567,9 @@ class ApuracaoIRPJMensalAdmin(admin.ModelAdmin):
         """Formatar imposto a pagar com cores"""
         valor = obj.imposto_a_pagar
         if valor > 0:
-            return format_html('<span style="color:red; font-weight:bold;">R$ {:,.2f}</span>', valor)
+            return format_html('<span style="color:red; font-weight:bold;">R$ {}</span>', f'{valor:,.2f}')
         elif valor < 0:
-            return format_html('<span style="color:green; font-weight:bold;">R$ {:,.2f} (Crédito)</span>', abs(valor))
+            return format_html('<span style="color:green; font-weight:bold;">R$ {} (Crédito)</span>', f'{abs(valor):,.2f}')
         else:
             return format_html('<span style="color:gray;">R$ 0,00</span>')
     imposto_a_pagar_formatado.short_description = 'Imposto a Pagar'
@@ -425,5 +581,53 @@ class ApuracaoIRPJMensalAdmin(admin.ModelAdmin):
             readonly.extend(['empresa', 'competencia'])
         return readonly
 
+@admin.register(SnapshotPeriodo)
+class SnapshotPeriodoAdmin(admin.ModelAdmin):
+    """
+    Snapshots dos relatórios de competências fechadas (somente leitura).
+    Gerados no fechamento; a reabertura do período os desativa.
+    """
+    list_display = (
+        'empresa', 'tipo', 'competencia', 'chave', 'versao', 'ativo',
+        'origem', 'tamanho_bruto', 'criado_em', 'invalidado_em'
+    )
+    list_filter = ('tipo', 'ativo', 'origem', 'competencia')
+    search_fields = ('empresa__name', 'chave', 'hash_payload')
+    ordering = ('-competencia', 'empresa__name', 'tipo', 'chave', '-versao')
+    list_select_related = ('empresa',)
+    exclude = ('payload',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EventoDominio)
+class EventoDominioAdmin(admin.ModelAdmin):
+    """
+    Outbox de eventos do domínio fiscal (somente leitura).
+    Eventos que esgotaram as tentativas podem ser devolvidos à fila.
+    """
+    list_display = ('id', 'tipo', 'empresa_id', 'chave', 'criado_em', 'processado_em', 'tentativas')
+    list_filter = ('tipo', ('processado_em', admin.EmptyFieldListFilter))
+    search_fields = ('chave',)
+    ordering = ('-id',)
+    show_full_result_count = False
+    actions = ['devolver_a_fila']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Devolver à fila (zera tentativas)')
+    def devolver_a_fila(self, request, queryset):
+        quantidade = queryset.filter(processado_em__isnull=True).update(tentativas=0, erro='')
+        self.message_user(request, f'{quantidade} evento(s) devolvido(s) à fila')
+
+
 # Import das configurações SaaS
 from . import admin_saas
@@ -0,0 +1,389 @@
+"""
+Subsistema de exportação em streaming (CSV e XLSX)
+
+As exportações percorrem o queryset com `.values_list(...).iterator(chunk_size=...)`
+e entregam o arquivo via `StreamingHttpResponse`, de modo que exportar 100 mil
+linhas usa memória constante: nenhuma instância de modelo é criada e nenhuma
+linha fica acumulada no servidor.
+
+Cada exportação é descrita por uma `DefinicaoExportacao`, que informa o queryset
+base (já com escopo de empresa), o FilterSet existente da tela correspondente e
+as colunas (cabeçalho + caminho do `values_list`). O XLSX é gerado sem
+dependências externas: o pacote é montado com `zipfile` em modo streaming e a
+planilha usa inline strings (sem tabela de strings compartilhadas em memória).
+"""
+import csv
+import io
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Optional
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+from .filters_contacorrente import MovimentacaoContaCorrenteFilter
+from .filters_despesas import DespesaEmpresaFilter
+from .filters_notafiscal import NotaFiscalFilter
+from .models.conta_corrente import MovimentacaoContaCorrente
+from .models.despesas import DespesaRateada, DespesaSocio
+from .models.fiscal import NotaFiscal
+from .replica import alias_leitura
+
+FORMATO_CSV = 'csv'
+FORMATO_XLSX = 'xlsx'
+FORMATOS_EXPORTACAO = (FORMATO_CSV, FORMATO_XLSX)
+
+# Linhas lidas do banco por ida ao servidor (cursor server-side no PostgreSQL)
+TAMANHO_CHUNK_EXPORTACAO = 2000
+
+
+@dataclass
+class ColunaExportacao:
+    cabecalho: str
+    campo: str
+    formatar: Optional[Callable] = None
+
+
+@dataclass
+class DefinicaoExportacao:
+    nome: str
+    queryset: Callable
+    colunas: list
+    campo_data: str
+    ordenacao: tuple
+    filterset_class: Optional[type] = None
+    filterset_recebe_request: bool = False
+    descricao: str = ''
+    extras: dict = field(default_factory=dict)
+
+    def cabecalhos(self):
+        return [coluna.cabecalho for coluna in self.colunas]
+
+    def campos(self):
+        return [coluna.campo for coluna in self.colunas]
+
+
+def _rotulo_choices(choices):
+    rotulos = dict(choices)
+    return lambda valor: rotulos.get(valor, valor)
+
+
+DEFINICOES_EXPORTACAO = {
+    'notas_fiscais': DefinicaoExportacao(
+        nome='notas_fiscais',
+        descricao='Notas fiscais com rateio por médico (uma linha por rateio)',
+        queryset=lambda empresa: NotaFiscal.objects.filter(empresa_destinataria=empresa),
+        filterset_class=NotaFiscalFilter,
+        campo_data='dtEmissao',
+        ordenacao=('dtEmissao', 'numero', 'id', 'rateios_medicos__id'),
+        colunas=[
+            ColunaExportacao('Número', 'numero'),
+            ColunaExportacao('Série', 'serie'),
+            ColunaExportacao('Emissão', 'dtEmissao'),
+            ColunaExportacao('Recebimento', 'dtRecebimento'),
+            ColunaExportacao('Tomador', 'tomador'),
+            ColunaExportacao('CNPJ Tomador', 'cnpj_tomador'),
+            ColunaExportacao('Tipo de Serviço', 'tipo_servico', _rotulo_choices(NotaFiscal.TIPO_SERVICO_CHOICES)),
+            ColunaExportacao('Status', 'status_recebimento', _rotulo_choices(NotaFiscal.STATUS_RECEBIMENTO_CHOICES)),
+            ColunaExportacao('Meio de Pagamento', 'meio_pagamento__nome'),
+            ColunaExportacao('Valor Bruto', 'val_bruto'),
+            ColunaExportacao('ISS', 'val_ISS'),
+            ColunaExportacao('PIS', 'val_PIS'),
+            ColunaExportacao('COFINS', 'val_COFINS'),
+            ColunaExportacao('IRPJ', 'val_IR'),
+            ColunaExportacao('CSLL', 'val_CSLL'),
+            ColunaExportacao('Outros', 'val_outros'),
+            ColunaExportacao('Valor Líquido', 'val_liquido'),
+            ColunaExportacao('Médico', 'rateios_medicos__medico__pessoa__name'),
+            ColunaExportacao('% Participação', 'rateios_medicos__percentual_participacao'),
+            ColunaExportacao('Bruto Médico', 'rateios_medicos__valor_bruto_medico'),
+            ColunaExportacao('ISS Médico', 'rateios_medicos__valor_iss_medico'),
+            ColunaExportacao('PIS Médico', 'rateios_medicos__valor_pis_medico'),
+            ColunaExportacao('COFINS Médico', 'rateios_medicos__valor_cofins_medico'),
+            ColunaExportacao('IRPJ Médico', 'rateios_medicos__valor_ir_medico'),
+            ColunaExportacao('CSLL Médico', 'rateios_medicos__valor_csll_medico'),
+            ColunaExportacao('Líquido Médico', 'rateios_medicos__valor_liquido_medico'),
+        ],
+    ),
+    'despesas_empresa': DefinicaoExportacao(
+        nome='despesas_empresa',
+        descricao='Despesas rateadas da empresa',
+        queryset=lambda empresa: DespesaRateada.objects.filter(item_despesa__grupo_despesa__empresa=empresa),
+        filterset_class=DespesaEmpresaFilter,
+        campo_data='data',
+        ordenacao=('data', 'id'),
+        colunas=[
+            ColunaExportacao('Data', 'data'),
+            ColunaExportacao('Grupo', 'item_despesa__grupo_despesa__descricao'),
+            ColunaExportacao('Código Item', 'item_despesa__codigo'),
+            ColunaExportacao('Item', 'item_despesa__descricao'),
+            ColunaExportacao('Classificação', 'tipo_classificacao', _rotulo_choices(DespesaRateada.TipoClassificacao.choices)),
+            ColunaExportacao('Valor', 'valor'),
+        ],
+    ),
+    'despesas_socio': DefinicaoExportacao(
+        nome='despesas_socio',
+        descricao='Despesas individuais dos sócios',
+        queryset=lambda empresa: DespesaSocio.objects.filter(socio__empresa=empresa),
+        campo_data='data',
+        ordenacao=('data', 'socio__pessoa__name', 'id'),
+        colunas=[
+            ColunaExportacao('Data', 'data'),
+            ColunaExportacao('Sócio', 'socio__pessoa__name'),
+            ColunaExportacao('Grupo', 'item_despesa__grupo_despesa__descricao'),
+            ColunaExportacao('Código Item', 'item_despesa__codigo'),
+            ColunaExportacao('Item', 'item_despesa__descricao'),
+            ColunaExportacao('Classificação', 'tipo_classificacao', _rotulo_choices(DespesaSocio.TipoClassificacao.choices)),
+            ColunaExportacao('Valor', 'valor'),
+        ],
+    ),
+    'lancamentos': DefinicaoExportacao(
+        nome='lancamentos',
+        descricao='Lançamentos de conta corrente',
+        queryset=lambda empresa: MovimentacaoContaCorrente.objects.filter(empresa=empresa),
+        filterset_class=MovimentacaoContaCorrenteFilter,
+        filterset_recebe_request=True,
+        campo_data='data_movimentacao',
+        ordenacao=('data_movimentacao', 'id'),
+        colunas=[
+            ColunaExportacao('Data', 'data_movimentacao'),
+            ColunaExportacao('Sócio', 'socio__pessoa__name'),
+            ColunaExportacao('Descrição', 'descricao_movimentacao__descricao'),
+            ColunaExportacao('Instrumento', 'instrumento_bancario__nome'),
+            ColunaExportacao('Documento', 'numero_documento_bancario'),
+            ColunaExportacao('Histórico', 'historico_complementar'),
+            ColunaExportacao('Valor', 'valor'),
+            ColunaExportacao('Conciliado', 'conciliado', lambda valor: 'Sim' if valor else 'Não'),
+        ],
+    ),
+}
+
+
+def montar_queryset_exportacao(definicao, empresa, request=None, ano=None):
+    """
+    Monta o queryset da exportação: escopo da empresa + FilterSet da tela + ano opcional.
+
+    Retorna um `values_list` já ordenado; nenhuma instância de modelo é criada.
+    """
+    queryset = definicao.queryset(empresa)
+    if definicao.filterset_class is not None and request is not None:
+        kwargs = {'queryset': queryset}
+        if definicao.filterset_recebe_request:
+            kwargs['request'] = request
+        filterset = definicao.filterset_class(request.GET, **kwargs)
+        queryset = filterset.qs
+    if ano:
+        queryset = queryset.filter(**{f'{definicao.campo_data}__year': int(ano)})
+    return queryset.order_by(*definicao.ordenacao).values_list(*definicao.campos())
+
+
+def iterar_linhas(definicao, queryset, chunk_size=TAMANHO_CHUNK_EXPORTACAO):
+    """Itera as linhas do queryset aplicando os formatadores das colunas."""
+    formatadores = [coluna.formatar for coluna in definicao.colunas]
+    for linha in queryset.iterator(chunk_size=chunk_size):
+        yield [
+            formatar(valor) if formatar and valor is not None else valor
+            for formatar, valor in zip(formatadores, linha)
+        ]
+
+
+# ===============================
+# CSV
+# ===============================
+
+class _Eco:
+    """Pseudo-buffer que apenas devolve o que o csv.writer escreve."""
+
+    def write(self, valor):
+        return valor
+
+
+def _valor_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, (date, datetime)):
+        return valor.strftime('%d/%m/%Y')
+    return valor
+
+
+def gerar_csv(cabecalhos, linhas):
+    """Gera o CSV linha a linha (com BOM UTF-8 para abrir corretamente no Excel)."""
+    writer = csv.writer(_Eco())
+    yield '﻿'
+    yield writer.writerow(cabecalhos)
+    for linha in linhas:
+        yield writer.writerow([_valor_csv(valor) for valor in linha])
+
+
+# ===============================
+# XLSX (streaming, sem dependências externas)
+# ===============================
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Estilos: 0 = padrão, 1 = data (dd/mm/aaaa), 2 = número com 2 casas, 3 = cabeçalho em negrito
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="dd/mm/yyyy"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+
+_EPOCA_EXCEL = date(1899, 12, 30)
+
+
+def _workbook_xml(nome_planilha):
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(nome_planilha[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _celula_xlsx(valor, estilo_texto=0):
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="inlineStr"><is><t>{"Sim" if valor else "Não"}</t></is></c>'
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    if isinstance(valor, date):
+        return f'<c s="1"><v>{(valor - _EPOCA_EXCEL).days}</v></c>'
+    if isinstance(valor, Decimal):
+        return f'<c s="2"><v>{valor}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c><v>{valor}</v></c>'
+    estilo = f' s="{estilo_texto}"' if estilo_texto else ''
+    return f'<c t="inlineStr"{estilo}><is><t xml:space="preserve">{escape(str(valor))}</t></is></c>'
+
+
+class _BufferStreaming(io.RawIOBase):
+    """Buffer não-seekable: o zipfile grava nele e o gerador esvazia a cada lote."""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def esvaziar(self):
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def gerar_xlsx(cabecalhos, linhas, nome_planilha='Dados', linhas_por_lote=500):
+    """Gera um XLSX em streaming, entregando bytes a cada `linhas_por_lote` linhas."""
+    buffer = _BufferStreaming()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as pacote:
+        pacote.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        pacote.writestr('_rels/.rels', _XLSX_RELS)
+        pacote.writestr('xl/workbook.xml', _workbook_xml(nome_planilha))
+        pacote.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        pacote.writestr('xl/styles.xml', _XLSX_STYLES)
+        yield buffer.esvaziar()
+
+        with pacote.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True) as planilha:
+            planilha.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            cabecalho = ''.join(_celula_xlsx(valor, estilo_texto=3) for valor in cabecalhos)
+            planilha.write(f'<row>{cabecalho}</row>'.encode('utf-8'))
+            for indice, linha in enumerate(linhas, start=1):
+                planilha.write(f'<row>{"".join(_celula_xlsx(valor) for valor in linha)}</row>'.encode('utf-8'))
+                if indice % linhas_por_lote == 0:
+                    dados = buffer.esvaziar()
+                    if dados:
+                        yield dados
+            planilha.write(b'</sheetData></worksheet>')
+    yield buffer.esvaziar()
+
+
+# ===============================
+# Resposta HTTP
+# ===============================
+
+def resposta_streaming(cabecalhos, linhas, formato, nome_arquivo, nome_planilha='Dados'):
+    """Monta a StreamingHttpResponse no formato solicitado (csv ou xlsx)."""
+    if formato == FORMATO_XLSX:
+        response = StreamingHttpResponse(
+            gerar_xlsx(cabecalhos, linhas, nome_planilha=nome_planilha),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    else:
+        response = StreamingHttpResponse(
+            gerar_csv(cabecalhos, linhas),
+            content_type='text/csv; charset=utf-8',
+        )
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}.{formato}"'
+    return response
+
+
+def exportar(definicao, empresa, formato, request=None, ano=None):
+    """Executa a exportação descrita por `definicao` e devolve a resposta em streaming."""
+    # O corpo é gerado depois que a view retorna: fixa o banco escolhido agora
+    queryset = montar_queryset_exportacao(definicao, empresa, request=request, ano=ano).using(alias_leitura())
+    sufixo = ano or datetime.now().strftime('%Y%m%d')
+    nome_arquivo = f'{definicao.nome}_{empresa.id}_{sufixo}'
+    return resposta_streaming(
+        definicao.cabecalhos(),
+        iterar_linhas(definicao, queryset),
+        formato,
+        nome_arquivo,
+        nome_planilha=definicao.nome,
+    )
@@ -4,6 +4,24 @@ from .models.fiscal import Aliquotas
 from medicos.models.despesas import GrupoDespesa
 from .models import ItemDespesa
 from .models.financeiro import DescricaoMovimentacaoFinanceira
+from medicos.services.busca import filtro_busca, normalizar_busca
+
+
+class BuscaNormalizadaFilter(django_filters.CharFilter):
+    """
+    Filtro por trecho numa coluna normalizada (*_busca, ver
+    medicos/services/busca.py): ignora acentos e caixa e, no PostgreSQL,
+    usa o índice de trigramas em vez de varrer a tabela com icontains.
+    """
+
+    def __init__(self, *args, normalizador=normalizar_busca, **kwargs):
+        self.normalizador = normalizador
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        condicao = filtro_busca(self.field_name, value, self.normalizador)
+        return qs.filter(condicao) if condicao else qs
+
 
 class EmpresaFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(label='Nome', lookup_expr='icontains')
@@ -26,7 +44,7 @@ class GrupoDespesaFilter(django_filters.FilterSet):
         fields = ['descricao']
 
 class ItemDespesaFilter(django_filters.FilterSet):
-    descricao = django_filters.CharFilter(lookup_expr='icontains', label='Descrição')
+    descricao = BuscaNormalizadaFilter(field_name='descricao_busca', label='Descrição')
 
     class Meta:
         model = ItemDespesa
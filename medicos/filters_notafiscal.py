@@ -1,5 +1,7 @@
 import django_filters
+from medicos.filters import BuscaNormalizadaFilter
 from medicos.models.fiscal import NotaFiscal
+from medicos.services.busca import normalizar_documento
 
 class NotaFiscalFilter(django_filters.FilterSet):
     def __init__(self, *args, **kwargs):
@@ -18,8 +20,10 @@ class NotaFiscalFilter(django_filters.FilterSet):
             else:
                 field.widget.attrs['class'] = 'form-control'
     numero = django_filters.CharFilter(lookup_expr='icontains', label='Número')
-    tomador = django_filters.CharFilter(lookup_expr='icontains', label='Tomador do Serviço')
-    cnpj_tomador = django_filters.CharFilter(lookup_expr='icontains', label='CNPJ do Tomador')
+    tomador = BuscaNormalizadaFilter(field_name='tomador_busca', label='Tomador do Serviço')
+    cnpj_tomador = BuscaNormalizadaFilter(
+        field_name='cnpj_tomador_busca', normalizador=normalizar_documento, label='CNPJ do Tomador'
+    )
     status_recebimento = django_filters.ChoiceFilter(choices=NotaFiscal.STATUS_RECEBIMENTO_CHOICES, label='Status do Recebimento')
     mes_ano_emissao = django_filters.CharFilter(label='Mês/Ano de Emissão', method='filter_mes_ano_emissao')
 
@@ -37,6 +37,8 @@ import django_filters
 from django import forms
 from datetime import date
 from medicos.models.fiscal import NotaFiscal
+from medicos.filters import BuscaNormalizadaFilter
+from medicos.services.busca import normalizar_documento
 
 class NotaFiscalRateioFilter(django_filters.FilterSet):
     mes_emissao = django_filters.CharFilter(
@@ -56,8 +58,8 @@ class NotaFiscalRateioFilter(django_filters.FilterSet):
         })
     )
     numero = django_filters.CharFilter(field_name="numero", lookup_expr="icontains", label="Nº NF")
-    tomador = django_filters.CharFilter(field_name="tomador", lookup_expr="icontains", label="Tomador")
-    cnpj_tomador = django_filters.CharFilter(field_name="cnpj_tomador", lookup_expr="icontains", label="CNPJ do Tomador")
+    tomador = BuscaNormalizadaFilter(field_name="tomador_busca", label="Tomador")
+    cnpj_tomador = BuscaNormalizadaFilter(field_name="cnpj_tomador_busca", normalizador=normalizar_documento, label="CNPJ do Tomador")
     
     def filter_mes_emissao(self, queryset, name, value):
         """Filtrar por mês/ano de emissão"""
@@ -223,7 +225,6 @@ class CustomUserCreationForm(UserCreationForm):
         self.fields['last_name'].required = True
 
     def save(self, commit=True, request=None):
-        print('DEBUG: Entrou no save do CustomUserCreationForm')
         import logging
         logger = logging.getLogger('auth.debug')
         logger.info('Iniciando fluxo de registro de usuário.')
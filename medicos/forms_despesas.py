@@ -52,25 +52,15 @@ class DespesaEmpresaForm(forms.ModelForm):
         }
 
     def __init__(self, *args, **kwargs):
-        import sys
         empresa_id = kwargs.pop('empresa_id', None)
-        print(f"[DespesaEmpresaForm] empresa_id recebido: {empresa_id}", file=sys.stderr)
         super().__init__(*args, **kwargs)
-        initial_item_id = None
         if self.instance and self.instance.pk and self.instance.item_despesa_id:
-            initial_item_id = self.instance.item_despesa_id
-            print(f"[DespesaEmpresaForm] item_despesa_id inicial: {initial_item_id}", file=sys.stderr)
-            self.initial['item_despesa'] = initial_item_id
-        else:
-            print(f"[DespesaEmpresaForm] Nenhum item_despesa_id inicial detectado.", file=sys.stderr)
+            self.initial['item_despesa'] = self.instance.item_despesa_id
         queryset = ItemDespesa.objects.filter(
             grupo_despesa__empresa_id=empresa_id,
             grupo_despesa__tipo_rateio=GrupoDespesa.Tipo_t.COM_RATEIO
         )
-        print(f"[DespesaEmpresaForm] itens encontrados: {queryset.count()}", file=sys.stderr)
-        print(f"[DespesaEmpresaForm] IDs dos itens: {[i.id for i in queryset]}", file=sys.stderr)
         self.fields['item_despesa'].queryset = queryset
         # Não sobrescrever o widget após definir o queryset, mantendo o padrão do ModelForm
         if self.instance and self.instance.pk and self.instance.data:
-            print(f"[DespesaEmpresaForm] Data inicial: {self.instance.data}", file=sys.stderr)
             self.initial['data'] = self.instance.data.strftime('%Y-%m-%d')
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+from medicos.models.relatorios import SnapshotPeriodo
+from medicos.services.snapshots_periodo import (
+    FORMATO_PAYLOAD,
+    ORIGEM_AUDITORIA,
+    auditar_snapshot,
+    competencia_de,
+    congelar,
+)
+
+
+class Command(BaseCommand):
+    """
+    Management command para auditar os snapshots de competências fechadas:
+    recalcula cada relatório congelado a partir dos lançamentos atuais e
+    lista os campos que mudaram desde o congelamento.
+
+    Com --regerar, os snapshots com diferenças ganham uma nova versão com o
+    valor recalculado (a versão anterior fica inativa, para consulta).
+
+    Uso:
+        python manage.py auditar_snapshots_periodo --empresa 5 --competencia 2025-08
+        python manage.py auditar_snapshots_periodo --empresa 5 --competencia 2025-08 --tipo apuracao
+        python manage.py auditar_snapshots_periodo --empresa 5 --competencia 2025-08 --regerar
+    """
+
+    help = 'Compara os snapshots de relatórios de uma competência com o recálculo atual'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, required=True, help='ID da empresa')
+        parser.add_argument('--competencia', type=str, required=True, help='Competência no formato YYYY-MM')
+        parser.add_argument(
+            '--tipo',
+            choices=[tipo for tipo, _ in SnapshotPeriodo.TIPO_CHOICES],
+            help='Audita apenas um tipo de relatório'
+        )
+        parser.add_argument(
+            '--regerar',
+            action='store_true',
+            help='Grava nova versão dos snapshots que divergem do recálculo'
+        )
+        parser.add_argument('--limite', type=int, default=20, help='Diferenças exibidas por snapshot')
+
+    def handle(self, *args, **options):
+        try:
+            competencia = competencia_de(options['competencia'])
+        except ValueError as e:
+            raise CommandError(f'Formato de competência inválido: {e}')
+
+        snapshots = SnapshotPeriodo.objects.filter(
+            empresa_id=options['empresa'],
+            competencia=competencia,
+            ativo=True,
+            formato=FORMATO_PAYLOAD,
+        )
+        if options['tipo']:
+            snapshots = snapshots.filter(tipo=options['tipo'])
+        if not snapshots:
+            self.stdout.write(self.style.WARNING('Nenhum snapshot vigente para os filtros informados'))
+            return
+
+        divergentes = 0
+        for snapshot in snapshots:
+            recalculado, diferencas = auditar_snapshot(snapshot)
+            if not diferencas:
+                self.stdout.write(f'  {snapshot}: sem diferenças')
+                continue
+
+            divergentes += 1
+            self.stdout.write(self.style.WARNING(f'  {snapshot}: {len(diferencas)} diferença(s)'))
+            for caminho, congelado, atual in diferencas[:options['limite']]:
+                self.stdout.write(f'    {caminho}: {congelado!r} -> {atual!r}')
+            if len(diferencas) > options['limite']:
+                self.stdout.write(f'    ... e mais {len(diferencas) - options["limite"]}')
+
+            if options['regerar']:
+                novo = congelar(
+                    snapshot.empresa_id, snapshot.tipo, snapshot.competencia, recalculado,
+                    chave=snapshot.chave, origem=ORIGEM_AUDITORIA,
+                )
+                self.stdout.write(f'    regerado como versão {novo.versao}')
+
+        resumo = f'{snapshots.count()} snapshot(s) auditados, {divergentes} com diferenças'
+        self.stdout.write(self.style.WARNING(resumo) if divergentes else self.style.SUCCESS(resumo))
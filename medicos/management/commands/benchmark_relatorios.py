@@ -0,0 +1,163 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from medicos.models.base import Empresa
+from medicos.services.benchmark import (
+    CENARIOS,
+    TOLERANCIA_TEMPO_PADRAO,
+    comparar_resultados,
+    executar_benchmarks,
+)
+from medicos.services.dados_sinteticos import GeradorDadosSinteticos
+
+
+class Command(BaseCommand):
+    """
+    Benchmark dos builders fiscais, da importação de XML, da cópia de despesas
+    e do fechamento mensal: tempo de parede e quantidade de queries SQL por
+    cenário, com saída em JSON para comparação entre commits.
+
+    Roda no banco configurado (Postgres local ou SQLite com
+    BENCHMARK_SQLITE_PATH; nesse caso crie as tabelas antes com
+    `python manage.py migrate --run-syncdb`). As execuções são desfeitas ao
+    final de cada repetição; apenas o tenant gerado por --gerar permanece.
+
+    Uso:
+        python manage.py benchmark_relatorios --gerar --notas-por-mes 200 --saida base.json
+        python manage.py benchmark_relatorios --empresa_id 5 --ano 2025 --mes 6 --saida atual.json \\
+            --comparar base.json --falhar-em-regressao
+    """
+
+    help = 'Mede tempo e queries dos caminhos pesados de relatório e gravação (saída JSON)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa_id', type=int, help='Empresa existente a usar nos cenários')
+        parser.add_argument(
+            '--gerar',
+            action='store_true',
+            help='Gera um tenant sintético (gerar_dados_sinteticos) e o usa nos cenários'
+        )
+        parser.add_argument('--socios', type=int, default=5, help='Sócios do tenant gerado (default: 5)')
+        parser.add_argument('--notas-por-mes', type=int, default=40, help='Notas/mês do tenant gerado (default: 40)')
+        parser.add_argument(
+            '--despesas-por-mes', type=int, default=20,
+            help='Despesas/mês do tenant gerado (default: 20)'
+        )
+        parser.add_argument('--semente', type=int, default=None, help='Semente do tenant gerado (default: timestamp)')
+        parser.add_argument('--ano', type=int, default=None, help='Ano das apurações (default: ano atual)')
+        parser.add_argument('--mes', type=int, default=12, help='Mês do relatório, cópia e fechamento (default: 12)')
+        parser.add_argument('--socio_id', type=int, default=None, help='Sócio do relatório mensal (default: primeiro)')
+        parser.add_argument(
+            '--cenarios',
+            nargs='+',
+            choices=list(CENARIOS),
+            help='Cenários a executar (default: todos)'
+        )
+        parser.add_argument('--repeticoes', type=int, default=3, help='Execuções medidas por cenário (default: 3)')
+        parser.add_argument('--aquecimento', type=int, default=1, help='Execuções descartadas por cenário (default: 1)')
+        parser.add_argument('--notas-xml', type=int, default=20, help='Arquivos XML por importação (default: 20)')
+        parser.add_argument('--saida', type=str, help='Arquivo JSON de saída (default: apenas stdout)')
+        parser.add_argument('--comparar', type=str, help='JSON de uma execução anterior para comparação')
+        parser.add_argument(
+            '--tolerancia', type=float, default=TOLERANCIA_TEMPO_PADRAO,
+            help=f'Aumento relativo de tempo tolerado na comparação (default: {TOLERANCIA_TEMPO_PADRAO})'
+        )
+        parser.add_argument(
+            '--falhar-em-regressao',
+            action='store_true',
+            help='Termina com erro se a comparação encontrar regressão'
+        )
+
+    def handle(self, *args, **options):
+        ano = options['ano'] or timezone.localdate().year
+        mes = options['mes']
+        if not 1 <= mes <= 12:
+            raise CommandError('Mês deve estar entre 1 e 12')
+        if options['repeticoes'] < 1:
+            raise CommandError('--repeticoes deve ser pelo menos 1')
+
+        referencia = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as arquivo:
+                    referencia = json.load(arquivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Não foi possível ler {options['comparar']}: {e}")
+
+        empresa_id = options['empresa_id']
+        if options['gerar']:
+            semente = options['semente'] if options['semente'] is not None else int(timezone.now().timestamp())
+            gerador = GeradorDadosSinteticos(
+                ano=ano,
+                meses=mes,
+                socios=options['socios'],
+                notas_por_mes=options['notas_por_mes'],
+                despesas_por_mes=options['despesas_por_mes'],
+                semente=semente,
+            )
+            self.stdout.write(self.style.HTTP_INFO(f'Gerando tenant sintético (semente {semente})...'))
+            empresa_id = gerador.gerar_empresa(0)['empresa_id']
+        if not empresa_id:
+            raise CommandError('Informe --empresa_id ou --gerar')
+        if not Empresa.objects.filter(id=empresa_id).exists():
+            raise CommandError(f'Empresa {empresa_id} não encontrada')
+
+        self.stdout.write(self.style.HTTP_INFO(
+            f'Benchmark: empresa {empresa_id}, competência {mes:02d}/{ano}, banco {connection.vendor}, '
+            f"{options['repeticoes']} repetição(ões)"
+        ))
+
+        def ao_concluir(nome, resultado):
+            if 'erro' in resultado:
+                self.stdout.write(self.style.ERROR(f"  {nome:<28} ERRO {resultado['erro']}"))
+                return
+            self.stdout.write(
+                f"  {nome:<28} {resultado['tempo_mediano_s'] * 1000:>10.1f} ms  "
+                f"{resultado['queries']:>6} queries"
+            )
+
+        resultado = executar_benchmarks(
+            empresa_id, ano, mes,
+            socio_id=options['socio_id'],
+            cenarios=options['cenarios'],
+            repeticoes=options['repeticoes'],
+            aquecimento=options['aquecimento'],
+            notas_xml=options['notas_xml'],
+            ao_concluir=ao_concluir,
+        )
+
+        regressoes = []
+        if referencia is not None:
+            comparacao = comparar_resultados(resultado, referencia, options['tolerancia'])
+            resultado['comparacao'] = {
+                'referencia': referencia.get('metadados', {}).get('commit'),
+                'tolerancia_tempo': options['tolerancia'],
+                'cenarios': comparacao,
+            }
+            self.stdout.write(self.style.HTTP_INFO(
+                f"Comparação com {resultado['comparacao']['referencia'] or options['comparar']}:"
+            ))
+            for item in comparacao:
+                linha = (
+                    f"  {item['cenario']:<28} tempo x{item['razao_tempo'] or 0:.2f}  "
+                    f"queries {item['queries_referencia']} -> {item['queries']}"
+                )
+                if item['regressao']:
+                    regressoes.append(item['cenario'])
+                    self.stdout.write(self.style.ERROR(linha + '  REGRESSÃO'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(linha))
+
+        conteudo = json.dumps(resultado, ensure_ascii=False, indent=2)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(conteudo + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Resultados gravados em {options['saida']}"))
+        else:
+            self.stdout.write(conteudo)
+
+        if regressoes and options['falhar_em_regressao']:
+            raise CommandError(f"Regressão em: {', '.join(regressoes)}")
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from medicos.models.base import Empresa
+from medicos.services.clonagem_cadastros import (
+    SECAO_RATEIO,
+    SECOES_CLONAGEM,
+    ClonagemCadastrosService,
+)
+
+
+class Command(BaseCommand):
+    """
+    Management command para implantar uma empresa a partir de uma empresa
+    modelo da mesma conta: grupos e itens de despesa, descrições de
+    movimentação, meios de pagamento, alíquotas e, opcionalmente, a matriz de
+    rateio do mês mais recente, tudo em uma transação.
+
+    Uso:
+        python manage.py clonar_cadastros_empresa --origem 3 --destino 7
+        python manage.py clonar_cadastros_empresa --origem 3 --destino 7 --com-rateio
+        python manage.py clonar_cadastros_empresa --origem 3 --destino 7 --secoes meios_pagamento aliquotas
+    """
+
+    help = 'Clona os cadastros (plano de despesas, descrições, meios, alíquotas) entre empresas da mesma conta'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--origem', type=int, required=True, help='ID da empresa modelo')
+        parser.add_argument('--destino', type=int, required=True, help='ID da empresa a implantar')
+        parser.add_argument(
+            '--secoes',
+            nargs='+',
+            choices=[secao for secao in SECOES_CLONAGEM if secao != SECAO_RATEIO],
+            help='Seções a clonar (padrão: todas, exceto rateio)'
+        )
+        parser.add_argument(
+            '--com-rateio',
+            action='store_true',
+            help='Inclui a matriz de rateio do mês mais recente da origem'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            empresa_destino = Empresa.objects.get(id=options['destino'])
+            servico = ClonagemCadastrosService.para_empresas(options['origem'], empresa_destino)
+        except Empresa.DoesNotExist:
+            raise CommandError(f"Empresa destino {options['destino']} não encontrada")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        secoes = list(options['secoes'] or [s for s in SECOES_CLONAGEM if s != SECAO_RATEIO])
+        if options['com_rateio']:
+            secoes.append(SECAO_RATEIO)
+
+        resultado = servico.clonar(secoes)
+        for secao, contadores in resultado.items():
+            detalhes = ', '.join(f'{chave}={valor}' for chave, valor in contadores.items())
+            self.stdout.write(f'  {secao}: {detalhes}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Cadastros de {servico.nome_origem} clonados para {empresa_destino.name}'
+        ))
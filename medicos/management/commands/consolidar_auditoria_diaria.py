@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from medicos.models.auditoria import ResumoAuditoriaDiario
+from datetime import date, timedelta
+
+
+class Command(BaseCommand):
+    """
+    Management command para gerar o resumo diário (por conta) dos logs de auditoria.
+
+    Sem --data, consolida todos os dias desde o último consolidado até ontem
+    (na primeira execução, desde o log mais antigo). É idempotente: reconsolidar
+    um dia substitui o resumo anterior.
+
+    Uso:
+        python manage.py consolidar_auditoria_diaria
+        python manage.py consolidar_auditoria_diaria --data 2025-09-15
+    """
+
+    help = 'Consolida os logs de auditoria em contagens diárias por conta'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data',
+            type=str,
+            help='Dia específico a (re)consolidar, no formato YYYY-MM-DD'
+        )
+
+    def handle(self, *args, **options):
+        ontem = timezone.localdate() - timedelta(days=1)
+
+        for origem, rotulo in ResumoAuditoriaDiario.ORIGEM_CHOICES:
+            if options['data']:
+                try:
+                    dias = [date.fromisoformat(options['data'])]
+                except ValueError as e:
+                    raise CommandError(f'Data inválida: {e}')
+            else:
+                dias = self._dias_pendentes(origem, ontem)
+
+            total = 0
+            for dia in dias:
+                total += ResumoAuditoriaDiario.consolidar_dia(origem, dia)
+            self.stdout.write(self.style.SUCCESS(
+                f'{rotulo}: {len(dias)} dia(s) consolidado(s), {total} linha(s) de resumo'
+            ))
+
+    def _dias_pendentes(self, origem, ontem):
+        ultima = ResumoAuditoriaDiario.ultima_data_consolidada(origem)
+        if ultima:
+            inicio = ultima + timedelta(days=1)
+        else:
+            modelo, campo_data, _, _ = ResumoAuditoriaDiario._fonte(origem)
+            primeiro = modelo.objects.order_by(campo_data).values_list(campo_data, flat=True).first()
+            if primeiro is None:
+                return []
+            inicio = timezone.localtime(primeiro).date()
+        dias = []
+        while inicio <= ontem:
+            dias.append(inicio)
+            inicio += timedelta(days=1)
+        return dias
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from medicos.services import buffer_metricas
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Management command para descarregar o buffer Redis de métricas SaaS em ContaMetrics.
+
+    Pode ser executado periodicamente (cron) ou como worker contínuo.
+
+    Uso:
+        python manage.py descarregar_metricas_saas
+        python manage.py descarregar_metricas_saas --continuo --intervalo 60
+    """
+
+    help = 'Persiste em ContaMetrics as métricas SaaS acumuladas no Redis'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Quantidade de hashes (conta/dia) descarregados por lote'
+        )
+
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Executa como worker, descarregando a cada --intervalo segundos'
+        )
+
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=60,
+            help='Intervalo em segundos entre descargas no modo contínuo'
+        )
+
+    def handle(self, *args, **options):
+        if buffer_metricas.obter_conexao_redis() is None:
+            self.stdout.write(self.style.WARNING('Buffer Redis de métricas indisponível; nada a descarregar'))
+            return
+
+        while True:
+            try:
+                total = self._descarregar_tudo(options['lote'])
+            except Exception as e:
+                if not options['continuo']:
+                    raise
+                # Worker não morre por falha transitória (Redis/banco): registra e tenta no próximo ciclo
+                logger.exception(f"Falha ao descarregar métricas SaaS: {e}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{total} métricas persistidas'))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+    def _descarregar_tudo(self, lote):
+        total = 0
+        while True:
+            persistidas = buffer_metricas.descarregar(tamanho_lote=lote)
+            if not persistidas:
+                return total
+            total += persistidas
@@ -1,6 +1,10 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from medicos.relatorios.builders import processar_fechamento_mensal_conta_corrente, fechar_periodo_conta_corrente
+from medicos.relatorios.builders import (
+    processar_fechamento_mensal_conta_corrente,
+    fechar_periodo_conta_corrente,
+    reabrir_periodo_conta_corrente,
+)
 from medicos.models.base import Empresa
 from datetime import date
 import calendar
@@ -16,6 +20,7 @@ class Command(BaseCommand):
     Uso:
         python manage.py fechar_conta_corrente_mensal --empresa_id 5 --competencia 2025-08
         python manage.py fechar_conta_corrente_mensal --empresa_id 5 --competencia 2025-08 --fechar
+        python manage.py fechar_conta_corrente_mensal --empresa_id 5 --competencia 2025-08 --reabrir --motivo "NF cancelada"
     
     Fonte: Práticas bancárias e padrões do projeto
     """
@@ -48,6 +53,19 @@ class Command(BaseCommand):
             action='store_true',
             help='Força reprocessamento mesmo se já processado'
         )
+        
+        parser.add_argument(
+            '--reabrir',
+            action='store_true',
+            help='Reabre o período fechado e invalida os snapshots dos relatórios'
+        )
+        
+        parser.add_argument(
+            '--motivo',
+            type=str,
+            default='',
+            help='Motivo da reabertura (registrado nos saldos e snapshots)'
+        )
 
     def handle(self, *args, **options):
         empresa_id = options['empresa_id']
@@ -70,6 +88,22 @@ class Command(BaseCommand):
         except Empresa.DoesNotExist:
             raise CommandError(f'Empresa {empresa_id} não encontrada')
         
+        if options['reabrir']:
+            resultado = reabrir_periodo_conta_corrente(
+                empresa_id,
+                competencia,
+                usuario=f'Command {self.__class__.__name__}',
+                motivo=options['motivo']
+            )
+            if not resultado['sucesso']:
+                raise CommandError('; '.join(resultado['erros']))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✅ Período {resultado["competencia"]} reaberto: {resultado["saldos_reabertos"]} saldos'
+                )
+            )
+            return
+        
         self.stdout.write(
             self.style.HTTP_INFO(
                 f'Iniciando fechamento mensal para {empresa.nome_fantasia} - {competencia_str}'
@@ -129,6 +163,8 @@ class Command(BaseCommand):
                             )
                         )
                         self.stdout.write(f'   Saldos fechados: {resultado_fechamento["saldos_fechados"]}')
+                        if resultado_fechamento.get('snapshots'):
+                            self.stdout.write(f'   Relatórios congelados: {resultado_fechamento["snapshots"]}')
                     else:
                         self.stdout.write(
                             self.style.ERROR('❌ Erro no fechamento oficial:')
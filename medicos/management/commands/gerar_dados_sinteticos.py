@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from medicos.models.base import Conta
+from medicos.services.dados_sinteticos import (
+    PREFIXO_CONTA,
+    GeradorDadosSinteticos,
+    remover_dados_sinteticos,
+)
+
+
+class Command(BaseCommand):
+    """
+    Semeia tenants sintéticos (empresas, sócios, notas fiscais com rateio,
+    despesas com matriz mensal de rateio, Financeiro e conta corrente) para
+    benchmarks e testes de carga.
+
+    Os dados são reprodutíveis pela semente e ficam em contas com o prefixo
+    "Sintética"; nunca use este comando em banco de produção.
+
+    Uso:
+        python manage.py gerar_dados_sinteticos --empresas 2 --socios 8 --notas-por-mes 200
+        python manage.py gerar_dados_sinteticos --limpar --empresas 0
+    """
+
+    help = 'Gera tenants sintéticos em escala configurável para benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresas', type=int, default=1, help='Quantidade de empresas (default: 1)')
+        parser.add_argument('--socios', type=int, default=5, help='Sócios por empresa (default: 5)')
+        parser.add_argument(
+            '--notas-por-mes', type=int, default=40,
+            help='Notas fiscais por empresa/mês (default: 40)'
+        )
+        parser.add_argument(
+            '--despesas-por-mes', type=int, default=20,
+            help='Despesas (rateadas + individuais) por empresa/mês (default: 20)'
+        )
+        parser.add_argument(
+            '--lancamentos-por-mes', type=int, default=2,
+            help='Lançamentos Financeiro por sócio/mês (default: 2)'
+        )
+        parser.add_argument('--ano', type=int, default=None, help='Ano das competências (default: ano atual)')
+        parser.add_argument('--meses', type=int, default=12, help='Meses gerados a partir de janeiro (default: 12)')
+        parser.add_argument('--semente', type=int, default=0, help='Semente do gerador (default: 0)')
+        parser.add_argument(
+            '--limpar',
+            action='store_true',
+            help='Remove os tenants sintéticos existentes antes de gerar (com --empresas 0, apenas remove)'
+        )
+
+    def handle(self, *args, **options):
+        if options['limpar']:
+            removidas = remover_dados_sinteticos()
+            self.stdout.write(self.style.WARNING(f'{removidas} empresa(s) sintética(s) removida(s)'))
+        if options['empresas'] <= 0:
+            return
+
+        semente = options['semente']
+        existentes = Conta.objects.filter(name__startswith=f'{PREFIXO_CONTA} {semente}-')
+        if existentes.exists():
+            raise CommandError(
+                f'Já existem tenants sintéticos com a semente {semente}. '
+                f'Use --limpar ou outra --semente.'
+            )
+
+        gerador = GeradorDadosSinteticos(
+            ano=options['ano'] or timezone.localdate().year,
+            meses=options['meses'],
+            socios=options['socios'],
+            notas_por_mes=options['notas_por_mes'],
+            despesas_por_mes=options['despesas_por_mes'],
+            lancamentos_por_mes=options['lancamentos_por_mes'],
+            semente=semente,
+        )
+        self.stdout.write(self.style.HTTP_INFO(
+            f"Gerando {options['empresas']} empresa(s) sintética(s) para {gerador.ano} "
+            f"({gerador.meses} mês(es), semente {semente})..."
+        ))
+        for indice in range(options['empresas']):
+            resumo = gerador.gerar_empresa(indice)
+            self.stdout.write(self.style.SUCCESS(
+                f"Empresa {resumo['empresa_id']} (CNPJ {resumo['cnpj']}): "
+                f"{resumo['socios']} sócios, {resumo['notas_fiscais']} notas, {resumo['rateios']} rateios, "
+                f"{resumo['despesas_rateadas'] + resumo['despesas_socio']} despesas, "
+                f"{resumo['recebimentos_conta_corrente'] + resumo['debitos_conta_corrente']} lançamentos de conta corrente, "
+                f"{resumo['lancamentos_financeiro']} lançamentos financeiros"
+            ))
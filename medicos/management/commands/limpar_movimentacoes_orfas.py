@@ -1,5 +1,6 @@
-from django.core.management.base import BaseCommand
-from medicos.signals_financeiro import limpar_movimentacoes_orfas
+from django.core.management.base import BaseCommand, CommandError
+from medicos.services.lotes import LockIndisponivel, TarefaEmExecucao
+from medicos.services.manutencao_financeiro import limpar_movimentacoes_orfas
 
 
 class Command(BaseCommand):
@@ -8,8 +9,11 @@ class Command(BaseCommand):
     
     Estas movimentações órfãs são criadas quando uma nota fiscal é excluída 
     mas o sistema anterior usava SET_NULL em vez de remover o registro completo.
+
+    A remoção é feita em lotes de --batch-size ids, cada um em uma transação
+    curta; interrompido, basta rodar de novo.
     
-    Uso: python manage.py limpar_movimentacoes_orfas
+    Uso: python manage.py limpar_movimentacoes_orfas [--dry-run] [--batch-size 1000] [--pause 0.5]
     '''
 
     def add_arguments(self, parser):
@@ -18,49 +22,64 @@ class Command(BaseCommand):
             action='store_true',
             help='Apenas simula a operação, sem remover os registros',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Movimentações removidas por lote (padrão: 1000)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Pausa em segundos entre lotes, para aliviar o banco em horário de uso',
+        )
 
     def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser maior que zero')
+
         self.stdout.write(
             self.style.WARNING('Iniciando limpeza de movimentações financeiras órfãs...')
         )
-        
-        if options['dry_run']:
+        dry_run = options['dry_run']
+        if dry_run:
             self.stdout.write(
                 self.style.NOTICE('MODO SIMULAÇÃO - Nenhum registro será removido')
             )
-            
-            # Contar órfãs sem remover
-            from medicos.models.financeiro import Financeiro
-            movimentacoes_orfas = Financeiro.objects.filter(
-                nota_fiscal__isnull=True,
-                descricao_movimentacao_financeira__descricao='Credito de Nota Fiscal'
-            )
-            count_orfas = movimentacoes_orfas.count()
-            
-            if count_orfas > 0:
-                self.stdout.write(f'Seriam removidas {count_orfas} movimentação(ões) órfã(s):')
-                for mov in movimentacoes_orfas:
+
+        def ao_progredir(progresso, linhas):
+            self.stdout.write(str(progresso))
+            if dry_run or options['verbosity'] >= 2:
+                for mov_id, socio_nome, valor, data in linhas:
                     self.stdout.write(
-                        f'  - ID: {mov.id}, Sócio: {mov.socio.pessoa.name}, '
-                        f'Valor: R$ {mov.valor}, Data: {mov.data_movimentacao}'
+                        f'  - ID: {mov_id}, Sócio: {socio_nome}, '
+                        f'Valor: R$ {valor}, Data: {data}'
                     )
-            else:
-                self.stdout.write('Nenhuma movimentação órfã encontrada.')
+
+        try:
+            total = limpar_movimentacoes_orfas(
+                tamanho_lote=options['batch_size'],
+                simular=dry_run,
+                pausa=options['pause'],
+                ao_progredir=ao_progredir,
+            )
+        except (TarefaEmExecucao, LockIndisponivel) as e:
+            raise CommandError(str(e))
+
+        if not total:
+            self.stdout.write(
+                self.style.SUCCESS('✅ Nenhuma movimentação órfã encontrada. Dados já estão limpos!')
+            )
+        elif dry_run:
+            self.stdout.write(f'Seriam removidas {total} movimentação(ões) órfã(s)')
         else:
-            # Executar limpeza real
-            count_removidas = limpar_movimentacoes_orfas()
-            
-            if count_removidas > 0:
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'✅ {count_removidas} movimentação(ões) órfã(s) removida(s) com sucesso!'
-                    )
-                )
-            else:
-                self.stdout.write(
-                    self.style.SUCCESS('✅ Nenhuma movimentação órfã encontrada. Dados já estão limpos!')
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'✅ {total} movimentação(ões) órfã(s) removida(s) com sucesso!'
                 )
-        
+            )
+
         self.stdout.write(
             self.style.SUCCESS('Comando concluído.')
         )
@@ -1,12 +1,27 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from medicos.models.despesas import DespesaSocio
-from medicos.models.financeiro import Financeiro, DescricaoMovimentacaoFinanceira
+from django.core.management.base import BaseCommand, CommandError
+from medicos.services.lotes import LockIndisponivel, TarefaEmExecucao
+from medicos.services.manutencao_financeiro import migrar_despesas_para_financeiro
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 class Command(BaseCommand):
+    """
+    Migra as despesas de sócio para lançamentos de movimentação financeira
+    (Financeiro), em páginas de --batch-size despesas.
+
+    Cada página é lida com uma query (a existência do lançamento vem de um
+    anti-join) e gravada em uma transação curta com bulk_create, de modo que
+    o comando pode rodar com o sistema em uso. É idempotente e retomável: o
+    último id concluído fica em checkpoint e uma nova execução com os mesmos
+    filtros continua dali (--reset-checkpoint recomeça do início).
+
+    Uso:
+        python manage.py migrate_despesas_to_financeiro --dry-run
+        python manage.py migrate_despesas_to_financeiro --empresa-id 5 --batch-size 2000
+        python manage.py migrate_despesas_to_financeiro --pause 0.5 -v 2
+    """
+
     help = 'Migra despesas de sócio existentes para a tabela de movimentação financeira'
 
     def add_arguments(self, parser):
@@ -25,119 +40,80 @@ class Command(BaseCommand):
             action='store_true',
             help='Executa sem fazer alterações, apenas mostra o que seria feito',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Despesas lidas e gravadas por página (padrão: 1000)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Pausa em segundos entre páginas, para aliviar o banco em horário de uso',
+        )
+        parser.add_argument(
+            '--reset-checkpoint',
+            action='store_true',
+            help='Ignora o checkpoint da execução anterior e recomeça do início',
+        )
 
     def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser maior que zero')
+
         self.stdout.write(self.style.SUCCESS('Iniciando migração de despesas para movimentação financeira...'))
-        
-        # Filtros opcionais
-        empresa_id = options.get('empresa_id')
-        socio_id = options.get('socio_id')
-        dry_run = options.get('dry_run', False)
-        
-        # Buscar todas as despesas de sócio
-        despesas_qs = DespesaSocio.objects.all().select_related(
-            'socio', 
-            'item_despesa__grupo_despesa__empresa'
-        )
-        
-        if empresa_id:
-            despesas_qs = despesas_qs.filter(item_despesa__grupo_despesa__empresa_id=empresa_id)
-            self.stdout.write(f'Filtrando por empresa ID: {empresa_id}')
-        
-        if socio_id:
-            despesas_qs = despesas_qs.filter(socio_id=socio_id)
-            self.stdout.write(f'Filtrando por sócio ID: {socio_id}')
-        
-        total_despesas = despesas_qs.count()
-        self.stdout.write(f'Total de despesas encontradas: {total_despesas}')
-        
+        dry_run = options['dry_run']
+        if options['empresa_id']:
+            self.stdout.write(f'Filtrando por empresa ID: {options["empresa_id"]}')
+        if options['socio_id']:
+            self.stdout.write(f'Filtrando por sócio ID: {options["socio_id"]}')
         if dry_run:
             self.stdout.write(self.style.WARNING('MODO DRY-RUN: Nenhuma alteração será feita'))
-        
+
         # Obter usuário admin para as criações (primeiro superuser encontrado)
-        admin_user = User.objects.filter(is_superuser=True).first()
+        admin_user = User.objects.filter(is_superuser=True).order_by('id').first()
         if not admin_user:
             self.stdout.write(self.style.ERROR('Nenhum superuser encontrado. Criando registros sem usuário.'))
-        
-        contador_criados = 0
-        contador_existentes = 0
-        contador_erros = 0
-        
-        for despesa in despesas_qs:
-            try:
-                empresa = despesa.item_despesa.grupo_despesa.empresa
-                socio = despesa.socio
-                
-                # Verificar se já existe lançamento financeiro para esta despesa
-                # Critério: mesmo sócio, mesma data, mesmo valor negativo e descrição similar
-                descricao_texto = f"Débito - {despesa.item_despesa.descricao}"
-                
-                # Buscar se já existe uma movimentação similar
-                movimentacao_existente = Financeiro.objects.filter(
-                    socio=socio,
-                    data_movimentacao=despesa.data,
-                    valor=-despesa.valor,  # Valor negativo para débito
-                    descricao_movimentacao_financeira__descricao=descricao_texto
-                ).exists()
-                
-                if movimentacao_existente:
-                    contador_existentes += 1
-                    self.stdout.write(
-                        f'JÁ EXISTE: Despesa ID {despesa.id} - {socio.pessoa.name} - '
-                        f'{despesa.data} - R$ {despesa.valor}'
-                    )
-                    continue
-                
-                if dry_run:
-                    contador_criados += 1
-                    self.stdout.write(
-                        f'SERIA CRIADO: Despesa ID {despesa.id} - {socio.pessoa.name} - '
-                        f'{despesa.data} - R$ {despesa.valor} - {descricao_texto}'
-                    )
-                    continue
-                
-                # Criar ou obter descrição da movimentação financeira
-                with transaction.atomic():
-                    descricao_movimentacao, created = DescricaoMovimentacaoFinanceira.objects.get_or_create(
-                        empresa=empresa,
-                        descricao=descricao_texto,
-                        defaults={
-                            'created_by': admin_user,
-                        }
-                    )
-                    
-                    # Criar lançamento financeiro
-                    Financeiro.objects.create(
-                        socio=socio,
-                        descricao_movimentacao_financeira=descricao_movimentacao,
-                        data_movimentacao=despesa.data,
-                        valor=-despesa.valor,  # Valor negativo para débito
-                        created_by=admin_user,
-                    )
-                    
-                    contador_criados += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'CRIADO: Despesa ID {despesa.id} - {socio.pessoa.name} - '
-                            f'{despesa.data} - R$ {despesa.valor} - {descricao_texto}'
-                        )
-                    )
-                    
-            except Exception as e:
-                contador_erros += 1
+
+        detalhar = options['verbosity'] >= 2
+
+        def ao_progredir(progresso, resultado):
+            self.stdout.write(str(progresso))
+            for despesa, erro in resultado['erros']:
+                self.stdout.write(self.style.ERROR(f'ERRO: Despesa ID {despesa["id"]} - {erro}'))
+            if not detalhar:
+                return
+            rotulo = 'SERIA CRIADO' if dry_run else 'CRIADO'
+            for despesa in resultado['criados']:
                 self.stdout.write(
-                    self.style.ERROR(
-                        f'ERRO: Despesa ID {despesa.id} - {str(e)}'
-                    )
+                    f'{rotulo}: Despesa ID {despesa["id"]} - {despesa["socio__pessoa__name"]} - '
+                    f'{despesa["data"]} - R$ {despesa["valor"]}'
                 )
-        
+
+        try:
+            totais = migrar_despesas_para_financeiro(
+                empresa_id=options['empresa_id'],
+                socio_id=options['socio_id'],
+                tamanho_lote=options['batch_size'],
+                simular=dry_run,
+                usuario=admin_user,
+                reiniciar=options['reset_checkpoint'],
+                pausa=options['pause'],
+                ao_progredir=ao_progredir,
+            )
+        except (TarefaEmExecucao, LockIndisponivel) as e:
+            raise CommandError(str(e))
+
         # Resumo final
         self.stdout.write(self.style.SUCCESS('\n=== RESUMO DA MIGRAÇÃO ==='))
-        self.stdout.write(f'Total de despesas processadas: {total_despesas}')
-        self.stdout.write(f'Lançamentos criados: {contador_criados}')
-        self.stdout.write(f'Já existentes (ignorados): {contador_existentes}')
-        self.stdout.write(f'Erros: {contador_erros}')
-        
+        if totais['retomado_de']:
+            self.stdout.write(f'Retomado do checkpoint: despesas com ID > {totais["retomado_de"]}')
+        self.stdout.write(f'Total de despesas processadas: {totais["processadas"]}')
+        self.stdout.write(f'Lançamentos {"a criar" if dry_run else "criados"}: {totais["criados"]}')
+        self.stdout.write(f'Já existentes (ignorados): {totais["existentes"]}')
+        self.stdout.write(f'Erros: {totais["erros"]}')
+
         if dry_run:
             self.stdout.write(self.style.WARNING('\nEste foi um DRY-RUN. Para executar de fato, remova o parâmetro --dry-run'))
         else:
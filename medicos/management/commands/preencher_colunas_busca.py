@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from medicos.services import busca
+
+
+class Command(BaseCommand):
+    """
+    Management command para preencher as colunas de busca normalizadas
+    (ItemDespesa.descricao_busca, NotaFiscal.tomador_busca/cnpj_tomador_busca,
+    Pessoa.name_busca) das linhas gravadas antes delas.
+
+    Roda no deploy, após o migrate (com --vazias, que só lê as linhas cuja
+    coluna de busca ainda está vazia); depois disso o save dos models mantém
+    os campos. A passada completa (sem --vazias) corrige também colunas
+    desatualizadas por queryset.update. É idempotente: só atualiza linhas
+    divergentes.
+
+    Com --indices, cria também a extensão pg_trgm e os índices GIN de
+    trigramas (apenas PostgreSQL; nos demais bancos não faz nada).
+
+    Uso:
+        python manage.py preencher_colunas_busca
+        python manage.py preencher_colunas_busca --verificar
+        python manage.py preencher_colunas_busca --indices --lote 5000
+        python manage.py preencher_colunas_busca --vazias --indices
+    """
+
+    help = 'Preenche as colunas de busca normalizadas e, opcionalmente, os índices de trigramas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Apenas informa quantas linhas estão com a coluna de busca desatualizada'
+        )
+
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=2000,
+            help='Linhas lidas e gravadas por página'
+        )
+
+        parser.add_argument(
+            '--indices',
+            action='store_true',
+            help='Cria a extensão pg_trgm e os índices de trigramas (PostgreSQL)'
+        )
+
+        parser.add_argument(
+            '--vazias',
+            action='store_true',
+            help='Só preenche as linhas com a coluna de busca ainda vazia'
+        )
+
+    def handle(self, *args, **options):
+        for modelo in busca.modelos_com_busca():
+            divergentes = busca.preencher_colunas_existentes(
+                modelo, lote=options['lote'], apenas_contar=options['verificar'],
+                apenas_vazias=options['vazias'],
+            )
+            acao = 'desatualizada(s)' if options['verificar'] else 'atualizada(s)'
+            estilo = self.style.WARNING if options['verificar'] and divergentes else self.style.SUCCESS
+            self.stdout.write(estilo(f'{modelo._meta.verbose_name_plural}: {divergentes} linha(s) {acao}'))
+
+        if options['indices'] and not options['verificar']:
+            if not busca.suportado():
+                self.stdout.write(self.style.WARNING(
+                    'Banco sem suporte a pg_trgm: busca segue por LIKE na coluna normalizada'
+                ))
+                return
+            criados = busca.criar_indices_trigrama()
+            self.stdout.write(self.style.SUCCESS(f'Índices de trigramas garantidos: {", ".join(criados)}'))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from medicos.models.conta_corrente import MovimentacaoContaCorrente
+
+
+class Command(BaseCommand):
+    """
+    Management command para preencher a empresa desnormalizada dos lançamentos
+    de conta corrente (MovimentacaoContaCorrente.empresa) a partir do sócio ou,
+    na falta dele, da descrição da movimentação.
+
+    Roda no deploy, logo após o migrate (com --sem-empresa, que só trata os
+    lançamentos ainda sem empresa e termina de imediato quando não há nenhum);
+    depois disso o save do lançamento mantém o campo. É idempotente: só
+    atualiza lançamentos sem empresa ou com empresa divergente.
+
+    Uso:
+        python manage.py preencher_empresa_lancamentos
+        python manage.py preencher_empresa_lancamentos --verificar
+        python manage.py preencher_empresa_lancamentos --sem-empresa
+        python manage.py preencher_empresa_lancamentos --lote 20000
+    """
+
+    help = 'Preenche a empresa dos lançamentos de conta corrente a partir do sócio/descrição'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Apenas informa quantos lançamentos estão sem empresa'
+        )
+
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=10000,
+            help='Faixa de IDs atualizada por UPDATE'
+        )
+
+        parser.add_argument(
+            '--sem-empresa',
+            action='store_true',
+            help='Trata apenas lançamentos sem empresa (não corrige empresas divergentes)'
+        )
+
+    def handle(self, *args, **options):
+        lancamentos = MovimentacaoContaCorrente.objects.all()
+        sem_empresa = lancamentos.filter(empresa__isnull=True).count()
+        self.stdout.write(self.style.WARNING(f'{sem_empresa} lançamento(s) sem empresa'))
+
+        if options['verificar']:
+            return
+
+        if options['sem_empresa']:
+            if not sem_empresa:
+                return
+            lancamentos = lancamentos.filter(empresa__isnull=True)
+
+        faixa = lancamentos.aggregate(menor=Min('id'), maior=Max('id'))
+        if faixa['menor'] is None:
+            return
+
+        atualizados = 0
+        for inicio in range(faixa['menor'], faixa['maior'] + 1, options['lote']):
+            atualizados += MovimentacaoContaCorrente.preencher_empresa(
+                lancamentos.filter(id__gte=inicio, id__lt=inicio + options['lote'])
+            )
+        self.stdout.write(self.style.SUCCESS(f'{atualizados} lançamento(s) atualizado(s)'))
+
+        restantes = MovimentacaoContaCorrente.objects.filter(empresa__isnull=True).count()
+        if restantes:
+            self.stdout.write(self.style.WARNING(
+                f'{restantes} lançamento(s) sem sócio nem descrição com empresa permanecem sem empresa'
+            ))
@@ -0,0 +1,100 @@
+from datetime import date
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from medicos.services import eventos_dominio
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Management command (worker) que aplica em lote os eventos do outbox de
+    domínio fiscal (EventoDominio): débitos de despesas na conta corrente e
+    invalidação do cache do adicional de IR.
+
+    Com EVENTOS_DOMINIO_PROCESSAMENTO = 'apos_commit' os eventos já são
+    aplicados ao fim de cada transação; o worker recupera os que falharam.
+    Com 'worker', é ele quem aplica todos.
+
+    Uso:
+        python manage.py processar_eventos_dominio
+        python manage.py processar_eventos_dominio --continuo --intervalo 2
+        python manage.py processar_eventos_dominio --reprocessar --empresa 5 --desde 2025-01-01
+        python manage.py processar_eventos_dominio --expurgar-dias 90
+    """
+
+    help = 'Aplica em lote os eventos de domínio fiscal pendentes (outbox)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=None,
+            help='Quantidade máxima de eventos por lote (padrão: EVENTOS_DOMINIO_TAMANHO_LOTE)'
+        )
+
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Executa como worker, verificando a fila a cada --intervalo segundos'
+        )
+
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2,
+            help='Intervalo em segundos entre verificações quando a fila está vazia'
+        )
+
+        parser.add_argument(
+            '--reprocessar',
+            action='store_true',
+            help='Reaplica os eventos já processados para reconstruir os dados derivados'
+        )
+
+        parser.add_argument('--empresa', type=int, help='Com --reprocessar: só eventos da empresa')
+        parser.add_argument('--desde', type=str, help='Com --reprocessar: eventos a partir de YYYY-MM-DD')
+
+        parser.add_argument(
+            '--expurgar-dias',
+            type=int,
+            help='Remove eventos processados há mais de N dias'
+        )
+
+    def handle(self, *args, **options):
+        if options['expurgar_dias'] is not None:
+            removidos = eventos_dominio.expurgar_eventos(options['expurgar_dias'])
+            self.stdout.write(self.style.SUCCESS(f'{removidos} evento(s) processado(s) removido(s)'))
+            return
+
+        if options['reprocessar']:
+            try:
+                desde = date.fromisoformat(options['desde']) if options['desde'] else None
+            except ValueError as e:
+                raise CommandError(f'Data inválida em --desde: {e}')
+            total = eventos_dominio.reprocessar_eventos(
+                empresa_id=options['empresa'], desde=desde, lote=options['lote']
+            )
+            self.stdout.write(self.style.SUCCESS(f'{total} evento(s) reaplicado(s)'))
+            return
+
+        while True:
+            total = 0
+            try:
+                while True:
+                    processados = eventos_dominio.processar_eventos(limite=options['lote'])
+                    if not processados:
+                        break
+                    total += processados
+            except Exception as e:
+                if not options['continuo']:
+                    raise
+                # Banco indisponível: o worker registra e tenta de novo no próximo ciclo
+                logger.exception(f"Falha ao processar eventos de domínio: {e}")
+            if total:
+                self.stdout.write(self.style.SUCCESS(f'{total} evento(s) de domínio processados'))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
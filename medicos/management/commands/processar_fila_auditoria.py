@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from medicos.services import fila_auditoria
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima (s) entre tentativas após falhas consecutivas no modo contínuo
+ESPERA_MAXIMA_FALHA = 300
+
+
+class Command(BaseCommand):
+    """
+    Management command (worker) que grava em lote os eventos de auditoria
+    enfileirados no Redis (settings.AUDITORIA_BACKEND = 'redis').
+
+    Uso:
+        python manage.py processar_fila_auditoria
+        python manage.py processar_fila_auditoria --continuo --intervalo 2
+    """
+
+    help = 'Grava em lote os eventos de auditoria enfileirados no Redis'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Quantidade máxima de eventos gravados por bulk_create'
+        )
+
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Executa como worker, verificando a fila a cada --intervalo segundos'
+        )
+
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2,
+            help='Intervalo em segundos entre verificações quando a fila está vazia'
+        )
+
+    def handle(self, *args, **options):
+        if fila_auditoria.backend_configurado() != fila_auditoria.BACKEND_REDIS:
+            raise CommandError("AUDITORIA_BACKEND não é 'redis'; não há fila externa a processar")
+
+        falhas_seguidas = 0
+        while True:
+            try:
+                total = self._processar_fila(options['lote'])
+            except Exception as e:
+                if not options['continuo']:
+                    raise
+                # Redis/banco indisponível: registra e espera com backoff exponencial
+                falhas_seguidas += 1
+                espera = min(options['intervalo'] * 2 ** falhas_seguidas, ESPERA_MAXIMA_FALHA)
+                logger.exception(f"Falha ao processar fila de auditoria; nova tentativa em {espera:.0f}s: {e}")
+                time.sleep(espera)
+                continue
+            falhas_seguidas = 0
+            if total:
+                self.stdout.write(self.style.SUCCESS(f'{total} eventos de auditoria gravados'))
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+    def _processar_fila(self, lote):
+        total = 0
+        while True:
+            gravados = fila_auditoria.processar_fila_redis(limite=lote)
+            if not gravados:
+                return total
+            total += gravados
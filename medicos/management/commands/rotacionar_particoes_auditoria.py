@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from medicos.models.base import ContaAuditLog
+from medicos.models.auditoria import LogAuditoriaFinanceiro
+from medicos.services import particoes_auditoria
+from datetime import datetime, time
+
+
+class Command(BaseCommand):
+    """
+    Management command para rotação das partições mensais de auditoria.
+
+    - Com --converter, converte antes as tabelas de auditoria ainda não
+      particionadas (idempotente; usado no deploy, após o migrate);
+    - Garante as partições do mês corrente e dos próximos meses;
+    - Remove (DETACH + DROP) as partições fora da retenção;
+    - Remove em lotes os logs fora da retenção que não estão em partições
+      mensais (partição legada ou banco sem particionamento).
+
+    Execute `consolidar_auditoria_diaria` antes, para que as contagens dos
+    meses removidos fiquem preservadas no resumo diário.
+
+    Uso:
+        python manage.py rotacionar_particoes_auditoria
+        python manage.py rotacionar_particoes_auditoria --meses-futuros 3 --retencao-meses 12
+        python manage.py rotacionar_particoes_auditoria --converter
+    """
+
+    help = 'Cria partições futuras e remove partições antigas das tabelas de auditoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses-futuros',
+            type=int,
+            default=3,
+            help='Quantidade de meses futuros com partição pré-criada'
+        )
+
+        parser.add_argument(
+            '--retencao-meses',
+            type=int,
+            default=12,
+            help='Meses de logs brutos mantidos'
+        )
+
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Tamanho do lote na remoção de logs fora de partições mensais'
+        )
+
+        parser.add_argument(
+            '--converter',
+            action='store_true',
+            help='Converte em particionadas as tabelas de auditoria que ainda não são'
+        )
+
+    def handle(self, *args, **options):
+        if options['converter']:
+            convertidas = particoes_auditoria.converter_tabelas_auditoria()
+            self.stdout.write(self.style.SUCCESS(f'Tabelas convertidas em particionadas: {len(convertidas)}'))
+
+        criadas = particoes_auditoria.criar_particoes_futuras(options['meses_futuros'])
+        removidas = particoes_auditoria.remover_particoes_antigas(options['retencao_meses'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Partições garantidas: {len(criadas)}; partições removidas: {len(removidas)}'
+        ))
+        for particao in removidas:
+            self.stdout.write(f'  - {particao}')
+
+        limite = timezone.make_aware(
+            datetime.combine(particoes_auditoria.data_limite_retencao(options['retencao_meses']), time.min)
+        )
+        restantes = self._remover_em_lotes(ContaAuditLog, 'timestamp', limite, options['lote'])
+        restantes += self._remover_em_lotes(LogAuditoriaFinanceiro, 'data_acao', limite, options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'Logs removidos em lotes: {restantes}'))
+
+    def _remover_em_lotes(self, modelo, campo_data, limite, lote):
+        antigos = modelo.objects.filter(**{f'{campo_data}__lt': limite}).order_by('id')
+        total = 0
+        while True:
+            ids = list(antigos.values_list('id', flat=True)[:lote])
+            if not ids:
+                return total
+            removidos, _ = modelo.objects.filter(id__in=ids).delete()
+            total += removidos
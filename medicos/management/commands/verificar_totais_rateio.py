@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from medicos.models.fiscal import NotaFiscal
+
+
+class Command(BaseCommand):
+    """
+    Management command para conferir (e reparar) os totais de rateio mantidos
+    em NotaFiscal (rateio_quantidade, rateio_percentual_total, rateio_valor_total)
+    contra os valores calculados a partir de NotaFiscalRateioMedico.
+
+    O deploy (compose.prod.yaml) roda `--recalcular-todas --corrigir` logo após
+    o migrate, para que notas gravadas antes das colunas não apareçam sem rateio.
+
+    Uso:
+        python manage.py verificar_totais_rateio
+        python manage.py verificar_totais_rateio --empresa_id 5 --corrigir
+        python manage.py verificar_totais_rateio --recalcular-todas --corrigir
+    """
+
+    help = 'Verifica e corrige divergências nos totais de rateio das notas fiscais'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--empresa_id',
+            type=int,
+            help='Restringe a verificação a uma empresa'
+        )
+
+        parser.add_argument(
+            '--corrigir',
+            action='store_true',
+            help='Recalcula os totais das notas divergentes'
+        )
+
+        parser.add_argument(
+            '--recalcular-todas',
+            action='store_true',
+            help='Com --corrigir, recalcula todas as notas (ex: após a criação das colunas)'
+        )
+
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Quantidade de notas recalculadas por UPDATE'
+        )
+
+    def handle(self, *args, **options):
+        notas = NotaFiscal.objects.all()
+        if options['empresa_id']:
+            notas = notas.filter(empresa_destinataria_id=options['empresa_id'])
+
+        if options['recalcular_todas']:
+            alvo = notas
+        else:
+            alvo = notas.com_totais_rateio_divergentes()
+            for nota in alvo.values(
+                'id', 'numero', 'rateio_quantidade', 'qtd_rateios',
+                'rateio_percentual_total', 'percentual_rateado',
+                'rateio_valor_total', 'valor_rateado',
+            )[:50]:
+                self.stdout.write(
+                    f"  NF {nota['numero']} (id {nota['id']}): "
+                    f"qtd {nota['rateio_quantidade']}->{nota['qtd_rateios']}, "
+                    f"% {nota['rateio_percentual_total']}->{nota['percentual_rateado']}, "
+                    f"R$ {nota['rateio_valor_total']}->{nota['valor_rateado']}"
+                )
+
+        ids = list(alvo.order_by('id').values_list('id', flat=True))
+        if not options['recalcular_todas']:
+            self.stdout.write(self.style.WARNING(f'{len(ids)} nota(s) com totais divergentes'))
+
+        if not options['corrigir']:
+            return
+
+        corrigidas = 0
+        for inicio in range(0, len(ids), options['lote']):
+            corrigidas += NotaFiscal.atualizar_totais_rateio(ids[inicio:inicio + options['lote']])
+        self.stdout.write(self.style.SUCCESS(f'{corrigidas} nota(s) recalculada(s)'))
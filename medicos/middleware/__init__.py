@@ -2,9 +2,13 @@
 Middleware package para SaaS Multi-tenancy
 """
 from .tenant_middleware import TenantMiddleware, LicenseValidationMiddleware, UserLimitMiddleware
+from .perfil_sql import PerfilSQLMiddleware
+from .replica import ReplicaMiddleware
 
 __all__ = [
     'TenantMiddleware',
     'LicenseValidationMiddleware', 
-    'UserLimitMiddleware'
+    'UserLimitMiddleware',
+    'PerfilSQLMiddleware',
+    'ReplicaMiddleware',
 ]
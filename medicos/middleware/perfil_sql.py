@@ -0,0 +1,85 @@
+"""
+Middleware de perfil de SQL por requisição (opt-in)
+
+Registra, por view, queries, tempo de banco, queries repetidas (N+1) e tempo
+de template, agregando em services/perfil_sql.py. Fica depois de
+LicenseValidationMiddleware na cadeia: requisições barradas por tenant ou
+licença não entram no perfil.
+
+Desligado (PERFIL_SQL_ENABLED=False, o padrão), o middleware levanta
+MiddlewareNotUsed e o Django o remove da cadeia: custo zero por requisição.
+Ligado, PERFIL_SQL_AMOSTRAGEM (0-1) limita a fração de requisições medidas.
+"""
+import logging
+import random
+import time
+
+from django.core.exceptions import MiddlewareNotUsed
+
+from medicos.services.perfil_sql import (
+    ColetaRequisicao,
+    instrumentar_templates,
+    orcamento_queries,
+    perfil_sql_habilitado,
+    registrar_requisicao,
+)
+
+logger = logging.getLogger(__name__)
+
+CAMINHOS_IGNORADOS = ('/static/', '/media/', '/favicon.ico')
+
+
+def nome_view(request):
+    """Nome estável da view resolvida (namespace:nome), ou a rota crua."""
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return '<não resolvida>'
+    return resolver_match.view_name or resolver_match.route or resolver_match._func_path
+
+
+class PerfilSQLMiddleware:
+    """
+    Mede cada requisição amostrada e a soma ao perfil da view.
+
+    Acrescenta o cabeçalho `X-Perfil-SQL` à resposta e registra um aviso
+    quando a requisição passa de PERFIL_SQL_ORCAMENTO_QUERIES queries.
+    """
+
+    def __init__(self, get_response):
+        from django.conf import settings
+
+        if not perfil_sql_habilitado():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.amostragem = float(getattr(settings, 'PERFIL_SQL_AMOSTRAGEM', 1.0))
+        instrumentar_templates()
+
+    def __call__(self, request):
+        if request.path.startswith(CAMINHOS_IGNORADOS) or (
+            self.amostragem < 1 and random.random() >= self.amostragem
+        ):
+            return self.get_response(request)
+
+        coleta = ColetaRequisicao()
+        inicio = time.perf_counter()
+        with coleta.ativa():
+            response = self.get_response(request)
+        tempo_total = time.perf_counter() - inicio
+
+        view = nome_view(request)
+        try:
+            registrar_requisicao(view, coleta, tempo_total)
+        except Exception as e:
+            logger.warning(f"Falha ao registrar perfil de SQL de {view}: {e}")
+
+        if coleta.queries > orcamento_queries():
+            logger.warning(
+                f"Orçamento de SQL excedido em {view} ({request.method} {request.path}): "
+                f"{coleta.queries} queries, {coleta.duplicadas} repetidas, "
+                f"{coleta.tempo_db * 1000:.1f} ms de banco"
+            )
+        response['X-Perfil-SQL'] = (
+            f'queries={coleta.queries}; repetidas={coleta.duplicadas}; '
+            f'db_ms={coleta.tempo_db * 1000:.1f}; template_ms={coleta.tempo_template * 1000:.1f}'
+        )
+        return response
@@ -0,0 +1,39 @@
+"""
+Middleware de leitura das próprias escritas para a réplica (medicos/replica.py)
+
+Após uma requisição de escrita, as requisições seguintes da mesma sessão
+leem do primário por REPLICA_LEITURA_PROPRIA_SEGUNDOS, mesmo em views
+marcadas com `leitura_replica`. Sem réplica configurada, o middleware
+levanta MiddlewareNotUsed e sai da cadeia.
+"""
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from medicos.replica import primario, replica_configurada
+
+CHAVE_SESSAO_PRIMARIO = '_replica_primario_ate'
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaMiddleware:
+    """Fica depois de SessionMiddleware: usa a sessão para lembrar a última escrita."""
+
+    def __init__(self, get_response):
+        if not replica_configurada():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.segundos = getattr(settings, 'REPLICA_LEITURA_PROPRIA_SEGUNDOS', 15)
+
+    def __call__(self, request):
+        sessao = getattr(request, 'session', None)
+        primario_ate = sessao.get(CHAVE_SESSAO_PRIMARIO) if sessao is not None else None
+        if primario_ate and primario_ate > time.time():
+            with primario():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        if request.method not in METODOS_SEGUROS and sessao is not None:
+            sessao[CHAVE_SESSAO_PRIMARIO] = time.time() + self.segundos
+        return response
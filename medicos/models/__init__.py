@@ -5,6 +5,7 @@ from .despesas import *
 from .financeiro import *
 from .conta_corrente import *
 from .auditoria import *
+from .eventos import *
 
 from .relatorios import *
 from .relatorios_apuracao_csll import *
@@ -31,7 +32,10 @@ __all__ = [
     'ApuracaoCSLL', 'ApuracaoIRPJMensal',
     
     # Modelos de Auditoria
-    'LogAuditoriaFinanceiro', 'ConfiguracaoSistemaManual', 'registrar_auditoria',
+    'LogAuditoriaFinanceiro', 'ResumoAuditoriaDiario', 'ConfiguracaoSistemaManual', 'registrar_auditoria',
+
+    # Outbox de eventos do domínio
+    'EventoDominio',
     
     # Constantes importantes
     'app_name', 'REGIME_TRIBUTACAO_COMPETENCIA', 'REGIME_TRIBUTACAO_CAIXA',
@@ -241,8 +241,10 @@ class LogAuditoriaFinanceiro(models.Model):
         help_text="Usuário que executou a ação"
     )
     
+    # default (e não auto_now_add) para preservar o horário do evento na gravação em lote
     data_acao = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name="Data/Hora da Ação"
     )
     
@@ -404,76 +406,265 @@ class LogAuditoriaFinanceiro(models.Model):
                        valores_anteriores=None, valores_novos=None,
                        ip_origem=None, user_agent=None, 
                        resultado='sucesso', mensagem_erro=None,
-                       duracao_ms=None, dados_extras=None):
+                       duracao_ms=None, dados_extras=None, duravel=None):
         """
         Método de classe para registrar uma ação de auditoria
+
+        O registro é enfileirado e gravado em lote (services/fila_auditoria.py).
+        Ações em ACOES_CRITICAS_FINANCEIRAS, ou com duravel=True, são gravadas
+        de forma síncrona; duravel=False força a fila mesmo para elas.
         """
+        from medicos.services import fila_auditoria
+
+        if duravel is None:
+            duravel = acao in fila_auditoria.ACOES_CRITICAS_FINANCEIRAS
         log = cls(
             conta=conta,
             usuario=usuario,
             acao=acao,
             descricao_acao=descricao_acao,
             objeto_id=objeto_id,
-            objeto_tipo=objeto_tipo,
+            objeto_tipo=objeto_tipo or '',
             valores_anteriores=valores_anteriores,
             valores_novos=valores_novos,
             ip_origem=ip_origem,
-            user_agent=user_agent,
+            user_agent=user_agent or '',
             resultado=resultado,
-            mensagem_erro=mensagem_erro,
+            mensagem_erro=mensagem_erro or '',
             duracao_ms=duracao_ms,
             dados_extras=dados_extras
         )
-        log.save()
-        return log
+        return fila_auditoria.registrar(log, duravel=duravel)
     
     @classmethod
-    def limpar_logs_antigos(cls, conta, dias_retencao=365):
+    def limpar_logs_antigos(cls, conta, dias_retencao=365, tamanho_lote=5000):
         """
         Remove logs mais antigos que o período de retenção
+
+        A remoção é feita em lotes de `tamanho_lote` ids (cada lote em sua
+        própria transação), evitando um único DELETE gigante que bloqueia a
+        tabela e infla o log de transações.
         """
         from datetime import timedelta
         
         data_limite = timezone.now() - timedelta(days=dias_retencao)
-        logs_removidos = cls.objects.filter(
+        antigos = cls.objects.filter(
             conta=conta,
             data_acao__lt=data_limite
-        ).delete()
+        ).order_by('id')
+
+        logs_removidos = 0
+        while True:
+            ids = list(antigos.values_list('id', flat=True)[:tamanho_lote])
+            if not ids:
+                break
+            removidos, _ = cls.objects.filter(id__in=ids).delete()
+            logs_removidos += removidos
         
-        return logs_removidos[0] if logs_removidos else 0
+        return logs_removidos
     
     @classmethod
     def obter_estatisticas_conta(cls, conta, data_inicio=None, data_fim=None):
         """
         Obtém estatísticas de auditoria para uma conta
+
+        Lê o resumo diário (ResumoAuditoriaDiario) e só agrega os logs brutos
+        dos dias ainda não consolidados.
         """
-        queryset = cls.objects.filter(conta=conta)
+        estatisticas = ResumoAuditoriaDiario.estatisticas(
+            ResumoAuditoriaDiario.ORIGEM_FINANCEIRO, conta, data_inicio, data_fim
+        )
+        estatisticas['periodo'] = {
+            'inicio': data_inicio,
+            'fim': data_fim
+        }
         
+        return estatisticas
+
+
+class ResumoAuditoriaDiario(models.Model):
+    """
+    Consolidação diária (por conta) dos logs de auditoria
+
+    Contagens por ação, usuário e resultado de cada dia, geradas pelo comando
+    `consolidar_auditoria_diaria`. Estatísticas e filtros das telas de
+    auditoria leem este resumo (poucas linhas) e só consultam os logs brutos
+    a partir do último dia consolidado, ou seja, apenas a partição corrente.
+    O resumo também preserva o histórico de contagens após a remoção das
+    partições antigas pela política de retenção.
+    """
+
+    ORIGEM_CONTA = 'conta'
+    ORIGEM_FINANCEIRO = 'financeiro'
+    ORIGEM_CHOICES = [
+        (ORIGEM_CONTA, 'Auditoria da Conta (SaaS)'),
+        (ORIGEM_FINANCEIRO, 'Auditoria Financeira'),
+    ]
+
+    class Meta:
+        db_table = 'resumo_auditoria_diario'
+        indexes = [
+            models.Index(fields=['origem', 'conta', 'data']),
+            models.Index(fields=['origem', 'data']),
+        ]
+        verbose_name = "Resumo Diário de Auditoria"
+        verbose_name_plural = "Resumos Diários de Auditoria"
+
+    origem = models.CharField(max_length=20, choices=ORIGEM_CHOICES, verbose_name="Origem")
+    conta = models.ForeignKey(
+        Conta,
+        on_delete=models.CASCADE,
+        related_name='resumos_auditoria'
+    )
+    data = models.DateField(verbose_name="Data")
+    acao = models.CharField(max_length=50, verbose_name="Ação")
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Usuário"
+    )
+    resultado = models.CharField(max_length=20, blank=True, verbose_name="Resultado")
+    total = models.PositiveIntegerField(default=0, verbose_name="Total")
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} - {self.origem} - {self.acao}: {self.total}"
+
+    @staticmethod
+    def _fonte(origem):
+        """Retorna (modelo, campo de data, campo de usuário, campo de resultado) da origem."""
+        if origem == ResumoAuditoriaDiario.ORIGEM_CONTA:
+            from .base import ContaAuditLog
+            return ContaAuditLog, 'timestamp', 'user', None
+        return LogAuditoriaFinanceiro, 'data_acao', 'usuario', 'resultado'
+
+    @classmethod
+    def ultima_data_consolidada(cls, origem):
+        return cls.objects.filter(origem=origem).aggregate(ultima=models.Max('data'))['ultima']
+
+    @classmethod
+    def consolidar_dia(cls, origem, data):
+        """
+        (Re)gera o resumo de um dia para todas as contas, de forma idempotente.
+
+        Returns:
+            int: Quantidade de linhas de resumo gravadas
+        """
+        from datetime import datetime, time, timedelta
+        from django.db import transaction
+
+        modelo, campo_data, campo_usuario, campo_resultado = cls._fonte(origem)
+        inicio = timezone.make_aware(datetime.combine(data, time.min))
+        fim = inicio + timedelta(days=1)
+
+        agrupamento = ['conta_id', 'acao', f'{campo_usuario}_id']
+        if campo_resultado:
+            agrupamento.append(campo_resultado)
+        linhas = (
+            modelo.objects.filter(**{f'{campo_data}__gte': inicio, f'{campo_data}__lt': fim})
+            .values(*agrupamento)
+            .annotate(total=models.Count('id'))
+            .order_by()
+        )
+        resumos = [
+            cls(
+                origem=origem,
+                conta_id=linha['conta_id'],
+                data=data,
+                acao=linha['acao'],
+                usuario_id=linha[f'{campo_usuario}_id'],
+                resultado=linha.get(campo_resultado, '') if campo_resultado else '',
+                total=linha['total'],
+            )
+            for linha in linhas
+        ]
+        with transaction.atomic():
+            cls.objects.filter(origem=origem, data=data).delete()
+            cls.objects.bulk_create(resumos, batch_size=1000)
+        return len(resumos)
+
+    @classmethod
+    def estatisticas(cls, origem, conta, data_inicio=None, data_fim=None):
+        """
+        Contagens por ação, usuário e resultado no período, combinando o resumo
+        (dias já consolidados) com os logs brutos posteriores ao último dia
+        consolidado. Os limites do período são tratados com granularidade diária
+        para os dias consolidados.
+        """
+        from collections import Counter
+        from datetime import datetime, time, timedelta
+
+        modelo, campo_data, campo_usuario, campo_resultado = cls._fonte(origem)
+        ultima = cls.ultima_data_consolidada(origem)
+
+        por_acao, por_usuario, por_resultado = Counter(), Counter(), Counter()
+
+        if ultima:
+            resumos = cls.objects.filter(origem=origem, conta=conta, data__lte=ultima)
+            if data_inicio:
+                resumos = resumos.filter(data__gte=_como_data(data_inicio))
+            if data_fim:
+                resumos = resumos.filter(data__lte=_como_data(data_fim))
+            for acao, usuario, resultado, total in resumos.values_list(
+                'acao', 'usuario__username', 'resultado', 'total'
+            ).iterator():
+                por_acao[acao] += total
+                por_usuario[usuario] += total
+                if resultado:
+                    por_resultado[resultado] += total
+
+        recentes = modelo.objects.filter(conta=conta)
+        if ultima:
+            inicio_bruto = timezone.make_aware(datetime.combine(ultima + timedelta(days=1), time.min))
+            recentes = recentes.filter(**{f'{campo_data}__gte': inicio_bruto})
         if data_inicio:
-            queryset = queryset.filter(data_acao__gte=data_inicio)
+            recentes = recentes.filter(**{f'{campo_data}__gte': data_inicio})
         if data_fim:
-            queryset = queryset.filter(data_acao__lte=data_fim)
-        
-        from django.db.models import Count
-        
-        estatisticas = {
-            'total_acoes': queryset.count(),
-            'acoes_por_tipo': dict(
-                queryset.values('acao').annotate(count=Count('id')).values_list('acao', 'count')
-            ),
-            'acoes_por_usuario': dict(
-                queryset.values('usuario__username').annotate(count=Count('id')).values_list('usuario__username', 'count')
-            ),
-            'acoes_por_resultado': dict(
-                queryset.values('resultado').annotate(count=Count('id')).values_list('resultado', 'count')
-            ),
-            'periodo': {
-                'inicio': data_inicio,
-                'fim': data_fim
-            }
+            recentes = recentes.filter(**{f'{campo_data}__lte': data_fim})
+        agrupamento = ['acao', f'{campo_usuario}__username']
+        if campo_resultado:
+            agrupamento.append(campo_resultado)
+        for linha in recentes.values(*agrupamento).annotate(total=models.Count('id')).order_by():
+            por_acao[linha['acao']] += linha['total']
+            por_usuario[linha[f'{campo_usuario}__username']] += linha['total']
+            if campo_resultado:
+                por_resultado[linha[campo_resultado]] += linha['total']
+
+        return {
+            'total_acoes': sum(por_acao.values()),
+            'acoes_por_tipo': dict(por_acao),
+            'acoes_por_usuario': dict(por_usuario),
+            'acoes_por_resultado': dict(por_resultado),
         }
-        
-        return estatisticas
+
+    @classmethod
+    def acoes_registradas(cls, origem, conta):
+        """Ações distintas já registradas pela conta (resumo + logs ainda não consolidados)."""
+        from datetime import datetime, time, timedelta
+
+        modelo, campo_data, _, _ = cls._fonte(origem)
+        ultima = cls.ultima_data_consolidada(origem)
+        acoes = set(
+            cls.objects.filter(origem=origem, conta=conta).values_list('acao', flat=True).distinct()
+        )
+        recentes = modelo.objects.filter(conta=conta)
+        if ultima:
+            inicio_bruto = timezone.make_aware(datetime.combine(ultima + timedelta(days=1), time.min))
+            recentes = recentes.filter(**{f'{campo_data}__gte': inicio_bruto})
+        acoes.update(recentes.values_list('acao', flat=True).distinct())
+        return sorted(acoes)
+
+
+def _como_data(valor):
+    """Converte datetime/date em date (limites de período do resumo diário)."""
+    from datetime import datetime
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.localtime(valor)
+        return valor.date()
+    return valor
 
 
 # Função de conveniência para auditoria
@@ -487,6 +678,7 @@ def registrar_auditoria(request, conta, acao, descricao, **kwargs):
         acao: Tipo da ação (deve estar em ACOES_CHOICES)
         descricao: Descrição detalhada da ação
         **kwargs: Argumentos adicionais para LogAuditoriaFinanceiro.registrar_acao
+            (inclusive `duravel` para forçar gravação síncrona)
     """
     ip_origem = None
     user_agent = None
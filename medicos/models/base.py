@@ -4,6 +4,8 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from medicos.services.busca import normalizar_busca, preencher_colunas_busca
+
 # CONSTANTES GLOBAIS
 app_name = 'medicos'
 
@@ -327,8 +329,10 @@ class ContaAuditLog(models.Model):
         blank=True,
         verbose_name="Endereço IP"
     )
+    # default (e não auto_now_add) para preservar o horário do evento na gravação em lote
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name="Data/Hora"
     )
     
@@ -464,6 +468,8 @@ class Pessoa(SaaSBaseModel):
 
     # Dados pessoais
     name = models.CharField(max_length=255, verbose_name="Nome Completo")
+    # Nome normalizado (sem acentos, minúsculas) para busca; preenchido no save()
+    name_busca = models.CharField(max_length=255, blank=True, default='', editable=False)
     cpf = models.CharField(max_length=14, blank=True, verbose_name="CPF")
     rg = models.CharField(max_length=20, blank=True, verbose_name="RG")
     data_nascimento = models.DateField(null=True, blank=True, verbose_name="Data de Nascimento")
@@ -491,6 +497,12 @@ class Pessoa(SaaSBaseModel):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    COLUNAS_BUSCA = {'name_busca': ('name', normalizar_busca)}
+
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = preencher_colunas_busca(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
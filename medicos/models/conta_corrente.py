@@ -1,4 +1,7 @@
+import calendar
+
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
 from django.conf import settings
 from django.utils import timezone
@@ -306,10 +309,25 @@ class MovimentacaoContaCorrente(models.Model):
             models.Index(fields=['data_movimentacao']),
             models.Index(fields=['descricao_movimentacao']),
             models.Index(fields=['instrumento_bancario']),
+            # Extrato da empresa (lista paginada por data, id) e saldos por sócio
+            models.Index(fields=['empresa', 'data_movimentacao', 'id'], name='mcc_emp_data_id_idx'),
+            models.Index(fields=['empresa', 'socio', 'data_movimentacao'], name='mcc_emp_socio_data_idx'),
         ]
         ordering = ['-data_movimentacao', '-created_at']
 
     # Relacionamentos principais
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=False,  # Coberto pelos índices compostos iniciados por empresa
+        related_name='lancamentos_bancarios',
+        verbose_name="Empresa",
+        help_text="Empresa do lançamento (desnormalizada do sócio/descrição e mantida no save)"
+    )
     
     descricao_movimentacao = models.ForeignKey(
         DescricaoMovimentacaoFinanceira,
@@ -429,9 +447,45 @@ class MovimentacaoContaCorrente(models.Model):
         if self.conciliado and not self.data_conciliacao:
             self.data_conciliacao = timezone.now().date()
 
+    def resolver_empresa_id(self):
+        """Empresa do lançamento: a do sócio, ou a da descrição quando não há sócio"""
+        if self.socio_id:
+            return self.socio.empresa_id
+        if self.descricao_movimentacao_id:
+            return self.descricao_movimentacao.empresa_id
+        return None
+
     def save(self, *args, **kwargs):
+        empresa_id = self.resolver_empresa_id() or self.empresa_id
+        if empresa_id != self.empresa_id:
+            self.empresa_id = empresa_id
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'empresa' not in update_fields:
+                kwargs['update_fields'] = [*update_fields, 'empresa']
         super().save(*args, **kwargs)
 
+    @classmethod
+    def preencher_empresa(cls, queryset=None):
+        """
+        Preenche/corrige `empresa` em um único UPDATE, pela mesma regra do save.
+
+        Necessário após criar a coluna (lançamentos antigos) e após updates em
+        massa que troquem sócio ou descrição. Returns: linhas atualizadas.
+        """
+        empresa_derivada = Coalesce(
+            models.Subquery(Socio.objects.filter(pk=models.OuterRef('socio_id')).values('empresa_id')[:1]),
+            models.Subquery(
+                DescricaoMovimentacaoFinanceira.objects.filter(
+                    pk=models.OuterRef('descricao_movimentacao_id')
+                ).values('empresa_id')[:1]
+            ),
+        )
+        if queryset is None:
+            queryset = cls.objects.all()
+        return queryset.order_by().annotate(empresa_derivada=empresa_derivada).filter(
+            models.Q(empresa__isnull=True) | ~models.Q(empresa_id=models.F('empresa_derivada'))
+        ).exclude(empresa_derivada__isnull=True).update(empresa_id=empresa_derivada)
+
     def __str__(self):
         tipo = "Débito Bancário" if self.valor > 0 else "Crédito Bancário"
         return f"{self.data_movimentacao.strftime('%d/%m/%Y')} - {tipo}: R$ {abs(self.valor):,.2f}"
@@ -490,9 +544,10 @@ class MovimentacaoContaCorrente(models.Model):
         self.save()
     
     @classmethod
-    def obter_lancamentos_periodo(cls, data_inicio, data_fim):
-        """Obtém lançamentos bancários em um período específico"""
+    def obter_lancamentos_periodo(cls, empresa, data_inicio, data_fim):
+        """Obtém os lançamentos bancários da empresa em um período específico"""
         return cls.objects.filter(
+            empresa=empresa,
             data_movimentacao__range=[data_inicio, data_fim]
         ).select_related(
             'descricao_movimentacao',
@@ -501,59 +556,59 @@ class MovimentacaoContaCorrente(models.Model):
         )
     
     @classmethod
-    def obter_saldo_periodo(cls, data_inicio, data_fim):
-        """Calcula o saldo de um período específico"""
-        lancamentos = cls.obter_lancamentos_periodo(data_inicio, data_fim)
-        
-        total_debitos_bancarios = lancamentos.filter(valor__gt=0).aggregate(
-            total=models.Sum('valor')
-        )['total'] or 0
-        
-        total_creditos_bancarios = lancamentos.filter(valor__lt=0).aggregate(
-            total=models.Sum('valor')
-        )['total'] or 0
+    def _totais_periodo(cls, lancamentos):
+        """Contagens e somas do período em uma única agregação"""
+        return lancamentos.order_by().aggregate(
+            quantidade=models.Count('id'),
+            debitos=models.Sum('valor', filter=models.Q(valor__gt=0)),
+            creditos=models.Sum('valor', filter=models.Q(valor__lt=0)),
+            saldo=models.Sum('valor'),
+            conciliados=models.Count('id', filter=models.Q(conciliado=True)),
+            nao_conciliados=models.Count('id', filter=models.Q(conciliado=False)),
+        )
+    
+    @classmethod
+    def obter_saldo_periodo(cls, empresa, data_inicio, data_fim):
+        """Calcula o saldo da empresa em um período específico"""
+        totais = cls._totais_periodo(
+            cls.objects.filter(empresa=empresa, data_movimentacao__range=[data_inicio, data_fim])
+        )
+        total_debitos_bancarios = totais['debitos'] or 0
+        total_creditos_bancarios = totais['creditos'] or 0
         
         return {
             'total_debitos_bancarios': total_debitos_bancarios,  # Entradas
             'total_creditos_bancarios': abs(total_creditos_bancarios),  # Saídas
             'saldo_liquido': total_debitos_bancarios + total_creditos_bancarios,  # total_creditos_bancarios já é negativo
-            'quantidade_lancamentos': lancamentos.count(),
-            'conciliados': lancamentos.filter(conciliado=True).count(),
-            'nao_conciliados': lancamentos.filter(conciliado=False).count()
+            'quantidade_lancamentos': totais['quantidade'],
+            'conciliados': totais['conciliados'],
+            'nao_conciliados': totais['nao_conciliados']
         }
     
     @classmethod
-    def obter_consolidado_periodo(cls, mes_referencia):
-        """Obtém o consolidado de todos os lançamentos em um mês"""
+    def obter_consolidado_periodo(cls, empresa, mes_referencia):
+        """Obtém o consolidado dos lançamentos da empresa em um mês"""
         data_inicio = mes_referencia.replace(day=1)
-        ultimo_dia = 31
-        while ultimo_dia > 28:
-            try:
-                data_fim = data_inicio.replace(day=ultimo_dia)
-                break
-            except ValueError:
-                ultimo_dia -= 1
+        data_fim = data_inicio.replace(day=calendar.monthrange(data_inicio.year, data_inicio.month)[1])
         
         lancamentos = cls.objects.filter(
+            empresa=empresa,
             data_movimentacao__range=[data_inicio, data_fim]
         )
+        totais = cls._totais_periodo(lancamentos)
         
         consolidado = {
-            'total_lancamentos': lancamentos.count(),
-            'total_debitos_bancarios': lancamentos.filter(valor__gt=0).aggregate(
-                total=models.Sum('valor')
-            )['total'] or 0,
-            'total_creditos_bancarios': abs(lancamentos.filter(valor__lt=0).aggregate(
-                total=models.Sum('valor')
-            )['total'] or 0),
-            'saldo_geral': lancamentos.aggregate(total=models.Sum('valor'))['total'] or 0,
-            'conciliados': lancamentos.filter(conciliado=True).count(),
-            'nao_conciliados': lancamentos.filter(conciliado=False).count(),
+            'total_lancamentos': totais['quantidade'],
+            'total_debitos_bancarios': totais['debitos'] or 0,
+            'total_creditos_bancarios': abs(totais['creditos'] or 0),
+            'saldo_geral': totais['saldo'] or 0,
+            'conciliados': totais['conciliados'],
+            'nao_conciliados': totais['nao_conciliados'],
             'por_categoria': {},
         }
         
         # Consolidado por categoria (descrição)
-        categorias = lancamentos.values(
+        categorias = lancamentos.order_by().values(
             'descricao_movimentacao__descricao'
         ).annotate(
             total=models.Sum('valor'),
@@ -699,6 +754,24 @@ class SaldoMensalContaCorrente(models.Model):
         if usuario:
             self.observacoes += f"\nFechado por: {usuario} em {timezone.now()}"
         self.save()
+
+    def reabrir_periodo(self, usuario=None, motivo=''):
+        """
+        Reabre o período e invalida os snapshots dos relatórios congelados
+        no fechamento (medicos/services/snapshots_periodo.py).
+        """
+        from django.utils import timezone
+        from medicos.services.snapshots_periodo import invalidar_snapshots
+        self.fechado = False
+        detalhe = f" ({motivo})" if motivo else ''
+        self.observacoes += f"\nReaberto por: {usuario or '-'} em {timezone.now()}{detalhe}"
+        self.save()
+        invalidar_snapshots(
+            self.empresa_id,
+            self.competencia,
+            motivo=f"Período reaberto{detalhe}",
+            socio_id=self.socio_id,
+        )
     
     def __str__(self):
         return f"{self.socio.pessoa.name} - {self.competencia.strftime('%m/%Y')} - Saldo: R$ {self.saldo_final}"
@@ -5,6 +5,7 @@ from django.conf import settings
 from django.utils import timezone
 from decimal import Decimal
 from .base import SaaSBaseModel, Empresa, Socio
+from medicos.services.busca import normalizar_busca, preencher_colunas_busca
 
 from django.utils.translation import gettext_lazy as _
 
@@ -93,9 +94,17 @@ class ItemDespesa(AuditoriaModel):
     )
     codigo = models.CharField(max_length=20, null=False, verbose_name="Código", help_text="Código do item dentro do grupo")
     descricao = models.CharField(max_length=255, null=False, default="", verbose_name="Descrição", help_text="Descrição detalhada do item de despesa")
+    # Descrição normalizada (sem acentos, minúsculas) para o autocomplete; preenchida no save()
+    descricao_busca = models.CharField(max_length=255, blank=True, default='', editable=False)
 
     # campos de auditoria herdados de AuditoriaModel
 
+    COLUNAS_BUSCA = {'descricao_busca': ('descricao', normalizar_busca)}
+
+    def save(self, *args, **kwargs):
+        kwargs['update_fields'] = preencher_colunas_busca(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+
 
     @property
     def permite_rateio(self):
@@ -0,0 +1,74 @@
+"""
+Outbox transacional de eventos do domínio fiscal
+
+Os signals de medicos/signals_financeiro.py deixam de manter os dados
+derivados dentro da transação que grava a nota, a despesa ou o rateio:
+registram aqui um evento compacto, na mesma transação, e o consumidor
+(medicos/services/eventos_dominio.py) aplica os eventos em lote depois do
+commit ou no worker `processar_eventos_dominio`.
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class EventoDominio(models.Model):
+    """
+    Evento do domínio fiscal gravado na mesma transação da alteração
+
+    `chave` identifica o objeto afetado (ex: 'despesa_socio:15',
+    'rateio_despesa:7:2025-08'): eventos repetidos da mesma chave são
+    aplicados uma única vez por lote. Eventos processados são mantidos
+    (processado_em preenchido) para permitir reconstruir os dados derivados
+    reaplicando-os.
+    """
+
+    TIPO_NOTA_EMITIDA = 'nota_emitida'
+    TIPO_NOTA_ALTERADA = 'nota_alterada'
+    TIPO_NOTA_RECEBIDA = 'nota_recebida'
+    TIPO_NOTA_CANCELADA = 'nota_cancelada'
+    TIPO_NOTA_EXCLUIDA = 'nota_excluida'
+    TIPO_RATEIO_NOTA_ALTERADO = 'rateio_nota_alterado'
+    TIPO_RATEIO_DESPESA_ALTERADO = 'rateio_despesa_alterado'
+    TIPO_DESPESA_ALTERADA = 'despesa_alterada'
+    TIPO_ALIQUOTA_ALTERADA = 'aliquota_alterada'
+
+    TIPO_CHOICES = [
+        (TIPO_NOTA_EMITIDA, 'Nota fiscal emitida'),
+        (TIPO_NOTA_ALTERADA, 'Nota fiscal alterada'),
+        (TIPO_NOTA_RECEBIDA, 'Nota fiscal recebida'),
+        (TIPO_NOTA_CANCELADA, 'Nota fiscal cancelada'),
+        (TIPO_NOTA_EXCLUIDA, 'Nota fiscal excluída'),
+        (TIPO_RATEIO_NOTA_ALTERADO, 'Rateio da nota fiscal alterado'),
+        (TIPO_RATEIO_DESPESA_ALTERADO, 'Rateio mensal de despesa alterado'),
+        (TIPO_DESPESA_ALTERADA, 'Despesa alterada'),
+        (TIPO_ALIQUOTA_ALTERADA, 'Alíquotas alteradas'),
+    ]
+
+    class Meta:
+        db_table = 'evento_dominio'
+        indexes = [
+            # Fila: só os pendentes, em ordem de gravação
+            models.Index(
+                fields=['id'],
+                name='evento_dominio_pendente_idx',
+                condition=models.Q(processado_em__isnull=True),
+            ),
+            models.Index(fields=['empresa_id', 'criado_em'], name='evento_dominio_emp_idx'),
+        ]
+        verbose_name = "Evento de Domínio"
+        verbose_name_plural = "Eventos de Domínio"
+
+    id = models.BigAutoField(primary_key=True)
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES, verbose_name="Tipo")
+    # Sem FK: o evento de exclusão sobrevive ao objeto e à empresa
+    empresa_id = models.IntegerField(null=True, blank=True, verbose_name="Empresa")
+    chave = models.CharField(max_length=100, verbose_name="Chave")
+    dados = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, verbose_name="Dados")
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+    processado_em = models.DateTimeField(null=True, blank=True, verbose_name="Processado em")
+    tentativas = models.PositiveSmallIntegerField(default=0, verbose_name="Tentativas")
+    erro = models.TextField(blank=True, verbose_name="Último erro")
+
+    def __str__(self):
+        return f"#{self.id} {self.tipo} {self.chave}"
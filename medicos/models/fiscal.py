@@ -1,11 +1,13 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from .base import (
     Conta, Empresa, NFISCAL_ALIQUOTA_CONSULTAS, NFISCAL_ALIQUOTA_PLANTAO, 
     NFISCAL_ALIQUOTA_OUTROS, REGIME_TRIBUTACAO_COMPETENCIA, REGIME_TRIBUTACAO_CAIXA
 )
+from medicos.services.busca import normalizar_busca, normalizar_documento, preencher_colunas_busca
 
 
 class RegimeTributarioHistorico(models.Model):
@@ -678,6 +680,45 @@ class Aliquotas(models.Model):
         )
 
 
+class NotaFiscalQuerySet(models.QuerySet):
+    """QuerySet de NotaFiscal com agregados de rateio calculados no banco."""
+
+    def com_totais_rateio(self):
+        """
+        Anota quantidade, percentual e valor rateados calculados a partir de
+        NotaFiscalRateioMedico (subqueries correlacionadas, sem multiplicar linhas):
+        `qtd_rateios`, `percentual_rateado` e `valor_rateado`.
+
+        Útil para consultas ad-hoc e para conferir os totais mantidos na nota.
+        """
+        rateios = NotaFiscalRateioMedico.objects.filter(
+            nota_fiscal=models.OuterRef('pk')
+        ).order_by().values('nota_fiscal')
+        return self.annotate(
+            qtd_rateios=Coalesce(
+                models.Subquery(rateios.annotate(c=models.Count('id')).values('c')), 0
+            ),
+            percentual_rateado=Coalesce(
+                models.Subquery(rateios.annotate(s=models.Sum('percentual_participacao')).values('s')),
+                models.Value(0),
+                output_field=models.DecimalField(max_digits=7, decimal_places=2),
+            ),
+            valor_rateado=Coalesce(
+                models.Subquery(rateios.annotate(s=models.Sum('valor_bruto_medico')).values('s')),
+                models.Value(0),
+                output_field=models.DecimalField(max_digits=15, decimal_places=2),
+            ),
+        )
+
+    def com_totais_rateio_divergentes(self):
+        """Notas cujos totais mantidos divergem dos calculados a partir dos rateios."""
+        return self.com_totais_rateio().exclude(
+            rateio_quantidade=models.F('qtd_rateios'),
+            rateio_percentual_total=models.F('percentual_rateado'),
+            rateio_valor_total=models.F('valor_rateado'),
+        )
+
+
 class NotaFiscal(models.Model):
     """
     Modelo para gerenciamento de Notas Fiscais de Serviços
@@ -739,6 +780,11 @@ class NotaFiscal(models.Model):
         help_text="Número do CNPJ do tomador do serviço (formato: 00.000.000/0000-00)",
         blank=True, null=True
     )
+
+    # Tomador normalizado (sem acentos, minúsculas) e CNPJ só com dígitos, para
+    # os filtros de listas e o admin; preenchidos no save()
+    tomador_busca = models.CharField(max_length=200, blank=True, default='', editable=False)
+    cnpj_tomador_busca = models.CharField(max_length=18, blank=True, default='', editable=False)
     
     # === TIPO DE SERVIÇO E ALÍQUOTAS ===
     TIPO_SERVICO_CONSULTAS = 1
@@ -872,6 +918,24 @@ class NotaFiscal(models.Model):
         verbose_name="Criado por"
     )
 
+    # === TOTAIS DE RATEIO (desnormalizados) ===
+    # Mantidos por NotaFiscalRateioMedico (save/delete) via atualizar_totais_rateio;
+    # conferidos/reparados pelo comando verificar_totais_rateio.
+    rateio_quantidade = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name="Quantidade de Médicos no Rateio"
+    )
+    rateio_percentual_total = models.DecimalField(
+        max_digits=7, decimal_places=2, default=0, editable=False,
+        verbose_name="Percentual Total Rateado"
+    )
+    rateio_valor_total = models.DecimalField(
+        max_digits=15, decimal_places=2, default=0, editable=False,
+        verbose_name="Valor Total Rateado (R$)"
+    )
+
+    objects = NotaFiscalQuerySet.as_manager()
+
     def clean(self):
         """Validações simplificadas do modelo"""
         # Pula validação de valor líquido se for contexto de recebimento
@@ -917,6 +981,21 @@ class NotaFiscal(models.Model):
                     '__all__': 'Já existe uma nota fiscal com este número, série e empresa. Escolha outro número ou série.'
                 })
 
+    COLUNAS_BUSCA = {
+        'tomador_busca': ('tomador', normalizar_busca),
+        'cnpj_tomador_busca': ('cnpj_tomador', normalizar_documento),
+    }
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Estado gravado, para distinguir recebimento/cancelamento nos eventos de domínio
+        instancia._estado_salvo = {
+            campo: instancia.__dict__.get(campo)
+            for campo in ('status_recebimento', 'dtEmissao', 'empresa_destinataria_id')
+        }
+        return instancia
+
     def save(self, *args, **kwargs):
         """Override do save para cálculos automáticos"""
         # Verificar se é importação de XML (não recalcular impostos)
@@ -957,6 +1036,7 @@ class NotaFiscal(models.Model):
             aliquota_vigente = Aliquotas.obter_aliquota_vigente(self.empresa_destinataria, self.dtEmissao)
             self.aliquotas = aliquota_vigente
 
+        kwargs['update_fields'] = preencher_colunas_busca(self, kwargs.get('update_fields'))
         super().save(*args, **kwargs)
 
     def calcular_impostos(self):
@@ -1011,30 +1091,52 @@ class NotaFiscal(models.Model):
         return self.meio_pagamento.nome if self.meio_pagamento else 'Não definido'
 
     # === MÉTODOS DE RATEIO ===
+
+    @classmethod
+    def atualizar_totais_rateio(cls, notas_ids):
+        """
+        Recalcula, em um único UPDATE atômico, os totais de rateio mantidos
+        nas notas informadas a partir de NotaFiscalRateioMedico.
+
+        Args:
+            notas_ids: ids das notas fiscais afetadas
+
+        Returns:
+            int: Quantidade de notas atualizadas
+        """
+        notas_ids = [nota_id for nota_id in set(notas_ids) if nota_id]
+        if not notas_ids:
+            return 0
+        return cls.objects.filter(pk__in=notas_ids).com_totais_rateio().update(
+            rateio_quantidade=models.F('qtd_rateios'),
+            rateio_percentual_total=models.F('percentual_rateado'),
+            rateio_valor_total=models.F('valor_rateado'),
+        )
+
+    def recarregar_totais_rateio(self):
+        """Atualiza a instância em memória com os totais persistidos."""
+        if self.pk:
+            self.refresh_from_db(fields=['rateio_quantidade', 'rateio_percentual_total', 'rateio_valor_total'])
     
     @property
     def tem_rateio(self):
         """Verifica se a nota fiscal possui rateio configurado"""
-        return self.rateios_medicos.exists()
+        return self.rateio_quantidade > 0
     
     @property
     def total_medicos_rateio(self):
         """Retorna o número de médicos no rateio"""
-        return self.rateios_medicos.count()
+        return self.rateio_quantidade
     
     @property
     def percentual_total_rateado(self):
         """Retorna o percentual total já rateado"""
-        return self.rateios_medicos.aggregate(
-            total=models.Sum('percentual_participacao')
-        )['total'] or 0
+        return self.rateio_percentual_total
     
     @property
     def valor_total_rateado(self):
         """Retorna o valor total já rateado"""
-        return self.rateios_medicos.aggregate(
-            total=models.Sum('valor_bruto_medico')
-        )['total'] or 0
+        return self.rateio_valor_total
     
     @property
     def valor_pendente_rateio(self):
@@ -1174,7 +1276,18 @@ class NotaFiscalRateioMedico(models.Model):
         if not self.data_rateio:
             from django.utils import timezone
             self.data_rateio = timezone.now()
-        super().save(*args, **kwargs)
+
+        # Nota anterior (troca de nota no rateio) também precisa ter os totais refeitos
+        nota_anterior_id = None
+        if self.pk:
+            nota_anterior_id = NotaFiscalRateioMedico.objects.filter(pk=self.pk).values_list(
+                'nota_fiscal_id', flat=True
+            ).first()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            NotaFiscal.atualizar_totais_rateio([self.nota_fiscal_id, nota_anterior_id])
+        if self.nota_fiscal_id and 'nota_fiscal' in self._state.fields_cache:
+            self.nota_fiscal.recarregar_totais_rateio()
     """
     Rateio de Nota Fiscal para Médicos
     
@@ -3,6 +3,13 @@ Modelos relacionados a relatórios consolidados
 
 """
 
+import hashlib
+import json
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.conf import settings
@@ -76,11 +83,11 @@ class RelatorioMensalSocio(models.Model):
     imposto_provisionado_mes_anterior = models.DecimalField(max_digits=15, decimal_places=2, default=0, verbose_name="Imposto Provisionado Mês Anterior", help_text="Valor dos impostos provisionados no mês anterior.")
 
     # Listas detalhadas (JSON)
-    lista_despesas_sem_rateio = models.JSONField(default=list)
-    lista_despesas_com_rateio = models.JSONField(default=list)
-    lista_notas_fiscais = models.JSONField(default=list)
-    lista_notas_fiscais_emitidas = models.JSONField(default=list)
-    lista_movimentacoes_financeiras = models.JSONField(default=list)
+    lista_despesas_sem_rateio = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    lista_despesas_com_rateio = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    lista_notas_fiscais = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    lista_notas_fiscais_emitidas = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    lista_movimentacoes_financeiras = models.JSONField(default=list, encoder=DjangoJSONEncoder)
     debug_ir_adicional = models.JSONField(default=list, blank=True, null=True, help_text="Espelho detalhado do cálculo do IR adicional por nota fiscal.")
 
     # Totais das notas fiscais emitidas do sócio (para linha de totais da tabela)
@@ -121,3 +128,118 @@ class RelatorioMensalSocio(models.Model):
         
         from types import SimpleNamespace
         return [SimpleNamespace(**item) for item in self.lista_despesas_com_rateio]
+
+
+class _CodificadorSnapshot(json.JSONEncoder):
+    """JSON com marcação de Decimal e datas, para que o payload volte com os mesmos tipos."""
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return {'__decimal__': str(o)}
+        if isinstance(o, datetime):
+            return {'__datahora__': o.isoformat()}
+        if isinstance(o, date):
+            return {'__data__': o.isoformat()}
+        return super().default(o)
+
+
+def _decodificar_objeto(objeto):
+    if len(objeto) == 1:
+        if '__decimal__' in objeto:
+            return Decimal(objeto['__decimal__'])
+        if '__datahora__' in objeto:
+            return datetime.fromisoformat(objeto['__datahora__'])
+        if '__data__' in objeto:
+            return date.fromisoformat(objeto['__data__'])
+    return objeto
+
+
+class SnapshotPeriodo(models.Model):
+    """
+    Payload congelado de um relatório para uma competência fechada.
+
+    Quando a competência é fechada (SaldoMensalContaCorrente.fechado), os
+    dados calculados dos relatórios são gravados aqui, em JSON comprimido
+    (zlib), e as leituras daquele período passam a vir do snapshot em vez de
+    recalcular a partir dos lançamentos (medicos/services/snapshots_periodo.py).
+
+    Cada congelamento gera uma nova versão; reabrir o período desativa a
+    versão vigente, que continua disponível para auditoria. `formato` é a
+    versão da estrutura do payload: snapshots de um formato anterior são
+    ignorados e regerados.
+    """
+
+    TIPO_MENSAL_SOCIO = 'mensal_socio'
+    TIPO_APURACAO = 'apuracao'
+    TIPO_EXECUTIVO = 'executivo'
+    TIPO_CHOICES = [
+        (TIPO_MENSAL_SOCIO, 'Relatório mensal do sócio'),
+        (TIPO_APURACAO, 'Apuração de impostos'),
+        (TIPO_EXECUTIVO, 'Resumo executivo por sócio'),
+    ]
+
+    class Meta:
+        db_table = 'snapshot_periodo'
+        verbose_name = "Snapshot de Período"
+        verbose_name_plural = "Snapshots de Período"
+        unique_together = ('empresa', 'tipo', 'competencia', 'chave', 'versao')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['empresa', 'tipo', 'competencia', 'chave'],
+                condition=models.Q(ativo=True),
+                name='snapshot_periodo_ativo_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['empresa', 'tipo', 'competencia', 'ativo'], name='snapshot_emp_tipo_comp_idx'),
+        ]
+        ordering = ['-competencia', 'tipo', 'chave', '-versao']
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name='snapshots_periodo',
+        verbose_name="Empresa"
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo")
+    competencia = models.DateField(
+        verbose_name="Competência",
+        help_text="Primeiro dia do mês de referência"
+    )
+    chave = models.CharField(
+        max_length=50,
+        blank=True,
+        default='',
+        verbose_name="Chave",
+        help_text="Identifica o payload dentro da competência (ex: ID do sócio)"
+    )
+    versao = models.PositiveIntegerField(default=1, verbose_name="Versão")
+    formato = models.PositiveSmallIntegerField(default=1, verbose_name="Formato do payload")
+    payload = models.BinaryField(verbose_name="Payload (JSON zlib)")
+    hash_payload = models.CharField(max_length=64, verbose_name="SHA-256 do payload")
+    tamanho_bruto = models.PositiveIntegerField(default=0, verbose_name="Tamanho sem compressão (bytes)")
+    ativo = models.BooleanField(default=True, verbose_name="Vigente")
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+    origem = models.CharField(
+        max_length=30,
+        blank=True,
+        verbose_name="Origem",
+        help_text="Quem congelou: fechamento, primeira leitura ou auditoria"
+    )
+    invalidado_em = models.DateTimeField(null=True, blank=True, verbose_name="Invalidado em")
+    motivo_invalidacao = models.CharField(max_length=255, blank=True, verbose_name="Motivo da invalidação")
+
+    @staticmethod
+    def serializar(dados):
+        """(bytes comprimidos, sha256, tamanho) do payload; chaves ordenadas para o hash ser estável."""
+        bruto = json.dumps(dados, cls=_CodificadorSnapshot, sort_keys=True, separators=(',', ':')).encode()
+        return zlib.compress(bruto, 6), hashlib.sha256(bruto).hexdigest(), len(bruto)
+
+    @property
+    def dados(self):
+        return json.loads(zlib.decompress(bytes(self.payload)), object_hook=_decodificar_objeto)
+
+    def __str__(self):
+        chave = f' [{self.chave}]' if self.chave else ''
+        return f"{self.get_tipo_display()} {self.competencia.strftime('%m/%Y')}{chave} v{self.versao}"
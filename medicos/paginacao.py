@@ -0,0 +1,295 @@
+"""
+Paginação por cursor (keyset) para as listas django-tables2
+
+A paginação padrão do django-tables2 faz um COUNT(*) do conjunto filtrado e
+um OFFSET que cresce com a página: listas grandes (extrato da conta
+corrente, notas fiscais de tenants antigos) ficam mais lentas a cada página.
+
+`PaginadorCursor` continua compatível com os templates do django-tables2
+(é um LazyPaginator: sem COUNT), mas os links "anterior/próxima" carregam um
+cursor opaco com a chave (data, id) da borda da página em vez do número da
+página. A consulta vira `WHERE (data, id) < (cursor) ORDER BY data DESC, id
+DESC LIMIT n+1`, que usa o índice e custa o mesmo em qualquer profundidade.
+Links numéricos (?page=7) continuam funcionando em modo offset.
+
+Modo de contagem estimada (PAGINACAO_CONTAGEM_ESTIMADA=True): no PostgreSQL,
+o total de páginas exibido vem da estimativa do planejador (EXPLAIN), sem
+COUNT(*). Em outros bancos o paginador se comporta como o LazyPaginator.
+
+`PaginacaoCursorMixin` liga o paginador às views SingleTableMixin +
+FilterView e desliga a segunda paginação (com COUNT) que o
+MultipleObjectMixin faria sobre o mesmo queryset.
+
+`PaginadorContagemEstimada` é o equivalente para as changelists do admin
+(ModelAdmin.paginator).
+"""
+import base64
+import json
+import logging
+import math
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django_tables2.paginators import LazyPaginator
+from django_tables2.rows import BoundRows
+
+logger = logging.getLogger(__name__)
+
+
+def codificar_cursor(numero, valores, direcao='proxima'):
+    """Cursor opaco para a query string: página alvo, chave da borda e direção."""
+    dados = {'n': numero, 'v': [str(v) for v in valores], 'd': direcao[0]}
+    return base64.urlsafe_b64encode(json.dumps(dados, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    """Retorna (numero, valores_texto, direcao) ou None se o token não for um cursor válido."""
+    if not token or not isinstance(token, str) or token.isdigit():
+        return None
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        direcao = 'anterior' if dados['d'] == 'a' else 'proxima'
+        return int(dados['n']), list(dados['v']), direcao
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def contagem_estimada(queryset):
+    """
+    Estimativa de linhas do queryset pelo planejador do PostgreSQL, ou None.
+
+    Não executa a consulta: lê "Plan Rows" do EXPLAIN. A precisão depende das
+    estatísticas da tabela (ANALYZE), o que basta para exibir páginas.
+    """
+    conexao = connections[queryset.db]
+    if conexao.vendor != 'postgresql':
+        return None
+    try:
+        sql, parametros = queryset.order_by().query.sql_with_params()
+        with conexao.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', parametros)
+            plano = cursor.fetchone()[0]
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        return int(plano[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"Falha ao estimar contagem de {queryset.model.__name__}: {e}")
+        return None
+
+
+class PaginadorContagemEstimada(Paginator):
+    """
+    Paginator do admin que, no PostgreSQL, usa a estimativa do planejador
+    quando ela passa de ADMIN_CONTAGEM_EXATA_ATE linhas; abaixo disso (ou em
+    outros bancos) faz o COUNT(*) normal, barato nesses volumes.
+    """
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimado = contagem_estimada(self.object_list)
+            if estimado is not None and estimado > getattr(settings, 'ADMIN_CONTAGEM_EXATA_ATE', 10000):
+                return estimado
+        return super().count
+
+
+class PaginaCursor(Page):
+    """Página cujos números de página anterior/próxima são cursores."""
+
+    def __init__(self, object_list, number, paginator, tem_anterior, tem_proxima, chave_primeiro, chave_ultimo):
+        super().__init__(object_list, number, paginator)
+        self._tem_anterior = tem_anterior
+        self._tem_proxima = tem_proxima
+        self._chave_primeiro = chave_primeiro
+        self._chave_ultimo = chave_ultimo
+
+    def has_next(self):
+        return self._tem_proxima
+
+    def has_previous(self):
+        return self._tem_anterior
+
+    def next_page_number(self):
+        return codificar_cursor(self.number + 1, self._chave_ultimo, 'proxima')
+
+    def previous_page_number(self):
+        if self.number - 1 <= 1:
+            # A primeira página é sempre a mais barata: sem cursor
+            return 1
+        return codificar_cursor(self.number - 1, self._chave_primeiro, 'anterior')
+
+
+class PaginadorCursor(LazyPaginator):
+    """
+    Paginador keyset sobre as linhas de uma tabela django-tables2.
+
+    `ordem`: campos da ordenação estável, ex: ('-dtEmissao', '-id'); o último
+    deve ser único. Sem `ordem` (ex: usuário ordenou por outra coluna) o
+    paginador é um LazyPaginator comum, em modo offset.
+    `cursor`: valor cru do parâmetro de página da requisição.
+    `contagem_estimada`: usa a estimativa do PostgreSQL para o total de páginas.
+    """
+
+    def __init__(self, object_list, per_page, ordem=None, cursor=None, contagem_estimada=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.ordem = tuple(ordem or ())
+        self.cursor = decodificar_cursor(cursor) if self.ordem else None
+        self.usar_contagem_estimada = contagem_estimada
+        self._total_estimado = None
+
+    # Linhas e queryset da tabela
+
+    def _queryset(self):
+        dados = getattr(self.object_list, 'data', None)
+        return getattr(dados, 'data', None)
+
+    def _linhas(self, registros):
+        return list(BoundRows(data=registros, table=self.object_list.table))
+
+    def _chave(self, registro):
+        return [getattr(registro, campo.lstrip('-')) for campo in self.ordem]
+
+    def _filtro_keyset(self, queryset, valores_texto, direcao):
+        """Q da comparação lexicográfica (c1, c2, ...) antes/depois da chave."""
+        modelo = queryset.model
+        valores = [
+            modelo._meta.get_field(campo.lstrip('-')).to_python(valor)
+            for campo, valor in zip(self.ordem, valores_texto)
+        ]
+        filtro = Q()
+        iguais = {}
+        for campo, valor in zip(self.ordem, valores):
+            nome = campo.lstrip('-')
+            decrescente = campo.startswith('-')
+            # Seguindo a ordem: "depois" é menor em campo decrescente, maior em crescente
+            operador = 'lt' if decrescente == (direcao == 'proxima') else 'gt'
+            filtro |= Q(**iguais, **{f'{nome}__{operador}': valor})
+            iguais[nome] = valor
+        return filtro
+
+    # Contagem
+
+    @property
+    def total_estimado(self):
+        if self.usar_contagem_estimada and self._total_estimado is None:
+            queryset = self._queryset()
+            if queryset is not None:
+                self._total_estimado = contagem_estimada(queryset)
+        return self._total_estimado
+
+    def _get_num_pages(self):
+        conhecidas = self._num_pages
+        estimado = self.total_estimado
+        if estimado is None or self._final_num_pages is not None:
+            return conhecidas
+        return max(conhecidas or 1, math.ceil(estimado / self.per_page))
+
+    num_pages = property(_get_num_pages)
+
+    # Páginas
+
+    def page(self, number):
+        queryset = self._queryset()
+        if not self.ordem or queryset is None:
+            return super().page(number)
+
+        if self.cursor is None:
+            pagina = super().page(number)
+            registros = [linha.record for linha in pagina.object_list]
+            if not registros:
+                return pagina
+            return PaginaCursor(
+                pagina.object_list, pagina.number, self,
+                tem_anterior=pagina.number > 1,
+                tem_proxima=self._final_num_pages is None,
+                chave_primeiro=self._chave(registros[0]),
+                chave_ultimo=self._chave(registros[-1]),
+            )
+
+        numero, valores, direcao = self.cursor
+        ordem = self.ordem
+        if direcao == 'anterior':
+            ordem = tuple(c[1:] if c.startswith('-') else f'-{c}' for c in ordem)
+        try:
+            filtro = self._filtro_keyset(queryset, valores, direcao)
+        except ValidationError:
+            self.cursor = None
+            return self.page(1)
+        registros = list(queryset.filter(filtro).order_by(*ordem)[:self.per_page + 1])
+        sobra = len(registros) > self.per_page
+        registros = registros[:self.per_page]
+        if not registros:
+            # Cursor obsoleto (registros excluídos desde o clique): volta ao início
+            self.cursor = None
+            return self.page(1)
+        if direcao == 'anterior':
+            registros.reverse()
+            if not sobra:
+                numero = 1
+            tem_anterior, tem_proxima = sobra, True
+        else:
+            tem_anterior, tem_proxima = True, sobra
+
+        numero = max(numero, 1)
+        self._num_pages = numero + 1 if tem_proxima else numero
+        if not tem_proxima:
+            self._final_num_pages = numero
+        return PaginaCursor(
+            self._linhas(registros), numero, self,
+            tem_anterior=tem_anterior,
+            tem_proxima=tem_proxima,
+            chave_primeiro=self._chave(registros[0]),
+            chave_ultimo=self._chave(registros[-1]),
+        )
+
+
+class PaginacaoCursorMixin:
+    """
+    Paginação keyset para views SingleTableMixin + FilterView.
+
+    Defina `ordem_cursor` com a ordenação estável da lista (último campo
+    único). Quando o usuário ordena por uma coluna da tabela, a view cai para
+    o modo offset sem COUNT.
+    """
+
+    ordem_cursor = ('-id',)
+
+    def _ordenado_pelo_usuario(self):
+        campo = self.get_table_class()._meta.order_by_field
+        return bool(self.request.GET.get(campo))
+
+    def paginate_queryset(self, queryset, page_size):
+        # A tabela pagina as linhas; a paginação do MultipleObjectMixin só faria outro COUNT
+        return (None, None, queryset, False)
+
+    def get_table_pagination(self, table):
+        paginacao = super().get_table_pagination(table)
+        if paginacao is False:
+            return paginacao
+        if paginacao is True:
+            paginacao = {}
+        paginacao.update({
+            'paginator_class': PaginadorCursor,
+            'ordem': None if self._ordenado_pelo_usuario() else self.ordem_cursor,
+            'cursor': self.request.GET.get(table.prefixed_page_field),
+            'contagem_estimada': getattr(settings, 'PAGINACAO_CONTAGEM_ESTIMADA', False),
+        })
+        return paginacao
+
+    def get_table_kwargs(self):
+        kwargs = super().get_table_kwargs()
+        if not self._ordenado_pelo_usuario():
+            # Sem isso o Meta.order_by da tabela reordenaria o queryset e a
+            # primeira página (offset) divergiria da ordem do cursor
+            kwargs.setdefault('order_by', ())
+        return kwargs
+
+    def get_table_data(self):
+        dados = super().get_table_data()
+        if hasattr(dados, 'order_by') and not self._ordenado_pelo_usuario():
+            dados = dados.order_by(*self.ordem_cursor)
+        return dados
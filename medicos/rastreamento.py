@@ -0,0 +1,234 @@
+"""
+Rastreamento estruturado do app medicos
+
+Substitui os print() de depuração espalhados pelos caminhos quentes
+(signals, builders, importação de XML, fechamento) por três peças que se
+encaixam na configuração LOGGING do settings:
+
+- `span`: cronometra um trecho (context manager ou decorador) e emite um
+  registro estruturado com `span`, `duracao_ms` e os campos informados.
+  Em nível DEBUG quando rápido; em WARNING quando passa de
+  RASTREAMENTO_LIMITE_LENTO_MS, de modo que operações lentas aparecem em
+  produção mesmo com DEBUG desligado.
+- `FiltroAmostragem`: amostra, por prefixo de logger, os registros abaixo
+  de WARNING (ex: só 10% dos registros de medicos.signals_financeiro).
+- `HandlerFila`: enfileira os registros e os escreve em uma thread
+  separada (QueueListener); o worker não bloqueia em stdout e, com a fila
+  cheia, o registro é descartado em vez de segurar a requisição.
+
+`FormatadorEstruturado` escreve uma linha JSON por registro, incluindo os
+campos do span, para ingestão por agregadores de log.
+
+Com o nível do logger acima de DEBUG, um span rápido custa duas leituras
+de relógio e uma checagem de nível: nenhuma mensagem é formatada.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from contextlib import ContextDecorator
+from datetime import datetime, timezone
+
+LIMITE_LENTO_MS_PADRAO = 1000
+
+# Atributos padrão de LogRecord; o restante vem de `extra` e vai para o JSON
+_ATRIBUTOS_PADRAO = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def _limite_lento_ms():
+    try:
+        from django.conf import settings
+        return float(getattr(settings, 'RASTREAMENTO_LIMITE_LENTO_MS', LIMITE_LENTO_MS_PADRAO))
+    except Exception:
+        return LIMITE_LENTO_MS_PADRAO
+
+
+class span(ContextDecorator):
+    """
+    Cronometra um trecho de código e registra a duração.
+
+        with span('builder.relatorio_mensal_socio', logger, empresa_id=1) as s:
+            ...
+            s.anotar(socios=3)
+
+        @span('signal.despesa_socio', logger)
+        def handler(...): ...
+
+    `logger` pode ser um Logger ou um nome (padrão: medicos.rastreamento).
+    `limite_ms` sobrepõe RASTREAMENTO_LIMITE_LENTO_MS para este span.
+    Exceções não são suprimidas; o span é registrado com `status='erro'`.
+    """
+
+    def __init__(self, nome, logger=None, limite_ms=None, **campos):
+        if logger is None or isinstance(logger, str):
+            logger = logging.getLogger(logger or __name__)
+        self.nome = nome
+        self.logger = logger
+        self.limite_ms = limite_ms
+        self.campos = campos
+        self.duracao_ms = None
+
+    def _recreate_cm(self):
+        # Como decorador, cada chamada usa sua própria instância (reentrante e thread-safe)
+        return span(self.nome, self.logger, self.limite_ms, **self.campos)
+
+    def anotar(self, **campos):
+        """Acrescenta campos ao registro do span (ex: contagens calculadas no trecho)."""
+        self.campos.update(campos)
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_exc, exc, tb):
+        self.duracao_ms = (time.perf_counter() - self._inicio) * 1000
+        limite = self.limite_ms if self.limite_ms is not None else _limite_lento_ms()
+        if self.duracao_ms >= limite:
+            nivel = logging.WARNING
+        elif tipo_exc is not None:
+            nivel = logging.INFO
+        else:
+            nivel = logging.DEBUG
+        if self.logger.isEnabledFor(nivel):
+            status = 'erro' if tipo_exc is not None else 'ok'
+            self.logger.log(
+                nivel, 'span %s %.1f ms (%s)', self.nome, self.duracao_ms, status,
+                extra={
+                    'span': self.nome,
+                    'duracao_ms': round(self.duracao_ms, 3),
+                    'status': status,
+                    'campos': self.campos,
+                },
+            )
+        return False
+
+
+class FiltroAmostragem(logging.Filter):
+    """
+    Deixa passar apenas uma fração dos registros abaixo de `nivel_integral`.
+
+    `taxas` mapeia prefixo de logger -> fração (0 a 1); vale o prefixo mais
+    longo. Registros de WARNING para cima passam sempre.
+
+        'filters': {'amostragem': {
+            '()': 'medicos.rastreamento.FiltroAmostragem',
+            'taxas': {'medicos.signals_financeiro': 0.1},
+        }}
+    """
+
+    def __init__(self, taxas=None, taxa_padrao=1.0, nivel_integral=logging.WARNING):
+        super().__init__()
+        self.taxas = dict(taxas or {})
+        self.taxa_padrao = float(taxa_padrao)
+        self.nivel_integral = nivel_integral
+        self._cache = {}
+
+    def taxa(self, nome_logger):
+        try:
+            return self._cache[nome_logger]
+        except KeyError:
+            pass
+        taxa = self.taxa_padrao
+        melhor = -1
+        for prefixo, valor in self.taxas.items():
+            if (nome_logger == prefixo or nome_logger.startswith(prefixo + '.')) and len(prefixo) > melhor:
+                taxa, melhor = float(valor), len(prefixo)
+        self._cache[nome_logger] = taxa
+        return taxa
+
+    def filter(self, record):
+        if record.levelno >= self.nivel_integral:
+            return True
+        taxa = self.taxa(record.name)
+        return taxa >= 1 or random.random() < taxa
+
+
+class FormatadorEstruturado(logging.Formatter):
+    """Uma linha JSON por registro: horário, nível, logger, mensagem e campos de `extra`."""
+
+    def format(self, record):
+        dados = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'processo': record.process,
+            'thread': record.threadName,
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO and not chave.startswith('_'):
+                dados[chave] = valor
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            dados['excecao'] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class HandlerFila(logging.Handler):
+    """
+    Handler assíncrono: o chamador só enfileira; um QueueListener escreve no
+    stream (stderr por padrão) com o formatter configurado neste handler.
+
+    A fila é limitada (`tamanho_fila`); registros que não cabem são
+    descartados e contados em `descartados`. Após fork (ex: gunicorn com
+    --preload) a thread de escrita é recriada no processo filho.
+    """
+
+    def __init__(self, tamanho_fila=10000, stream=None):
+        # Não herda de QueueHandler: o dictConfig do Python 3.12+ trata essa
+        # classe de forma especial (chaves queue/listener/handlers)
+        super().__init__()
+        self.queue = queue.Queue(maxsize=tamanho_fila)
+        self.destino = logging.StreamHandler(stream or sys.stderr)
+        self.descartados = 0
+        self._iniciar_listener()
+        atexit.register(self._parar_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reiniciar_apos_fork)
+
+    def _iniciar_listener(self):
+        self.listener = logging.handlers.QueueListener(self.queue, self.destino)
+        self.listener.start()
+
+    def _parar_listener(self):
+        listener, self.listener = self.listener, None
+        if listener is not None and listener._thread is not None:
+            listener.stop()
+
+    def _reiniciar_apos_fork(self):
+        # A thread do listener não sobrevive ao fork; a fila herdada pode ter lixo
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self._iniciar_listener()
+
+    def setFormatter(self, fmt):
+        # A formatação acontece na thread do listener, não na do chamador
+        self.destino.setFormatter(fmt)
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            self.descartados += 1
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self._parar_listener()
+        super().close()
@@ -5,6 +5,10 @@ from medicos.models import NotaFiscal
 from django.db.models import Sum, Q
 from django.db import transaction
 from decimal import Decimal
+from medicos.rastreamento import span
+import logging
+
+logger = logging.getLogger(__name__)
 
 TRIMESTRES = [
     (1, (1, 2, 3)),
@@ -13,6 +17,7 @@ TRIMESTRES = [
     (4, (10, 11, 12)),
 ]
 
+@span('apuracao.csll', logger)
 def montar_relatorio_csll_persistente(empresa_id, ano):
     empresa = Empresa.objects.get(id=empresa_id)
     aliquota = Aliquotas.obter_aliquota_vigente(empresa)
@@ -18,6 +18,10 @@ from django.db.models import Sum, Q
 from django.db import transaction
 from decimal import Decimal
 from datetime import datetime
+from medicos.rastreamento import span
+import logging
+
+logger = logging.getLogger(__name__)
 
 MESES = [
     (1, 'Janeiro'),
@@ -34,6 +38,7 @@ MESES = [
     (12, 'Dezembro'),
 ]
 
+@span('apuracao.irpj_mensal', logger)
 def montar_relatorio_irpj_mensal_persistente(empresa_id, ano):
     """
     Monta relatório IRPJ mensal por estimativa conforme Lei 9.430/1996, Art. 2º.
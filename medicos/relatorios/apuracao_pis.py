@@ -1,8 +1,14 @@
 from datetime import datetime
+from decimal import Decimal
 from django.db.models import Sum
 from medicos.models.base import Empresa, REGIME_TRIBUTACAO_COMPETENCIA, REGIME_TRIBUTACAO_CAIXA
 from medicos.models.fiscal import Aliquotas, NotaFiscal
+from medicos.services.centavos import aplicar_percentual, de_centavos, para_centavos, somar_centavos_por
 from medicos.models.relatorios_apuracao_pis import ApuracaoPIS
+from medicos.rastreamento import span
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Fonte: .github/documentacao_especifica_instructions.md, seção Relatórios
 
@@ -19,6 +25,7 @@ def _competencia_anterior(competencia):
     else:
         return f'{mes-1:02d}/{ano}'
 
+@span('apuracao.pis', logger)
 def montar_relatorio_pis_persistente(empresa_id, ano):
     """
     Monta e persiste os dados do relatório de apuração de PIS para cada competência do ano.
@@ -35,88 +42,84 @@ def montar_relatorio_pis_persistente(empresa_id, ano):
     # Se o valor apurado for inferior a R$ 10,00, o pagamento é acumulado para a competência seguinte.
     # Fonte: IN RFB nº 1.717/2017, art. 68. Exemplo: competência 03/2025 apura R$ 7,50, não gera pagamento, acumula para 04/2025.
     VALOR_MINIMO_PAGAMENTO = 10.00  # Fonte: IN RFB nº 1.717/2017, art. 68
-    saldo_acumulado = 0.0
-    for mes in range(1, 13):
-        competencia = f'{mes:02d}/{ano}'
-        
-        # Notas para base de cálculo considerando regime tributário da empresa
-        # EXCLUDINDO notas fiscais canceladas de todos os cálculos
-        if empresa.regime_tributario == REGIME_TRIBUTACAO_COMPETENCIA:
-            # Regime de competência: considera data de emissão
-            notas_mes = NotaFiscal.objects.filter(
-                empresa_destinataria=empresa,
-                dtEmissao__year=int(ano),
-                dtEmissao__month=mes
-            ).exclude(status_recebimento='cancelado')
-        else:
-            # Regime de caixa: considera data de recebimento
-            notas_mes = NotaFiscal.objects.filter(
-                empresa_destinataria=empresa,
-                dtRecebimento__year=int(ano),
-                dtRecebimento__month=mes,
-                dtRecebimento__isnull=False  # Só considera notas efetivamente recebidas
-            ).exclude(status_recebimento='cancelado')
-        base_calculo = sum(float(nf.val_bruto or 0) for nf in notas_mes)
-        
-        # Alíquota vigente
-        aliquota_obj = Aliquotas.objects.filter(
-            empresa=empresa,
-            data_vigencia_inicio__lte=f'{ano}-12-31',
-        ).order_by('-data_vigencia_inicio').first()
-        aliquota = float(getattr(aliquota_obj, 'PIS', 0)) if aliquota_obj else 0
-        imposto_devido = round(base_calculo * (aliquota / 100), 2)
-        
-        # Imposto retido considerando data de RECEBIMENTO da nota fiscal
-        # EXCLUDINDO notas fiscais canceladas
-        notas_recebidas_mes = NotaFiscal.objects.filter(
+    valor_minimo_centavos = para_centavos(VALOR_MINIMO_PAGAMENTO)
+    saldo_acumulado = 0
+
+    # Alíquota vigente
+    aliquota_obj = Aliquotas.objects.filter(
+        empresa=empresa,
+        data_vigencia_inicio__lte=f'{ano}-12-31',
+    ).order_by('-data_vigencia_inicio').first()
+    aliquota = getattr(aliquota_obj, 'PIS', None) or Decimal('0')
+
+    # Notas para base de cálculo considerando regime tributário da empresa
+    # EXCLUDINDO notas fiscais canceladas de todos os cálculos
+    # Somas do ano em centavos, uma query agrupada por mês para cada critério de data
+    if empresa.regime_tributario == REGIME_TRIBUTACAO_COMPETENCIA:
+        # Regime de competência: considera data de emissão
+        notas_base = NotaFiscal.objects.filter(
+            empresa_destinataria=empresa,
+            dtEmissao__year=int(ano),
+        ).exclude(status_recebimento='cancelado')
+        campo_mes_base = 'dtEmissao__month'
+    else:
+        # Regime de caixa: considera data de recebimento
+        notas_base = NotaFiscal.objects.filter(
             empresa_destinataria=empresa,
             dtRecebimento__year=int(ano),
-            dtRecebimento__month=mes
+            dtRecebimento__isnull=False  # Só considera notas efetivamente recebidas
         ).exclude(status_recebimento='cancelado')
-        imposto_retido_nf = sum(float(nf.val_PIS or 0) for nf in notas_recebidas_mes)
-        
+        campo_mes_base = 'dtRecebimento__month'
+    base_por_mes = somar_centavos_por(notas_base, campo_mes_base, 'val_bruto')
+
+    # Imposto retido considerando data de RECEBIMENTO da nota fiscal
+    # EXCLUDINDO notas fiscais canceladas
+    notas_recebidas = NotaFiscal.objects.filter(
+        empresa_destinataria=empresa,
+        dtRecebimento__year=int(ano),
+    ).exclude(status_recebimento='cancelado')
+    retido_por_mes = somar_centavos_por(notas_recebidas, 'dtRecebimento__month', 'val_PIS')
+
+    for mes in range(1, 13):
+        competencia = f'{mes:02d}/{ano}'
+        base_calculo = base_por_mes.get(mes, {}).get('val_bruto', 0)
+        imposto_devido = aplicar_percentual(base_calculo, aliquota)
+        imposto_retido_nf = retido_por_mes.get(mes, {}).get('val_PIS', 0)
+
         credito_mes_anterior = saldo_acumulado
         credito_mes_seguinte = 0
-        imposto_a_pagar = round(imposto_devido - imposto_retido_nf + credito_mes_anterior - credito_mes_seguinte, 2)
-        if imposto_a_pagar < VALOR_MINIMO_PAGAMENTO:
+        imposto_a_pagar = imposto_devido - imposto_retido_nf + credito_mes_anterior - credito_mes_seguinte
+        if imposto_a_pagar < valor_minimo_centavos:
             saldo_acumulado = imposto_a_pagar
-            imposto_a_pagar = 0.0
+            imposto_a_pagar = 0
             credito_mes_seguinte = saldo_acumulado
         else:
-            saldo_acumulado = 0.0
-        obj, _ = ApuracaoPIS.objects.update_or_create(
-            empresa=empresa,
-            competencia=competencia,
-            defaults={
-                'base_calculo': base_calculo,
-                'aliquota': aliquota,
-                'imposto_devido': imposto_devido,
-                'imposto_retido_nf': imposto_retido_nf,
-                'imposto_a_pagar': imposto_a_pagar,
-                'credito_mes_anterior': credito_mes_anterior,
-                'credito_mes_seguinte': credito_mes_seguinte,
-            }
-        )
-        linhas.append({
-            'competencia': competencia,
-            'base_calculo': base_calculo,
-            'aliquota': aliquota,
-            'imposto_devido': imposto_devido,
-            'imposto_retido_nf': imposto_retido_nf,
-            'imposto_a_pagar': imposto_a_pagar,
-            'credito_mes_anterior': credito_mes_anterior,
-            'credito_mes_seguinte': credito_mes_seguinte,
-        })
+            saldo_acumulado = 0
         total_pis += imposto_devido
         total_base_calculo += base_calculo
         total_retido += imposto_retido_nf
         total_a_pagar += imposto_a_pagar
+        valores = {
+            'base_calculo': de_centavos(base_calculo),
+            'aliquota': aliquota,
+            'imposto_devido': de_centavos(imposto_devido),
+            'imposto_retido_nf': de_centavos(imposto_retido_nf),
+            'imposto_a_pagar': de_centavos(imposto_a_pagar),
+            'credito_mes_anterior': de_centavos(credito_mes_anterior),
+            'credito_mes_seguinte': de_centavos(credito_mes_seguinte),
+        }
+        obj, _ = ApuracaoPIS.objects.update_or_create(
+            empresa=empresa,
+            competencia=competencia,
+            defaults=valores,
+        )
+        linhas.append({'competencia': competencia, **valores})
     return {
         'linhas': linhas,
         'totais': {
-            'total_base_calculo': total_base_calculo,
-            'total_imposto_devido': total_pis,
-            'total_imposto_retido_nf': total_retido,
-            'total_imposto_a_pagar': total_a_pagar,
+            'total_base_calculo': de_centavos(total_base_calculo),
+            'total_imposto_devido': de_centavos(total_pis),
+            'total_imposto_retido_nf': de_centavos(total_retido),
+            'total_imposto_a_pagar': de_centavos(total_a_pagar),
         },
     }
@@ -13,8 +13,21 @@ from medicos.models.fiscal import NotaFiscal, NotaFiscalRateioMedico, Aliquotas
 from medicos.models.despesas import DespesaRateada, ItemDespesaRateioMensal, DespesaSocio
 from medicos.models.financeiro import Financeiro
 from medicos.models.relatorios import RelatorioMensalSocio
+from medicos.services.adicional_ir import adicional_ir_socio_no_mes
+from medicos.services.centavos import (
+    aplicar_percentual,
+    de_centavos,
+    para_centavos,
+    somar_centavos,
+    somar_centavos_por,
+)
+from medicos.services.despesas_apropriadas import despesas_rateadas_do_socio
+from medicos.rastreamento import span
 from datetime import date
 import calendar
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 def calcular_adicional_ir_trimestral_socio(empresa, socio, ano, mes):
@@ -22,85 +35,17 @@ def calcular_adicional_ir_trimestral_socio(empresa, socio, ano, mes):
     Calcula o adicional de IR trimestral para um sócio específico.
     Baseado na implementação do Relatório Mensal do Sócio.
     
-    Retorna o valor do adicional de IR trimestral proporcional ao sócio.
+    Retorna o valor do adicional de IR trimestral proporcional ao sócio
+    (apuração única por trimestre em medicos/services/adicional_ir.py).
     """
-    # Só calcula nos meses de fechamento de trimestre (3, 6, 9, 12)
-    if mes not in [3, 6, 9, 12]:
-        return Decimal('0')
-    
     try:
-        # Obter alíquotas da empresa
-        aliquota = Aliquotas.objects.filter(empresa=empresa).first()
-        if not aliquota:
-            return Decimal('0')
-        
-        # Determinar o trimestre atual
-        trimestre = (mes - 1) // 3 + 1
-        meses_trimestre = {
-            1: [1, 2, 3],    # T1: Jan, Fev, Mar
-            2: [4, 5, 6],    # T2: Abr, Mai, Jun
-            3: [7, 8, 9],    # T3: Jul, Ago, Set
-            4: [10, 11, 12]  # T4: Out, Nov, Dez
-        }
-        
-        # Calcular base trimestral da empresa (soma dos 3 meses do trimestre)
-        total_consultas_trimestre_empresa = Decimal('0')
-        total_outros_trimestre_empresa = Decimal('0')
-        
-        # Calcular receita trimestral do sócio para participação
-        receita_bruta_socio_trimestre = Decimal('0')
-        
-        for mes_trimestre in meses_trimestre[trimestre]:
-            # Notas da empresa no mês
-            notas_mes = NotaFiscal.objects.filter(
-                empresa_destinataria=empresa,
-                dtEmissao__year=ano,
-                dtEmissao__month=mes_trimestre
-            ).exclude(status_recebimento='cancelado')
-            
-            for nf in notas_mes:
-                valor_nota = Decimal(str(nf.val_bruto or 0))
-                if nf.tipo_servico == nf.TIPO_SERVICO_CONSULTAS:
-                    total_consultas_trimestre_empresa += valor_nota
-                else:  # TIPO_SERVICO_OUTROS
-                    total_outros_trimestre_empresa += valor_nota
-                
-                # Calcular receita do sócio nesta nota
-                rateio = nf.rateios_medicos.filter(medico=socio).first()
-                if rateio:
-                    receita_bruta_socio_trimestre += Decimal(str(rateio.valor_bruto_medico or 0))
-        
-        # Calcular base de cálculo trimestral da empresa
-        presuncao_consultas = Decimal(str(aliquota.IRPJ_PRESUNCAO_CONSULTA)) / Decimal('100')
-        presuncao_outros = Decimal(str(aliquota.IRPJ_PRESUNCAO_OUTROS)) / Decimal('100')
-        
-        base_consultas_trimestre = total_consultas_trimestre_empresa * presuncao_consultas
-        base_outros_trimestre = total_outros_trimestre_empresa * presuncao_outros
-        base_calculo_ir_trimestre = base_consultas_trimestre + base_outros_trimestre
-        
-        # Aplicar limite trimestral de R$ 60.000,00
-        limite_trimestral = Decimal('60000.00')  # Lei 9.249/1995, Art. 3º, §1º
-        excedente_adicional_trimestre = max(base_calculo_ir_trimestre - limite_trimestral, Decimal('0'))
-        
-        # Calcular adicional total da empresa (10% sobre o excedente)
-        aliquota_adicional_fixa = Decimal('0.10')  # 10% fixo por lei
-        adicional_ir_trimestral_empresa = excedente_adicional_trimestre * aliquota_adicional_fixa
-        
-        # Calcular participação do sócio
-        total_receita_trimestre_empresa = total_consultas_trimestre_empresa + total_outros_trimestre_empresa
-        if total_receita_trimestre_empresa > 0:
-            participacao_socio = receita_bruta_socio_trimestre / total_receita_trimestre_empresa
-            adicional_ir_trimestral_socio = adicional_ir_trimestral_empresa * participacao_socio
-        else:
-            adicional_ir_trimestral_socio = Decimal('0')
-        
-        return adicional_ir_trimestral_socio
-        
+        return adicional_ir_socio_no_mes(empresa, socio.id, ano, mes)
     except Exception as e:
-        print(f"Erro ao calcular adicional IR trimestral para sócio {socio.id}: {e}")
+        logger.warning("Erro ao calcular adicional IR trimestral para sócio %s: %s", socio.id, e)
         return Decimal('0')
 
 
+@span('builder.relatorio_executivo_anual', logger)
 def montar_relatorio_executivo_anual(empresa_id, ano=None):
     """
     Builder simplificado para o relatório executivo anual.
@@ -116,50 +61,38 @@ def montar_relatorio_executivo_anual(empresa_id, ano=None):
     empresa = Empresa.objects.get(id=empresa_id)
     ano_atual = ano or datetime.now().year
     
-    # Dados de notas fiscais por mês (simplificado)
-    notas_emitidas_mes = {}
-    notas_recebidas_mes = {}
-    notas_pendentes_mes = {}
-    despesas_coletivas_mes = {}
+    # Dados de notas fiscais por mês: somas do ano em centavos, uma query agrupada por mês
+    # EXCLUDINDO notas fiscais canceladas
+    notas_ano = NotaFiscal.objects.filter(empresa_destinataria=empresa).exclude(status_recebimento='cancelado')
     
-    for mes in range(1, 13):
-        # Notas emitidas (valor das notas fiscais emitidas)
-        # EXCLUDINDO notas fiscais canceladas
-        emitidas = NotaFiscal.objects.filter(
-            empresa_destinataria=empresa,
-            dtEmissao__year=ano_atual,
-            dtEmissao__month=mes
-        ).exclude(status_recebimento='cancelado').aggregate(total=Sum('val_bruto'))['total'] or Decimal('0')
-        notas_emitidas_mes[mes] = emitidas
-        
-        # Notas recebidas (valor das notas fiscais efetivamente recebidas)
-        # EXCLUDINDO notas fiscais canceladas
-        recebidas = NotaFiscal.objects.filter(
-            empresa_destinataria=empresa,
-            dtRecebimento__year=ano_atual,
-            dtRecebimento__month=mes,
-            dtRecebimento__isnull=False,
-            status_recebimento='recebido'
-        ).exclude(status_recebimento='cancelado').aggregate(total=Sum('val_bruto'))['total'] or Decimal('0')
-        notas_recebidas_mes[mes] = recebidas
-        
-        # Notas pendentes
-        # EXCLUDINDO notas fiscais canceladas
-        pendentes = NotaFiscal.objects.filter(
-            empresa_destinataria=empresa,
-            dtEmissao__year=ano_atual,
-            dtEmissao__month=mes,
-            status_recebimento__in=['pendente', 'parcial']
-        ).exclude(status_recebimento='cancelado').aggregate(total=Sum('val_bruto'))['total'] or Decimal('0')
-        notas_pendentes_mes[mes] = pendentes
-        
-        # Despesas coletivas
-        despesas = DespesaRateada.objects.filter(
-            item_despesa__grupo_despesa__empresa=empresa,
-            data__year=ano_atual,
-            data__month=mes
-        ).aggregate(total=Sum('valor'))['total'] or Decimal('0')
-        despesas_coletivas_mes[mes] = despesas
+    # Notas emitidas (valor das notas fiscais emitidas)
+    emitidas = somar_centavos_por(notas_ano.filter(dtEmissao__year=ano_atual), 'dtEmissao__month', 'val_bruto')
+    
+    # Notas recebidas (valor das notas fiscais efetivamente recebidas)
+    recebidas = somar_centavos_por(
+        notas_ano.filter(dtRecebimento__year=ano_atual, dtRecebimento__isnull=False, status_recebimento='recebido'),
+        'dtRecebimento__month', 'val_bruto',
+    )
+    
+    # Notas pendentes
+    pendentes = somar_centavos_por(
+        notas_ano.filter(dtEmissao__year=ano_atual, status_recebimento__in=['pendente', 'parcial']),
+        'dtEmissao__month', 'val_bruto',
+    )
+    
+    # Despesas coletivas
+    despesas = somar_centavos_por(
+        DespesaRateada.objects.filter(item_despesa__grupo_despesa__empresa=empresa, data__year=ano_atual),
+        'data__month', 'valor',
+    )
+    
+    def por_mes(somas, campo):
+        return {mes: de_centavos(somas.get(mes, {}).get(campo, 0)) for mes in range(1, 13)}
+    
+    notas_emitidas_mes = por_mes(emitidas, 'val_bruto')
+    notas_recebidas_mes = por_mes(recebidas, 'val_bruto')
+    notas_pendentes_mes = por_mes(pendentes, 'val_bruto')
+    despesas_coletivas_mes = por_mes(despesas, 'valor')
     
     # Totais anuais
     total_emitidas = sum(notas_emitidas_mes.values())
@@ -180,6 +113,7 @@ def montar_relatorio_executivo_anual(empresa_id, ano=None):
     }
 
 
+@span('builder.resumo_demonstrativo_socios', logger)
 def montar_resumo_demonstrativo_socios(empresa_id, mes_ano=None):
     """
     Builder para resumo demonstrativo por sócio.
@@ -231,9 +165,9 @@ def montar_resumo_demonstrativo_socios(empresa_id, mes_ano=None):
             dtEmissao__month=mes
         ).exclude(status_recebimento='cancelado').distinct()
         
-        receita_emitida = notas_emitidas_socio.aggregate(
-            total_rateio=Sum('rateios_medicos__valor_bruto_medico')
-        )['total_rateio'] or Decimal('0')
+        receita_emitida = de_centavos(somar_centavos(
+            notas_emitidas_socio, 'rateios_medicos__valor_bruto_medico'
+        )['rateios_medicos__valor_bruto_medico'])
         
         # CORREÇÃO: Considerar regime de tributação da empresa para base de cálculo do "Imposto Devido"
         # Competência: usa notas emitidas (dtEmissao) | Caixa: usa notas recebidas (dtRecebimento)
@@ -247,9 +181,9 @@ def montar_resumo_demonstrativo_socios(empresa_id, mes_ano=None):
                 dtEmissao__month=mes
             ).exclude(status_recebimento='cancelado').distinct()
             
-            receita_base_imposto_devido = notas_base_imposto_devido.aggregate(
-                total_rateio=Sum('rateios_medicos__valor_bruto_medico')
-            )['total_rateio'] or Decimal('0')
+            receita_base_imposto_devido = de_centavos(somar_centavos(
+                notas_base_imposto_devido, 'rateios_medicos__valor_bruto_medico'
+            )['rateios_medicos__valor_bruto_medico'])
         else:
             # Regime de caixa: usar notas recebidas (data de recebimento)
             notas_base_imposto_devido = NotaFiscal.objects.filter(
@@ -261,9 +195,9 @@ def montar_resumo_demonstrativo_socios(empresa_id, mes_ano=None):
                 status_recebimento='recebido'
             ).exclude(status_recebimento='cancelado').distinct()
             
-            receita_base_imposto_devido = notas_base_imposto_devido.aggregate(
-                total_rateio=Sum('rateios_medicos__valor_bruto_medico')
-            )['total_rateio'] or Decimal('0')
+            receita_base_imposto_devido = de_centavos(somar_centavos(
+                notas_base_imposto_devido, 'rateios_medicos__valor_bruto_medico'
+            )['rateios_medicos__valor_bruto_medico'])
         
         # Nota fiscal recebida do sócio no mês (baseada em data de recebimento) - para "Receita Bruta"
         # EXCLUDINDO notas fiscais canceladas
@@ -276,9 +210,9 @@ def montar_resumo_demonstrativo_socios(empresa_id, mes_ano=None):
             status_recebimento='recebido'
         ).exclude(status_recebimento='cancelado').distinct()
         
-        receita_bruta = notas_recebidas_socio.aggregate(
-            total_rateio=Sum('rateios_medicos__valor_bruto_medico')
-        )['total_rateio'] or Decimal('0')
+        receita_bruta = de_centavos(somar_centavos(
+            notas_recebidas_socio, 'rateios_medicos__valor_bruto_medico'
+        )['rateios_medicos__valor_bruto_medico'])
         
         # Impostos retidos: sempre por data de recebimento (valores proporcionais do rateio)
         rateios_socio = NotaFiscalRateioMedico.objects.filter(
@@ -290,41 +224,34 @@ def montar_resumo_demonstrativo_socios(empresa_id, mes_ano=None):
             nota_fiscal__status_recebimento='recebido'
         )
         
-        impostos_retidos_rateados = rateios_socio.aggregate(
-            total_iss=Sum('valor_iss_medico'),
-            total_pis=Sum('valor_pis_medico'),
-            total_cofins=Sum('valor_cofins_medico'),
-            total_ir=Sum('valor_ir_medico'),
-            total_csll=Sum('valor_csll_medico')
+        impostos_retidos_rateados = somar_centavos(
+            rateios_socio,
+            'valor_iss_medico', 'valor_pis_medico', 'valor_cofins_medico', 'valor_ir_medico', 'valor_csll_medico',
         )
         
-        # Imposto retido = valores proporcionais retidos nas notas fiscais (rateio)
-        imposto_retido = (
-            (impostos_retidos_rateados['total_iss'] or Decimal('0')) +
-            (impostos_retidos_rateados['total_pis'] or Decimal('0')) +
-            (impostos_retidos_rateados['total_cofins'] or Decimal('0')) +
-            (impostos_retidos_rateados['total_ir'] or Decimal('0')) +
-            (impostos_retidos_rateados['total_csll'] or Decimal('0'))
-        )
+        # Imposto retido = valores proporcionais retidos nas notas fiscais (rateio), em centavos
+        imposto_retido = sum(impostos_retidos_rateados.values())
         
         # Imposto devido: calculado seguindo regime tributário da empresa sobre a base correta
         aliquotas = Aliquotas.obter_aliquota_vigente(empresa)
+        base_imposto_devido = para_centavos(receita_base_imposto_devido)
         
-        if aliquotas and receita_base_imposto_devido > 0:
-            # Calcular impostos devidos usando alíquotas sobre a base correta (seguindo regime tributário)
+        if aliquotas and base_imposto_devido > 0:
+            # Calcular impostos devidos usando alíquotas sobre a base correta (seguindo regime tributário),
+            # cada um arredondado no centavo
             # ISS: sempre competência por lei (LC 116/2003)
-            iss_devido = receita_base_imposto_devido * (aliquotas.ISS / Decimal('100'))
+            iss_devido = aplicar_percentual(base_imposto_devido, aliquotas.ISS)
             
             # PIS e COFINS: seguem regime da empresa
-            pis_devido = receita_base_imposto_devido * (aliquotas.PIS / Decimal('100'))
-            cofins_devido = receita_base_imposto_devido * (aliquotas.COFINS / Decimal('100'))
+            pis_devido = aplicar_percentual(base_imposto_devido, aliquotas.PIS)
+            cofins_devido = aplicar_percentual(base_imposto_devido, aliquotas.COFINS)
             
             # IRPJ e CSLL: seguem regime da empresa, com presunção de lucro (32% para consultas)
-            base_calculo_ir = receita_base_imposto_devido * (aliquotas.IRPJ_PRESUNCAO_CONSULTA / Decimal('100'))
-            base_calculo_csll = receita_base_imposto_devido * (aliquotas.CSLL_PRESUNCAO_CONSULTA / Decimal('100'))
+            base_calculo_ir = aplicar_percentual(base_imposto_devido, aliquotas.IRPJ_PRESUNCAO_CONSULTA)
+            base_calculo_csll = aplicar_percentual(base_imposto_devido, aliquotas.CSLL_PRESUNCAO_CONSULTA)
             
-            ir_devido = base_calculo_ir * (aliquotas.IRPJ_ALIQUOTA / Decimal('100'))
-            csll_devido = base_calculo_csll * (aliquotas.CSLL_ALIQUOTA / Decimal('100'))
+            ir_devido = aplicar_percentual(base_calculo_ir, aliquotas.IRPJ_ALIQUOTA)
+            csll_devido = aplicar_percentual(base_calculo_csll, aliquotas.CSLL_ALIQUOTA)
             
             # Calcular impostos devidos básicos
             impostos_devido_total = iss_devido + pis_devido + cofins_devido + ir_devido + csll_devido
@@ -332,19 +259,21 @@ def montar_resumo_demonstrativo_socios(empresa_id, mes_ano=None):
             # Calcular adicional de IR trimestral (separado do imposto devido)
             adicional_ir_trimestral = calcular_adicional_ir_trimestral_socio(empresa, socio, ano, mes)
             
-            # Debug - verificar valores
-            print(f"DEBUG Builder Executivo - Sócio {socio.pessoa.name}:")
-            print(f"  - Impostos devido básicos: {impostos_devido_total}")
-            print(f"  - Adicional IR trimestral: {adicional_ir_trimestral}")
-            print(f"  - Imposto devido (sem adicional): {impostos_devido_total}")
+            logger.debug(
+                "Resumo sócio %s: impostos devidos básicos %s, adicional IR trimestral %s",
+                socio.id, impostos_devido_total, adicional_ir_trimestral
+            )
             
             # Imposto devido = apenas impostos básicos (sem adicional de IR trimestral)
-            imposto_devido = impostos_devido_total
+            imposto_devido = de_centavos(impostos_devido_total)
         else:
             # Se não há alíquotas, apenas calcular o adicional de IR trimestral
             adicional_ir_trimestral = calcular_adicional_ir_trimestral_socio(empresa, socio, ano, mes)
             imposto_devido = Decimal('0')
         
+        adicional_ir_trimestral = de_centavos(para_centavos(adicional_ir_trimestral))
+        imposto_retido = de_centavos(imposto_retido)
+        
         # Calcular imposto devido com adicional de IR (soma dos dois)
         imposto_devido_com_adicional = imposto_devido + adicional_ir_trimestral
         
@@ -354,29 +283,18 @@ def montar_resumo_demonstrativo_socios(empresa_id, mes_ano=None):
         # Receita líquida apurada = receita bruta emitida - imposto devido
         receita_liquida = receita_bruta - imposto_devido
         
-        # Despesas com rateio do sócio no mês
-        despesas_rateadas = DespesaRateada.objects.filter(
-            item_despesa__grupo_despesa__empresa=empresa,
-            data__year=ano,
-            data__month=mes
-        )
-        
-        despesa_com_rateio = Decimal('0')
-        for despesa in despesas_rateadas:
-            # Obter configuração de rateio para este sócio/item/mês
-            rateio = ItemDespesaRateioMensal.obter_rateio_para_despesa(
-                despesa.item_despesa, socio, despesa.data
-            )
-            if rateio and rateio.percentual_rateio:
-                valor_rateado = despesa.valor * (rateio.percentual_rateio / Decimal('100'))
-                despesa_com_rateio += valor_rateado
+        # Despesas com rateio do sócio no mês: valor apropriado pelo percentual
+        # vigente, somado no banco em centavos (services/despesas_apropriadas.py)
+        despesa_com_rateio = de_centavos(somar_centavos(
+            despesas_rateadas_do_socio(empresa.id, socio.id, ano, mes), 'valor_apropriado'
+        )['valor_apropriado'])
         
         # Despesas sem rateio do sócio no mês (despesas diretas do sócio)
-        despesas_socio = DespesaSocio.objects.filter(
+        despesas_socio = de_centavos(somar_centavos(DespesaSocio.objects.filter(
             socio=socio,
             data__year=ano,
             data__month=mes
-        ).aggregate(total=Sum('valor'))['total'] or Decimal('0')
+        ), 'valor')['valor'])
         
         despesa_sem_rateio = despesas_socio
         
@@ -388,7 +306,7 @@ def montar_resumo_demonstrativo_socios(empresa_id, mes_ano=None):
             socio=socio,
             mes_referencia=datetime(ano, mes, 1).date()
         )
-        saldo_financeiro = Decimal(str(saldo_financeiro_data.get('saldo_liquido', 0)))
+        saldo_financeiro = de_centavos(para_centavos(saldo_financeiro_data.get('saldo_liquido', 0)))
         
         # Buscar imposto provisionado do mês anterior para este sócio
         if mes == 1:
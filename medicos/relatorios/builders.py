@@ -1,12 +1,38 @@
 # Imports necessários
 from medicos.models.base import Empresa, Socio, REGIME_TRIBUTACAO_COMPETENCIA, REGIME_TRIBUTACAO_CAIXA
 from medicos.models.despesas import DespesaSocio, DespesaRateada, ItemDespesaRateioMensal
-from medicos.models.fiscal import NotaFiscal, Aliquotas
+from medicos.models.fiscal import NotaFiscal, NotaFiscalRateioMedico, Aliquotas
 from medicos.models.financeiro import Financeiro
 from medicos.models.relatorios import RelatorioMensalSocio
+from medicos.services.centavos import (
+    aplicar_percentual,
+    de_centavos,
+    para_centavos,
+    proporcao,
+    somar_centavos,
+    somar_centavos_por,
+    totais_colunas,
+    vetor_centavos,
+)
+from medicos.services.adicional_ir import (
+    adicional_ir_socio_no_mes,
+    apurar_adicional_ir_trimestral,
+    trimestre_do_mes,
+)
+from medicos.services.despesas_apropriadas import (
+    despesas_individuais,
+    despesas_rateadas_do_socio,
+    totais_despesas_apropriadas,
+)
+from django.db.models import Q, Sum
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from decimal import Decimal, ROUND_HALF_UP
+import logging
+
+from medicos.rastreamento import span
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -24,6 +50,73 @@ def montar_relatorio_mensal_empresa(empresa_id, mes_ano):
     return {'relatorio': {}}
 
 
+
+# Colunas monetárias das linhas de notas fiscais do sócio (ordem da matriz de totais)
+COLUNAS_NOTAS_SOCIO = ('valor_bruto', 'iss', 'pis', 'cofins', 'irpj', 'csll', 'outros', 'valor_liquido')
+
+
+def _notas_fiscais_do_socio(socio, notas_qs):
+    """
+    Linhas das notas fiscais do sócio (valores do rateio) para o relatório mensal.
+
+    Uma única query (rateios do sócio com a nota via select_related); os valores
+    são convertidos em centavos uma vez e os totais por coluna somados como
+    matriz inteira.
+
+    Returns:
+        tuple: (linhas para o template/JSON, totais por coluna em centavos,
+                faturamento em centavos {'consultas', 'plantao', 'outros'})
+    """
+    rateios = NotaFiscalRateioMedico.objects.filter(
+        medico=socio, nota_fiscal__in=notas_qs
+    ).select_related('nota_fiscal').order_by('-nota_fiscal__dtEmissao', '-nota_fiscal__numero')
+
+    linhas, valores = [], []
+    faturamento = {'consultas': 0, 'plantao': 0, 'outros': 0}
+    for rateio in rateios:
+        nf = rateio.nota_fiscal
+        bruto = para_centavos(rateio.valor_bruto_medico)
+        # 'outros' da nota rateado na proporção do valor bruto do sócio
+        outros = proporcao(para_centavos(nf.val_outros), bruto, para_centavos(nf.val_bruto))
+        linha_centavos = [
+            bruto,
+            para_centavos(rateio.valor_iss_medico),
+            para_centavos(rateio.valor_pis_medico),
+            para_centavos(rateio.valor_cofins_medico),
+            para_centavos(rateio.valor_ir_medico),
+            para_centavos(rateio.valor_csll_medico),
+            outros,
+            para_centavos(rateio.valor_liquido_medico),
+        ]
+        valores.append(linha_centavos)
+
+        # Classificar por tipo de serviço (usando valor do rateio do sócio específico)
+        descricao = (nf.descricao_servicos or '').lower()
+        if nf.tipo_servico == NotaFiscal.TIPO_SERVICO_CONSULTAS:
+            faturamento['consultas'] += bruto
+        elif 'plantão' in descricao or 'plantao' in descricao:
+            faturamento['plantao'] += bruto
+        else:
+            faturamento['outros'] += bruto
+
+        linha = {
+            'id': nf.id,
+            'numero': getattr(nf, 'numero', ''),
+            'tp_aliquota': nf.get_tipo_servico_display(),
+            'tomador': nf.tomador,
+            'percentual_rateio': rateio.percentual_participacao,  # Percentual de rateio do sócio
+            'data_emissao': nf.dtEmissao.strftime('%d/%m/%Y'),
+            'data_recebimento': nf.dtRecebimento.strftime('%d/%m/%Y') if nf.dtRecebimento else '',
+        }
+        linha.update({
+            coluna: de_centavos(valor) for coluna, valor in zip(COLUNAS_NOTAS_SOCIO, linha_centavos)
+        })
+        linhas.append(linha)
+
+    return linhas, totais_colunas(valores, COLUNAS_NOTAS_SOCIO), faturamento
+
+
+@span('builder.relatorio_mensal_socio', logger)
 def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lancar_impostos=False, 
                                  atualizar_lancamentos_existentes=True):
     """
@@ -51,74 +144,47 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
     if not socio_selecionado and socios:
         socio_selecionado = socios[0]
 
-    # Despesas sem rateio
-    despesas_sem_rateio = DespesaSocio.objects.filter(
-        socio=socio_selecionado,
-        item_despesa__grupo_despesa__empresa=empresa,
-        data__year=competencia.year,
-        data__month=competencia.month
-    ).select_related('item_despesa__grupo_despesa')
-
+    # Despesas apropriadas ao sócio (individuais e rateadas), calculadas no banco
+    socio_selecionado_id = socio_selecionado.id if socio_selecionado else None
     lista_despesas_sem_rateio = []
-    for despesa in despesas_sem_rateio:
-        # Incluir nome do sócio e campos adicionais para exibição no template
-        socio_nome = getattr(getattr(despesa, 'socio', None), 'pessoa', None)
-        socio_display = socio_nome.name if socio_nome else str(getattr(despesa, 'socio', ''))
-        lista_despesas_sem_rateio.append({
-            'id': despesa.id,
-            'data': despesa.data.strftime('%d/%m/%Y'),
-            'socio': socio_display,
-            'grupo': despesa.item_despesa.grupo_despesa.descricao,
-            'descricao': despesa.item_despesa.descricao,
-            # manter chave 'valor' para compatibilidade com cálculo existente
-            'valor': float(despesa.valor),
-            'valor_total': float(despesa.valor),
-            'taxa_rateio': '-',  # despesas sem rateio não têm taxa aplicada
-            'valor_apropriado': float(despesa.valor),
-        })
-
-    # Despesas com rateio
-    despesas_com_rateio = DespesaRateada.objects.filter(
-        item_despesa__grupo_despesa__empresa=empresa,
-        data__year=competencia.year,
-        data__month=competencia.month
-    ).select_related('item_despesa__grupo_despesa')
-
     lista_despesas_com_rateio = []
-    # (debug prints removed)
-    for despesa in despesas_com_rateio:
-        # Garantir que exista um rateio para este item/sócio/mês (pode criar ou copiar do mês anterior)
-        try:
-            rateio = ItemDespesaRateioMensal.obter_rateio_para_despesa(
-                despesa.item_despesa,
-                socio_selecionado,
-                despesa.data
-            )
-        except Exception:
-            # Em caso de erro inesperado, pular esta despesa e logar para análise
-            print(f"[ERROR] Falha ao obter/criar rateio para despesa {despesa.id} e socio {socio_selecionado.id}")
-            continue
-
-        percentual = Decimal(rateio.percentual_rateio or 0)
-        valor_socio = despesa.valor * (percentual / Decimal('100')) if percentual > 0 else Decimal('0')
-
-        if percentual == 0:
-            # rateio zerado para este sócio — sem log em produção
-            pass
-
-        lista_despesas_com_rateio.append({
-            'id': despesa.id,
-            'data': despesa.data.strftime('%d/%m/%Y'),
-            'grupo': despesa.item_despesa.grupo_despesa.descricao,
-            'descricao': despesa.item_despesa.descricao,
-            'valor_total': float(despesa.valor),
-            'rateio_percentual': float(percentual),
-            'valor_socio': float(valor_socio),
-        })
+    # Totais padronizados: despesa_sem_rateio e despesa_com_rateio (centavos)
+    despesa_sem_rateio = 0
+    despesa_com_rateio = 0
+    if socio_selecionado_id:
+        despesas_sem_rateio = despesas_individuais(
+            empresa.id, socio_selecionado_id, competencia.year, competencia.month
+        ).order_by('-data', 'id').values('id', 'data', 'socio_nome', 'grupo', 'descricao', 'valor')
+        for despesa in despesas_sem_rateio:
+            despesa_sem_rateio += para_centavos(despesa['valor'])
+            lista_despesas_sem_rateio.append({
+                'id': despesa['id'],
+                'data': despesa['data'].strftime('%d/%m/%Y'),
+                'socio': despesa['socio_nome'],
+                'grupo': despesa['grupo'],
+                'descricao': despesa['descricao'],
+                # manter chave 'valor' para compatibilidade com cálculo existente
+                'valor': despesa['valor'],
+                'valor_total': despesa['valor'],
+                'taxa_rateio': '-',  # despesas sem rateio não têm taxa aplicada
+                'valor_apropriado': despesa['valor'],
+            })
 
-    # Totais padronizados: despesa_sem_rateio e despesa_com_rateio
-    despesa_sem_rateio = sum(d['valor'] for d in lista_despesas_sem_rateio)
-    despesa_com_rateio = sum(d['valor_socio'] for d in lista_despesas_com_rateio)
+        despesas_com_rateio = despesas_rateadas_do_socio(
+            empresa.id, socio_selecionado_id, competencia.year, competencia.month
+        ).order_by('-data', 'id').values('id', 'data', 'grupo', 'descricao', 'valor', 'taxa_rateio', 'valor_apropriado')
+        for despesa in despesas_com_rateio:
+            valor_socio = para_centavos(despesa['valor_apropriado'])
+            despesa_com_rateio += valor_socio
+            lista_despesas_com_rateio.append({
+                'id': despesa['id'],
+                'data': despesa['data'].strftime('%d/%m/%Y'),
+                'grupo': despesa['grupo'],
+                'descricao': despesa['descricao'],
+                'valor_total': despesa['valor'],
+                'rateio_percentual': despesa['taxa_rateio'],
+                'valor_socio': de_centavos(valor_socio),
+            })
 
     # Notas fiscais do sócio no mês
     # Para o cálculo de adicional de IR: considera data de emissão (conforme documentação)
@@ -148,178 +214,62 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
         dtEmissao__month=competencia.month
     ).exclude(status_recebimento='cancelado')
 
-    total_notas_bruto_empresa = sum(float(nf.val_bruto or 0) for nf in notas_empresa_qs)
+    # Receitas da empresa no mês por tipo de serviço (data de emissão), em uma agregação
+    servico_consultas = Q(tipo_servico=NotaFiscal.TIPO_SERVICO_CONSULTAS)
+    receitas_empresa_mes = somar_centavos(
+        notas_empresa_qs, 'val_bruto',
+        consultas=('val_bruto', servico_consultas),
+        outros=('val_bruto', ~servico_consultas),
+    )
+    total_notas_bruto_empresa = receitas_empresa_mes['val_bruto']
     
-    # Buscar a alíquota da empresa para obter o valor base correto
-    try:
-        aliquota = Aliquotas.objects.filter(empresa=empresa).first()
-        if aliquota and hasattr(aliquota, 'IRPJ_VALOR_BASE_INICIAR_CAL_ADICIONAL'):
-            valor_base_adicional = float(aliquota.IRPJ_VALOR_BASE_INICIAR_CAL_ADICIONAL)
-            aliquota_adicional = float(aliquota.IRPJ_ADICIONAL) / 100
-        else:
-            # Se não encontrar alíquota, não calcula adicional
-            valor_base_adicional = total_notas_bruto_empresa + 1  # Força adicional = 0
-            aliquota_adicional = 0
-    except:
-        # Em caso de erro, não calcula adicional
-        valor_base_adicional = total_notas_bruto_empresa + 1  # Força adicional = 0
-        aliquota_adicional = 0
-    
-    # CORREÇÃO: Adicional de IR TRIMESTRAL - Calcular com base trimestral
-    # Lei 9.249/1995, Art. 3º, §1º - limite trimestral de R$ 60.000,00
-    try:
-        aliquota = Aliquotas.objects.filter(empresa=empresa).first()
-        if aliquota:
-            # Determinar o trimestre atual
-            trimestre = (competencia.month - 1) // 3 + 1
-            meses_trimestre = {
-                1: [1, 2, 3],    # T1: Jan, Fev, Mar
-                2: [4, 5, 6],    # T2: Abr, Mai, Jun
-                3: [7, 8, 9],    # T3: Jul, Ago, Set
-                4: [10, 11, 12]  # T4: Out, Nov, Dez
-            }
-            
-            # Calcular base trimestral (soma dos 3 meses do trimestre)
-            total_consultas_trimestre = 0
-            total_outros_trimestre = 0
-            
-            for mes in meses_trimestre[trimestre]:
-                notas_mes = NotaFiscal.objects.filter(
-                    empresa_destinataria=empresa,
-                    dtEmissao__year=competencia.year,
-                    dtEmissao__month=mes
-                ).exclude(status_recebimento='cancelado')
-                
-                for nf in notas_mes:
-                    if nf.tipo_servico == nf.TIPO_SERVICO_CONSULTAS:
-                        total_consultas_trimestre += float(nf.val_bruto or 0)
-                    else:  # TIPO_SERVICO_OUTROS
-                        total_outros_trimestre += float(nf.val_bruto or 0)
-            
-            # Calcular base de cálculo trimestral
-            base_consultas_trimestre = total_consultas_trimestre * (float(aliquota.IRPJ_PRESUNCAO_CONSULTA) / 100)
-            base_outros_trimestre = total_outros_trimestre * (float(aliquota.IRPJ_PRESUNCAO_OUTROS) / 100)
-            base_calculo_ir_trimestre = base_consultas_trimestre + base_outros_trimestre
-            
-            # Aplicar limite trimestral de R$ 60.000,00
-            limite_trimestral = 60000.00  # Lei 9.249/1995, Art. 3º, §1º
-            excedente_adicional_trimestre = max(base_calculo_ir_trimestre - limite_trimestral, 0)
-            
-            # Para exibição no relatório mensal, usar dados do mês atual
-            total_consultas = 0
-            total_outros = 0
-            
-            notas_emitidas_empresa = NotaFiscal.objects.filter(
-                empresa_destinataria=empresa,
-                dtEmissao__year=competencia.year,
-                dtEmissao__month=competencia.month
-            ).exclude(status_recebimento='cancelado')
-            
-            for nf in notas_emitidas_empresa:
-                if nf.tipo_servico == nf.TIPO_SERVICO_CONSULTAS:
-                    total_consultas += float(nf.val_bruto or 0)
-                else:  # TIPO_SERVICO_OUTROS
-                    total_outros += float(nf.val_bruto or 0)
-            
-            base_consultas = total_consultas * (float(aliquota.IRPJ_PRESUNCAO_CONSULTA) / 100)
-            base_outros = total_outros * (float(aliquota.IRPJ_PRESUNCAO_OUTROS) / 100)
-            base_calculo_ir = base_consultas + base_outros
-            
-        else:
-            total_consultas = 0
-            total_outros = 0
-            base_consultas = 0
-            base_outros = 0
-            base_calculo_ir = 0
-            excedente_adicional_trimestre = 0
-    except Exception as e:
-        total_consultas = 0
-        total_outros = 0
-        base_consultas = 0
-        base_outros = 0
-        base_calculo_ir = 0
-        excedente_adicional_trimestre = 0
-    
-    # ADICIONAL DE IR TRIMESTRAL: Calcular valor total da empresa para rateio entre sócios
-    # Alíquota do adicional é sempre 10% conforme Lei 9.249/1995, Art. 3º, §1º
-    aliquota_adicional_fixa = 0.10  # 10% fixo por lei
-    adicional_ir_trimestral_empresa = excedente_adicional_trimestre * aliquota_adicional_fixa
+    # Para exibição no relatório mensal, usar dados do mês atual
+    total_consultas = receitas_empresa_mes['consultas']
+    total_outros = receitas_empresa_mes['outros']
+    
+    # ADICIONAL DE IR TRIMESTRAL: apuração única por empresa/trimestre, com o vetor
+    # de participação dos sócios (Lei 9.249/1995, Art. 3º, §1º - limite trimestral de R$ 60.000,00)
+    apuracao_adicional_ir = apurar_adicional_ir_trimestral(
+        empresa, competencia.year, trimestre_do_mes(competencia.month)
+    )
+    adicional_ir_trimestral_empresa = para_centavos(apuracao_adicional_ir.adicional)
     
     # Receita bruta recebida do sócio no mês - usar notas por data de recebimento
     # para ser consistente com a tabela "Notas Fiscais Recebidas no Mês"
-    receita_bruta_socio_recebida = 0
-    for nf in notas_fiscais_qs:  # Usar notas por data de recebimento
-        rateio = nf.rateios_medicos.filter(medico=socio_selecionado).first()
-        if rateio:
-            receita_bruta_socio_recebida += float(rateio.valor_bruto_medico)
+    receita_bruta_socio_recebida = somar_centavos(NotaFiscalRateioMedico.objects.filter(
+        medico=socio_selecionado, nota_fiscal__in=notas_fiscais_qs
+    ), 'valor_bruto_medico')['valor_bruto_medico']
     
     # CORREÇÃO: Para o cálculo do adicional de IR, usar receita EMITIDA do sócio
     # para ser consistente com o cálculo do adicional (sempre por emissão)
-    receita_bruta_socio_emitida = 0
-    for nf in notas_fiscais_emissao_qs:  # Usar notas por data de emissão
-        rateio = nf.rateios_medicos.filter(medico=socio_selecionado).first()
-        if rateio:
-            receita_bruta_socio_emitida += float(rateio.valor_bruto_medico)
-    
-    # Calcular a participação do sócio na receita bruta da empresa (para adicional de IR)
-    # Para adicional trimestral, usar receita trimestral da empresa
-    total_receita_trimestre = total_consultas_trimestre + total_outros_trimestre if 'total_consultas_trimestre' in locals() else total_notas_bruto_empresa
-    
-    # Calcular receita trimestral do sócio para participação correta
-    receita_bruta_socio_trimestre = 0
-    if 'meses_trimestre' in locals() and 'trimestre' in locals():
-        for mes in meses_trimestre[trimestre]:
-            notas_mes_socio = NotaFiscal.objects.filter(
-                empresa_destinataria=empresa,
-                dtEmissao__year=competencia.year,
-                dtEmissao__month=mes
-            ).exclude(status_recebimento='cancelado')
-            
-            for nf in notas_mes_socio:
-                rateio = nf.rateios_medicos.filter(medico=socio_selecionado).first()
-                if rateio:
-                    receita_bruta_socio_trimestre += float(rateio.valor_bruto_medico)
-    
-    participacao_socio = receita_bruta_socio_trimestre / total_receita_trimestre if total_receita_trimestre > 0 else 0
+    receita_bruta_socio_emitida = somar_centavos(NotaFiscalRateioMedico.objects.filter(
+        medico=socio_selecionado, nota_fiscal__in=notas_fiscais_emissao_qs
+    ), 'valor_bruto_medico')['valor_bruto_medico']
     
-    # ADICIONAL DE IR TRIMESTRAL: Calcular a parte proporcional do sócio no adicional de IR trimestral
+    # ADICIONAL DE IR TRIMESTRAL: parte proporcional do sócio
     # REGRA: Só aparece nos meses de fechamento de trimestre (3, 6, 9, 12)
-    if competencia.month in [3, 6, 9, 12]:
-        adicional_ir_trimestral_socio = adicional_ir_trimestral_empresa * participacao_socio if adicional_ir_trimestral_empresa > 0 else 0
-    else:
-        adicional_ir_trimestral_socio = 0
-    
-    # Processar notas fiscais do sócio para exibição
-    notas_fiscais = []
-    total_iss_socio = 0
-    total_pis_socio = 0
-    total_cofins_socio = 0
-    total_irpj_socio = 0
-    total_csll_socio = 0
-    total_outros_socio = 0
-    total_notas_liquido_socio = 0
+    adicional_ir_trimestral_socio = para_centavos(adicional_ir_socio_no_mes(
+        empresa, getattr(socio_selecionado, 'id', None), competencia.year, competencia.month
+    ))
     
     # CORREÇÃO: Calcular impostos apurados seguindo as mesmas regras da Apuração de Impostos
     # Os impostos do sócio são calculados aplicando o rateio aos impostos "a pagar" da empresa
     # (calculados seguindo regime tributário), não usando valores individuais das notas fiscais
     
-    # Obter alíquotas da empresa
-    try:
-        aliquota_obj = Aliquotas.objects.filter(
-            empresa=empresa,
-            data_vigencia_inicio__lte=f'{competencia.year}-12-31',
-        ).order_by('-data_vigencia_inicio').first()
-        
-        if aliquota_obj:
-            aliquota_pis = float(getattr(aliquota_obj, 'PIS', 0))
-            aliquota_cofins = float(getattr(aliquota_obj, 'COFINS', 0))
-            aliquota_csll = float(getattr(aliquota_obj, 'CSLL_ALIQUOTA', 0))
-            aliquota_irpj = float(getattr(aliquota_obj, 'IRPJ_ALIQUOTA', 0))
-            aliquota_iss = float(getattr(aliquota_obj, 'ISS', 0))
-        else:
-            aliquota_pis = aliquota_cofins = aliquota_csll = aliquota_irpj = aliquota_iss = 0
-    except:
-        aliquota_pis = aliquota_cofins = aliquota_csll = aliquota_irpj = aliquota_iss = 0
+    # Obter alíquotas da empresa (percentuais em Decimal, aplicados sobre centavos)
+    aliquota_obj = Aliquotas.objects.filter(
+        empresa=empresa,
+        data_vigencia_inicio__lte=f'{competencia.year}-12-31',
+    ).order_by('-data_vigencia_inicio').first()
+    
+    if aliquota_obj:
+        aliquota_pis = aliquota_obj.PIS or Decimal('0')
+        aliquota_cofins = aliquota_obj.COFINS or Decimal('0')
+        aliquota_csll = aliquota_obj.CSLL_ALIQUOTA or Decimal('0')
+        aliquota_irpj = aliquota_obj.IRPJ_ALIQUOTA or Decimal('0')
+        aliquota_iss = aliquota_obj.ISS or Decimal('0')
+    else:
+        aliquota_pis = aliquota_cofins = aliquota_csll = aliquota_irpj = aliquota_iss = Decimal('0')
     
     # Calcular impostos a pagar do mês seguindo a mesma lógica da apuração
     
@@ -341,23 +291,24 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
             dtRecebimento__isnull=False
         ).exclude(status_recebimento='cancelado')
     
-    base_calculo_empresa = sum(float(nf.val_bruto or 0) for nf in notas_base_calculo)
-    
-    # Calcular bases de consultas e outros serviços do sócio seguindo regime tributário
-    base_consultas_socio_regime = 0
-    base_outros_socio_regime = 0
-    
-    # Usar o mesmo queryset usado para base de cálculo dos impostos (notas_base_calculo)
-    # que já respeita o regime tributário da empresa
-    for nf in notas_base_calculo:
-        rateio = nf.rateios_medicos.filter(medico=socio_selecionado).first()
-        if rateio:
-            valor_bruto_rateio = float(rateio.valor_bruto_medico or 0)
-            # Classificar por tipo de serviço
-            if nf.tipo_servico == NotaFiscal.TIPO_SERVICO_CONSULTAS:
-                base_consultas_socio_regime += valor_bruto_rateio
-            else:
-                base_outros_socio_regime += valor_bruto_rateio
+    receitas_base = somar_centavos(
+        notas_base_calculo, 'val_bruto',
+        consultas=('val_bruto', servico_consultas),
+        outros=('val_bruto', ~servico_consultas),
+    )
+    base_calculo_empresa = receitas_base['val_bruto']
+    
+    # Bases de consultas e outros serviços do sócio seguindo regime tributário:
+    # mesmo queryset da base de cálculo dos impostos (notas_base_calculo)
+    rateio_consultas = Q(nota_fiscal__tipo_servico=NotaFiscal.TIPO_SERVICO_CONSULTAS)
+    bases_socio = somar_centavos(
+        NotaFiscalRateioMedico.objects.filter(medico=socio_selecionado, nota_fiscal__in=notas_base_calculo),
+        'valor_bruto_medico',
+        consultas=('valor_bruto_medico', rateio_consultas),
+        outros=('valor_bruto_medico', ~rateio_consultas),
+    )
+    base_consultas_socio_regime = bases_socio['consultas']
+    base_outros_socio_regime = bases_socio['outros']
     
     # Imposto retido: sempre considera data de recebimento
     # EXCLUDINDO notas fiscais canceladas
@@ -368,102 +319,55 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
         dtRecebimento__isnull=False
     ).exclude(status_recebimento='cancelado')
     
-    # Calcular impostos devidos da empresa
-    pis_devido = base_calculo_empresa * (aliquota_pis / 100) if aliquota_pis > 0 else 0
-    cofins_devido = base_calculo_empresa * (aliquota_cofins / 100) if aliquota_cofins > 0 else 0
+    # Calcular impostos devidos da empresa (arredondados no centavo)
+    pis_devido = aplicar_percentual(base_calculo_empresa, aliquota_pis)
+    cofins_devido = aplicar_percentual(base_calculo_empresa, aliquota_cofins)
     
     # Para CSLL e IRPJ: aplicar presunções de lucro
     if aliquota_obj:
-        presuncao_consultas = float(getattr(aliquota_obj, 'CSLL_PRESUNCAO_CONSULTA', 32)) / 100
-        presuncao_outros = float(getattr(aliquota_obj, 'CSLL_PRESUNCAO_OUTROS', 8)) / 100
-        
         # Separar por tipo de serviço
-        receita_consultas = sum(float(nf.val_bruto or 0) for nf in notas_base_calculo if nf.tipo_servico == NotaFiscal.TIPO_SERVICO_CONSULTAS)
-        receita_outros = sum(float(nf.val_bruto or 0) for nf in notas_base_calculo if nf.tipo_servico != NotaFiscal.TIPO_SERVICO_CONSULTAS)
-        
-        base_csll = (receita_consultas * presuncao_consultas) + (receita_outros * presuncao_outros)
+        base_csll = (
+            aplicar_percentual(receitas_base['consultas'], aliquota_obj.CSLL_PRESUNCAO_CONSULTA)
+            + aplicar_percentual(receitas_base['outros'], aliquota_obj.CSLL_PRESUNCAO_OUTROS)
+        )
         base_irpj = base_csll  # Mesma base para IRPJ e CSLL
         
-        csll_devido = base_csll * (aliquota_csll / 100) if aliquota_csll > 0 else 0
-        irpj_devido = base_irpj * (aliquota_irpj / 100) if aliquota_irpj > 0 else 0
+        csll_devido = aplicar_percentual(base_csll, aliquota_csll)
+        irpj_devido = aplicar_percentual(base_irpj, aliquota_irpj)
     else:
         csll_devido = irpj_devido = 0
     
     # Para ISSQN: calcular valor devido (base * alíquota) - o ISS nas notas é apenas o valor retido
-    iss_devido = base_calculo_empresa * (aliquota_iss / 100) if aliquota_iss > 0 else 0
-    
-    # Impostos retidos
-    pis_retido = sum(float(nf.val_PIS or 0) for nf in notas_retidas)
-    cofins_retido = sum(float(nf.val_COFINS or 0) for nf in notas_retidas) 
-    csll_retido = sum(float(nf.val_CSLL or 0) for nf in notas_retidas)
-    irpj_retido = sum(float(nf.val_IR or 0) for nf in notas_retidas)
-    iss_retido = sum(float(nf.val_ISS or 0) for nf in notas_retidas)
-    
-    # Impostos a pagar da empresa
-    pis_a_pagar = max(0, pis_devido - pis_retido)
-    cofins_a_pagar = max(0, cofins_devido - cofins_retido)
-    csll_a_pagar = max(0, csll_devido - csll_retido)
-    irpj_a_pagar = max(0, irpj_devido - irpj_retido)
-    iss_a_pagar = max(0, iss_devido - iss_retido)
-    
-    # Aplicar rateio do sócio aos impostos a pagar da empresa
+    iss_devido = aplicar_percentual(base_calculo_empresa, aliquota_iss)
+    
+    # Aplicar rateio do sócio aos impostos devidos da empresa
     # Usar a mesma base de cálculo (seguindo regime tributário) para participação do sócio
     if base_calculo_empresa > 0:
-        # Calcular receita do sócio seguindo o mesmo regime tributário usado para base de cálculo
-        if empresa.regime_tributario == REGIME_TRIBUTACAO_COMPETENCIA:
-            # Regime de competência: usar notas emitidas
-            receita_socio_periodo = 0
-            for nf in notas_base_calculo:
-                rateio = nf.rateios_medicos.filter(medico=socio_selecionado).first()
-                if rateio:
-                    receita_socio_periodo += float(rateio.valor_bruto_medico or 0)
-        else:
-            # Regime de caixa: usar notas recebidas (já calculado anteriormente)
-            receita_socio_periodo = receita_bruta_socio_recebida
-        
-        participacao_socio_impostos = receita_socio_periodo / base_calculo_empresa
+        # Receita do sócio no mesmo regime da base de cálculo (emitidas na competência,
+        # recebidas no caixa - neste caso igual a receita_bruta_socio_recebida)
+        receita_socio_periodo = bases_socio['valor_bruto_medico']
         
-        # Impostos devidos do sócio (calculados sobre a base proporcional)
-        total_pis_devido_socio = pis_devido * participacao_socio_impostos
-        total_cofins_devido_socio = cofins_devido * participacao_socio_impostos  
-        total_irpj_devido_socio = irpj_devido * participacao_socio_impostos
-        total_csll_devido_socio = csll_devido * participacao_socio_impostos
-        total_iss_devido_socio = iss_devido * participacao_socio_impostos
+        # Impostos devidos do sócio (parcela proporcional, arredondada no centavo)
+        total_pis_devido_socio = proporcao(pis_devido, receita_socio_periodo, base_calculo_empresa)
+        total_cofins_devido_socio = proporcao(cofins_devido, receita_socio_periodo, base_calculo_empresa)
+        total_irpj_devido_socio = proporcao(irpj_devido, receita_socio_periodo, base_calculo_empresa)
+        total_csll_devido_socio = proporcao(csll_devido, receita_socio_periodo, base_calculo_empresa)
+        total_iss_devido_socio = proporcao(iss_devido, receita_socio_periodo, base_calculo_empresa)
         
         # Impostos retidos do sócio (calculados com base nos valores reais das notas recebidas)
         # CORREÇÃO: Usar valores proporcionais dos rateios das notas recebidas no mês
         # Os impostos retidos devem considerar a data de recebimento da nota fiscal
         # conforme documentado em medicos/templates/relatorios/relatorio_mensal_socio.html
         # EXCLUDINDO notas fiscais canceladas
-        notas_recebidas_socio = NotaFiscal.objects.filter(
-            empresa_destinataria=empresa,
-            dtRecebimento__year=competencia.year,
-            dtRecebimento__month=competencia.month,
-            dtRecebimento__isnull=False,
-            rateios_medicos__medico=socio_selecionado
-        ).exclude(status_recebimento='cancelado').distinct()
-        
-        total_pis_retido_socio = 0
-        total_cofins_retido_socio = 0
-        total_irpj_retido_socio = 0
-        total_csll_retido_socio = 0
-        total_iss_retido_socio = 0
-        
-        for nf in notas_recebidas_socio:
-            rateio = nf.rateios_medicos.filter(medico=socio_selecionado).first()
-            if rateio:
-                # Usar valores proporcionais calculados automaticamente no modelo NotaFiscalRateioMedico
-                total_pis_retido_socio += float(rateio.valor_pis_medico or 0)
-                total_cofins_retido_socio += float(rateio.valor_cofins_medico or 0)
-                total_irpj_retido_socio += float(rateio.valor_ir_medico or 0)
-                total_csll_retido_socio += float(rateio.valor_csll_medico or 0)
-                total_iss_retido_socio += float(rateio.valor_iss_medico or 0)
-        
-        # Impostos retidos do sócio já calculados acima
-        # (total_*_retido_socio já estão definidos)
-        
-        # Impostos devidos do sócio já calculados acima  
-        # (total_*_devido_socio já estão definidos)
+        retidos_socio = somar_centavos(
+            NotaFiscalRateioMedico.objects.filter(medico=socio_selecionado, nota_fiscal__in=notas_retidas),
+            'valor_pis_medico', 'valor_cofins_medico', 'valor_ir_medico', 'valor_csll_medico', 'valor_iss_medico',
+        )
+        total_pis_retido_socio = retidos_socio['valor_pis_medico']
+        total_cofins_retido_socio = retidos_socio['valor_cofins_medico']
+        total_irpj_retido_socio = retidos_socio['valor_ir_medico']
+        total_csll_retido_socio = retidos_socio['valor_csll_medico']
+        total_iss_retido_socio = retidos_socio['valor_iss_medico']
         
         # Impostos a provisionar serão calculados no final: devido - retido
     else:
@@ -481,103 +385,23 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
         
         # Impostos a provisionar serão calculados no final: devido - retido (todos serão 0)
     
-    # Separar faturamento por tipo de serviço
-    faturamento_consultas = 0
-    faturamento_plantao = 0  
-    faturamento_outros = 0
-
+    # Notas fiscais recebidas no mês (por data de recebimento), com faturamento por tipo de serviço
+    notas_fiscais, totais_nf, faturamento = _notas_fiscais_do_socio(socio_selecionado, notas_fiscais_qs)
+    faturamento_consultas = faturamento['consultas']
+    faturamento_plantao = faturamento['plantao']
+    faturamento_outros = faturamento['outros']
     debug_ir_adicional_espelho = []
-    for nf in notas_fiscais_qs:
-        nf.calcular_impostos()  # Atualiza campos de impostos no modelo
-        # Buscar o rateio do sócio para esta nota
-        rateio = nf.rateios_medicos.filter(medico=socio_selecionado).first()
-        if rateio:
-            valor_bruto_rateio = float(rateio.valor_bruto_medico)
-            valor_bruto_total_nf = float(nf.val_bruto or 0)
-            
-            # Classificar por tipo de serviço (usando valor do rateio do sócio específico)
-            if nf.tipo_servico == NotaFiscal.TIPO_SERVICO_CONSULTAS:
-                faturamento_consultas += valor_bruto_rateio
-            elif 'plantão' in nf.descricao_servicos.lower() or 'plantao' in nf.descricao_servicos.lower():
-                faturamento_plantao += valor_bruto_rateio
-            else:
-                faturamento_outros += valor_bruto_rateio
-            
-            # O cálculo detalhado do adicional de IR para o sócio foi desfeito; manter apenas o necessário para o relatório.
-            notas_fiscais.append({
-                'id': nf.id,
-                'numero': getattr(nf, 'numero', ''),
-                'tp_aliquota': nf.get_tipo_servico_display(),
-                'tomador': nf.tomador,
-                'percentual_rateio': float(rateio.percentual_participacao),  # Percentual de rateio do sócio
-                'valor_bruto': valor_bruto_rateio,  # Valor bruto rateado para o sócio
-                'valor_liquido': float(rateio.valor_liquido_medico),
-                'iss': float(rateio.valor_iss_medico),
-                'pis': float(rateio.valor_pis_medico),
-                'cofins': float(rateio.valor_cofins_medico),
-                'irpj': float(rateio.valor_ir_medico),
-                'csll': float(rateio.valor_csll_medico),
-                'outros': float(rateio.valor_outros_medico),  # Usar propriedade padronizada do modelo
-                'data_emissao': nf.dtEmissao.strftime('%d/%m/%Y'),
-                'data_recebimento': nf.dtRecebimento.strftime('%d/%m/%Y') if nf.dtRecebimento else '',
-            })
-            # Acumular outros valores e valor líquido do sócio (mas não impostos - estes são calculados pela apuração)
-            total_outros_socio += float(rateio.valor_outros_medico or 0)
-            total_notas_liquido_socio += float(rateio.valor_liquido_medico or 0)
-
 
-    # Totais dos campos das notas fiscais do sócio (para o template)
-    total_nf_valor_bruto = sum(float(nf['valor_bruto'] or 0) for nf in notas_fiscais)
-    total_nf_iss = sum(float(nf['iss'] or 0) for nf in notas_fiscais)
-    total_nf_pis = sum(float(nf['pis'] or 0) for nf in notas_fiscais)
-    total_nf_cofins = sum(float(nf['cofins'] or 0) for nf in notas_fiscais)
-    total_nf_irpj = sum(float(nf['irpj'] or 0) for nf in notas_fiscais)
-    total_nf_csll = sum(float(nf['csll'] or 0) for nf in notas_fiscais)
-    total_nf_outros = sum(float(nf['outros'] or 0) for nf in notas_fiscais)
-    total_nf_valor_liquido = sum(float(nf['valor_liquido'] or 0) for nf in notas_fiscais)
+    # Valor líquido do sócio (os impostos são calculados pela apuração, não pelas notas)
+    total_notas_liquido_socio = totais_nf['valor_liquido']
 
     # Processar notas fiscais emitidas no mês (por data de emissão)
-    notas_fiscais_emitidas = []
-    for nf in notas_fiscais_emissao_qs:
-        nf.calcular_impostos()  # Atualiza campos de impostos no modelo
-        # Buscar o rateio do sócio para esta nota
-        rateio = nf.rateios_medicos.filter(medico=socio_selecionado).first()
-        if rateio:
-            notas_fiscais_emitidas.append({
-                'id': nf.id,
-                'numero': getattr(nf, 'numero', ''),
-                'tp_aliquota': nf.get_tipo_servico_display(),
-                'tomador': nf.tomador,
-                'percentual_rateio': float(rateio.percentual_participacao),  # Percentual de rateio do sócio
-                'valor_bruto': float(rateio.valor_bruto_medico),  # Valor bruto rateado para o sócio
-                'valor_liquido': float(rateio.valor_liquido_medico),
-                'iss': float(rateio.valor_iss_medico),
-                'pis': float(rateio.valor_pis_medico),
-                'cofins': float(rateio.valor_cofins_medico),
-                'irpj': float(rateio.valor_ir_medico),
-                'csll': float(rateio.valor_csll_medico),
-                'outros': float(rateio.valor_outros_medico),  # Usar propriedade padronizada do modelo
-                'data_emissao': nf.dtEmissao.strftime('%d/%m/%Y'),
-                'data_recebimento': nf.dtRecebimento.strftime('%d/%m/%Y') if nf.dtRecebimento else '',
-            })
-
-    # Totais dos campos das notas fiscais emitidas do sócio (para o template)
-    total_nf_emitidas_valor_bruto = sum(float(nf['valor_bruto'] or 0) for nf in notas_fiscais_emitidas)
-    total_nf_emitidas_iss = sum(float(nf['iss'] or 0) for nf in notas_fiscais_emitidas)
-    total_nf_emitidas_pis = sum(float(nf['pis'] or 0) for nf in notas_fiscais_emitidas)
-    total_nf_emitidas_cofins = sum(float(nf['cofins'] or 0) for nf in notas_fiscais_emitidas)
-    total_nf_emitidas_irpj = sum(float(nf['irpj'] or 0) for nf in notas_fiscais_emitidas)
-    total_nf_emitidas_csll = sum(float(nf['csll'] or 0) for nf in notas_fiscais_emitidas)
-    total_nf_emitidas_outros = sum(float(nf['outros'] or 0) for nf in notas_fiscais_emitidas)
-    total_nf_emitidas_valor_liquido = sum(float(nf['valor_liquido'] or 0) for nf in notas_fiscais_emitidas)
+    notas_fiscais_emitidas, totais_nf_emitidas, _ = _notas_fiscais_do_socio(
+        socio_selecionado, notas_fiscais_emissao_qs
+    )
 
-    # Total notas emitidas no mês: deve considerar apenas a parte rateada para o sócio específico
-    # Somar apenas o valor rateado para o sócio de cada nota fiscal emitida no mês
-    total_notas_emitidas_mes = 0
-    for nf in notas_fiscais_emissao_qs:
-        rateio = nf.rateios_medicos.filter(medico=socio_selecionado).first()
-        if rateio:
-            total_notas_emitidas_mes += float(rateio.valor_bruto_medico or 0)
+    # Total notas emitidas no mês: apenas a parte rateada para o sócio específico
+    total_notas_emitidas_mes = totais_nf_emitidas['valor_bruto']
 
     # Receita bruta e líquida do sócio - usar apenas a parte do sócio calculada anteriormente
     receita_bruta_recebida = receita_bruta_socio_recebida  # Usar valor correto (parte do sócio)
@@ -621,31 +445,27 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
 
     despesas_total = despesa_sem_rateio + despesa_com_rateio
     saldo_apurado = receita_liquida - despesas_total
-    # Cálculo do saldo das movimentações financeiras do sócio no mês
-    movimentacoes_financeiras_qs = Financeiro.objects.filter(
+    # Cálculo do saldo das movimentações financeiras do sócio no mês (uma query, somas em centavos)
+    movimentacoes_financeiras_qs = list(Financeiro.objects.filter(
         socio=socio_selecionado,
         data_movimentacao__year=competencia.year,
         data_movimentacao__month=competencia.month
-    )
-    saldo_movimentacao_financeira = float(sum(m.valor for m in movimentacoes_financeiras_qs))
+    ).select_related('descricao_movimentacao_financeira'))
+    valores_movimentacoes = vetor_centavos(m.valor for m in movimentacoes_financeiras_qs)
+    saldo_movimentacao_financeira = int(valores_movimentacoes.sum())
     
     # Calcular total de receitas (movimentações de crédito)
-    total_receitas = float(sum(m.valor for m in movimentacoes_financeiras_qs if m.valor > 0))
-    print(f"DEBUG Builder: total_receitas calculado = {total_receitas}")
-    print(f"DEBUG Builder: número de movimentações = {movimentacoes_financeiras_qs.count()}")
-    print(f"DEBUG Builder: movimentações positivas = {[m.valor for m in movimentacoes_financeiras_qs if m.valor > 0]}")
+    total_receitas = int(valores_movimentacoes[valores_movimentacoes > 0].sum())
     
     # Calcular total de despesas outros (movimentações de débito)
-    total_despesas_outros = float(abs(sum(m.valor for m in movimentacoes_financeiras_qs if m.valor < 0)))
-    print(f"DEBUG Builder: total_despesas_outros calculado = {total_despesas_outros}")
-    print(f"DEBUG Builder: movimentações negativas = {[m.valor for m in movimentacoes_financeiras_qs if m.valor < 0]}")
+    total_despesas_outros = -int(valores_movimentacoes[valores_movimentacoes < 0].sum())
     
     movimentacoes_financeiras = [
         {
             'id': m.id,
             'data': m.data_movimentacao.strftime('%d/%m/%Y'),
             'descricao': str(m.descricao_movimentacao_financeira),
-            'valor': float(m.valor),
+            'valor': m.valor,
         }
         for m in movimentacoes_financeiras_qs
     ]
@@ -654,58 +474,41 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
     # SALDO A TRANSFERIR = RECEITA LÍQUIDA (r-a) - DESPESAS (-) + SALDO DAS MOVIMENTAÇÕES FINANCEIRAS (+)
     despesa_geral = despesa_sem_rateio + despesa_com_rateio
     saldo_a_transferir = receita_liquida - despesa_geral + saldo_movimentacao_financeira
-    print(f"DEBUG Builder: Novo cálculo saldo_a_transferir:")
-    print(f"  receita_liquida: {receita_liquida}")
-    print(f"  despesa_geral: {despesa_geral}")
-    print(f"  saldo_movimentacao_financeira: {saldo_movimentacao_financeira}")
-    print(f"  saldo_a_transferir: {saldo_a_transferir}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Relatório sócio %s %s: receitas %s (%s movimentações), despesas outros %s, receita líquida %s, "
+            "despesa geral %s, saldo movimentações %s, saldo a transferir %s",
+            socio_selecionado_id, mes_ano, de_centavos(total_receitas), len(movimentacoes_financeiras_qs),
+            de_centavos(total_despesas_outros), de_centavos(receita_liquida), de_centavos(despesa_geral),
+            de_centavos(saldo_movimentacao_financeira), de_centavos(saldo_a_transferir),
+        )
 
     # Calcular despesas provisionadas (despesas apropriadas do mês seguinte)
     mes_seguinte = competencia + relativedelta(months=1)
     
-    # Despesas sem rateio do mês seguinte
-    despesas_sem_rateio_mes_seguinte = DespesaSocio.objects.filter(
-        item_despesa__grupo_despesa__empresa=empresa,
-        socio=socio_selecionado,
-        data__year=mes_seguinte.year,
-        data__month=mes_seguinte.month
-    ).select_related('item_despesa__grupo_despesa')
-    
-    total_despesas_sem_rateio_mes_seguinte = sum(float(d.valor) for d in despesas_sem_rateio_mes_seguinte)
-    
-    # Despesas com rateio do mês seguinte
-    despesas_com_rateio_mes_seguinte = DespesaRateada.objects.filter(
-        item_despesa__grupo_despesa__empresa=empresa,
-        data__year=mes_seguinte.year,
-        data__month=mes_seguinte.month
-    ).select_related('item_despesa__grupo_despesa')
-    
-    total_despesas_com_rateio_mes_seguinte = 0
-    for despesa in despesas_com_rateio_mes_seguinte:
-        try:
-            rateio = ItemDespesaRateioMensal.obter_rateio_para_despesa(
-                despesa.item_despesa,
-                socio_selecionado,
-                despesa.data
-            )
-            percentual = Decimal(rateio.percentual_rateio or 0)
-            valor_socio = despesa.valor * (percentual / Decimal('100')) if percentual > 0 else Decimal('0')
-            total_despesas_com_rateio_mes_seguinte += float(valor_socio)
-        except Exception:
-            continue
+    # Despesas sem rateio e com rateio do mês seguinte (agregadas no banco)
+    if socio_selecionado_id:
+        totais_mes_seguinte = totais_despesas_apropriadas(
+            empresa.id, socio_selecionado_id, mes_seguinte.year, mes_seguinte.month
+        )
+    else:
+        totais_mes_seguinte = {'sem_rateio': Decimal('0'), 'com_rateio': Decimal('0')}
+    total_despesas_sem_rateio_mes_seguinte = para_centavos(totais_mes_seguinte['sem_rateio'])
+    total_despesas_com_rateio_mes_seguinte = para_centavos(totais_mes_seguinte['com_rateio'])
     
     # Total de despesas provisionadas
     despesas_provisionadas = total_despesas_sem_rateio_mes_seguinte + total_despesas_com_rateio_mes_seguinte
     
-    print(f"DEBUG Builder: Despesas provisionadas calculadas:")
-    print(f"  Mês seguinte: {mes_seguinte.strftime('%Y-%m')}")
-    print(f"  Despesas sem rateio: {total_despesas_sem_rateio_mes_seguinte}")
-    print(f"  Despesas com rateio: {total_despesas_com_rateio_mes_seguinte}")
-    print(f"  Total despesas provisionadas: {despesas_provisionadas}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Relatório sócio %s %s: provisionadas %s (sem rateio %s, com rateio %s) em %s",
+            socio_selecionado_id, mes_ano, de_centavos(despesas_provisionadas),
+            de_centavos(total_despesas_sem_rateio_mes_seguinte),
+            de_centavos(total_despesas_com_rateio_mes_seguinte), mes_seguinte.strftime('%Y-%m'),
+        )
 
-    # Definir dados para salvar no modelo (apenas campos que existem)
-    dados_modelo = {
-        'data_geracao': datetime.now(),
+    # Valores monetários do modelo, em centavos (convertidos para Decimal ao gravar)
+    valores_centavos = {
         'total_despesas_sem_rateio': despesa_sem_rateio,
         'total_despesas_com_rateio': despesa_com_rateio,
         'despesas_total': despesas_total,
@@ -736,29 +539,35 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
         'total_notas_bruto': total_notas_bruto_empresa,
         'total_notas_liquido': total_notas_liquido_socio,
         'total_notas_emitidas_mes': total_notas_emitidas_mes,
-        'total_nf_valor_bruto': total_nf_valor_bruto,
-        'total_nf_iss': total_nf_iss,
-        'total_nf_pis': total_nf_pis,
-        'total_nf_cofins': total_nf_cofins,
-        'total_nf_irpj': total_nf_irpj,
-        'total_nf_csll': total_nf_csll,
-        'total_nf_outros': total_nf_outros,
-        'total_nf_valor_liquido': total_nf_valor_liquido,
-        'total_nf_emitidas_valor_bruto': total_nf_emitidas_valor_bruto,
-        'total_nf_emitidas_iss': total_nf_emitidas_iss,
-        'total_nf_emitidas_pis': total_nf_emitidas_pis,
-        'total_nf_emitidas_cofins': total_nf_emitidas_cofins,
-        'total_nf_emitidas_irpj': total_nf_emitidas_irpj,
-        'total_nf_emitidas_csll': total_nf_emitidas_csll,
-        'total_nf_emitidas_outros': total_nf_emitidas_outros,
-        'total_nf_emitidas_valor_liquido': total_nf_emitidas_valor_liquido,
+        'total_nf_valor_bruto': totais_nf['valor_bruto'],
+        'total_nf_iss': totais_nf['iss'],
+        'total_nf_pis': totais_nf['pis'],
+        'total_nf_cofins': totais_nf['cofins'],
+        'total_nf_irpj': totais_nf['irpj'],
+        'total_nf_csll': totais_nf['csll'],
+        'total_nf_outros': totais_nf['outros'],
+        'total_nf_valor_liquido': totais_nf['valor_liquido'],
+        'total_nf_emitidas_valor_bruto': totais_nf_emitidas['valor_bruto'],
+        'total_nf_emitidas_iss': totais_nf_emitidas['iss'],
+        'total_nf_emitidas_pis': totais_nf_emitidas['pis'],
+        'total_nf_emitidas_cofins': totais_nf_emitidas['cofins'],
+        'total_nf_emitidas_irpj': totais_nf_emitidas['irpj'],
+        'total_nf_emitidas_csll': totais_nf_emitidas['csll'],
+        'total_nf_emitidas_outros': totais_nf_emitidas['outros'],
+        'total_nf_emitidas_valor_liquido': totais_nf_emitidas['valor_liquido'],
         'faturamento_consultas': faturamento_consultas,
         'faturamento_plantao': faturamento_plantao,
         'faturamento_outros': faturamento_outros,
         'saldo_apurado': saldo_apurado,
         'saldo_movimentacao_financeira': saldo_movimentacao_financeira,
         'saldo_a_transferir': saldo_a_transferir,
-        'imposto_provisionado_mes_anterior': float(imposto_provisionado_mes_anterior),
+    }
+
+    # Definir dados para salvar no modelo (apenas campos que existem)
+    dados_modelo = {
+        'data_geracao': datetime.now(),
+        **{campo: de_centavos(valor) for campo, valor in valores_centavos.items()},
+        'imposto_provisionado_mes_anterior': imposto_provisionado_mes_anterior,
         'lista_despesas_sem_rateio': lista_despesas_sem_rateio,
         'lista_despesas_com_rateio': lista_despesas_com_rateio,
         'lista_notas_fiscais': notas_fiscais,
@@ -777,27 +586,27 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
     
     # Adicionar adicional_ir_trimestral_empresa ao dicionário de contexto do template
     contexto = {'relatorio': relatorio_obj}
-    contexto['adicional_ir_trimestral_empresa'] = adicional_ir_trimestral_empresa
+    contexto['adicional_ir_trimestral_empresa'] = de_centavos(adicional_ir_trimestral_empresa)
     
     # Campos auxiliares utilizados no template
-    contexto['receita_bruta_socio'] = receita_bruta_socio_emitida  # Usar notas emitidas para cálculo de adicional de IR
+    contexto['receita_bruta_socio'] = de_centavos(receita_bruta_socio_emitida)  # Usar notas emitidas para cálculo de adicional de IR
     
     # Adicionar total_receitas diretamente no contexto (campo não existe no modelo ainda)
-    contexto['total_receitas'] = total_receitas
+    contexto['total_receitas'] = de_centavos(total_receitas)
     
     # Adicionar total_despesas_outros diretamente no contexto (campo não existe no modelo ainda)
-    contexto['total_despesas_outros'] = total_despesas_outros
+    contexto['total_despesas_outros'] = de_centavos(total_despesas_outros)
     
     # Adicionar despesas provisionadas ao contexto
-    contexto['despesas_provisionadas'] = despesas_provisionadas
+    contexto['despesas_provisionadas'] = de_centavos(despesas_provisionadas)
     
     # Adicionar campos calculados que não estão no modelo
-    contexto['base_consultas_medicas'] = total_consultas
-    contexto['base_outros_servicos'] = total_outros
+    contexto['base_consultas_medicas'] = de_centavos(total_consultas)
+    contexto['base_outros_servicos'] = de_centavos(total_outros)
     
     # Adicionar bases do sócio seguindo regime tributário
-    contexto['base_consultas_socio_regime'] = base_consultas_socio_regime
-    contexto['base_outros_socio_regime'] = base_outros_socio_regime
+    contexto['base_consultas_socio_regime'] = de_centavos(base_consultas_socio_regime)
+    contexto['base_outros_socio_regime'] = de_centavos(base_outros_socio_regime)
     
     # Adicionar alíquotas dos impostos para exibição no template
     contexto['aliquota_pis'] = aliquota_pis
@@ -806,10 +615,13 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
     contexto['aliquota_csll'] = aliquota_csll
     contexto['aliquota_iss'] = aliquota_iss
     
-    # Debug para verificar valores
-    print(f"DEBUG Builder: base_consultas_socio_regime = {base_consultas_socio_regime}")
-    print(f"DEBUG Builder: base_outros_socio_regime = {base_outros_socio_regime}")
-    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Relatório sócio %s %s: base consultas %s, base outros %s",
+            socio_selecionado_id, mes_ano,
+            de_centavos(base_consultas_socio_regime), de_centavos(base_outros_socio_regime),
+        )
+
     # Incluir listas diretamente no contexto para uso imediato pela view
     contexto['lista_despesas_sem_rateio'] = lista_despesas_sem_rateio
     contexto['lista_despesas_com_rateio'] = lista_despesas_com_rateio
@@ -821,11 +633,11 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
             
             # Usar valores diretos das variáveis calculadas (mais seguro que acessar o objeto persistido)
             valores_impostos = {
-                'PIS': total_pis_socio,
-                'COFINS': total_cofins_socio,
-                'IRPJ': total_irpj_socio + adicional_ir_trimestral_socio,  # Incluir ADICIONAL DE IR TRIMESTRAL
-                'CSLL': total_csll_socio,
-                'ISSQN': total_iss_socio,
+                'PIS': de_centavos(total_pis_socio),
+                'COFINS': de_centavos(total_cofins_socio),
+                'IRPJ': de_centavos(total_irpj_socio + adicional_ir_trimestral_socio),  # Incluir ADICIONAL DE IR TRIMESTRAL
+                'CSLL': de_centavos(total_csll_socio),
+                'ISSQN': de_centavos(total_iss_socio),
             }
             
             # Executar lançamento automático
@@ -843,6 +655,7 @@ def montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=None, auto_lanca
             
         except Exception as e:
             # Em caso de erro, incluir no contexto mas não interromper o relatório
+            logger.exception("Erro no lançamento automático de impostos do sócio %s em %s", socio_selecionado_id, mes_ano)
             contexto['resultado_lancamento_automatico'] = {
                 'success': False,
                 'error': f'Erro no lançamento automático: {str(e)}'
@@ -877,49 +690,53 @@ def montar_relatorio_issqn(empresa_id, mes_ano):
         empresa=empresa,
         data_vigencia_inicio__lte=f'{ano}-12-31',
     ).order_by('-data_vigencia_inicio').first()
-    aliquota_iss = float(getattr(aliquota_obj, 'ISS', 0)) if aliquota_obj else 0
+    aliquota_iss = getattr(aliquota_obj, 'ISS', None) or Decimal('0')
+    
+    # Notas para base de cálculo considerando regime tributário da empresa
+    # EXCLUDINDO notas fiscais canceladas de todos os cálculos
+    # Somas do ano inteiro em uma query agrupada por mês, em centavos
+    if empresa.regime_tributario == REGIME_TRIBUTACAO_COMPETENCIA:
+        # Regime de competência: considera data de emissão
+        notas_ano = NotaFiscal.objects.filter(
+            empresa_destinataria=empresa,
+            dtEmissao__year=ano,
+        ).exclude(status_recebimento='cancelado')
+        campo_mes = 'dtEmissao__month'
+    else:
+        # Regime de caixa: considera data de recebimento
+        notas_ano = NotaFiscal.objects.filter(
+            empresa_destinataria=empresa,
+            dtRecebimento__year=ano,
+            dtRecebimento__isnull=False  # Só considera notas efetivamente recebidas
+        ).exclude(status_recebimento='cancelado')
+        campo_mes = 'dtRecebimento__month'
+    somas_por_mes = somar_centavos_por(notas_ano, campo_mes, 'val_bruto', 'val_ISS')
     
     for mes in range(1, 13):
-        # Notas para base de cálculo considerando regime tributário da empresa
-        # EXCLUDINDO notas fiscais canceladas de todos os cálculos
-        if empresa.regime_tributario == REGIME_TRIBUTACAO_COMPETENCIA:
-            # Regime de competência: considera data de emissão
-            notas_mes = NotaFiscal.objects.filter(
-                empresa_destinataria=empresa,
-                dtEmissao__year=ano,
-                dtEmissao__month=mes
-            ).exclude(status_recebimento='cancelado')
-        else:
-            # Regime de caixa: considera data de recebimento
-            notas_mes = NotaFiscal.objects.filter(
-                empresa_destinataria=empresa,
-                dtRecebimento__year=ano,
-                dtRecebimento__month=mes,
-                dtRecebimento__isnull=False  # Só considera notas efetivamente recebidas
-            ).exclude(status_recebimento='cancelado')
-        valor_bruto = sum(float(nf.val_bruto or 0) for nf in notas_mes)
+        somas = somas_por_mes.get(mes, {'val_bruto': 0, 'val_ISS': 0})
+        valor_bruto = somas['val_bruto']
         
         # Imposto devido: calculado sobre a base de cálculo (valor bruto)
-        imposto_devido = valor_bruto * aliquota_iss / 100
+        imposto_devido = aplicar_percentual(valor_bruto, aliquota_iss)
         
         # Imposto retido: valor efetivamente retido nas notas fiscais
         # Para ISSQN, tanto cálculo quanto retenção seguem o mesmo regime
-        imposto_retido_nf = sum(float(nf.val_ISS or 0) for nf in notas_mes)
+        imposto_retido_nf = somas['val_ISS']
         
         total_iss += imposto_devido
         total_imposto_retido_nf += imposto_retido_nf
         linhas.append({
             'competencia': f'{mes:02d}/{ano}',
-            'valor_bruto': valor_bruto,
-            'valor_iss': imposto_devido,  # Agora é o valor devido calculado
-            'imposto_retido_nf': imposto_retido_nf,
+            'valor_bruto': de_centavos(valor_bruto),
+            'valor_iss': de_centavos(imposto_devido),  # Agora é o valor devido calculado
+            'imposto_retido_nf': de_centavos(imposto_retido_nf),
             'aliquota': aliquota_iss,
         })
     return {
         'linhas': linhas,
         'totais': {
-            'total_iss': total_iss,
-            'total_imposto_retido_nf': total_imposto_retido_nf,
+            'total_iss': de_centavos(total_iss),
+            'total_imposto_retido_nf': de_centavos(total_imposto_retido_nf),
         }
     }
 
@@ -944,6 +761,7 @@ def montar_relatorio_executivo_anual(empresa_id, ano=None):
     }
 
 
+@span('fechamento.processar_mensal_conta_corrente', logger)
 def processar_fechamento_mensal_conta_corrente(empresa_id, competencia):
     """
     Processa fechamento mensal da conta corrente para todos os sócios.
@@ -1013,6 +831,7 @@ def processar_fechamento_mensal_conta_corrente(empresa_id, competencia):
                     except SaldoMensalContaCorrente.DoesNotExist:
                         # Primeira vez: calcular acumulado até o mês anterior
                         movs_anteriores = MovimentacaoContaCorrente.objects.filter(
+                            empresa_id=empresa_id,
                             socio=socio,
                             data_movimentacao__lt=primeiro_dia
                         )
@@ -1020,6 +839,7 @@ def processar_fechamento_mensal_conta_corrente(empresa_id, competencia):
                     
                     # 2. Buscar movimentações do mês atual
                     movs_mes_atual = MovimentacaoContaCorrente.objects.filter(
+                        empresa_id=empresa_id,
                         socio=socio,
                         data_movimentacao__range=[primeiro_dia, ultimo_dia]
                     )
@@ -1072,10 +892,13 @@ def processar_fechamento_mensal_conta_corrente(empresa_id, competencia):
         }
 
 
+@span('fechamento.fechar_periodo_conta_corrente', logger)
 def fechar_periodo_conta_corrente(empresa_id, competencia, usuario=None):
     """
     Fecha oficialmente o período da conta corrente para todos os sócios.
     Marca como fechado e impede alterações futuras.
+    Após o fechamento, congela os relatórios da competência
+    (medicos/services/snapshots_periodo.py).
     
     Args:
         empresa_id: ID da empresa
@@ -1086,27 +909,28 @@ def fechar_periodo_conta_corrente(empresa_id, competencia, usuario=None):
         dict: Resultado do fechamento
     """
     from medicos.models.conta_corrente import SaldoMensalContaCorrente
+    from medicos.services.snapshots_periodo import congelar_periodo
     from django.db import transaction
     from django.utils import timezone
     
     try:
         with transaction.atomic():
-            saldos = SaldoMensalContaCorrente.objects.filter(
+            saldos = list(SaldoMensalContaCorrente.objects.filter(
                 empresa_id=empresa_id,
                 competencia=competencia,
                 fechado=False
-            )
+            ))
             
-            if not saldos.exists():
+            if not saldos:
                 return {'sucesso': False, 'erros': ['Nenhum saldo encontrado para fechamento']}
             
             # Marcar todos como fechados
             for saldo in saldos:
                 saldo.fechar_periodo(usuario)
             
-            return {
+            resultado = {
                 'sucesso': True,
-                'saldos_fechados': saldos.count(),
+                'saldos_fechados': len(saldos),
                 'competencia': competencia.strftime('%m/%Y'),
                 'data_fechamento': timezone.now()
             }
@@ -1114,6 +938,51 @@ def fechar_periodo_conta_corrente(empresa_id, competencia, usuario=None):
     except Exception as e:
         return {'sucesso': False, 'erros': [str(e)]}
 
+    # Fora da transação: uma falha ao congelar não desfaz o fechamento (a
+    # primeira leitura do período congela o que faltou)
+    try:
+        resultado['snapshots'] = congelar_periodo(empresa_id, competencia)
+    except Exception:
+        logger.exception("Erro ao congelar relatórios da empresa %s em %s", empresa_id, competencia)
+        resultado['snapshots'] = {}
+    return resultado
+
+
+@span('fechamento.reabrir_periodo_conta_corrente', logger)
+def reabrir_periodo_conta_corrente(empresa_id, competencia, usuario=None, motivo=''):
+    """
+    Reabre o período da conta corrente de todos os sócios e invalida os
+    snapshots dos relatórios da competência.
+    
+    Returns:
+        dict: Resultado da reabertura
+    """
+    from medicos.models.conta_corrente import SaldoMensalContaCorrente
+    from django.db import transaction
+    
+    try:
+        with transaction.atomic():
+            saldos = list(SaldoMensalContaCorrente.objects.filter(
+                empresa_id=empresa_id,
+                competencia=competencia,
+                fechado=True
+            ))
+            
+            if not saldos:
+                return {'sucesso': False, 'erros': ['Nenhum saldo fechado encontrado para reabertura']}
+            
+            for saldo in saldos:
+                saldo.reabrir_periodo(usuario, motivo)
+            
+            return {
+                'sucesso': True,
+                'saldos_reabertos': len(saldos),
+                'competencia': competencia.strftime('%m/%Y'),
+            }
+            
+    except Exception as e:
+        return {'sucesso': False, 'erros': [str(e)]}
+
 
 def obter_saldo_anterior_conta_corrente(empresa_id, socio_id, competencia):
     """
@@ -1153,6 +1022,7 @@ def obter_saldo_anterior_conta_corrente(empresa_id, socio_id, competencia):
         # Calcular dinamicamente se não há saldo persistido
         primeiro_dia_competencia = competencia
         movs_anteriores = MovimentacaoContaCorrente.objects.filter(
+            empresa_id=empresa_id,
             socio_id=socio_id,
             data_movimentacao__lt=primeiro_dia_competencia
         )
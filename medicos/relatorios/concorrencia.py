@@ -0,0 +1,93 @@
+"""
+Execução concorrente das etapas independentes de um relatório
+
+A apuração de impostos monta vários builders que não dependem uns dos
+outros (ISSQN, PIS, COFINS, IRPJ mensal e trimestral, CSLL, adicional de
+IR). Em sequência, o tempo da página é a soma de todos; com
+`executar_etapas` cada builder roda em uma thread do executor
+(sync_to_async com thread_sensitive=False) e o tempo se aproxima do da etapa
+mais lenta.
+
+- RELATORIOS_CONCORRENCIA_MAXIMA limita quantas etapas da mesma requisição
+  rodam ao mesmo tempo (cada etapa ocupa uma conexão com o banco). Com 1, as
+  etapas rodam uma a uma na thread síncrona da requisição, como antes; em
+  SQLite (benchmarks locais) o limite é sempre 1.
+- As ContextVars da requisição (`leitura_replica`, `primario`) são copiadas
+  pelo asgiref para as threads: a etapa lê da réplica quando a view lê.
+- Cada thread abre a própria conexão, fechada ao fim da etapa: as threads
+  do executor não recebem o request_finished que a fecharia.
+- Os builders que gravam (update_or_create nas tabelas Apuracao*) continuam
+  em transaction.atomic na conexão da própria etapa; etapas distintas gravam
+  tabelas distintas.
+- A produção segue em WSGI (gunicorn síncrono): o Django executa a view
+  assíncrona em um event loop próprio da requisição, com a mesma
+  concorrência entre etapas, e as exportações em StreamingHttpResponse com
+  geradores síncronos continuam em streaming (sob ASGI seriam bufferizadas).
+"""
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from medicos.rastreamento import span
+
+logger = logging.getLogger(__name__)
+
+CONCORRENCIA_MAXIMA_PADRAO = 4
+
+
+def concorrencia_maxima():
+    """Limite por requisição; 1 em SQLite, que não aceita as escritas concorrentes dos builders."""
+    if connections[DEFAULT_DB_ALIAS].vendor == 'sqlite':
+        return 1
+    return max(1, int(getattr(settings, 'RELATORIOS_CONCORRENCIA_MAXIMA', CONCORRENCIA_MAXIMA_PADRAO)))
+
+
+def _executar_em_thread(nome, funcao):
+    try:
+        with span(f'relatorio.etapa.{nome}', logger):
+            return funcao()
+    finally:
+        connections.close_all()
+
+
+async def executar_etapas(etapas, limite=None):
+    """
+    Executa etapas independentes e devolve {nome: resultado}.
+
+        relatorios = await executar_etapas({
+            'pis': partial(montar_relatorio_pis_persistente, empresa_id, ano),
+            'csll': partial(montar_relatorio_csll_persistente, empresa_id, ano),
+        })
+
+    `etapas`: {nome: callable sem argumentos} com código síncrono (ORM).
+    `limite`: sobrepõe RELATORIOS_CONCORRENCIA_MAXIMA para esta chamada.
+    Se alguma etapa falhar, a primeira exceção (na ordem de `etapas`) é
+    relançada depois que todas terminarem.
+    """
+    limite = max(1, limite) if limite is not None else concorrencia_maxima()
+    nomes = list(etapas)
+
+    with span('relatorio.etapas', logger, etapas=len(nomes), limite=limite):
+        if limite == 1 or len(nomes) <= 1:
+            resultados = {}
+            for nome in nomes:
+                with span(f'relatorio.etapa.{nome}', logger):
+                    resultados[nome] = await sync_to_async(etapas[nome])()
+            return resultados
+
+        semaforo = asyncio.Semaphore(limite)
+
+        async def executar(nome):
+            async with semaforo:
+                return await sync_to_async(_executar_em_thread, thread_sensitive=False)(nome, etapas[nome])
+
+        saidas = await asyncio.gather(*(executar(nome) for nome in nomes), return_exceptions=True)
+
+    for nome, saida in zip(nomes, saidas):
+        if isinstance(saida, BaseException):
+            logger.error(f"Etapa {nome} do relatório falhou: {saida}")
+            raise saida
+    return dict(zip(nomes, saidas))
@@ -0,0 +1,231 @@
+"""
+Payloads serializáveis dos relatórios congelados por competência
+
+Cada função monta, a partir dos builders, os dados que a view precisa para
+renderizar o relatório, sem objetos de modelo: é isto que
+medicos/services/snapshots_periodo.py grava quando a competência é fechada
+e devolve nas leituras seguintes.
+
+- Relatório mensal do sócio: o dicionário `relatorio` e os campos
+  auxiliares do contexto da view relatorio_mensal_socio.
+- Apuração de impostos: as linhas de cada imposto do mês (ISSQN, PIS,
+  COFINS, IRPJ mensal) e, nos meses que fecham trimestre, as linhas
+  trimestrais (IRPJ, CSLL, adicional de IR).
+- Resumo executivo: as linhas por sócio de montar_resumo_demonstrativo_socios,
+  com o ID do sócio no lugar da instância.
+"""
+import logging
+from decimal import Decimal
+
+from medicos.models.base import Socio
+
+logger = logging.getLogger(__name__)
+
+IMPOSTOS_MENSAIS = ('issqn', 'pis', 'cofins', 'irpj_mensal')
+IMPOSTOS_TRIMESTRAIS = ('irpj', 'csll', 'adicional_trimestral')
+
+# Campos auxiliares de montar_relatorio_mensal_socio usados pelo template
+_CAMPOS_CONTEXTO_MENSAL_SOCIO = (
+    'valor_adicional_rateio', 'receita_bruta_socio', 'total_receitas', 'total_despesas_outros',
+    'despesas_provisionadas', 'base_consultas_medicas', 'base_outros_servicos',
+    'base_consultas_socio_regime', 'base_outros_socio_regime',
+    'aliquota_pis', 'aliquota_cofins', 'aliquota_irpj', 'aliquota_csll', 'aliquota_iss',
+)
+
+
+def processar_movimentacoes_financeiras(relatorio_obj):
+    """
+    Processa e normaliza movimentações financeiras.
+    """
+    lista_movimentacoes = getattr(relatorio_obj, 'lista_movimentacoes_financeiras', [])
+    for mov in lista_movimentacoes:
+        if isinstance(mov, dict):
+            if 'tipo' not in mov or mov['tipo'] in (None, ''):
+                mov['tipo'] = mov.get('descricao', '-')
+        else:
+            if not hasattr(mov, 'tipo') or mov.tipo in (None, ''):
+                mov.tipo = getattr(mov, 'descricao', '-')
+    return lista_movimentacoes
+
+
+def carregar_despesas_apropriadas(empresa_id, socio_id, mes_ano):
+    """
+    Despesas apropriadas do sócio no mês (individuais + rateadas) e seus totais,
+    calculados no banco por medicos/services/despesas_apropriadas.py.
+    """
+    from medicos.services.despesas_apropriadas import despesas_apropriadas, totais_despesas_apropriadas
+    zero = Decimal('0')
+    vazio = {'total': zero, 'normal': zero, 'provisionadas': zero}
+    if not (socio_id and mes_ano):
+        return [], vazio
+    try:
+        ano, mes = (int(parte) for parte in mes_ano.split('-'))
+        linhas = list(despesas_apropriadas(empresa_id, socio_id=socio_id, ano=ano, mes=mes))
+        totais = totais_despesas_apropriadas(empresa_id, socio_id=socio_id, ano=ano, mes=mes)
+    except Exception as e:
+        logger.error(f"Erro ao carregar despesas apropriadas: {e}")
+        return [], vazio
+    for linha in linhas:
+        if linha['taxa_rateio'] is None:
+            linha['taxa_rateio'] = '-'
+    return linhas, totais
+
+
+def payload_relatorio_mensal_socio(empresa_id, mes_ano, socio_id, auto_lancar_impostos=False):
+    """
+    Dados do relatório mensal do sócio: {'relatorio': {...}, 'contexto': {...}}.
+
+    Com `auto_lancar_impostos` (período aberto) o builder também lança os
+    impostos na conta corrente e o resultado vem em
+    'resultado_lancamento_automatico', que não faz parte do snapshot.
+    """
+    from medicos.relatorios.builders import montar_relatorio_mensal_socio
+
+    relatorio_dict = montar_relatorio_mensal_socio(
+        empresa_id,
+        mes_ano,
+        socio_id=socio_id,
+        auto_lancar_impostos=auto_lancar_impostos,
+        atualizar_lancamentos_existentes=True
+    )
+    relatorio_obj = relatorio_dict['relatorio']
+    lista_movimentacoes = processar_movimentacoes_financeiras(relatorio_obj)
+    despesas_apropriadas, totais_despesas = carregar_despesas_apropriadas(empresa_id, socio_id, mes_ano)
+
+    campos_modelo = (
+        'despesa_geral', 'despesas_total', 'saldo_movimentacao_financeira',
+        'total_notas_emitidas_mes', 'total_notas_bruto', 'total_notas_liquido',
+        'total_iss', 'total_pis', 'total_cofins', 'total_irpj', 'total_irpj_adicional', 'total_csll',
+        'total_iss_devido', 'total_pis_devido', 'total_cofins_devido', 'total_irpj_devido', 'total_csll_devido',
+        'total_iss_retido', 'total_pis_retido', 'total_cofins_retido', 'total_irpj_retido', 'total_csll_retido',
+        'receita_bruta_recebida', 'receita_liquida', 'impostos_total', 'impostos_devido_total',
+        'impostos_retido_total', 'saldo_apurado', 'saldo_a_transferir', 'imposto_provisionado_mes_anterior',
+        'total_nf_valor_bruto', 'total_nf_iss', 'total_nf_pis', 'total_nf_cofins', 'total_nf_irpj',
+        'total_nf_csll', 'total_nf_outros', 'total_nf_valor_liquido',
+        'total_nf_emitidas_valor_bruto', 'total_nf_emitidas_iss', 'total_nf_emitidas_pis',
+        'total_nf_emitidas_cofins', 'total_nf_emitidas_irpj', 'total_nf_emitidas_csll',
+        'total_nf_emitidas_outros', 'total_nf_emitidas_valor_liquido',
+        'faturamento_consultas', 'faturamento_plantao', 'faturamento_outros',
+    )
+    relatorio = {campo: getattr(relatorio_obj, campo, 0) for campo in campos_modelo}
+    relatorio.update({
+        'competencia': mes_ano,
+        'total_despesas_normal': totais_despesas['normal'],
+        'total_despesas_provisionadas': totais_despesas['provisionadas'],
+        'despesas_apropriadas': despesas_apropriadas,
+        'total_despesas_apropriadas': totais_despesas['total'],
+        'movimentacoes_financeiras': lista_movimentacoes,
+        'notas_fiscais': getattr(relatorio_obj, 'lista_notas_fiscais', []),
+        'notas_fiscais_emitidas': getattr(relatorio_obj, 'lista_notas_fiscais_emitidas', []),
+        # Campos específicos para o cálculo de IRPJ utilizados no template
+        'base_calculo_consultas': relatorio_dict.get('base_calculo_consultas', 0),
+        'base_calculo_outros': relatorio_dict.get('base_calculo_outros', 0),
+        'base_calculo_ir_total': relatorio_dict.get('base_calculo_ir_total', 0),
+    })
+
+    payload = {
+        'relatorio': relatorio,
+        'contexto': {campo: relatorio_dict.get(campo, 0) for campo in _CAMPOS_CONTEXTO_MENSAL_SOCIO},
+    }
+    if auto_lancar_impostos:
+        payload['resultado_lancamento_automatico'] = relatorio_dict.get('resultado_lancamento_automatico')
+    return payload
+
+
+# Apuração de impostos
+
+def _linhas(nome, resultado):
+    # O adicional de IR vem como lista; os builders, como {'linhas': [...]}
+    if resultado is None:
+        return None
+    return resultado if nome == 'adicional_trimestral' else resultado['linhas']
+
+
+def apuracao_do_mes(relatorios, mes):
+    """Linhas do mês (e do trimestre, nos meses 3, 6, 9 e 12) a partir dos relatórios do ano."""
+    dados = {nome: _linhas(nome, relatorios[nome])[mes - 1] for nome in IMPOSTOS_MENSAIS}
+    if mes % 3 == 0:
+        dados.update({nome: _linhas(nome, relatorios[nome])[mes // 3 - 1] for nome in IMPOSTOS_TRIMESTRAIS})
+    return dados
+
+
+def impostos_congelados(congeladas):
+    """Impostos cujas linhas do ano inteiro estão nos snapshots: o builder não precisa rodar."""
+    meses = set(congeladas)
+    impostos = set()
+    if meses >= set(range(1, 13)):
+        impostos.update(IMPOSTOS_MENSAIS)
+    if meses >= {3, 6, 9, 12}:
+        impostos.update(IMPOSTOS_TRIMESTRAIS)
+    return impostos
+
+
+def aplicar_apuracao_congelada(relatorios, congeladas):
+    """
+    Substitui, nos relatórios do ano, as linhas das competências congeladas.
+
+    `relatorios`: {imposto: resultado do builder}, com None para os impostos
+    que não rodaram (impostos_congelados). `congeladas`: {mes: payload}.
+    """
+    resultado = {}
+    for nome in IMPOSTOS_MENSAIS + IMPOSTOS_TRIMESTRAIS:
+        trimestral = nome in IMPOSTOS_TRIMESTRAIS
+        linhas = list(_linhas(nome, relatorios.get(nome)) or [None] * (4 if trimestral else 12))
+        for mes, dados in congeladas.items():
+            if nome not in dados:
+                continue
+            linhas[mes // 3 - 1 if trimestral else mes - 1] = dados[nome]
+        resultado[nome] = linhas if nome == 'adicional_trimestral' else {**(relatorios.get(nome) or {}), 'linhas': linhas}
+    return resultado
+
+
+def payload_apuracao_ano(empresa_id, ano):
+    """{mes: payload} da apuração de todos os meses do ano, rodando os builders uma vez."""
+    from medicos.relatorios.apuracao_cofins import montar_relatorio_cofins_persistente
+    from medicos.relatorios.apuracao_csll import montar_relatorio_csll_persistente
+    from medicos.relatorios.apuracao_irpj import montar_relatorio_irpj_persistente
+    from medicos.relatorios.apuracao_irpj_mensal import montar_relatorio_irpj_mensal_persistente
+    from medicos.relatorios.apuracao_pis import montar_relatorio_pis_persistente
+    from medicos.relatorios.builders import montar_relatorio_issqn
+    from medicos.services.adicional_ir import apurar_adicional_ir_ano
+    from medicos.models.base import Empresa
+
+    relatorios = {
+        'issqn': montar_relatorio_issqn(empresa_id, f'{ano}-01'),
+        'pis': montar_relatorio_pis_persistente(empresa_id, str(ano)),
+        'cofins': montar_relatorio_cofins_persistente(empresa_id, str(ano)),
+        'irpj_mensal': montar_relatorio_irpj_mensal_persistente(empresa_id, str(ano)),
+        'irpj': montar_relatorio_irpj_persistente(empresa_id, str(ano)),
+        'csll': montar_relatorio_csll_persistente(empresa_id, str(ano)),
+        'adicional_trimestral': [
+            apuracao.como_dict()
+            for apuracao in apurar_adicional_ir_ano(Empresa.objects.get(id=empresa_id), int(ano))
+        ],
+    }
+    return {mes: apuracao_do_mes(relatorios, mes) for mes in range(1, 13)}
+
+
+# Resumo executivo
+
+def payload_resumo_executivo(empresa_id, mes_ano):
+    """montar_resumo_demonstrativo_socios com `socio_id` no lugar da instância do sócio."""
+    from medicos.relatorios.builder_executivo import montar_resumo_demonstrativo_socios
+
+    resumo = montar_resumo_demonstrativo_socios(empresa_id, mes_ano)
+    resumo['resumo_socios'] = [
+        {**{campo: valor for campo, valor in linha.items() if campo != 'socio'}, 'socio_id': linha['socio'].id}
+        for linha in resumo['resumo_socios']
+    ]
+    return resumo
+
+
+def restaurar_resumo_executivo(dados):
+    """Recoloca as instâncias de Socio nas linhas de um resumo executivo congelado."""
+    ids = [linha['socio_id'] for linha in dados['resumo_socios']]
+    socios = Socio.objects.select_related('pessoa').in_bulk(ids)
+    dados['resumo_socios'] = [
+        {**linha, 'socio': socios.get(linha['socio_id'])}
+        for linha in dados['resumo_socios']
+        if linha['socio_id'] in socios
+    ]
+    return dados
@@ -0,0 +1,300 @@
+"""
+Tendências plurianuais dos tributos apurados
+
+Lê as apurações já persistidas (ApuracaoISSQN, ApuracaoPIS, ApuracaoCOFINS,
+ApuracaoIRPJ, ApuracaoIRPJMensal, ApuracaoCSLL) e a receita bruta das notas
+fiscais de uma ou várias empresas, sem rodar os builders ano a ano: uma
+query agregada por tabela, valores em centavos inteiros (ver
+medicos/services/centavos.py).
+
+As linhas viram um quadro longo pandas (empresa, ano, mês, série, centavos)
+e depois um cubo NumPy int64 empresa × mês × série com a grade completa de
+meses; sobre ele, numa passada vetorizada para todas as empresas:
+
+- totais anuais e variação ano a ano (YoY), anual e mês contra mesmo mês;
+- acumulado móvel de 12 meses;
+- alíquota efetiva por tributo (imposto devido / receita bruta): mensal,
+  12 meses e anual.
+
+Convenções:
+- receita bruta por data de emissão, sem notas canceladas;
+- IRPJ e CSLL trimestrais (competência "T1/2025") entram no último mês do
+  trimestre; trimestres sem apuração definitiva de IRPJ usam as estimativas
+  mensais (ApuracaoIRPJMensal);
+- IRPJ soma imposto devido e adicional;
+- meses sem apuração persistida contam como zero.
+
+O primeiro ano exibido já tem YoY e acumulado de 12 meses: o ano anterior é
+carregado só para esses cálculos.
+"""
+import logging
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.db.models import Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from medicos.models.fiscal import NotaFiscal
+from medicos.models.relatorios_apuracao_cofins import ApuracaoCOFINS
+from medicos.models.relatorios_apuracao_csll import ApuracaoCSLL
+from medicos.models.relatorios_apuracao_irpj import ApuracaoIRPJ
+from medicos.models.relatorios_apuracao_irpj_mensal import ApuracaoIRPJMensal
+from medicos.models.relatorios_apuracao_issqn import ApuracaoISSQN
+from medicos.models.relatorios_apuracao_pis import ApuracaoPIS
+from medicos.services.centavos import centavos, de_centavos
+
+logger = logging.getLogger(__name__)
+
+RECEITA = 'receita_bruta'
+TOTAL = 'total_tributos'
+
+# tributo -> (model de apuração, campos que compõem o imposto devido)
+FONTES_TRIBUTOS = {
+    'ISS': (ApuracaoISSQN, ('imposto_devido',)),
+    'PIS': (ApuracaoPIS, ('imposto_devido',)),
+    'COFINS': (ApuracaoCOFINS, ('imposto_devido',)),
+    'IRPJ': (ApuracaoIRPJ, ('imposto_devido', 'adicional')),
+    'CSLL': (ApuracaoCSLL, ('imposto_devido',)),
+}
+TRIBUTOS = tuple(FONTES_TRIBUTOS)
+SERIES = (RECEITA, *TRIBUTOS, TOTAL)
+ROTULOS_SERIES = {RECEITA: 'Receita Bruta', **{tributo: tributo for tributo in TRIBUTOS}, TOTAL: 'Total Tributos'}
+
+MAXIMO_ANOS = 15
+
+_COLUNAS = ['empresa_id', 'ano', 'mes', 'serie', 'centavos']
+_COMPETENCIA = r'^(?:T(?P<trimestre>[1-4])|(?P<mes>\d{1,2}))/(?P<ano>\d{4})$'
+
+
+# ===============================
+# Leitura (quadro longo)
+# ===============================
+
+def _ler_apuracoes(modelo, campos, empresa_ids, anos):
+    """(empresa_id, competencia, centavos) das apurações dos anos, numa query."""
+    anos_competencia = Q()
+    for ano in anos:
+        anos_competencia |= Q(competencia__endswith=f'/{ano}')
+    valor = centavos(campos[0])
+    for campo in campos[1:]:
+        valor = valor + centavos(campo)
+    linhas = modelo.objects.filter(empresa_id__in=empresa_ids).filter(anos_competencia).order_by().annotate(
+        _centavos=valor
+    ).values_list('empresa_id', 'competencia', '_centavos')
+    return pd.DataFrame.from_records(list(linhas), columns=['empresa_id', 'competencia', 'centavos'])
+
+
+def _com_ano_mes(linhas, modelo):
+    """Converte a competência (MM/AAAA ou Tn/AAAA) em ano e mês de referência."""
+    if linhas.empty:
+        return linhas.assign(ano=pd.Series(dtype='int64'), mes=pd.Series(dtype='int64'))
+    partes = linhas['competencia'].str.extract(_COMPETENCIA)
+    mes = pd.to_numeric(partes['mes']).fillna(pd.to_numeric(partes['trimestre']) * 3)
+    validas = partes['ano'].notna() & mes.between(1, 12)
+    if not validas.all():
+        logger.warning(
+            f"{modelo.__name__}: {int((~validas).sum())} apuração(ões) com competência "
+            f"fora do formato MM/AAAA ou Tn/AAAA ignorada(s)"
+        )
+    return linhas.loc[validas].assign(
+        ano=partes.loc[validas, 'ano'].astype('int64'),
+        mes=mes.loc[validas].astype('int64'),
+        centavos=linhas.loc[validas, 'centavos'].fillna(0).astype('int64'),
+    )
+
+
+def _trimestres(linhas):
+    return pd.MultiIndex.from_arrays([linhas['empresa_id'], linhas['ano'], (linhas['mes'] - 1) // 3])
+
+
+def _ler_receita(empresa_ids, ano_inicial, ano_final):
+    linhas = NotaFiscal.objects.filter(
+        empresa_destinataria_id__in=empresa_ids,
+        dtEmissao__gte=date(ano_inicial, 1, 1),
+        dtEmissao__lte=date(ano_final, 12, 31),
+    ).exclude(status_recebimento='cancelado').order_by().annotate(
+        ano=ExtractYear('dtEmissao'), mes=ExtractMonth('dtEmissao')
+    ).values('empresa_destinataria_id', 'ano', 'mes').annotate(
+        _centavos=Sum(centavos('val_bruto'))
+    ).values_list('empresa_destinataria_id', 'ano', 'mes', '_centavos')
+    receita = pd.DataFrame.from_records(list(linhas), columns=['empresa_id', 'ano', 'mes', 'centavos'])
+    return receita.assign(serie=RECEITA, centavos=receita['centavos'].fillna(0).astype('int64'))
+
+
+def carregar_quadro(empresa_ids, ano_inicial, ano_final):
+    """
+    Quadro longo com receita bruta e imposto devido por tributo.
+
+    Returns:
+        DataFrame: colunas empresa_id, ano, mes, serie, centavos (int64)
+    """
+    anos = range(ano_inicial, ano_final + 1)
+    partes = [_ler_receita(empresa_ids, ano_inicial, ano_final)]
+    for tributo, (modelo, campos) in FONTES_TRIBUTOS.items():
+        linhas = _com_ano_mes(_ler_apuracoes(modelo, campos, empresa_ids, anos), modelo)
+        if tributo == 'IRPJ':
+            estimativas = _com_ano_mes(
+                _ler_apuracoes(ApuracaoIRPJMensal, campos, empresa_ids, anos), ApuracaoIRPJMensal
+            )
+            estimativas = estimativas.loc[~_trimestres(estimativas).isin(_trimestres(linhas))]
+            linhas = pd.concat([linhas, estimativas], ignore_index=True)
+        partes.append(linhas.assign(serie=tributo))
+    return pd.concat([parte[_COLUNAS] for parte in partes], ignore_index=True)
+
+
+def montar_cubo(quadro, empresa_ids, ano_inicial, ano_final):
+    """
+    Cubo int64 (empresas, meses, SERIES) em centavos, com todos os meses de
+    ano_inicial a ano_final (zero onde não há valor) e a série TOTAL somada.
+    """
+    meses = (ano_final - ano_inicial + 1) * 12
+    cubo = np.zeros((len(empresa_ids), meses, len(SERIES)), dtype=np.int64)
+    if not quadro.empty:
+        posicao_mes = ((quadro['ano'] - ano_inicial) * 12 + quadro['mes'] - 1).to_numpy()
+        np.add.at(cubo, (
+            pd.Index(empresa_ids).get_indexer(quadro['empresa_id']),
+            posicao_mes,
+            pd.Index(SERIES).get_indexer(quadro['serie']),
+        ), quadro['centavos'].to_numpy(dtype=np.int64))
+    tributos = [SERIES.index(tributo) for tributo in TRIBUTOS]
+    cubo[:, :, SERIES.index(TOTAL)] = cubo[:, :, tributos].sum(axis=2)
+    return cubo
+
+
+# ===============================
+# Métricas (vetorizadas sobre o cubo)
+# ===============================
+
+def _percentual(numerador, denominador):
+    """numerador / denominador em %, NaN onde o denominador é zero."""
+    numerador = np.asarray(numerador, dtype=np.float64)
+    denominador = np.asarray(denominador, dtype=np.float64)
+    resultado = np.full(np.broadcast(numerador, denominador).shape, np.nan)
+    np.divide(numerador * 100, denominador, out=resultado, where=denominador != 0)
+    return resultado
+
+
+def _variacao(atual, anterior):
+    """Variação percentual sobre o período anterior (NaN com anterior zero)."""
+    return _percentual(atual - anterior, np.abs(anterior))
+
+
+def _aliquota_efetiva(valores):
+    """Imposto / receita bruta por tributo e total (eixo final = TRIBUTOS + TOTAL)."""
+    receita = valores[..., SERIES.index(RECEITA)]
+    return _percentual(valores[..., 1:], receita[..., np.newaxis])
+
+
+def calcular_metricas(cubo):
+    """
+    Métricas de um cubo (empresas, meses, SERIES) cujo primeiro ano serve só
+    de base: os resultados cobrem os anos seguintes.
+
+    Returns:
+        dict de arrays: 'anual' e 'mensal' (centavos), 'acumulado_12m',
+        'variacao_anual', 'variacao_mensal', 'aliquota_anual',
+        'aliquota_mensal' e 'aliquota_12m'
+    """
+    empresas, meses, series = cubo.shape
+    anual = cubo.reshape(empresas, meses // 12, 12, series).sum(axis=2)
+    acumulado = np.concatenate(
+        [np.zeros((empresas, 1, series), dtype=np.int64), np.cumsum(cubo, axis=1)], axis=1
+    )
+    acumulado_12m = (acumulado[:, 12:] - acumulado[:, :-12])[:, 1:]
+    mensal = cubo[:, 12:]
+    return {
+        'anual': anual[:, 1:],
+        'variacao_anual': _variacao(anual[:, 1:], anual[:, :-1]),
+        'aliquota_anual': _aliquota_efetiva(anual[:, 1:]),
+        'mensal': mensal,
+        'variacao_mensal': _variacao(mensal, cubo[:, :-12]),
+        'aliquota_mensal': _aliquota_efetiva(mensal),
+        'acumulado_12m': acumulado_12m,
+        'aliquota_12m': _aliquota_efetiva(acumulado_12m),
+    }
+
+
+# ===============================
+# Saída (dicionários para template e JSON)
+# ===============================
+
+def _moedas(vetor):
+    return {serie: de_centavos(valor) for serie, valor in zip(SERIES, vetor.tolist())}
+
+
+def _percentuais(vetor, series):
+    return {serie: (None if np.isnan(valor) else round(valor, 2)) for serie, valor in zip(series, vetor.tolist())}
+
+
+def _serie_empresa(metricas, indice, ano_inicial, ano_final, incluir_mensal):
+    anos = []
+    for i, ano in enumerate(range(ano_inicial, ano_final + 1)):
+        anos.append({
+            'ano': ano,
+            'valores': _moedas(metricas['anual'][indice, i]),
+            'variacao_anual': _percentuais(metricas['variacao_anual'][indice, i], SERIES),
+            'aliquota_efetiva': _percentuais(metricas['aliquota_anual'][indice, i], SERIES[1:]),
+        })
+    resultado = {'anual': anos}
+    if incluir_mensal:
+        meses = []
+        for i in range(metricas['mensal'].shape[1]):
+            ano, mes = divmod(i, 12)
+            meses.append({
+                'competencia': f'{mes + 1:02d}/{ano_inicial + ano}',
+                'valores': _moedas(metricas['mensal'][indice, i]),
+                'variacao_anual': _percentuais(metricas['variacao_mensal'][indice, i], SERIES),
+                'aliquota_efetiva': _percentuais(metricas['aliquota_mensal'][indice, i], SERIES[1:]),
+                'acumulado_12m': _moedas(metricas['acumulado_12m'][indice, i]),
+                'aliquota_efetiva_12m': _percentuais(metricas['aliquota_12m'][indice, i], SERIES[1:]),
+            })
+        resultado['mensal'] = meses
+    return resultado
+
+
+def montar_tendencias_tributarias(empresas, ano_inicial, ano_final, incluir_mensal=True):
+    """
+    Tendências de receita e tributos de uma ou várias empresas entre
+    ano_inicial e ano_final (inclusive), com o consolidado quando há mais de
+    uma empresa.
+
+    Args:
+        empresas: Empresas (instâncias) a comparar
+        incluir_mensal: inclui a série mês a mês além dos totais anuais
+
+    Returns:
+        dict: 'series', 'tributos', 'ano_inicial', 'ano_final', 'empresas'
+        (lista com 'empresa_id', 'nome', 'anual' e 'mensal') e 'consolidado'
+    """
+    if ano_final < ano_inicial:
+        raise ValueError('ano_final deve ser maior ou igual a ano_inicial')
+    if ano_final - ano_inicial + 1 > MAXIMO_ANOS:
+        raise ValueError(f'Período limitado a {MAXIMO_ANOS} anos')
+
+    empresas = list(empresas)
+    empresa_ids = [empresa.id for empresa in empresas]
+    quadro = carregar_quadro(empresa_ids, ano_inicial - 1, ano_final)
+    cubo = montar_cubo(quadro, empresa_ids, ano_inicial - 1, ano_final)
+    if len(empresas) > 1:
+        cubo = np.concatenate([cubo, cubo.sum(axis=0, keepdims=True)], axis=0)
+    metricas = calcular_metricas(cubo)
+
+    resultado = {
+        'series': list(SERIES),
+        'tributos': list(TRIBUTOS),
+        'ano_inicial': ano_inicial,
+        'ano_final': ano_final,
+        'empresas': [
+            {
+                'empresa_id': empresa.id,
+                'nome': str(empresa),
+                **_serie_empresa(metricas, indice, ano_inicial, ano_final, incluir_mensal),
+            }
+            for indice, empresa in enumerate(empresas)
+        ],
+        'consolidado': None,
+    }
+    if len(empresas) > 1:
+        resultado['consolidado'] = _serie_empresa(metricas, len(empresas), ano_inicial, ano_final, incluir_mensal)
+    return resultado
@@ -0,0 +1,259 @@
+"""
+Leitura em réplica do PostgreSQL para relatórios, exportações e dashboards
+
+Com REPLICA_DATABASE_HOST definido, o settings cria o alias `replica` e o
+`RoteadorReplica` passa a mandar para ele as leituras feitas dentro de
+`leitura_replica` (context manager ou decorador). Fora desse escopo tudo
+continua no `default`: a réplica é opt-in por carga de trabalho, nunca
+global.
+
+Garantias de consistência:
+- Escritas vão sempre ao primário. Um modelo escrito dentro do escopo
+  passa a ser lido do primário até o fim do escopo (ex: builders que fazem
+  update_or_create e depois relêem). Leituras dentro de transaction.atomic
+  no primário também ficam no primário.
+- Leitura das próprias escritas entre requisições: após um POST/PUT/PATCH/
+  DELETE, o ReplicaMiddleware (medicos/middleware/replica.py) marca a sessão e, por
+  REPLICA_LEITURA_PROPRIA_SEGUNDOS, as requisições daquele usuário leem do
+  primário (o usuário que acabou de salvar uma nota vê a nota no relatório).
+- Fallback: a réplica é verificada a cada REPLICA_VERIFICACAO_SEGUNDOS
+  (conexão e atraso de replicação). Fora do ar ou com atraso acima de
+  REPLICA_LAG_MAXIMO_SEGUNDOS, as leituras voltam ao primário até a próxima
+  verificação. Como decorador, um erro de conexão na réplica no meio da view
+  repete a execução uma vez no primário.
+
+Testes locais: aponte REPLICA_DATABASE_NAME para um segundo banco no mesmo
+PostgreSQL (ex: `createdb -T medicos medicos_replica`). Um banco que não está
+em recuperação é tratado como réplica sem atraso.
+"""
+import logging
+import threading
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, InterfaceError, OperationalError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+ALIAS_REPLICA = 'replica'
+
+# Apps cujas leituras nunca vão à réplica (sessão/autenticação recém-gravadas)
+APPS_SOMENTE_PRIMARIO = frozenset({'sessions', 'auth', 'contenttypes', 'admin'})
+
+_contexto_leitura = ContextVar('medicos_replica_contexto', default=None)
+_primario_forcado = ContextVar('medicos_replica_primario_forcado', default=False)
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+class _SaudeReplica:
+    """Estado da réplica por processo, reavaliado no máximo a cada REPLICA_VERIFICACAO_SEGUNDOS."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._disponivel = None
+        self._valida_ate = 0.0
+        self.atraso_segundos = None
+
+    def marcar_indisponivel(self, motivo):
+        with self._lock:
+            if self._disponivel is not False:
+                logger.warning(f"Réplica indisponível, leituras no primário: {motivo}")
+            self._disponivel = False
+            self._valida_ate = time.monotonic() + _config('REPLICA_VERIFICACAO_SEGUNDOS', 10)
+
+    def disponivel(self):
+        agora = time.monotonic()
+        if agora < self._valida_ate:
+            return self._disponivel
+        with self._lock:
+            if agora < self._valida_ate:
+                return self._disponivel
+            # Reserva a janela antes de consultar: outras threads não repetem a verificação
+            self._valida_ate = agora + _config('REPLICA_VERIFICACAO_SEGUNDOS', 10)
+        try:
+            atraso = medir_atraso_replica()
+        except Exception as e:
+            self.marcar_indisponivel(e)
+            return False
+        self.atraso_segundos = atraso
+        limite = _config('REPLICA_LAG_MAXIMO_SEGUNDOS', 30)
+        if atraso > limite:
+            self.marcar_indisponivel(f'atraso de {atraso:.1f}s (limite {limite}s)')
+            return False
+        if self._disponivel is False:
+            logger.info(f"Réplica disponível novamente (atraso {atraso:.1f}s)")
+        self._disponivel = True
+        return True
+
+
+saude_replica = _SaudeReplica()
+
+
+def medir_atraso_replica():
+    """
+    Atraso de replicação em segundos (0 quando a réplica está em dia ou não é standby).
+
+    Com o WAL recebido todo reaplicado, o atraso é zero mesmo que a última
+    transação reaplicada seja antiga (primário ocioso).
+    """
+    conexao = connections[ALIAS_REPLICA]
+    with conexao.cursor() as cursor:
+        if conexao.vendor != 'postgresql':
+            cursor.execute('SELECT 1')
+            return 0.0
+        cursor.execute(
+            "SELECT CASE "
+            "WHEN NOT pg_is_in_recovery() THEN 0 "
+            "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+def _fechar_conexao_replica():
+    connections[ALIAS_REPLICA].close()
+
+
+class leitura_replica(ContextDecorator):
+    """
+    Escopo de leituras que toleram o atraso da réplica.
+
+        @login_required
+        @leitura_replica()
+        async def relatorio_apuracao(request, empresa_id): ...
+
+        with leitura_replica():
+            dados = montar_relatorio_executivo_anual(empresa_id)
+
+    Decora views síncronas e assíncronas; nas assíncronas o escopo chega às
+    threads de sync_to_async pelas ContextVars copiadas.
+    Sem réplica configurada (ou indisponível) não muda nada.
+    """
+
+    def __init__(self):
+        self.usou_replica = False
+        self.modelos_escritos = set()
+
+    def _recreate_cm(self):
+        return leitura_replica()
+
+    def __enter__(self):
+        self._token = _contexto_leitura.set(self)
+        return self
+
+    def __exit__(self, tipo_exc, exc, tb):
+        _contexto_leitura.reset(self._token)
+        return False
+
+    def __call__(self, func):
+        if iscoroutinefunction(func):
+            return self._decorar_async(func)
+
+        @wraps(func)
+        def interno(*args, **kwargs):
+            contexto = self._recreate_cm()
+            try:
+                with contexto:
+                    return func(*args, **kwargs)
+            except (OperationalError, InterfaceError) as e:
+                if not contexto.usou_replica:
+                    raise
+                saude_replica.marcar_indisponivel(e)
+                _fechar_conexao_replica()
+                with primario():
+                    return func(*args, **kwargs)
+        return interno
+
+    def _decorar_async(self, func):
+        @wraps(func)
+        async def interno(*args, **kwargs):
+            contexto = self._recreate_cm()
+            try:
+                with contexto:
+                    return await func(*args, **kwargs)
+            except (OperationalError, InterfaceError) as e:
+                if not contexto.usou_replica:
+                    raise
+                saude_replica.marcar_indisponivel(e)
+                await sync_to_async(_fechar_conexao_replica)()
+                with primario():
+                    return await func(*args, **kwargs)
+        return interno
+
+
+class primario(ContextDecorator):
+    """Força leituras no primário, mesmo dentro de `leitura_replica`."""
+
+    def __enter__(self):
+        self._token = _primario_forcado.set(True)
+        return self
+
+    def __exit__(self, tipo_exc, exc, tb):
+        _primario_forcado.reset(self._token)
+        return False
+
+
+def alias_leitura():
+    """
+    Alias para fixar com `.using()` um queryset avaliado fora do escopo atual
+    (ex: StreamingHttpResponse, consumido depois que a view retorna).
+    """
+    return ALIAS_REPLICA if _usar_replica() else DEFAULT_DB_ALIAS
+
+
+def _usar_replica(model=None):
+    contexto = _contexto_leitura.get()
+    if contexto is None or _primario_forcado.get() or not replica_configurada():
+        return False
+    if model is not None and (
+        model._meta.app_label in APPS_SOMENTE_PRIMARIO
+        or model._meta.label == settings.AUTH_USER_MODEL
+        or model._meta.label in contexto.modelos_escritos
+    ):
+        return False
+    if transaction.get_connection(DEFAULT_DB_ALIAS).in_atomic_block:
+        return False
+    if not saude_replica.disponivel():
+        return False
+    contexto.usou_replica = True
+    return True
+
+
+class RoteadorReplica:
+    """Router do Django: leituras em `leitura_replica` vão à réplica; o resto ao primário."""
+
+    def db_for_read(self, model, **hints):
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db:
+            return instancia._state.db
+        return ALIAS_REPLICA if _usar_replica(model) else None
+
+    def db_for_write(self, model, **hints):
+        contexto = _contexto_leitura.get()
+        if contexto is not None:
+            contexto.modelos_escritos.add(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e primário têm os mesmos dados: relações entre eles são válidas
+        bancos = {DEFAULT_DB_ALIAS, ALIAS_REPLICA}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == ALIAS_REPLICA:
+            return False
+        return None
+
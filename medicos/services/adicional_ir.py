@@ -0,0 +1,204 @@
+"""
+Apuração do adicional de IR trimestral (Lei 9.249/1995, Art. 3º, §1º)
+
+Serviço único usado por todos os relatórios (apuração de impostos, relatório
+mensal do sócio e relatório executivo), para que os números sejam os mesmos e
+calculados uma única vez por empresa/trimestre:
+
+- receita do trimestre por tipo de serviço (sempre por data de emissão,
+  excluindo notas canceladas) em uma agregação;
+- base presumida, excedente sobre R$ 60.000,00 e adicional de 10%;
+- vetor de participação de todos os sócios (receita bruta rateada no
+  trimestre) em uma única query agrupada por médico.
+
+O resultado fica em cache (chave por empresa/ano/trimestre) e é invalidado
+pelos signals de NotaFiscal/NotaFiscalRateioMedico e pelo serviço de rateio.
+"""
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from decimal import Decimal
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+
+from medicos.models.fiscal import Aliquotas, NotaFiscal, NotaFiscalRateioMedico
+
+logger = logging.getLogger(__name__)
+
+LIMITE_TRIMESTRAL = Decimal('60000.00')  # R$ 60.000,00/trimestre
+ALIQUOTA_ADICIONAL = Decimal('0.10')  # 10% fixo por lei
+MESES_FECHAMENTO_TRIMESTRE = (3, 6, 9, 12)
+
+PREFIXO_CACHE = 'adicional_ir'
+
+
+def _timeout_cache():
+    return getattr(settings, 'ADICIONAL_IR_CACHE_TIMEOUT', 300)
+
+
+def trimestre_do_mes(mes):
+    return (int(mes) - 1) // 3 + 1
+
+
+def meses_do_trimestre(trimestre):
+    primeiro = (trimestre - 1) * 3 + 1
+    return [primeiro, primeiro + 1, primeiro + 2]
+
+
+def chave_cache(empresa_id, ano, trimestre):
+    return f'{PREFIXO_CACHE}:{empresa_id}:{ano}:T{trimestre}'
+
+
+@dataclass
+class AdicionalIRTrimestral:
+    """Apuração do adicional de IR de uma empresa em um trimestre."""
+
+    empresa_id: int
+    ano: int
+    trimestre: int
+    receita_consultas: Decimal = Decimal('0')
+    receita_outros: Decimal = Decimal('0')
+    base_consultas: Decimal = Decimal('0')
+    base_outros: Decimal = Decimal('0')
+    limite_trimestral: Decimal = LIMITE_TRIMESTRAL
+    excedente: Decimal = Decimal('0')
+    adicional: Decimal = Decimal('0')
+    # socio_id -> receita bruta rateada ao sócio no trimestre
+    receita_por_socio: dict = field(default_factory=dict)
+
+    @property
+    def receita_bruta(self):
+        return self.receita_consultas + self.receita_outros
+
+    @property
+    def base_total(self):
+        return self.base_consultas + self.base_outros
+
+    def participacao(self, socio_id):
+        """Fração (0-1) da receita do trimestre atribuída ao sócio."""
+        if self.receita_bruta <= 0:
+            return Decimal('0')
+        return self.receita_por_socio.get(socio_id, Decimal('0')) / self.receita_bruta
+
+    def adicional_socio(self, socio_id):
+        """Parcela do adicional do trimestre proporcional à participação do sócio."""
+        if self.adicional <= 0:
+            return Decimal('0')
+        return self.adicional * self.participacao(socio_id)
+
+    def participacoes(self):
+        """Vetor de participação de todos os sócios com receita no trimestre."""
+        return {socio_id: self.participacao(socio_id) for socio_id in self.receita_por_socio}
+
+    def como_dict(self):
+        """Formato histórico de `views_relatorios.calcular_adicional_ir_trimestral`."""
+        return {
+            'trimestre': f'T{self.trimestre}',
+            'receita_consultas': self.receita_consultas,
+            'receita_outros': self.receita_outros,
+            'receita_bruta': self.receita_bruta,
+            'base_consultas': self.base_consultas,
+            'base_outros': self.base_outros,
+            'base_total': self.base_total,
+            'limite_trimestral': self.limite_trimestral,
+            'excedente': self.excedente,
+            'adicional': self.adicional,
+        }
+
+
+def _calcular(empresa, ano, trimestre):
+    meses = meses_do_trimestre(trimestre)
+    apuracao = AdicionalIRTrimestral(empresa_id=empresa.id, ano=ano, trimestre=trimestre)
+
+    aliquotas = Aliquotas.obter_aliquota_vigente(empresa, date(ano, meses[-1], 1))
+    if aliquotas is None:
+        aliquotas = Aliquotas.objects.filter(empresa=empresa).order_by('-data_vigencia_inicio').first()
+    if aliquotas is None:
+        return apuracao
+
+    # ADICIONAL DE IR: sempre por data de emissão (independente do regime da empresa)
+    notas = NotaFiscal.objects.filter(
+        empresa_destinataria=empresa,
+        dtEmissao__year=ano,
+        dtEmissao__month__in=meses,
+    ).exclude(status_recebimento='cancelado')
+
+    consultas = Q(tipo_servico=NotaFiscal.TIPO_SERVICO_CONSULTAS)
+    receitas = notas.aggregate(
+        consultas=Sum('val_bruto', filter=consultas),
+        outros=Sum('val_bruto', filter=~consultas),
+    )
+    apuracao.receita_consultas = receitas['consultas'] or Decimal('0')
+    apuracao.receita_outros = receitas['outros'] or Decimal('0')
+
+    apuracao.base_consultas = apuracao.receita_consultas * (aliquotas.IRPJ_PRESUNCAO_CONSULTA / Decimal('100'))
+    apuracao.base_outros = apuracao.receita_outros * (aliquotas.IRPJ_PRESUNCAO_OUTROS / Decimal('100'))
+    apuracao.excedente = max(Decimal('0'), apuracao.base_total - LIMITE_TRIMESTRAL)
+    apuracao.adicional = apuracao.excedente * ALIQUOTA_ADICIONAL
+
+    # Participação de todos os sócios em uma query agrupada
+    por_socio = NotaFiscalRateioMedico.objects.filter(
+        nota_fiscal__in=notas
+    ).values('medico_id').annotate(total=Sum('valor_bruto_medico'))
+    apuracao.receita_por_socio = {
+        linha['medico_id']: linha['total'] or Decimal('0') for linha in por_socio
+    }
+    return apuracao
+
+
+def apurar_adicional_ir_trimestral(empresa, ano, trimestre, usar_cache=True):
+    """
+    Apura (ou lê do cache) o adicional de IR da empresa no trimestre.
+
+    Args:
+        empresa: Empresa
+        ano (int): ano da competência
+        trimestre (int): 1 a 4
+
+    Returns:
+        AdicionalIRTrimestral
+    """
+    ano, trimestre = int(ano), int(trimestre)
+    chave = chave_cache(empresa.id, ano, trimestre)
+    if usar_cache:
+        try:
+            dados = cache.get(chave)
+        except Exception as e:
+            logger.warning(f"Cache do adicional de IR indisponível: {e}")
+            dados = None
+        if dados is not None:
+            return AdicionalIRTrimestral(**dados)
+
+    apuracao = _calcular(empresa, ano, trimestre)
+    try:
+        cache.set(chave, asdict(apuracao), _timeout_cache())
+    except Exception as e:
+        logger.warning(f"Falha ao gravar cache do adicional de IR: {e}")
+    return apuracao
+
+
+def apurar_adicional_ir_ano(empresa, ano):
+    """Apurações dos quatro trimestres do ano."""
+    return [apurar_adicional_ir_trimestral(empresa, ano, trimestre) for trimestre in range(1, 5)]
+
+
+def adicional_ir_socio_no_mes(empresa, socio_id, ano, mes):
+    """
+    Parcela do sócio no adicional de IR trimestral, lançada apenas nos meses de
+    fechamento de trimestre (3, 6, 9, 12); nos demais meses é zero.
+    """
+    if int(mes) not in MESES_FECHAMENTO_TRIMESTRE or not socio_id:
+        return Decimal('0')
+    return apurar_adicional_ir_trimestral(empresa, ano, trimestre_do_mes(mes)).adicional_socio(socio_id)
+
+
+def invalidar_cache_adicional_ir(empresa_id, data):
+    """Descarta a apuração em cache do trimestre que contém `data`."""
+    if not (empresa_id and data):
+        return
+    try:
+        cache.delete(chave_cache(empresa_id, data.year, trimestre_do_mes(data.month)))
+    except Exception as e:
+        logger.warning(f"Falha ao invalidar cache do adicional de IR: {e}")
@@ -0,0 +1,298 @@
+"""
+Suíte de benchmarks dos caminhos pesados de relatório e gravação
+
+Mede tempo de parede (time.perf_counter) e quantidade de queries SQL de cada
+cenário sobre uma empresa (normalmente um tenant de
+services/dados_sinteticos.py):
+- relatório mensal do sócio (montar_relatorio_mensal_socio);
+- apurações persistentes de PIS, COFINS, CSLL, IRPJ (trimestral e mensal) e ISSQN;
+- importação de XML de NFS-e (NotaFiscalImportXMLView, via RequestFactory);
+- cópia de despesas do mês anterior (CopiaDespesasService, modos substituir e diferencial);
+- fechamento mensal da conta corrente (processar_fechamento_mensal_conta_corrente).
+
+Cada execução roda dentro de uma transação desfeita ao final, de modo que as
+repetições medem sempre o mesmo trabalho e o banco não é alterado. As queries
+são contadas com `connection.execute_wrapper` (sem o limite do log de queries
+do DEBUG). O resultado é um dict serializável em JSON, com metadados (commit,
+banco, versões) para comparação entre commits com `comparar_resultados`.
+"""
+from dataclasses import dataclass
+from datetime import date
+import contextlib
+import io
+import logging
+import platform
+import statistics
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from medicos.models.base import Empresa, Socio
+from medicos.services.copia_despesas import MODO_DIFERENCIAL, MODO_SUBSTITUIR, CopiaDespesasService
+from medicos.services.dados_sinteticos import gerar_xml_nfse
+
+logger = logging.getLogger(__name__)
+
+VERSAO_FORMATO = 1
+TOLERANCIA_TEMPO_PADRAO = 0.25  # 25% acima da referência
+# Numeração das NFS-e importadas (fora da faixa usada pelo gerador sintético)
+NUMERO_INICIAL_XML = 900000
+
+
+class ContadorQueries:
+    """Conta as queries executadas na conexão enquanto ativo (execute_wrapper)."""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+@dataclass
+class ContextoBenchmark:
+    """Parâmetros comuns aos cenários."""
+
+    empresa: Empresa
+    ano: int
+    mes: int
+    socio_id: int = None
+    notas_xml: int = 20
+    usuario: object = None
+
+    @property
+    def mes_ano(self):
+        return f'{self.ano:04d}-{self.mes:02d}'
+
+    @property
+    def competencia(self):
+        return date(self.ano, self.mes, 1)
+
+
+def _relatorio_mensal_socio(contexto):
+    from medicos.relatorios.builders import montar_relatorio_mensal_socio
+    return montar_relatorio_mensal_socio(contexto.empresa.id, contexto.mes_ano, socio_id=contexto.socio_id)
+
+
+def _apuracao_pis(contexto):
+    from medicos.relatorios.apuracao_pis import montar_relatorio_pis_persistente
+    return montar_relatorio_pis_persistente(contexto.empresa.id, contexto.ano)
+
+
+def _apuracao_cofins(contexto):
+    from medicos.relatorios.apuracao_cofins import montar_relatorio_cofins_persistente
+    return montar_relatorio_cofins_persistente(contexto.empresa.id, contexto.ano)
+
+
+def _apuracao_csll(contexto):
+    from medicos.relatorios.apuracao_csll import montar_relatorio_csll_persistente
+    return montar_relatorio_csll_persistente(contexto.empresa.id, contexto.ano)
+
+
+def _apuracao_irpj(contexto):
+    from medicos.relatorios.apuracao_irpj import montar_relatorio_irpj_persistente
+    return montar_relatorio_irpj_persistente(contexto.empresa.id, contexto.ano)
+
+
+def _apuracao_irpj_mensal(contexto):
+    from medicos.relatorios.apuracao_irpj_mensal import montar_relatorio_irpj_mensal_persistente
+    return montar_relatorio_irpj_mensal_persistente(contexto.empresa.id, contexto.ano)
+
+
+def _apuracao_issqn(contexto):
+    from medicos.relatorios.builders import montar_relatorio_issqn
+    return montar_relatorio_issqn(contexto.empresa.id, contexto.mes_ano)
+
+
+def _importacao_xml(contexto):
+    """POST de `notas_xml` arquivos de NFS-e na view de importação, como no upload da tela."""
+    from medicos.views_import_xml import NotaFiscalImportXMLView
+
+    arquivos = [
+        SimpleUploadedFile(
+            f'nfse_{numero}.xml',
+            gerar_xml_nfse(contexto.empresa.cnpj, numero, contexto.competencia, 1000 + numero % 997),
+            content_type='text/xml',
+        )
+        for numero in range(NUMERO_INICIAL_XML, NUMERO_INICIAL_XML + contexto.notas_xml)
+    ]
+    request = RequestFactory().post(reverse('medicos:importar_xml_nota_fiscal'), {'xml_file': arquivos})
+    request.user = contexto.usuario
+    request.session = {'empresa_id': contexto.empresa.id}
+    request._messages = FallbackStorage(request)
+    return NotaFiscalImportXMLView.as_view()(request)
+
+
+def _copia_despesas(modo):
+    def executar(contexto):
+        return CopiaDespesasService(contexto.empresa.id, usuario=None).copiar(contexto.ano, contexto.mes, modo=modo)
+    return executar
+
+
+def _fechamento_mensal(contexto):
+    from medicos.relatorios.builders import processar_fechamento_mensal_conta_corrente
+    return processar_fechamento_mensal_conta_corrente(contexto.empresa.id, contexto.competencia)
+
+
+# nome -> callable(contexto); a ordem é a de execução
+CENARIOS = {
+    'relatorio_mensal_socio': _relatorio_mensal_socio,
+    'apuracao_pis': _apuracao_pis,
+    'apuracao_cofins': _apuracao_cofins,
+    'apuracao_csll': _apuracao_csll,
+    'apuracao_irpj': _apuracao_irpj,
+    'apuracao_irpj_mensal': _apuracao_irpj_mensal,
+    'apuracao_issqn': _apuracao_issqn,
+    'importacao_xml': _importacao_xml,
+    'copia_despesas_substituir': _copia_despesas(MODO_SUBSTITUIR),
+    'copia_despesas_diferencial': _copia_despesas(MODO_DIFERENCIAL),
+    'fechamento_mensal': _fechamento_mensal,
+}
+
+
+def medir(funcao, repeticoes=3, aquecimento=1):
+    """
+    Executa `funcao` (aquecimento + repetições), cada vez em uma transação
+    desfeita ao final, medindo tempo e queries.
+
+    Returns:
+        dict: tempos (s) e queries por execução medida, mediana/mínimo/máximo
+    """
+    tempos, queries = [], []
+    for execucao in range(aquecimento + repeticoes):
+        contador = ContadorQueries()
+        with transaction.atomic():
+            with connection.execute_wrapper(contador), contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                funcao()
+                decorrido = time.perf_counter() - inicio
+            transaction.set_rollback(True)
+        if execucao >= aquecimento:
+            tempos.append(decorrido)
+            queries.append(contador.total)
+    return {
+        'tempo_mediano_s': round(statistics.median(tempos), 6),
+        'tempo_min_s': round(min(tempos), 6),
+        'tempo_max_s': round(max(tempos), 6),
+        'tempos_s': [round(t, 6) for t in tempos],
+        'queries': int(statistics.median(queries)),
+        'queries_por_execucao': queries,
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def metadados():
+    """Ambiente da execução, gravado junto dos resultados."""
+    return {
+        'versao_formato': VERSAO_FORMATO,
+        'gerado_em': timezone.now().isoformat(),
+        'commit': _commit_atual(),
+        'banco': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+    }
+
+
+def executar_benchmarks(empresa_id, ano, mes, socio_id=None, cenarios=None, repeticoes=3,
+                        aquecimento=1, notas_xml=20, ao_concluir=None):
+    """
+    Executa os cenários sobre a empresa/competência informadas.
+
+    Args:
+        cenarios: nomes de CENARIOS a executar (None = todos)
+        ao_concluir: callback(nome, resultado) chamado a cada cenário concluído
+
+    Returns:
+        dict: {'metadados': {...}, 'parametros': {...}, 'resultados': {nome: {...}}}
+    """
+    empresa = Empresa.objects.get(id=empresa_id)
+    if socio_id is None:
+        socio_id = (
+            Socio.objects.filter(empresa=empresa, ativo=True)
+            .order_by('pessoa__name').values_list('id', flat=True).first()
+        )
+    nomes = list(cenarios or CENARIOS)
+    desconhecidos = [nome for nome in nomes if nome not in CENARIOS]
+    if desconhecidos:
+        raise ValueError(f"Cenário(s) desconhecido(s): {', '.join(desconhecidos)}")
+
+    contexto = ContextoBenchmark(
+        empresa=empresa, ano=int(ano), mes=int(mes), socio_id=socio_id, notas_xml=int(notas_xml),
+        usuario=get_user_model()(username='benchmark'),
+    )
+    resultados = {}
+    for nome in nomes:
+        try:
+            resultado = medir(lambda: CENARIOS[nome](contexto), repeticoes=repeticoes, aquecimento=aquecimento)
+        except Exception as e:
+            logger.exception(f"Falha no cenário de benchmark {nome}")
+            resultado = {'erro': f'{type(e).__name__}: {e}'}
+        resultados[nome] = resultado
+        if ao_concluir:
+            ao_concluir(nome, resultado)
+
+    return {
+        'metadados': metadados(),
+        'parametros': {
+            'empresa_id': empresa.id,
+            'ano': contexto.ano,
+            'mes': contexto.mes,
+            'socio_id': socio_id,
+            'repeticoes': repeticoes,
+            'aquecimento': aquecimento,
+            'notas_xml': contexto.notas_xml,
+        },
+        'resultados': resultados,
+    }
+
+
+def comparar_resultados(atual, referencia, tolerancia_tempo=TOLERANCIA_TEMPO_PADRAO):
+    """
+    Compara duas execuções (formato de `executar_benchmarks`).
+
+    Há regressão quando o cenário passa a fazer mais queries que a referência
+    ou quando o tempo mediano supera a referência em mais de `tolerancia_tempo`.
+
+    Returns:
+        list[dict]: uma entrada por cenário presente nas duas execuções, com
+        'regressao' (bool) e os deltas de tempo e queries
+    """
+    comparacao = []
+    resultados_referencia = referencia.get('resultados', {})
+    for nome, resultado in atual.get('resultados', {}).items():
+        anterior = resultados_referencia.get(nome)
+        if not anterior or 'erro' in resultado or 'erro' in anterior:
+            continue
+        tempo_ref = anterior['tempo_mediano_s']
+        razao_tempo = resultado['tempo_mediano_s'] / tempo_ref if tempo_ref else None
+        delta_queries = resultado['queries'] - anterior['queries']
+        comparacao.append({
+            'cenario': nome,
+            'tempo_mediano_s': resultado['tempo_mediano_s'],
+            'tempo_referencia_s': tempo_ref,
+            'razao_tempo': round(razao_tempo, 3) if razao_tempo is not None else None,
+            'queries': resultado['queries'],
+            'queries_referencia': anterior['queries'],
+            'delta_queries': delta_queries,
+            'regressao': delta_queries > 0 or (razao_tempo is not None and razao_tempo > 1 + tolerancia_tempo),
+        })
+    return comparacao
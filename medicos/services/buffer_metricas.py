@@ -0,0 +1,405 @@
+"""
+Buffer de métricas SaaS em Redis com descarga periódica para ContaMetrics
+
+Cada evento de métrica vira uma operação atômica no Redis (HINCRBY /
+HINCRBYFLOAT / HSET) em um hash por conta e dia, em vez do get_or_create +
+save no banco a cada ação (que era uma corrida read-modify-write e um
+"hot row" por clique). O comando `descarregar_metricas_saas` consolida os
+hashes pendentes em ContaMetrics em lote.
+
+Estrutura no Redis:
+- `saas:metricas:<conta_id>:<AAAA-MM-DD>` (hash)
+    - `inc:<metrica_tipo>`: soma de incrementos ainda não persistidos
+    - `set:<metrica_tipo>`: valor absoluto registrado (record_metric)
+- `saas:metricas:pendentes` (set): chaves de hash aguardando descarga
+
+Semântica: um `set` substitui o valor persistido do dia; incrementos
+posteriores a ele somam sobre o novo valor (o HSET zera o `inc` pendente).
+
+Sem Redis disponível (backend de cache diferente ou falha de conexão), a
+métrica é gravada diretamente no banco, com atualização atômica via F().
+
+Durante a descarga de um hash (entre a reserva e o commit) seus valores
+ficam momentaneamente fora da leitura consolidada.
+
+Tipo e valor são validados contra o model antes de entrar no buffer. Se
+ainda assim um hash não puder ser persistido (erro de dados), ele é isolado
+em quarentena (`saas:metricas:quarentena`) para não bloquear as descargas
+seguintes; falhas de conexão com o banco devolvem o lote inteiro ao buffer.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import InterfaceError, OperationalError, transaction
+from django.db.models import F
+
+from medicos.models import ContaMetrics
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_CHAVE = 'saas:metricas'
+CHAVE_PENDENTES = f'{PREFIXO_CHAVE}:pendentes'
+CHAVE_QUARENTENA = f'{PREFIXO_CHAVE}:quarentena'
+PREFIXO_INCREMENTO = 'inc:'
+PREFIXO_VALOR = 'set:'
+
+# Hashes não descarregados expiram após este prazo (proteção contra lixo)
+TTL_BUFFER_SEGUNDOS = 7 * 24 * 3600
+
+
+def buffer_habilitado():
+    return getattr(settings, 'SAAS_METRICS_BUFFER_ENABLED', True)
+
+
+def obter_conexao_redis():
+    """Retorna a conexão Redis do cache padrão, ou None se indisponível."""
+    if not buffer_habilitado():
+        return None
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception as e:
+        # Backend de cache que não é django-redis (ex: locmem) ou pacote ausente
+        logger.debug(f"Buffer de métricas indisponível, usando banco: {e}")
+        return None
+
+
+def chave_buffer(conta_id, data):
+    return f'{PREFIXO_CHAVE}:{conta_id}:{data.isoformat()}'
+
+
+def _interpretar_chave(chave):
+    """`saas:metricas:<conta_id>:<data>` -> (conta_id, date)"""
+    _, _, conta_id, data_iso = chave.rsplit(':', 3)
+    return int(conta_id), date.fromisoformat(data_iso)
+
+
+def _texto(valor):
+    return valor.decode() if isinstance(valor, bytes) else valor
+
+
+def validar_metrica(metrica_tipo, valor):
+    """
+    Valida tipo e valor contra os campos de ContaMetrics (choices, max_length,
+    max_digits e decimal_places), já que o buffer não passa pelo model.
+
+    Returns:
+        Decimal: Valor normalizado
+
+    Raises:
+        ValidationError: Tipo fora das choices ou valor que não cabe no campo
+    """
+    ContaMetrics._meta.get_field('metrica_tipo').clean(metrica_tipo, None)
+    return ContaMetrics._meta.get_field('valor').clean(valor, None)
+
+
+# ===============================
+# Escrita
+# ===============================
+
+def incrementar(conta_id, metrica_tipo, incremento, data):
+    """
+    Soma `incremento` à métrica do dia no buffer.
+
+    Returns:
+        bool: True se bufferizado; False se o Redis não estava disponível
+    """
+    redis = obter_conexao_redis()
+    if redis is None:
+        return False
+    chave = chave_buffer(conta_id, data)
+    campo = f'{PREFIXO_INCREMENTO}{metrica_tipo}'
+    try:
+        pipe = redis.pipeline()
+        if isinstance(incremento, int):
+            pipe.hincrby(chave, campo, incremento)
+        else:
+            pipe.hincrbyfloat(chave, campo, float(incremento))
+        pipe.expire(chave, TTL_BUFFER_SEGUNDOS)
+        pipe.sadd(CHAVE_PENDENTES, chave)
+        pipe.execute()
+        return True
+    except Exception as e:
+        logger.warning(f"Falha ao bufferizar métrica {metrica_tipo} da conta {conta_id}: {e}")
+        return False
+
+
+def registrar_valor(conta_id, metrica_tipo, valor, data):
+    """
+    Registra o valor absoluto da métrica do dia no buffer (descarta incrementos pendentes).
+
+    Returns:
+        bool: True se bufferizado; False se o Redis não estava disponível
+    """
+    redis = obter_conexao_redis()
+    if redis is None:
+        return False
+    chave = chave_buffer(conta_id, data)
+    try:
+        pipe = redis.pipeline()  # MULTI/EXEC: set e remoção do incremento são atômicos
+        pipe.hset(chave, f'{PREFIXO_VALOR}{metrica_tipo}', str(valor))
+        pipe.hdel(chave, f'{PREFIXO_INCREMENTO}{metrica_tipo}')
+        pipe.expire(chave, TTL_BUFFER_SEGUNDOS)
+        pipe.sadd(CHAVE_PENDENTES, chave)
+        pipe.execute()
+        return True
+    except Exception as e:
+        logger.warning(f"Falha ao bufferizar métrica {metrica_tipo} da conta {conta_id}: {e}")
+        return False
+
+
+def incrementar_no_banco(conta, metrica_tipo, incremento, data):
+    """Fallback sem Redis: incremento atômico no banco (sem read-modify-write)."""
+    atualizados = ContaMetrics.objects.filter(
+        conta=conta, metrica_tipo=metrica_tipo, data=data
+    ).update(valor=F('valor') + incremento)
+    if not atualizados:
+        ContaMetrics.objects.create(conta=conta, metrica_tipo=metrica_tipo, data=data, valor=incremento)
+    return ContaMetrics.objects.filter(conta=conta, metrica_tipo=metrica_tipo, data=data).first()
+
+
+# ===============================
+# Leitura
+# ===============================
+
+def valores_pendentes(conta_id, metrica_tipo, data_inicio, data_fim):
+    """
+    Lê do buffer os valores ainda não persistidos de uma métrica no período.
+
+    Returns:
+        dict: data -> (valor_absoluto ou None, incremento Decimal)
+    """
+    redis = obter_conexao_redis()
+    if redis is None:
+        return {}
+    datas = []
+    dia = data_inicio
+    while dia <= data_fim:
+        datas.append(dia)
+        dia += timedelta(days=1)
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for dia in datas:
+            pipe.hmget(
+                chave_buffer(conta_id, dia),
+                f'{PREFIXO_VALOR}{metrica_tipo}',
+                f'{PREFIXO_INCREMENTO}{metrica_tipo}',
+            )
+        respostas = pipe.execute()
+    except Exception as e:
+        logger.warning(f"Falha ao ler buffer de métricas da conta {conta_id}: {e}")
+        return {}
+
+    pendentes = {}
+    for dia, (valor, incremento) in zip(datas, respostas):
+        if valor is None and incremento is None:
+            continue
+        pendentes[dia] = (
+            Decimal(_texto(valor)) if valor is not None else None,
+            Decimal(_texto(incremento)) if incremento is not None else Decimal('0'),
+        )
+    return pendentes
+
+
+def mesclar_valores(persistidos, pendentes):
+    """
+    Combina valores persistidos ({data: Decimal}) com os pendentes do buffer.
+
+    Returns:
+        dict: data -> valor consolidado
+    """
+    valores = dict(persistidos)
+    for dia, (valor_absoluto, incremento) in pendentes.items():
+        base = valor_absoluto if valor_absoluto is not None else valores.get(dia, Decimal('0'))
+        valores[dia] = base + incremento
+    return valores
+
+
+# ===============================
+# Descarga para o banco
+# ===============================
+
+def _reservar_chaves(redis, limite):
+    """
+    Retira até `limite` chaves do conjunto de pendentes e as renomeia para
+    chaves de descarga exclusivas, de modo que novos eventos do mesmo dia
+    passem a acumular em um hash novo enquanto este é persistido.
+    """
+    reservadas = []
+    for chave in redis.spop(CHAVE_PENDENTES, limite) or []:
+        chave = _texto(chave)
+        chave_descarga = f'{chave}:descarga:{uuid.uuid4().hex}'
+        try:
+            redis.rename(chave, chave_descarga)
+        except Exception:
+            # Chave expirada ou já descarregada por outro worker
+            continue
+        reservadas.append((chave, chave_descarga))
+    return reservadas
+
+
+def _agregar(chave, conteudo):
+    """
+    Converte o conteúdo de um hash em {(conta_id, metrica_tipo, data): [valor_absoluto, incremento]}.
+
+    Raises:
+        ValueError, ArithmeticError, ValidationError: Conteúdo inválido
+    """
+    conta_id, data = _interpretar_chave(chave)
+    agregados = defaultdict(lambda: [None, Decimal('0')])
+    for campo, valor in conteudo.items():
+        campo, valor = _texto(campo), Decimal(_texto(valor))
+        if campo.startswith(PREFIXO_VALOR):
+            metrica_tipo = campo[len(PREFIXO_VALOR):]
+            agregados[(conta_id, metrica_tipo, data)][0] = valor
+        elif campo.startswith(PREFIXO_INCREMENTO):
+            metrica_tipo = campo[len(PREFIXO_INCREMENTO):]
+            agregados[(conta_id, metrica_tipo, data)][1] += valor
+        else:
+            raise ValueError(f"Campo desconhecido no buffer: {campo}")
+        validar_metrica(metrica_tipo, valor)
+    return agregados
+
+
+def _persistir(agregados):
+    """
+    Grava os agregados em ContaMetrics numa transação.
+
+    Returns:
+        tuple: (quantidade atualizada, quantidade criada)
+    """
+    with transaction.atomic():
+        existentes = {}
+        for metrica in ContaMetrics.objects.select_for_update().filter(
+            conta_id__in={conta_id for conta_id, _, _ in agregados},
+            metrica_tipo__in={tipo for _, tipo, _ in agregados},
+            data__in={data for _, _, data in agregados},
+        ).order_by('id'):
+            existentes.setdefault((metrica.conta_id, metrica.metrica_tipo, metrica.data), metrica)
+
+        atualizar, criar = [], []
+        for (conta_id, metrica_tipo, data), (valor_absoluto, incremento) in agregados.items():
+            metrica = existentes.get((conta_id, metrica_tipo, data))
+            if metrica is not None:
+                base = valor_absoluto if valor_absoluto is not None else metrica.valor
+                metrica.valor = base + incremento
+                atualizar.append(metrica)
+            else:
+                base = valor_absoluto if valor_absoluto is not None else Decimal('0')
+                criar.append(ContaMetrics(
+                    conta_id=conta_id, metrica_tipo=metrica_tipo, data=data, valor=base + incremento,
+                ))
+        ContaMetrics.objects.bulk_update(atualizar, ['valor'], batch_size=500)
+        ContaMetrics.objects.bulk_create(criar, batch_size=500)
+    return len(atualizar), len(criar)
+
+
+def descarregar(tamanho_lote=500):
+    """
+    Persiste em ContaMetrics um lote de hashes pendentes do buffer.
+
+    Para cada (conta, métrica, dia): `set` substitui o valor persistido e
+    `inc` é somado. Linhas existentes são atualizadas com bulk_update e as
+    ausentes criadas com bulk_create, dentro de uma transação.
+
+    Se o lote falhar por erro de dados, os hashes são persistidos um a um e
+    os que continuarem falhando vão para a quarentena; falha de conexão com
+    o banco devolve o lote ao buffer e propaga a exceção.
+
+    Returns:
+        int: Quantidade de métricas (conta, tipo, dia) persistidas
+    """
+    redis = obter_conexao_redis()
+    if redis is None:
+        return 0
+
+    reservadas = _reservar_chaves(redis, tamanho_lote)
+    if not reservadas:
+        return 0
+
+    pipe = redis.pipeline(transaction=False)
+    for _, chave_descarga in reservadas:
+        pipe.hgetall(chave_descarga)
+    conteudos = pipe.execute()
+
+    # chave_descarga -> (chave, agregados do hash)
+    lotes = {}
+    for (chave, chave_descarga), conteudo in zip(reservadas, conteudos):
+        try:
+            lotes[chave_descarga] = (chave, _agregar(chave, conteudo))
+        except (ValueError, ArithmeticError, ValidationError) as e:
+            _quarentenar(redis, chave_descarga, e)
+
+    agregados = {}
+    for _, agregados_chave in lotes.values():
+        agregados.update(agregados_chave)
+    if not agregados:
+        return 0
+
+    try:
+        atualizadas, criadas = _persistir(agregados)
+    except (OperationalError, InterfaceError):
+        # Banco indisponível: devolve os dados ao buffer para a próxima descarga
+        _restaurar(redis, [(chave, chave_descarga) for chave_descarga, (chave, _) in lotes.items()])
+        raise
+    except Exception as e:
+        logger.warning(f"Falha ao descarregar lote de métricas, persistindo hash a hash: {e}")
+        return _descarregar_individualmente(redis, lotes)
+
+    redis.delete(*lotes)
+    logger.info(f"Métricas descarregadas: {len(agregados)} (atualizadas={atualizadas}, criadas={criadas})")
+    return len(agregados)
+
+
+def _descarregar_individualmente(redis, lotes):
+    """Persiste cada hash separadamente, isolando em quarentena os que falham."""
+    persistidas = 0
+    pendentes = list(lotes.items())
+    for indice, (chave_descarga, (chave, agregados)) in enumerate(pendentes):
+        try:
+            _persistir(agregados)
+        except (OperationalError, InterfaceError):
+            _restaurar(redis, [(chave, descarga) for descarga, (chave, _) in pendentes[indice:]])
+            raise
+        except Exception as e:
+            _quarentenar(redis, chave_descarga, e)
+            continue
+        redis.delete(chave_descarga)
+        persistidas += len(agregados)
+    logger.info(f"Métricas descarregadas individualmente: {persistidas}")
+    return persistidas
+
+
+def _quarentenar(redis, chave_descarga, erro):
+    """Mantém o hash sem expiração e o registra na quarentena para análise manual."""
+    pipe = redis.pipeline()
+    pipe.persist(chave_descarga)
+    pipe.sadd(CHAVE_QUARENTENA, chave_descarga)
+    pipe.execute()
+    logger.error(f"Hash de métricas {chave_descarga} em quarentena: {erro}")
+
+
+def _restaurar(redis, reservadas):
+    """Recoloca no buffer o conteúdo das chaves reservadas após falha na persistência."""
+    for chave, chave_descarga in reservadas:
+        conteudo = redis.hgetall(chave_descarga)
+        campos_atuais = {_texto(campo) for campo in redis.hkeys(chave)}
+        pipe = redis.pipeline()
+        for campo, valor in conteudo.items():
+            campo = _texto(campo)
+            if campo.startswith(PREFIXO_INCREMENTO):
+                # Um valor absoluto registrado depois da reserva descarta incrementos anteriores
+                if f'{PREFIXO_VALOR}{campo[len(PREFIXO_INCREMENTO):]}' not in campos_atuais:
+                    pipe.hincrbyfloat(chave, campo, float(_texto(valor)))
+            else:
+                # Valor absoluto mais recente (já no hash novo) tem precedência
+                pipe.hsetnx(chave, campo, valor)
+        pipe.expire(chave, TTL_BUFFER_SEGUNDOS)
+        pipe.sadd(CHAVE_PENDENTES, chave)
+        pipe.delete(chave_descarga)
+        pipe.execute()
@@ -0,0 +1,274 @@
+"""
+Busca textual normalizada: autocomplete select2, filtros de listas e admin
+
+As buscas por trecho (`icontains`) em descrição de item de despesa, tomador
+de nota fiscal e nome de pessoa não usam índice: `UPPER(col) LIKE '%termo%'`
+varre a tabela inteira. Cada coluna pesquisada ganha uma cópia normalizada
+(`<campo>_busca`: sem acentos, minúsculas, espaços colapsados; CNPJ só com
+dígitos), preenchida no save() dos models, e a busca passa a ser
+`<campo>_busca LIKE '%termo normalizado%'`:
+
+- PostgreSQL: índices GIN de trigramas (pg_trgm) nas colunas normalizadas
+  atendem o LIKE com curinga à esquerda. `criar_indices_trigrama` é o
+  helper de migração, por exemplo:
+
+      migrations.RunPython(busca.criar_indices_trigrama, busca.remover_indices_trigrama)
+
+  e também é chamado por `preencher_colunas_busca --indices`.
+- Outros bancos (ex: SQLite em desenvolvimento): as funções de índice não
+  fazem nada e a busca cai no LIKE sobre a coluna normalizada.
+
+Termos com menos de 3 caracteres não aproveitam o índice de trigramas e são
+justamente os mais repetidos no autocomplete (primeiras letras digitadas):
+os resultados desses prefixos ficam em cache por empresa, com TTL curto
+(BUSCA_CACHE_TIMEOUT) e versão invalidada quando itens ou grupos de despesa
+da empresa mudam.
+"""
+import logging
+import re
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+# tabela -> colunas normalizadas com índice de trigramas
+COLUNAS_TRIGRAMA = {
+    'despesa_item': ['descricao_busca'],
+    'nota_fiscal': ['tomador_busca', 'cnpj_tomador_busca'],
+    'pessoa': ['name_busca'],
+}
+
+_ESPACOS = re.compile(r'\s+')
+_NAO_DIGITOS = re.compile(r'\D')
+
+
+def normalizar_busca(texto):
+    """
+    Forma normalizada usada nas colunas *_busca e nos termos pesquisados:
+    sem acentos, em minúsculas e com espaços colapsados.
+
+        normalizar_busca('  Médico  São João ') -> 'medico sao joao'
+    """
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return _ESPACOS.sub(' ', sem_acentos.casefold()).strip()
+
+
+def normalizar_documento(texto):
+    """CPF/CNPJ só com dígitos: '12.345.678/0001-90' -> '12345678000190'."""
+    return _NAO_DIGITOS.sub('', str(texto or ''))
+
+
+def preencher_colunas_busca(instancia, update_fields=None):
+    """
+    Atualiza as colunas normalizadas declaradas em `COLUNAS_BUSCA` do model
+    ({coluna_busca: (campo_origem, normalizador)}) e devolve `update_fields`
+    acrescido das colunas cujo campo de origem está sendo gravado.
+    """
+    for coluna, (origem, normalizador) in instancia.COLUNAS_BUSCA.items():
+        setattr(instancia, coluna, normalizador(getattr(instancia, origem)))
+    if update_fields is None:
+        return None
+    update_fields = set(update_fields)
+    update_fields.update(
+        coluna for coluna, (origem, _) in instancia.COLUNAS_BUSCA.items() if origem in update_fields
+    )
+    return update_fields
+
+
+def filtro_busca(campo, termo, normalizador=normalizar_busca):
+    """
+    Q para busca por trecho na coluna normalizada `campo`. Termo vazio (ou
+    que normaliza para vazio) não filtra nada.
+    """
+    termo = normalizador(termo)
+    if not termo:
+        return Q()
+    return Q(**{f'{campo}__contains': termo})
+
+
+def modelos_com_busca():
+    from medicos.models.base import Pessoa
+    from medicos.models.despesas import ItemDespesa
+    from medicos.models.fiscal import NotaFiscal
+
+    return [ItemDespesa, NotaFiscal, Pessoa]
+
+
+def _filtro_colunas_vazias(modelo):
+    """Linhas com alguma coluna normalizada vazia cuja coluna de origem tem conteúdo."""
+    filtro = Q()
+    for coluna, (origem, _) in modelo.COLUNAS_BUSCA.items():
+        filtro |= (
+            (Q(**{coluna: ''}) | Q(**{f'{coluna}__isnull': True}))
+            & Q(**{f'{origem}__isnull': False}) & ~Q(**{origem: ''})
+        )
+    return filtro
+
+
+def preencher_colunas_existentes(modelo, lote=2000, apenas_contar=False, apenas_vazias=False):
+    """
+    Recalcula as colunas normalizadas de `modelo` para as linhas gravadas
+    antes delas (ou por caminhos que não passam pelo save(), como
+    queryset.update). Idempotente: só grava as linhas divergentes, com
+    bulk_update por página de IDs.
+
+    Com `apenas_vazias`, só lê as linhas cuja coluna normalizada ainda está
+    vazia (backfill rápido do deploy); colunas desatualizadas por
+    queryset.update exigem a passada completa.
+
+    Returns:
+        int: Quantidade de linhas divergentes (atualizadas, se não apenas_contar)
+    """
+    colunas = list(modelo.COLUNAS_BUSCA)
+    origens = [origem for origem, _ in modelo.COLUNAS_BUSCA.values()]
+    linhas = modelo._base_manager.only('id', *origens, *colunas).order_by('id')
+    if apenas_vazias:
+        linhas = linhas.filter(_filtro_colunas_vazias(modelo))
+
+    divergentes = 0
+    ultimo_id = 0
+    while True:
+        pagina = list(linhas.filter(id__gt=ultimo_id)[:lote])
+        if not pagina:
+            break
+        alteradas = []
+        for instancia in pagina:
+            atuais = [getattr(instancia, coluna) for coluna in colunas]
+            preencher_colunas_busca(instancia)
+            if atuais != [getattr(instancia, coluna) for coluna in colunas]:
+                alteradas.append(instancia)
+        if alteradas and not apenas_contar:
+            modelo._base_manager.bulk_update(alteradas, colunas, batch_size=lote)
+        divergentes += len(alteradas)
+        ultimo_id = pagina[-1].id
+    return divergentes
+
+
+# ===============================
+# Índices de trigramas (PostgreSQL)
+# ===============================
+
+def suportado(conexao=None):
+    return (conexao or connection).vendor == 'postgresql'
+
+
+def nome_indice(tabela, coluna):
+    return f'{tabela}_{coluna}_trgm'
+
+
+def criar_indices_trigrama(apps=None, schema_editor=None):
+    """
+    Cria a extensão pg_trgm e os índices GIN de trigramas das colunas
+    normalizadas (idempotente). Assinatura compatível com RunPython.
+    """
+    conexao = schema_editor.connection if schema_editor else connection
+    if not suportado(conexao):
+        logger.info("Banco sem pg_trgm: busca normalizada segue sem índice de trigramas")
+        return []
+
+    criados = []
+    with conexao.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for tabela, colunas in COLUNAS_TRIGRAMA.items():
+            for coluna in colunas:
+                indice = nome_indice(tabela, coluna)
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{indice}" ON "{tabela}" USING gin ("{coluna}" gin_trgm_ops)'
+                )
+                criados.append(indice)
+    logger.info(f"Índices de trigramas garantidos: {', '.join(criados)}")
+    return criados
+
+
+def remover_indices_trigrama(apps=None, schema_editor=None):
+    """Reverso de criar_indices_trigrama (mantém a extensão pg_trgm)."""
+    conexao = schema_editor.connection if schema_editor else connection
+    if not suportado(conexao):
+        return
+    with conexao.cursor() as cursor:
+        for tabela, colunas in COLUNAS_TRIGRAMA.items():
+            for coluna in colunas:
+                cursor.execute(f'DROP INDEX IF EXISTS "{nome_indice(tabela, coluna)}"')
+
+
+# ===============================
+# Autocomplete de itens de despesa (com cache de prefixos)
+# ===============================
+
+def _configuracao(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def _chave_versao(empresa_id):
+    return f'busca:item_despesa:{empresa_id}:versao'
+
+
+def _versao(empresa_id):
+    try:
+        return cache.get(_chave_versao(empresa_id)) or 0
+    except Exception as e:
+        logger.warning(f"Cache de busca indisponível: {e}")
+        return None
+
+
+def invalidar_cache_busca(empresa_id):
+    """Descarta os prefixos em cache da empresa (nova versão da chave)."""
+    if not empresa_id:
+        return
+    chave = _chave_versao(empresa_id)
+    try:
+        try:
+            cache.incr(chave)
+        except ValueError:
+            cache.set(chave, 1, None)
+    except Exception as e:
+        logger.warning(f"Falha ao invalidar cache de busca da empresa {empresa_id}: {e}")
+
+
+def buscar_itens_despesa(empresa_id, termo, limite=20):
+    """
+    Itens de despesa com rateio da empresa cuja descrição contém o termo,
+    já no formato do select2 ({'id', 'text'}).
+
+    Prefixos curtos (até BUSCA_CACHE_PREFIXO_MAXIMO caracteres normalizados)
+    são servidos do cache por BUSCA_CACHE_TIMEOUT segundos.
+    """
+    from medicos.models.despesas import GrupoDespesa, ItemDespesa
+
+    termo = normalizar_busca(termo)
+    chave = None
+    if len(termo) <= _configuracao('BUSCA_CACHE_PREFIXO_MAXIMO', 3):
+        versao = _versao(empresa_id)
+        if versao is not None:
+            chave = f'busca:item_despesa:{empresa_id}:{versao}:{limite}:{termo}'
+            try:
+                resultados = cache.get(chave)
+            except Exception:
+                resultados = None
+            if resultados is not None:
+                return resultados
+
+    itens = ItemDespesa.objects.filter(
+        grupo_despesa__empresa_id=empresa_id,
+        grupo_despesa__tipo_rateio=GrupoDespesa.Tipo_t.COM_RATEIO,
+    ).filter(
+        filtro_busca('descricao_busca', termo)
+    ).select_related('grupo_despesa').order_by('descricao', 'id')[:limite]
+
+    resultados = [
+        {'id': item.pk, 'text': f"{item.descricao} ({item.grupo_despesa.descricao})"}
+        for item in itens
+    ]
+    if chave:
+        try:
+            cache.set(chave, resultados, _configuracao('BUSCA_CACHE_TIMEOUT', 60))
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache de busca: {e}")
+    return resultados
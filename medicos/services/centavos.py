@@ -0,0 +1,161 @@
+"""
+Agregação de valores monetários em centavos inteiros
+
+Núcleo compartilhado pelos builders de relatórios e apurações. Os valores são
+trazidos do banco já convertidos em centavos inteiros (ROUND(valor * 100)),
+somados com aritmética inteira exata (SUM no banco ou vetores NumPy int64) e
+rateados/percentuados com regra de arredondamento explícita:
+
+- `aplicar_percentual` e `proporcao`: meio centavo arredonda para longe do
+  zero (ROUND_HALF_UP), em uma única divisão inteira;
+- `ratear_centavos`: maior resto, a soma das parcelas fecha exatamente com o
+  total.
+
+Os resultados só voltam a Decimal (`de_centavos`) na fronteira: gravação em
+RelatorioMensalSocio/Apuracao* ou contexto de template. Substitui os laços
+`sum(float(nf.val_bruto or 0) for nf in ...)` que instanciavam cada nota e
+acumulavam erro de ponto flutuante.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+from django.db.models import BigIntegerField, F, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Round
+
+CENTAVO = Decimal('0.01')
+
+
+def para_centavos(valor):
+    """Converte um valor monetário (Decimal, int, float ou None) em centavos inteiros."""
+    if valor is None:
+        return 0
+    if isinstance(valor, int):
+        return valor * 100
+    if not isinstance(valor, Decimal):
+        valor = Decimal(str(valor))
+    return int(valor.quantize(CENTAVO, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def de_centavos(centavos):
+    """Converte centavos inteiros em Decimal com duas casas."""
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+def dividir_arredondando(numerador, denominador):
+    """Divisão inteira com arredondamento meio-para-longe-do-zero (ROUND_HALF_UP)."""
+    if not denominador:
+        return 0
+    negativo = (numerador < 0) != (denominador < 0)
+    numerador, denominador = abs(numerador), abs(denominador)
+    quociente = (2 * numerador + denominador) // (2 * denominador)
+    return -quociente if negativo else quociente
+
+
+def aplicar_percentual(centavos, percentual):
+    """
+    Aplica um percentual (ex: Decimal('0.65') para 0,65%) a um valor em centavos.
+
+    O percentual é convertido em fração exata, de modo que o único
+    arredondamento é o final, no centavo.
+    """
+    if not centavos or not percentual:
+        return 0
+    if not isinstance(percentual, Decimal):
+        percentual = Decimal(str(percentual))
+    numerador, denominador = percentual.as_integer_ratio()
+    return dividir_arredondando(int(centavos) * numerador, denominador * 100)
+
+
+def proporcao(centavos, parte, todo):
+    """Parcela `parte / todo` de um valor em centavos (0 se `todo` for zero)."""
+    if not todo:
+        return 0
+    return dividir_arredondando(int(centavos) * int(parte), int(todo))
+
+
+def ratear_centavos(total, pesos):
+    """
+    Distribui `total` centavos proporcionalmente aos `pesos` (inteiros) pelo
+    método do maior resto; empates de resto favorecem o maior peso.
+
+    Returns:
+        list[int]: parcelas na mesma ordem dos pesos, somando exatamente `total`
+    """
+    pesos = [int(peso) for peso in pesos]
+    soma_pesos = sum(pesos)
+    if not pesos or soma_pesos <= 0 or not total:
+        return [0] * len(pesos)
+
+    sinal = -1 if total < 0 else 1
+    total = abs(int(total))
+    parcelas = [total * peso // soma_pesos for peso in pesos]
+    restos = [total * peso % soma_pesos for peso in pesos]
+    faltantes = total - sum(parcelas)
+    ordem = sorted(range(len(pesos)), key=lambda i: (restos[i], pesos[i]), reverse=True)
+    for i in ordem[:faltantes]:
+        parcelas[i] += 1
+    return [sinal * parcela for parcela in parcelas]
+
+
+def centavos(campo):
+    """Expressão ORM com o campo (ou lookup) convertido em centavos inteiros no banco."""
+    return Cast(Round(F(campo) * Value(100)), output_field=BigIntegerField())
+
+
+def somar_centavos(queryset, *campos, **filtros):
+    """
+    Soma campos monetários no banco, em centavos, em uma única agregação.
+
+    Args:
+        queryset: queryset de origem
+        *campos: campos (ou lookups) a somar
+        **filtros: somas condicionais adicionais, nome -> (campo, Q)
+
+    Returns:
+        dict: campo (ou nome do filtro) -> centavos (int)
+    """
+    agregacoes = {
+        f'_c{i}': Coalesce(Sum(centavos(campo)), Value(0), output_field=BigIntegerField())
+        for i, campo in enumerate(campos)
+    }
+    nomes = {f'_c{i}': campo for i, campo in enumerate(campos)}
+    for i, (nome, (campo, condicao)) in enumerate(filtros.items()):
+        agregacoes[f'_f{i}'] = Coalesce(
+            Sum(centavos(campo), filter=condicao), Value(0), output_field=BigIntegerField()
+        )
+        nomes[f'_f{i}'] = nome
+    resultado = queryset.order_by().aggregate(**agregacoes)
+    return {nomes[chave]: int(valor or 0) for chave, valor in resultado.items()}
+
+
+def somar_centavos_por(queryset, chave, *campos):
+    """
+    Soma campos monetários agrupados por `chave`, em uma única query.
+
+    Returns:
+        dict: valor da chave -> {campo: centavos}
+    """
+    agregacoes = {f'_c{i}': Sum(centavos(campo)) for i, campo in enumerate(campos)}
+    grupos = {}
+    for linha in queryset.order_by().values(chave).annotate(**agregacoes):
+        grupos[linha[chave]] = {
+            campo: int(linha[f'_c{i}'] or 0) for i, campo in enumerate(campos)
+        }
+    return grupos
+
+
+def vetor_centavos(valores):
+    """Vetor NumPy int64 em centavos a partir de valores monetários já carregados."""
+    return np.fromiter((para_centavos(valor) for valor in valores), dtype=np.int64)
+
+
+def totais_colunas(linhas, campos):
+    """
+    Totais por coluna de linhas em centavos (sequências de int alinhadas a
+    `campos`), somados como matriz NumPy int64.
+
+    Returns:
+        dict: campo -> centavos (int)
+    """
+    matriz = np.asarray(linhas, dtype=np.int64).reshape(-1, len(campos))
+    return {campo: int(total) for campo, total in zip(campos, matriz.sum(axis=0))}
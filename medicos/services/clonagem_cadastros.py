@@ -0,0 +1,383 @@
+"""
+Serviço de clonagem em lote dos cadastros de uma empresa para outra
+
+Substitui a cópia linha a linha das views de importação
+(`importar_grupos_despesa`, `importar_descricoes_movimentacao`,
+`importar_meios_pagamento` e `importar_aliquotas`), que faziam um
+`exists()`/`first()` por registro da origem. Aqui cada camada é resolvida
+com uma leitura da origem, uma leitura das chaves já existentes no destino
+(em memória, como conjuntos/dicionários) e um bulk_create com
+`ignore_conflicts`; as FKs entre camadas (grupo -> item -> rateio) são
+remapeadas em memória pelas chaves de negócio.
+
+Chaves de negócio usadas para ignorar o que o destino já possui:
+- grupos de despesa: código; itens: (código do grupo, código do item);
+- meios de pagamento: código;
+- descrições de movimentação: código contábil (ou o texto, se sem código);
+- alíquotas: vigência (início, fim); vigências que se sobrepõem às do
+  destino também são ignoradas, para não haver duas alíquotas na mesma data;
+- rateio mensal: (item, sócio pela pessoa, mês) — só o mês mais recente da origem.
+"""
+from datetime import date
+import logging
+
+from django.db import transaction
+
+from medicos.models.base import Empresa, Socio
+from medicos.models.despesas import DespesaRateada, GrupoDespesa, ItemDespesa, ItemDespesaRateioMensal
+from medicos.models.eventos import EventoDominio
+from medicos.models.financeiro import DescricaoMovimentacaoFinanceira, MeioPagamento
+from medicos.models.fiscal import Aliquotas
+from medicos.rastreamento import span
+from medicos.services.busca import invalidar_cache_busca, normalizar_busca
+from medicos.services.debitos_despesas import sincronizar_debitos_despesas
+from medicos.services.eventos_dominio import registrar_evento
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 500
+
+SECAO_GRUPOS_DESPESA = 'grupos_despesa'
+SECAO_DESCRICOES = 'descricoes_movimentacao'
+SECAO_MEIOS_PAGAMENTO = 'meios_pagamento'
+SECAO_ALIQUOTAS = 'aliquotas'
+SECAO_RATEIO = 'rateio'
+SECOES_CLONAGEM = (
+    SECAO_GRUPOS_DESPESA, SECAO_DESCRICOES, SECAO_MEIOS_PAGAMENTO, SECAO_ALIQUOTAS, SECAO_RATEIO,
+)
+
+
+def _vigencias_se_sobrepoem(vigencia, outra):
+    """Vigências (início, fim) se sobrepõem; início/fim vazios são abertos."""
+    inicio, fim = vigencia[0] or date.min, vigencia[1] or date.max
+    outro_inicio, outro_fim = outra[0] or date.min, outra[1] or date.max
+    return inicio <= outro_fim and outro_inicio <= fim
+
+
+class ClonagemCadastrosService:
+    """
+    Copia os cadastros de `empresa_origem` para `empresa_destino`.
+
+    Cada método `clonar_<secao>` pode ser usado isoladamente (telas de
+    importação) e devolve um dict de contadores; `clonar` executa as seções
+    pedidas em uma única transação (implantação de uma empresa nova a partir
+    de uma empresa modelo).
+    """
+
+    def __init__(self, empresa_origem, empresa_destino, usuario=None):
+        self.origem = empresa_origem
+        self.destino = empresa_destino
+        self.usuario = usuario
+
+    @property
+    def nome_origem(self):
+        return self.origem.nome_fantasia or self.origem.name
+
+    # Grupos e itens de despesa
+
+    def clonar_grupos_despesa(self):
+        """
+        Cria os grupos ausentes e, em todos os grupos (novos ou existentes),
+        os itens ausentes.
+
+        Returns:
+            dict: {'grupos_importados', 'itens_importados', 'grupos_ignorados', 'itens_ignorados'}
+        """
+        grupos_origem = list(GrupoDespesa.objects.filter(empresa=self.origem).order_by('id'))
+        itens_origem = list(
+            ItemDespesa.objects.filter(grupo_despesa__empresa=self.origem)
+            .select_related('grupo_despesa').order_by('id')
+        )
+        codigos_existentes = set(
+            GrupoDespesa.objects.filter(empresa=self.destino).values_list('codigo', flat=True)
+        )
+        novos_grupos = [
+            GrupoDespesa(
+                empresa=self.destino,
+                codigo=grupo.codigo,
+                descricao=grupo.descricao,
+                tipo_rateio=grupo.tipo_rateio,
+                created_by=self.usuario,
+            )
+            for grupo in grupos_origem if grupo.codigo not in codigos_existentes
+        ]
+        GrupoDespesa.objects.bulk_create(novos_grupos, batch_size=TAMANHO_LOTE, ignore_conflicts=True)
+
+        # ignore_conflicts não devolve as PKs: relê os grupos do destino para remapear os itens
+        grupos_destino = dict(
+            GrupoDespesa.objects.filter(empresa=self.destino).values_list('codigo', 'id')
+        )
+        itens_existentes = set(
+            ItemDespesa.objects.filter(grupo_despesa__empresa=self.destino)
+            .values_list('grupo_despesa__codigo', 'codigo')
+        )
+        novos_itens = [
+            ItemDespesa(
+                grupo_despesa_id=grupos_destino[item.grupo_despesa.codigo],
+                codigo=item.codigo,
+                descricao=item.descricao,
+                # bulk_create não passa pelo save(): coluna de busca preenchida aqui
+                descricao_busca=normalizar_busca(item.descricao),
+                created_by=self.usuario,
+            )
+            for item in itens_origem
+            if (item.grupo_despesa.codigo, item.codigo) not in itens_existentes
+            and item.grupo_despesa.codigo in grupos_destino
+        ]
+        ItemDespesa.objects.bulk_create(novos_itens, batch_size=TAMANHO_LOTE, ignore_conflicts=True)
+        # bulk_create não dispara signals: descarta os prefixos do autocomplete da empresa
+        transaction.on_commit(lambda: invalidar_cache_busca(self.destino.id))
+
+        return {
+            'grupos_importados': len(novos_grupos),
+            'itens_importados': len(novos_itens),
+            'grupos_ignorados': len(grupos_origem) - len(novos_grupos),
+            'itens_ignorados': len(itens_origem) - len(novos_itens),
+        }
+
+    # Descrições de movimentação
+
+    @staticmethod
+    def _chave_descricao(codigo_contabil, descricao):
+        return ('codigo', codigo_contabil) if codigo_contabil else ('descricao', descricao)
+
+    def clonar_descricoes_movimentacao(self):
+        """
+        Returns:
+            dict: {'criadas', 'duplicadas'}
+        """
+        descricoes_origem = list(
+            DescricaoMovimentacaoFinanceira.objects.filter(empresa=self.origem).order_by('id')
+        )
+        existentes = {
+            self._chave_descricao(codigo, descricao)
+            for codigo, descricao in DescricaoMovimentacaoFinanceira.objects.filter(
+                empresa=self.destino
+            ).values_list('codigo_contabil', 'descricao')
+        }
+        novas = []
+        for descricao in descricoes_origem:
+            chave = self._chave_descricao(descricao.codigo_contabil, descricao.descricao)
+            if chave in existentes:
+                continue
+            existentes.add(chave)
+            novas.append(DescricaoMovimentacaoFinanceira(
+                empresa=self.destino,
+                descricao=descricao.descricao,
+                codigo_contabil=descricao.codigo_contabil,
+                created_by=self.usuario,
+            ))
+        DescricaoMovimentacaoFinanceira.objects.bulk_create(novas, batch_size=TAMANHO_LOTE, ignore_conflicts=True)
+        return {'criadas': len(novas), 'duplicadas': len(descricoes_origem) - len(novas)}
+
+    # Meios de pagamento
+
+    def clonar_meios_pagamento(self):
+        """
+        Returns:
+            dict: {'importados', 'ignorados'}
+        """
+        meios_origem = list(MeioPagamento.objects.filter(empresa=self.origem).order_by('id'))
+        codigos_existentes = set(
+            MeioPagamento.objects.filter(empresa=self.destino).values_list('codigo', flat=True)
+        )
+        novos = [
+            MeioPagamento(
+                empresa=self.destino,
+                codigo=meio.codigo,
+                nome=meio.nome,
+                ativo=meio.ativo,
+                created_by=self.usuario,
+            )
+            for meio in meios_origem if meio.codigo not in codigos_existentes
+        ]
+        MeioPagamento.objects.bulk_create(novos, batch_size=TAMANHO_LOTE, ignore_conflicts=True)
+        return {'importados': len(novos), 'ignorados': len(meios_origem) - len(novos)}
+
+    # Alíquotas
+
+    def clonar_aliquotas(self):
+        """
+        Copia as configurações de alíquotas cuja vigência o destino ainda não tem.
+
+        Mantém a regra do modelo de uma única alíquota ativa por empresa: a
+        cópia só chega ativa se o destino não tiver nenhuma ativa. Cada cópia
+        passa pelo full_clean() do modelo e vigências que se sobrepõem às do
+        destino são ignoradas. Como o bulk_create não dispara post_save, o
+        evento aliquota_alterada de cada cópia é registrado aqui (adicional de
+        IR dos trimestres da vigência).
+
+        Returns:
+            dict: {'importadas', 'ignoradas', 'sobrepostas'}
+
+        Raises:
+            ValidationError: Alíquota da origem inválida (ex: vigência invertida)
+        """
+        aliquotas_origem = list(
+            Aliquotas.objects.filter(empresa=self.origem).order_by('-ativa', '-data_vigencia_inicio', 'id')
+        )
+        destino = Aliquotas.objects.filter(empresa=self.destino)
+        vigencias_existentes = set(destino.values_list('data_vigencia_inicio', 'data_vigencia_fim'))
+        pode_ativar = not destino.filter(ativa=True).exists()
+
+        campos_copiados = [
+            campo.name for campo in Aliquotas._meta.concrete_fields
+            if not campo.primary_key and campo.name not in (
+                'empresa', 'ativa', 'created_at', 'updated_at', 'created_by', 'observacoes',
+            )
+        ]
+        novas, sobrepostas = [], 0
+        for aliquota in aliquotas_origem:
+            vigencia = (aliquota.data_vigencia_inicio, aliquota.data_vigencia_fim)
+            if vigencia in vigencias_existentes:
+                continue
+            if any(_vigencias_se_sobrepoem(vigencia, existente) for existente in vigencias_existentes):
+                sobrepostas += 1
+                continue
+            ativa = aliquota.ativa and pode_ativar
+            nova = Aliquotas(
+                empresa=self.destino,
+                ativa=ativa,
+                created_by=self.usuario,
+                observacoes=f"Importado de {self.nome_origem} - {aliquota.observacoes}",
+                **{campo: getattr(aliquota, campo) for campo in campos_copiados},
+            )
+            nova.full_clean()
+            vigencias_existentes.add(vigencia)
+            pode_ativar = pode_ativar and not ativa
+            novas.append(nova)
+        Aliquotas.objects.bulk_create(novas, batch_size=TAMANHO_LOTE)
+        for nova in novas:
+            registrar_evento(
+                EventoDominio.TIPO_ALIQUOTA_ALTERADA, f'aliquotas:{nova.pk}', self.destino.id,
+                data_vigencia_inicio=nova.data_vigencia_inicio,
+                data_vigencia_fim=nova.data_vigencia_fim,
+            )
+        return {
+            'importadas': len(novas),
+            'ignoradas': len(aliquotas_origem) - len(novas),
+            'sobrepostas': sobrepostas,
+        }
+
+    # Matriz de rateio
+
+    def clonar_rateio(self):
+        """
+        Copia a matriz de rateio do mês mais recente da origem para o mesmo mês
+        no destino.
+
+        Itens são casados por (código do grupo, código do item) e sócios pela
+        pessoa; linhas sem correspondência no destino são ignoradas, assim
+        como (item, sócio, mês) já rateados. Despesas rateadas do destino nos
+        itens afetados têm os débitos da conta corrente recalculados, como o
+        signal de ItemDespesaRateioMensal faria.
+
+        Returns:
+            dict: {'competencia', 'importados', 'ignorados', 'debitos_criados'}
+        """
+        rateios = ItemDespesaRateioMensal.objects.filter(item_despesa__grupo_despesa__empresa=self.origem)
+        competencia = rateios.order_by('-data_referencia').values_list('data_referencia', flat=True).first()
+        if competencia is None:
+            return {'competencia': None, 'importados': 0, 'ignorados': 0, 'debitos_criados': 0}
+
+        rateios_origem = list(
+            rateios.filter(data_referencia=competencia)
+            .values_list('item_despesa__grupo_despesa__codigo', 'item_despesa__codigo',
+                         'socio__pessoa_id', 'percentual_rateio', 'ativo', 'observacoes')
+        )
+        # Só itens de grupos COM RATEIO aceitam rateio (validação do modelo)
+        itens_destino = {
+            (grupo, item): item_id
+            for item_id, grupo, item in ItemDespesa.objects.filter(
+                grupo_despesa__empresa=self.destino,
+                grupo_despesa__tipo_rateio=GrupoDespesa.Tipo_t.COM_RATEIO,
+            ).values_list('id', 'grupo_despesa__codigo', 'codigo')
+        }
+        socios_destino = {}
+        for socio_id, pessoa_id in Socio.objects.filter(
+            empresa=self.destino, ativo=True
+        ).order_by('id').values_list('id', 'pessoa_id'):
+            socios_destino.setdefault(pessoa_id, socio_id)
+        existentes = set(
+            ItemDespesaRateioMensal.objects.filter(
+                item_despesa__grupo_despesa__empresa=self.destino, data_referencia=competencia
+            ).values_list('item_despesa_id', 'socio_id')
+        )
+
+        novos = []
+        for grupo, item, pessoa_id, percentual, ativo, observacoes in rateios_origem:
+            item_id = itens_destino.get((grupo, item))
+            socio_id = socios_destino.get(pessoa_id)
+            if item_id is None or socio_id is None or (item_id, socio_id) in existentes:
+                continue
+            existentes.add((item_id, socio_id))
+            novos.append(ItemDespesaRateioMensal(
+                item_despesa_id=item_id,
+                socio_id=socio_id,
+                data_referencia=competencia,
+                percentual_rateio=percentual,
+                ativo=ativo,
+                observacoes=observacoes,
+            ))
+        ItemDespesaRateioMensal.objects.bulk_create(novos, batch_size=TAMANHO_LOTE, ignore_conflicts=True)
+
+        debitos_criados = 0
+        itens_afetados = {rateio.item_despesa_id for rateio in novos}
+        if itens_afetados:
+            despesas = DespesaRateada.objects.filter(
+                item_despesa_id__in=itens_afetados,
+                data__year=competencia.year,
+                data__month=competencia.month,
+            ).select_related('item_despesa')
+            debitos_criados = sincronizar_debitos_despesas(
+                self.destino.id, despesas_rateadas=despesas, usuario=self.usuario
+            )['criados']
+
+        return {
+            'competencia': competencia,
+            'importados': len(novos),
+            'ignorados': len(rateios_origem) - len(novos),
+            'debitos_criados': debitos_criados,
+        }
+
+    # Execução completa
+
+    def clonar(self, secoes=SECOES_CLONAGEM):
+        """
+        Executa as seções pedidas, na ordem de dependência, em uma transação.
+
+        Returns:
+            dict: seção -> contadores da seção
+        """
+        invalidas = set(secoes) - set(SECOES_CLONAGEM)
+        if invalidas:
+            raise ValueError(f"Seções de clonagem inválidas: {', '.join(sorted(invalidas))}")
+
+        resultado = {}
+        with span('clonagem.cadastros', logger, origem=self.origem.id, destino=self.destino.id) as s:
+            with transaction.atomic():
+                for secao in SECOES_CLONAGEM:
+                    if secao in secoes:
+                        resultado[secao] = getattr(self, f'clonar_{secao}')()
+            s.anotar(secoes=list(resultado))
+        logger.info(
+            f"Cadastros clonados de {self.origem.id} para {self.destino.id}: "
+            + ', '.join(f'{secao}={contadores}' for secao, contadores in resultado.items())
+        )
+        return resultado
+
+    @classmethod
+    def para_empresas(cls, empresa_origem_id, empresa_destino, usuario=None):
+        """
+        Monta o serviço validando a origem: mesma conta do destino e empresa diferente.
+
+        Raises:
+            ValueError: com a mensagem exibida ao usuário
+        """
+        try:
+            empresa_origem = Empresa.objects.get(id=empresa_origem_id, conta_id=empresa_destino.conta_id)
+        except (Empresa.DoesNotExist, ValueError, TypeError):
+            raise ValueError('Empresa origem não encontrada ou não pertence à sua conta')
+        if empresa_origem.id == empresa_destino.id:
+            raise ValueError('Não é possível importar da mesma empresa')
+        return cls(empresa_origem, empresa_destino, usuario=usuario)
@@ -0,0 +1,215 @@
+"""
+Serviço de cópia em lote das despesas de um mês para o mês seguinte
+
+Substitui a cópia linha a linha de `views_despesas.copiar_despesas_mes_anterior`,
+que disparava um signal de sincronização com a conta corrente por despesa
+criada/excluída. Aqui as despesas são gravadas com bulk_create/bulk_update e
+os débitos derivados são recalculados em uma única passada por
+`medicos/services/debitos_despesas.py`.
+
+Modos:
+- MODO_SUBSTITUIR: apaga o mês de destino e recria tudo a partir da origem
+  (comportamento histórico da tela "Copiar do mês anterior").
+- MODO_DIFERENCIAL: compara origem x destino e só cria, altera ou remove
+  as despesas que de fato mudaram; despesas idênticas não são tocadas.
+"""
+from datetime import date
+import logging
+
+from django.db import transaction
+
+from medicos.models.despesas import DespesaRateada, DespesaSocio
+from medicos.services.debitos_despesas import (
+    remover_debitos_despesas,
+    sincronizar_debitos_despesas,
+)
+from medicos.signals_financeiro import sincronizacao_despesas_suspensa
+
+logger = logging.getLogger(__name__)
+
+MODO_SUBSTITUIR = 'substituir'
+MODO_DIFERENCIAL = 'diferencial'
+MODOS_COPIA = (MODO_SUBSTITUIR, MODO_DIFERENCIAL)
+
+# Campos copiados da origem e comparados no modo diferencial
+CAMPOS_COPIADOS = ('valor', 'possui_rateio')
+
+
+def _mes_anterior(ano, mes):
+    if mes == 1:
+        return ano - 1, 12
+    return ano, mes - 1
+
+
+def _chave_rateada(despesa):
+    return (despesa.item_despesa_id,)
+
+
+def _chave_socio(despesa):
+    return (despesa.item_despesa_id, despesa.socio_id)
+
+
+def _parear_despesas(origem, destino, chave):
+    """
+    Pareia despesas de origem e destino pela chave de negócio.
+
+    Como pode haver mais de uma despesa por chave no mês, os grupos são
+    pareados por ordem de valor; sobras de origem viram criações e sobras
+    de destino viram exclusões.
+
+    Returns:
+        tuple: (pares [(origem, destino)], novas_origem, destino_excedente)
+    """
+    grupos_destino = {}
+    for despesa in destino:
+        grupos_destino.setdefault(chave(despesa), []).append(despesa)
+    grupos_origem = {}
+    for despesa in origem:
+        grupos_origem.setdefault(chave(despesa), []).append(despesa)
+
+    pares, novas, excedentes = [], [], []
+    for chave_grupo, despesas_origem in grupos_origem.items():
+        despesas_origem = sorted(despesas_origem, key=lambda d: (d.valor, d.pk))
+        despesas_destino = sorted(grupos_destino.pop(chave_grupo, []), key=lambda d: (d.valor, d.pk))
+        pares.extend(zip(despesas_origem, despesas_destino))
+        novas.extend(despesas_origem[len(despesas_destino):])
+        excedentes.extend(despesas_destino[len(despesas_origem):])
+    for despesas_destino in grupos_destino.values():
+        excedentes.extend(despesas_destino)
+    return pares, novas, excedentes
+
+
+class CopiaDespesasService:
+    """
+    Copia as despesas (rateadas e de sócio) de uma empresa do mês anterior
+    para o mês de competência informado, em número constante de queries.
+    """
+
+    def __init__(self, empresa_id, usuario=None):
+        self.empresa_id = empresa_id
+        self.usuario = usuario
+
+    def _despesas_mes(self, modelo, ano, mes):
+        return modelo.objects.filter(
+            item_despesa__grupo_despesa__empresa_id=self.empresa_id,
+            data__year=ano,
+            data__month=mes,
+        ).select_related('item_despesa')
+
+    def _despesas_destino(self, modelo, destino):
+        return modelo.objects.filter(
+            item_despesa__grupo_despesa__empresa_id=self.empresa_id,
+            data=destino,
+        ).select_related('item_despesa')
+
+    def _nova_rateada(self, origem, destino):
+        return DespesaRateada(
+            item_despesa=origem.item_despesa,
+            data=destino,
+            valor=origem.valor,
+            possui_rateio=origem.possui_rateio,
+            created_by=self.usuario,
+        )
+
+    def _nova_socio(self, origem, destino):
+        return DespesaSocio(
+            item_despesa=origem.item_despesa,
+            socio_id=origem.socio_id,
+            data=destino,
+            valor=origem.valor,
+            possui_rateio=origem.possui_rateio,
+            created_by=self.usuario,
+        )
+
+    def copiar(self, ano, mes, modo=MODO_SUBSTITUIR):
+        """
+        Executa a cópia para a competência ano/mes.
+
+        Returns:
+            dict: contadores da operação (copiadas, criadas, atualizadas,
+            removidas, inalteradas, debitos_criados, debitos_removidos)
+        """
+        if modo not in MODOS_COPIA:
+            raise ValueError(f'Modo de cópia inválido: {modo}')
+
+        destino = date(ano, mes, 1)
+        origem_ano, origem_mes = _mes_anterior(ano, mes)
+        logger.info(
+            f"[COPIA DESPESAS] Origem: {origem_mes:02d}/{origem_ano}, "
+            f"Destino: {mes:02d}/{ano}, Modo: {modo}"
+        )
+
+        origem_rateadas = list(self._despesas_mes(DespesaRateada, origem_ano, origem_mes))
+        origem_socios = list(self._despesas_mes(DespesaSocio, origem_ano, origem_mes))
+        destino_rateadas = list(self._despesas_destino(DespesaRateada, destino))
+        destino_socios = list(self._despesas_destino(DespesaSocio, destino))
+
+        if modo == MODO_SUBSTITUIR:
+            pares_rateadas, novas_rateadas, remover_rateadas = [], origem_rateadas, destino_rateadas
+            pares_socios, novas_socios, remover_socios = [], origem_socios, destino_socios
+        else:
+            pares_rateadas, novas_rateadas, remover_rateadas = _parear_despesas(
+                origem_rateadas, destino_rateadas, _chave_rateada
+            )
+            pares_socios, novas_socios, remover_socios = _parear_despesas(
+                origem_socios, destino_socios, _chave_socio
+            )
+
+        alteradas_rateadas = self._aplicar_alteracoes(pares_rateadas)
+        alteradas_socios = self._aplicar_alteracoes(pares_socios)
+
+        with transaction.atomic(), sincronizacao_despesas_suspensa():
+            debitos_removidos = remover_debitos_despesas(
+                [d.pk for d in remover_rateadas],
+                [d.pk for d in remover_socios],
+                empresa_id=self.empresa_id,
+            )
+            if remover_rateadas:
+                DespesaRateada.objects.filter(pk__in=[d.pk for d in remover_rateadas]).delete()
+            if remover_socios:
+                DespesaSocio.objects.filter(pk__in=[d.pk for d in remover_socios]).delete()
+
+            if alteradas_rateadas:
+                DespesaRateada.objects.bulk_update(alteradas_rateadas, CAMPOS_COPIADOS, batch_size=500)
+            if alteradas_socios:
+                DespesaSocio.objects.bulk_update(alteradas_socios, CAMPOS_COPIADOS, batch_size=500)
+
+            criadas_rateadas = DespesaRateada.objects.bulk_create(
+                [self._nova_rateada(d, destino) for d in novas_rateadas], batch_size=500
+            )
+            criadas_socios = DespesaSocio.objects.bulk_create(
+                [self._nova_socio(d, destino) for d in novas_socios], batch_size=500
+            )
+
+            debitos = sincronizar_debitos_despesas(
+                self.empresa_id,
+                despesas_rateadas=criadas_rateadas + alteradas_rateadas,
+                despesas_socio=criadas_socios + alteradas_socios,
+                usuario=self.usuario,
+            )
+
+        resultado = {
+            'copiadas': len(origem_rateadas) + len(origem_socios),
+            'criadas': len(criadas_rateadas) + len(criadas_socios),
+            'atualizadas': len(alteradas_rateadas) + len(alteradas_socios),
+            'removidas': len(remover_rateadas) + len(remover_socios),
+            'inalteradas': (
+                len(pares_rateadas) + len(pares_socios)
+                - len(alteradas_rateadas) - len(alteradas_socios)
+            ),
+            'debitos_criados': debitos['criados'],
+            'debitos_removidos': debitos_removidos + debitos['removidos'],
+        }
+        logger.info(f"[COPIA DESPESAS] Resultado: {resultado}")
+        return resultado
+
+    def _aplicar_alteracoes(self, pares):
+        """Copia os campos da origem para o destino e devolve apenas os destinos alterados."""
+        alteradas = []
+        for origem, destino in pares:
+            if all(getattr(origem, campo) == getattr(destino, campo) for campo in CAMPOS_COPIADOS):
+                continue
+            for campo in CAMPOS_COPIADOS:
+                setattr(destino, campo, getattr(origem, campo))
+            alteradas.append(destino)
+        return alteradas
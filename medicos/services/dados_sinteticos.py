@@ -0,0 +1,450 @@
+"""
+Geração de dados sintéticos para benchmarks
+
+Semeia tenants completos (Conta/Empresa/sócios) em escala configurável, com a
+mesma forma dos dados de produção usados pelos caminhos pesados de relatório:
+- alíquotas vigentes, meios de pagamento e descrições de movimentação;
+- grupos/itens de despesa com matriz mensal de rateio (ItemDespesaRateioMensal)
+  fechando 100% por item;
+- notas fiscais com rateio entre médicos (services/rateio_nota_fiscal.calcular_rateio),
+  parte recebida (créditos na conta corrente), parte pendente e canceladas;
+- despesas rateadas e individuais com os débitos derivados na conta corrente
+  (services/debitos_despesas.py);
+- lançamentos financeiros (Financeiro) por sócio e mês.
+
+Tudo é gravado com bulk_create e os signals de sincronização suspensos, de modo
+que a geração não depende dos caminhos que se quer medir. Os tenants gerados
+usam contas com o prefixo PREFIXO_CONTA e podem ser removidos com
+`remover_dados_sinteticos`. Usado pelos comandos `gerar_dados_sinteticos` e
+`benchmark_relatorios`.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+import calendar
+import logging
+import random
+
+from django.db import transaction
+from django.utils import timezone
+
+from medicos.models.base import (
+    Conta, Empresa, Pessoa, Socio, REGIME_TRIBUTACAO_CAIXA, REGIME_TRIBUTACAO_COMPETENCIA,
+)
+from medicos.models.conta_corrente import MovimentacaoContaCorrente
+from medicos.models.despesas import (
+    DespesaRateada, DespesaSocio, GrupoDespesa, ItemDespesa, ItemDespesaRateioMensal,
+)
+from medicos.models.financeiro import DescricaoMovimentacaoFinanceira, Financeiro, MeioPagamento
+from medicos.models.fiscal import Aliquotas, NotaFiscal, NotaFiscalRateioMedico
+from medicos.services.busca import normalizar_busca, preencher_colunas_busca
+from medicos.services.centavos import aplicar_percentual, de_centavos, ratear_centavos
+from medicos.services.debitos_despesas import sincronizar_debitos_despesas
+from medicos.services.rateio_nota_fiscal import calcular_rateio
+from medicos.signals_financeiro import sincronizacao_despesas_suspensa, totais_rateio_suspensos
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_CONTA = 'Sintética'
+TAMANHO_LOTE = 1000
+
+NAMESPACE_NFSE = 'http://www.abrasf.org.br/nfse.xsd'
+
+ITENS_COM_RATEIO = ('Aluguel', 'Folha de pagamento', 'Contabilidade', 'Energia', 'Internet', 'Material de consumo')
+ITENS_SEM_RATEIO = ('Previdência privada', 'Plano de saúde', 'Anuidade CRM', 'Congressos')
+DESCRICOES_FINANCEIRO = ('Adiantamento de lucros', 'Distribuição de lucros', 'Reembolso de despesas')
+DESCRICAO_RECEBIMENTO = 'Recebimento de nota fiscal'
+TOMADORES = ('Hospital São Lucas', 'Clínica Vida', 'Unimed Regional', 'Prefeitura Municipal', 'Hospital Santa Casa')
+
+# Parâmetros de alíquota usados em todos os tenants sintéticos
+ALIQUOTAS_PADRAO = {
+    'ISS': Decimal('2.00'),
+    'ISS_RETENCAO': Decimal('0.00'),
+    'PIS': Decimal('0.65'),
+    'COFINS': Decimal('3.00'),
+    'IRPJ_ALIQUOTA': Decimal('15.00'),
+    'IRPJ_PRESUNCAO_OUTROS': Decimal('32.00'),
+    'IRPJ_PRESUNCAO_CONSULTA': Decimal('32.00'),
+    'IRPJ_VALOR_BASE_INICIAR_CAL_ADICIONAL': Decimal('60000.00'),
+    'IRPJ_ADICIONAL': Decimal('10.00'),
+    'CSLL_ALIQUOTA': Decimal('9.00'),
+    'CSLL_PRESUNCAO_OUTROS': Decimal('32.00'),
+    'CSLL_PRESUNCAO_CONSULTA': Decimal('32.00'),
+    'IRPJ_RETENCAO_FONTE': Decimal('1.50'),
+    'CSLL_RETENCAO_FONTE': Decimal('1.00'),
+}
+
+
+def cnpj_sintetico(semente, indice):
+    """CNPJ numérico (14 dígitos, sem DV válido) único por semente/índice."""
+    return f'{semente % 10 ** 6:06d}{indice:04d}0001'[:14]
+
+
+def gerar_xml_nfse(cnpj_prestador, numero, data_emissao, valor_bruto, tomador='Tomador Sintético',
+                   cnpj_tomador='00000000000000', iss_retido=False):
+    """
+    Monta um XML de NFS-e no padrão ABRASF (CompNfse) aceito por
+    `NotaFiscalImportXMLView`.
+
+    Returns:
+        bytes: conteúdo do arquivo XML
+    """
+    valor_bruto = Decimal(valor_bruto).quantize(Decimal('0.01'))
+    centavos = int(valor_bruto.scaleb(2))
+    valores = {
+        'ValorIss': aplicar_percentual(centavos, ALIQUOTAS_PADRAO['ISS']),
+        'ValorPis': aplicar_percentual(centavos, ALIQUOTAS_PADRAO['PIS']),
+        'ValorCofins': aplicar_percentual(centavos, ALIQUOTAS_PADRAO['COFINS']),
+        'ValorIr': aplicar_percentual(centavos, ALIQUOTAS_PADRAO['IRPJ_RETENCAO_FONTE']),
+        'ValorCsll': aplicar_percentual(centavos, ALIQUOTAS_PADRAO['CSLL_RETENCAO_FONTE']),
+    }
+    # ISS não retido (IssRetido=2) não é descontado do líquido
+    liquido = centavos - sum(valores.values()) + (0 if iss_retido else valores['ValorIss'])
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?>'
+        f'<ConsultarNfseResposta xmlns="{NAMESPACE_NFSE}"><ListaNfse><CompNfse><Nfse><InfNfse>'
+        f'<Numero>{numero}</Numero>'
+        f'<DataEmissao>{data_emissao:%Y-%m-%d}T10:00:00</DataEmissao>'
+        f'<ValoresNfse><BaseCalculo>{valor_bruto}</BaseCalculo>'
+        f'<ValorIss>{de_centavos(valores["ValorIss"])}</ValorIss>'
+        f'<ValorLiquidoNfse>{de_centavos(liquido)}</ValorLiquidoNfse></ValoresNfse>'
+        f'<DeclaracaoPrestacaoServico><InfDeclaracaoPrestacaoServico>'
+        f'<Servico><Valores><ValorServicos>{valor_bruto}</ValorServicos>'
+        f'<ValorPis>{de_centavos(valores["ValorPis"])}</ValorPis>'
+        f'<ValorCofins>{de_centavos(valores["ValorCofins"])}</ValorCofins>'
+        f'<ValorIr>{de_centavos(valores["ValorIr"])}</ValorIr>'
+        f'<ValorCsll>{de_centavos(valores["ValorCsll"])}</ValorCsll></Valores>'
+        f'<IssRetido>{1 if iss_retido else 2}</IssRetido>'
+        f'<Discriminacao>Serviços médicos (nota sintética {numero})</Discriminacao></Servico>'
+        f'<Prestador><CpfCnpj><Cnpj>{cnpj_prestador}</Cnpj></CpfCnpj></Prestador>'
+        f'<TomadorServico><IdentificacaoTomador><CpfCnpj><Cnpj>{cnpj_tomador}</Cnpj></CpfCnpj>'
+        f'</IdentificacaoTomador><RazaoSocial>{tomador}</RazaoSocial></TomadorServico>'
+        f'</InfDeclaracaoPrestacaoServico></DeclaracaoPrestacaoServico>'
+        f'</InfNfse></Nfse></CompNfse></ListaNfse></ConsultarNfseResposta>'
+    ).encode('utf-8')
+
+
+class GeradorDadosSinteticos:
+    """
+    Gera tenants sintéticos reprodutíveis (mesma semente, mesmos dados).
+
+    Args:
+        ano (int): ano das competências geradas
+        meses (int): quantidade de meses, a partir de janeiro
+        socios (int): sócios por empresa
+        notas_por_mes (int): notas fiscais emitidas por empresa/mês
+        despesas_por_mes (int): despesas (rateadas + individuais) por empresa/mês
+        lancamentos_por_mes (int): lançamentos Financeiro por sócio/mês
+        semente (int): semente do gerador pseudoaleatório
+        usuario: usuário gravado em created_by (opcional)
+    """
+
+    def __init__(self, ano, meses=12, socios=5, notas_por_mes=40, despesas_por_mes=20,
+                 lancamentos_por_mes=2, semente=0, usuario=None):
+        self.ano = int(ano)
+        self.meses = max(1, min(int(meses), 12))
+        self.socios = max(1, int(socios))
+        self.notas_por_mes = max(0, int(notas_por_mes))
+        self.despesas_por_mes = max(0, int(despesas_por_mes))
+        self.lancamentos_por_mes = max(0, int(lancamentos_por_mes))
+        self.semente = int(semente)
+        self.usuario = usuario
+
+    def competencias(self):
+        return [date(self.ano, mes, 1) for mes in range(1, self.meses + 1)]
+
+    def _data_no_mes(self, rnd, competencia):
+        ultimo_dia = calendar.monthrange(competencia.year, competencia.month)[1]
+        return competencia.replace(day=rnd.randint(1, ultimo_dia))
+
+    def gerar(self, empresas=1):
+        """
+        Gera `empresas` tenants (uma Conta e uma Empresa cada).
+
+        Returns:
+            list[dict]: resumo por empresa (ids e contagens)
+        """
+        return [self.gerar_empresa(indice) for indice in range(int(empresas))]
+
+    def gerar_empresa(self, indice):
+        """Gera um tenant completo em uma transação; retorna o resumo com as contagens."""
+        rnd = random.Random(f'{self.semente}:{indice}')
+        with transaction.atomic(), sincronizacao_despesas_suspensa(), totais_rateio_suspensos():
+            empresa, socios = self._criar_cadastros(rnd, indice)
+            aliquota = Aliquotas.objects.create(
+                empresa=empresa,
+                data_vigencia_inicio=date(self.ano - 1, 1, 1),
+                ativa=True,
+                created_by=self.usuario,
+                **ALIQUOTAS_PADRAO,
+            )
+            meios = MeioPagamento.objects.bulk_create([
+                MeioPagamento(empresa=empresa, codigo=codigo, nome=nome, created_by=self.usuario)
+                for codigo, nome in (('PIX', 'PIX'), ('TED', 'Transferência TED'), ('BOLETO', 'Boleto'))
+            ])
+            descricoes = {
+                descricao: DescricaoMovimentacaoFinanceira.objects.create(
+                    empresa=empresa, descricao=descricao, created_by=self.usuario
+                )
+                for descricao in DESCRICOES_FINANCEIRO + (DESCRICAO_RECEBIMENTO,)
+            }
+            itens_rateados, itens_individuais = self._criar_itens(empresa)
+            matrizes = self._criar_matrizes_rateio(rnd, itens_rateados, socios)
+            notas = self._criar_notas(rnd, empresa, aliquota, meios)
+            rateios = self._criar_rateios(rnd, notas, socios)
+            recebimentos = self._criar_recebimentos(notas, rateios, descricoes[DESCRICAO_RECEBIMENTO], meios)
+            despesas = self._criar_despesas(rnd, empresa, itens_rateados, itens_individuais, socios)
+            lancamentos = self._criar_financeiro(rnd, socios, descricoes)
+
+        resumo = {
+            'empresa_id': empresa.id,
+            'conta_id': empresa.conta_id,
+            'cnpj': empresa.cnpj,
+            'socios': len(socios),
+            'notas_fiscais': len(notas),
+            'rateios': len(rateios),
+            'rateios_mensais_despesa': matrizes,
+            'recebimentos_conta_corrente': recebimentos,
+            'despesas_rateadas': despesas['rateadas'],
+            'despesas_socio': despesas['socio'],
+            'debitos_conta_corrente': despesas['debitos'],
+            'lancamentos_financeiro': lancamentos,
+        }
+        logger.info(f"Tenant sintético gerado: {resumo}")
+        return resumo
+
+    def _criar_cadastros(self, rnd, indice):
+        conta = Conta.objects.create(
+            name=f'{PREFIXO_CONTA} {self.semente}-{indice}', created_by=self.usuario
+        )
+        empresa = Empresa.objects.create(
+            conta=conta,
+            name=f'Clínica Sintética {self.semente}-{indice} Ltda',
+            nome_fantasia=f'Sintética {self.semente}-{indice}',
+            cnpj=cnpj_sintetico(self.semente, indice),
+            # Alterna os regimes para exercitar as duas bases de apuração
+            regime_tributario=REGIME_TRIBUTACAO_CAIXA if indice % 2 else REGIME_TRIBUTACAO_COMPETENCIA,
+        )
+        pessoas = [
+            Pessoa(conta=conta, name=f'Médico Sintético {indice}-{i:03d}', crm=f'{rnd.randint(10000, 99999)}')
+            for i in range(self.socios)
+        ]
+        for pessoa in pessoas:
+            preencher_colunas_busca(pessoa)
+        pessoas = Pessoa.objects.bulk_create(pessoas)
+        socios = Socio.objects.bulk_create([
+            Socio(conta=conta, empresa=empresa, pessoa=pessoa, data_entrada=date(self.ano - 1, 1, 1))
+            for pessoa in pessoas
+        ])
+        return empresa, socios
+
+    def _criar_itens(self, empresa):
+        com_rateio = GrupoDespesa.objects.create(
+            empresa=empresa, codigo='GERAL', descricao='Despesas gerais',
+            tipo_rateio=GrupoDespesa.Tipo_t.COM_RATEIO, created_by=self.usuario,
+        )
+        sem_rateio = GrupoDespesa.objects.create(
+            empresa=empresa, codigo='SOCIO', descricao='Despesas de sócio',
+            tipo_rateio=GrupoDespesa.Tipo_t.SEM_RATEIO, created_by=self.usuario,
+        )
+        itens_rateados = ItemDespesa.objects.bulk_create([
+            ItemDespesa(grupo_despesa=com_rateio, codigo=f'G{i:02d}', descricao=descricao,
+                        descricao_busca=normalizar_busca(descricao), created_by=self.usuario)
+            for i, descricao in enumerate(ITENS_COM_RATEIO, start=1)
+        ])
+        itens_individuais = ItemDespesa.objects.bulk_create([
+            ItemDespesa(grupo_despesa=sem_rateio, codigo=f'S{i:02d}', descricao=descricao,
+                        descricao_busca=normalizar_busca(descricao), created_by=self.usuario)
+            for i, descricao in enumerate(ITENS_SEM_RATEIO, start=1)
+        ])
+        return itens_rateados, itens_individuais
+
+    def _criar_matrizes_rateio(self, rnd, itens, socios):
+        """Matriz mensal item x sócio com percentuais (2 casas) somando exatamente 100%."""
+        rateios = []
+        for competencia in self.competencias():
+            for item in itens:
+                # Percentuais em centésimos de ponto percentual: 10000 = 100,00%
+                pesos = [rnd.randint(1, 10) for _ in socios]
+                for socio, centesimos in zip(socios, ratear_centavos(10000, pesos)):
+                    rateios.append(ItemDespesaRateioMensal(
+                        item_despesa=item,
+                        socio=socio,
+                        data_referencia=competencia,
+                        percentual_rateio=de_centavos(centesimos),
+                        created_by=self.usuario,
+                    ))
+        ItemDespesaRateioMensal.objects.bulk_create(rateios, batch_size=TAMANHO_LOTE)
+        return len(rateios)
+
+    def _criar_notas(self, rnd, empresa, aliquota, meios):
+        notas = []
+        numero = 0
+        for competencia in self.competencias():
+            for _ in range(self.notas_por_mes):
+                numero += 1
+                emissao = self._data_no_mes(rnd, competencia)
+                bruto = rnd.randint(50_000, 3_000_000)  # R$ 500,00 a R$ 30.000,00, em centavos
+                impostos = {
+                    'val_ISS': aplicar_percentual(bruto, aliquota.ISS),
+                    'val_PIS': aplicar_percentual(bruto, aliquota.PIS),
+                    'val_COFINS': aplicar_percentual(bruto, aliquota.COFINS),
+                    'val_IR': aplicar_percentual(bruto, aliquota.IRPJ_RETENCAO_FONTE),
+                    'val_CSLL': aplicar_percentual(bruto, aliquota.CSLL_RETENCAO_FONTE),
+                }
+                sorteio = rnd.random()
+                status, recebimento = 'pendente', None
+                if sorteio < 0.02:
+                    status = 'cancelado'
+                elif sorteio < 0.85:
+                    # Recebimentos até 45 dias depois: desloca a base do regime de caixa
+                    status, recebimento = 'recebido', emissao + timedelta(days=rnd.randint(0, 45))
+                nota = NotaFiscal(
+                    numero=f'{numero:06d}',
+                    serie='1',
+                    empresa_destinataria=empresa,
+                    tomador=rnd.choice(TOMADORES),
+                    cnpj_tomador=f'{rnd.randint(10 ** 13, 10 ** 14 - 1)}',
+                    tipo_servico=rnd.choice((NotaFiscal.TIPO_SERVICO_CONSULTAS, NotaFiscal.TIPO_SERVICO_OUTROS)),
+                    descricao_servicos='Serviços médicos (nota sintética)',
+                    dtEmissao=emissao,
+                    dtVencimento=emissao + timedelta(days=30),
+                    dtRecebimento=recebimento,
+                    val_bruto=de_centavos(bruto),
+                    val_liquido=de_centavos(bruto - sum(impostos.values())),
+                    status_recebimento=status,
+                    meio_pagamento=rnd.choice(meios) if recebimento else None,
+                    aliquotas=aliquota,
+                    created_by=self.usuario,
+                    **{campo: de_centavos(valor) for campo, valor in impostos.items()},
+                )
+                preencher_colunas_busca(nota)
+                notas.append(nota)
+        return NotaFiscal.objects.bulk_create(notas, batch_size=TAMANHO_LOTE)
+
+    def _criar_rateios(self, rnd, notas, socios):
+        """Rateio integral de cada nota entre 1 e todos os sócios, com pesos aleatórios."""
+        rateios = []
+        agora = timezone.now()
+        for nota in notas:
+            participantes = rnd.sample(socios, rnd.randint(1, len(socios)))
+            pesos = [rnd.randint(1, 10) for _ in participantes]
+            brutos = ratear_centavos(int(nota.val_bruto.scaleb(2)), pesos)
+            valores = {socio.id: de_centavos(bruto) for socio, bruto in zip(participantes, brutos) if bruto > 0}
+            for medico_id, campos in calcular_rateio(nota, valores).items():
+                rateios.append(NotaFiscalRateioMedico(
+                    nota_fiscal=nota,
+                    medico_id=medico_id,
+                    tipo_rateio='valor',
+                    data_rateio=agora,
+                    configurado_por=self.usuario,
+                    **campos,
+                ))
+        NotaFiscalRateioMedico.objects.bulk_create(rateios, batch_size=TAMANHO_LOTE)
+        for inicio in range(0, len(notas), TAMANHO_LOTE):
+            NotaFiscal.atualizar_totais_rateio([nota.pk for nota in notas[inicio:inicio + TAMANHO_LOTE]])
+        return rateios
+
+    def _criar_recebimentos(self, notas, rateios, descricao, meios):
+        """Crédito na conta corrente de cada sócio pelo líquido rateado das notas recebidas."""
+        notas_por_id = {nota.pk: nota for nota in notas}
+        creditos = []
+        for rateio in rateios:
+            nota = notas_por_id[rateio.nota_fiscal_id]
+            if nota.status_recebimento != 'recebido':
+                continue
+            creditos.append(MovimentacaoContaCorrente(
+                empresa_id=nota.empresa_destinataria_id,
+                descricao_movimentacao=descricao,
+                instrumento_bancario=nota.meio_pagamento or meios[0],
+                nota_fiscal=nota,
+                socio_id=rateio.medico_id,
+                data_movimentacao=nota.dtRecebimento,
+                valor=rateio.valor_liquido_medico,
+                numero_documento_bancario=f'NF{nota.numero}',
+                historico_complementar=f'Recebimento NF {nota.numero}',
+                created_by=self.usuario,
+            ))
+        MovimentacaoContaCorrente.objects.bulk_create(creditos, batch_size=TAMANHO_LOTE)
+        return len(creditos)
+
+    def _criar_despesas(self, rnd, empresa, itens_rateados, itens_individuais, socios):
+        rateadas, individuais = [], []
+        for competencia in self.competencias():
+            for i in range(self.despesas_por_mes):
+                data_despesa = self._data_no_mes(rnd, competencia)
+                valor = de_centavos(rnd.randint(5_000, 800_000))
+                provisionada = rnd.random() < 0.1
+                classificacao = (
+                    DespesaRateada.TipoClassificacao.PROVISIONADA if provisionada
+                    else DespesaRateada.TipoClassificacao.NORMAL
+                )
+                # ~70% rateadas, o restante individual de um sócio
+                if i % 10 < 7:
+                    rateadas.append(DespesaRateada(
+                        item_despesa=rnd.choice(itens_rateados), data=data_despesa, valor=valor,
+                        tipo_classificacao=classificacao, possui_rateio=True, created_by=self.usuario,
+                    ))
+                else:
+                    individuais.append(DespesaSocio(
+                        item_despesa=rnd.choice(itens_individuais), socio=rnd.choice(socios),
+                        data=data_despesa, valor=valor, tipo_classificacao=classificacao,
+                        created_by=self.usuario,
+                    ))
+        DespesaRateada.objects.bulk_create(rateadas, batch_size=TAMANHO_LOTE)
+        DespesaSocio.objects.bulk_create(individuais, batch_size=TAMANHO_LOTE)
+
+        # Débitos derivados, como os gravaria a sincronização em lote
+        itens = {item.pk: item for item in itens_rateados + itens_individuais}
+        for despesa in rateadas + individuais:
+            despesa.item_despesa = itens[despesa.item_despesa_id]
+        debitos = sincronizar_debitos_despesas(
+            empresa.id, despesas_rateadas=rateadas, despesas_socio=individuais, usuario=self.usuario
+        )
+        return {'rateadas': len(rateadas), 'socio': len(individuais), 'debitos': debitos['criados']}
+
+    def _criar_financeiro(self, rnd, socios, descricoes):
+        lancamentos = []
+        for competencia in self.competencias():
+            for socio in socios:
+                for _ in range(self.lancamentos_por_mes):
+                    descricao = rnd.choice(DESCRICOES_FINANCEIRO)
+                    valor = de_centavos(rnd.randint(10_000, 1_500_000))
+                    lancamentos.append(Financeiro(
+                        socio=socio,
+                        descricao_movimentacao_financeira=descricoes[descricao],
+                        data_movimentacao=self._data_no_mes(rnd, competencia),
+                        # Adiantamentos/distribuições saem do sócio; reembolsos entram
+                        valor=valor if descricao == 'Reembolso de despesas' else -valor,
+                        created_by=self.usuario,
+                    ))
+        Financeiro.objects.bulk_create(lancamentos, batch_size=TAMANHO_LOTE)
+        return len(lancamentos)
+
+
+def empresas_sinteticas():
+    """Queryset das empresas pertencentes a contas sintéticas."""
+    return Empresa.objects.filter(conta__name__startswith=f'{PREFIXO_CONTA} ')
+
+
+def remover_dados_sinteticos():
+    """
+    Remove todos os tenants sintéticos.
+
+    A ordem respeita as FKs PROTECT (lançamentos -> descrições, notas ->
+    alíquotas, sócios -> conta/empresa/pessoa) antes de excluir as contas.
+
+    Returns:
+        int: quantidade de contas removidas
+    """
+    empresas = list(empresas_sinteticas().values_list('id', flat=True))
+    contas = Conta.objects.filter(name__startswith=f'{PREFIXO_CONTA} ')
+    with transaction.atomic(), sincronizacao_despesas_suspensa(), totais_rateio_suspensos():
+        MovimentacaoContaCorrente.objects.filter(empresa_id__in=empresas).delete()
+        Financeiro.objects.filter(socio__empresa_id__in=empresas).delete()
+        DespesaRateada.objects.filter(item_despesa__grupo_despesa__empresa_id__in=empresas).delete()
+        DespesaSocio.objects.filter(item_despesa__grupo_despesa__empresa_id__in=empresas).delete()
+        NotaFiscal.objects.filter(empresa_destinataria_id__in=empresas).delete()
+        Socio.objects.filter(empresa_id__in=empresas).delete()
+        contas.delete()
+    logger.info(f"Tenants sintéticos removidos: {len(empresas)} empresa(s)")
+    return len(empresas)
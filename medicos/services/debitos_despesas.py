@@ -0,0 +1,262 @@
+"""
+Serviço de sincronização em lote dos débitos de despesas na conta corrente
+
+Gera os lançamentos de débito (descrição, histórico e valor) das despesas
+rateadas e de sócio para um conjunto de despesas de uma só vez, com número
+constante de queries. Usado pelo consumidor de eventos de domínio
+(medicos/services/eventos_dominio.py) e pelas operações em lote.
+"""
+from bisect import bisect_right
+from datetime import date
+import logging
+
+from django.db.models import Min, Q
+
+from medicos.models.conta_corrente import MovimentacaoContaCorrente
+from medicos.models.despesas import DespesaRateada, ItemDespesaRateioMensal
+from medicos.models.financeiro import DescricaoMovimentacaoFinanceira
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de identificadores por cláusula OR ao localizar lançamentos existentes
+TAMANHO_LOTE_IDENTIFICADORES = 500
+
+
+def _identificador_rateada(despesa_id):
+    return f'Despesa Rateada ID: {despesa_id} - Sócio:'
+
+
+def _identificador_socio(despesa_id):
+    return f'(Despesa Sócio ID: {despesa_id})'
+
+
+def _filtrar_por_identificadores(identificadores, empresa_id=None):
+    """Retorna o queryset de lançamentos cujo histórico contém algum dos identificadores."""
+    identificadores = list(identificadores)
+    if not identificadores:
+        return MovimentacaoContaCorrente.objects.none()
+    filtro = Q()
+    for identificador in identificadores:
+        filtro |= Q(historico_complementar__contains=identificador)
+    lancamentos = MovimentacaoContaCorrente.objects.all()
+    if empresa_id is not None:
+        # Lançamentos antigos ainda sem empresa (antes do preencher_empresa_lancamentos)
+        # também são removidos, para não duplicar o débito recriado
+        lancamentos = lancamentos.filter(
+            Q(empresa_id=empresa_id) | Q(empresa__isnull=True, socio__empresa_id=empresa_id)
+        )
+    return lancamentos.filter(filtro)
+
+
+def remover_debitos_despesas(despesas_rateadas_ids=(), despesas_socio_ids=(), empresa_id=None):
+    """
+    Remove, em lote, os lançamentos de conta corrente gerados para as despesas informadas.
+
+    Os identificadores usam delimitadores completos ("... - Sócio:" e "...)")
+    para não casar IDs por prefixo (ex: ID 1 x ID 10). Com `empresa_id`, a
+    busca por histórico fica restrita aos lançamentos da empresa.
+
+    Returns:
+        int: Quantidade de lançamentos removidos
+    """
+    identificadores = (
+        [_identificador_rateada(pk) for pk in despesas_rateadas_ids] +
+        [_identificador_socio(pk) for pk in despesas_socio_ids]
+    )
+    total = 0
+    for inicio in range(0, len(identificadores), TAMANHO_LOTE_IDENTIFICADORES):
+        lote = identificadores[inicio:inicio + TAMANHO_LOTE_IDENTIFICADORES]
+        removidos, _ = _filtrar_por_identificadores(lote, empresa_id).delete()
+        total += removidos
+    return total
+
+
+def _obter_descricoes_debito(empresa_id, nomes, usuario=None):
+    """
+    Obtém (criando em lote as ausentes) as descrições "Débito <item>" da empresa.
+
+    Returns:
+        dict: nome da descrição -> DescricaoMovimentacaoFinanceira
+    """
+    nomes = set(nomes)
+    if not nomes:
+        return {}
+    descricoes = {}
+    for descricao in DescricaoMovimentacaoFinanceira.objects.filter(
+        empresa_id=empresa_id, descricao__in=nomes
+    ).order_by('id'):
+        # Mantém a mais antiga, como faria o get_or_create original
+        descricoes.setdefault(descricao.descricao, descricao)
+    ausentes = [
+        DescricaoMovimentacaoFinanceira(empresa_id=empresa_id, descricao=nome, created_by=usuario)
+        for nome in sorted(nomes - set(descricoes))
+    ]
+    if ausentes:
+        for descricao in DescricaoMovimentacaoFinanceira.objects.bulk_create(ausentes):
+            descricoes[descricao.descricao] = descricao
+    return descricoes
+
+
+def _nome_descricao(item_despesa):
+    descricao_despesa = item_despesa.descricao if item_despesa else "Despesa"
+    return f"Débito {descricao_despesa}"
+
+
+def _rateios_vigentes(rateios_por_socio, data_despesa):
+    """
+    Rateio vigente de cada sócio na data da despesa: o do mês de competência
+    ou, na falta dele, o mais recente de um mês anterior (mesma regra de
+    `despesas_apropriadas.percentual_rateio_vigente`).
+    """
+    mes = data_despesa.replace(day=1)
+    vigentes = []
+    for rateios in rateios_por_socio.values():
+        posicao = bisect_right([rateio.data_referencia for rateio in rateios], mes)
+        if posicao:
+            vigentes.append(rateios[posicao - 1])
+    return vigentes
+
+
+def despesas_rateadas_afetadas(itens_ids, data_referencia):
+    """
+    Despesas rateadas cujo débito depende do rateio dos itens no mês informado.
+
+    Pela regra de herança de `_rateios_vigentes`, o rateio de um sócio no mês M
+    vale também para os meses seguintes até o próximo rateio ativo próprio do
+    sócio para o item. O intervalo afetado de cada item vai de M até o mês em
+    que todos os seus sócios passam a ter rateio próprio; se algum sócio não
+    tiver rateio posterior, vai até o fim. Uma única query agrega os limites.
+
+    Args:
+        itens_ids (iterable): IDs dos itens de despesa cujo rateio mudou
+        data_referencia (date): qualquer dia do mês de competência alterado
+
+    Returns:
+        QuerySet: DespesaRateada afetadas, com `select_related('item_despesa')`
+    """
+    itens_ids = set(itens_ids)
+    if not itens_ids:
+        return DespesaRateada.objects.none()
+    mes = data_referencia.replace(day=1)
+    limites = {item_id: None for item_id in itens_ids}
+    ilimitados = set()
+    # Sócios com rateio (ativo ou não) até o mês: a alteração pode mudar o
+    # rateio herdado deles; o limite de cada um é o próximo rateio ativo próprio
+    for linha in ItemDespesaRateioMensal.objects.filter(
+        item_despesa_id__in=itens_ids,
+    ).values('item_despesa_id', 'socio_id').annotate(
+        primeiro=Min('data_referencia'),
+        proximo=Min('data_referencia', filter=Q(data_referencia__gt=mes, ativo=True)),
+    ):
+        if linha['primeiro'] > mes:
+            continue
+        item_id = linha['item_despesa_id']
+        if linha['proximo'] is None:
+            ilimitados.add(item_id)
+        elif limites[item_id] is None or linha['proximo'] > limites[item_id]:
+            limites[item_id] = linha['proximo']
+
+    filtro = Q()
+    for item_id in itens_ids:
+        condicao = Q(item_despesa_id=item_id, data__gte=mes)
+        if item_id not in ilimitados and limites[item_id] is not None:
+            condicao &= Q(data__lt=limites[item_id])
+        filtro |= condicao
+    return DespesaRateada.objects.filter(filtro).select_related('item_despesa')
+
+
+def sincronizar_debitos_despesas(empresa_id, despesas_rateadas=(), despesas_socio=(), usuario=None):
+    """
+    Recria, em uma única passada, os débitos de conta corrente das despesas informadas.
+
+    As despesas devem estar salvas (com pk) e, idealmente, carregadas com
+    `select_related('item_despesa')` para evitar consultas extras.
+
+    Fluxo (número constante de queries, independente do volume):
+    1. Remove os lançamentos existentes das despesas;
+    2. Carrega os rateios de todos os itens envolvidos em uma query e aplica,
+       por sócio, o rateio do mês ou o herdado do mês anterior mais recente;
+    3. Obtém/cria as descrições "Débito <item>" em lote;
+    4. Cria todos os lançamentos com bulk_create.
+
+    Returns:
+        dict: {'removidos': int, 'criados': int}
+    """
+    despesas_rateadas = list(despesas_rateadas)
+    despesas_socio = list(despesas_socio)
+
+    removidos = remover_debitos_despesas(
+        [d.pk for d in despesas_rateadas],
+        [d.pk for d in despesas_socio],
+        empresa_id=empresa_id,
+    )
+
+    # Rateios ativos por item e sócio, em ordem de mês de referência
+    rateios_por_item_socio = {}
+    if despesas_rateadas:
+        itens_ids = {d.item_despesa_id for d in despesas_rateadas if d.item_despesa_id}
+        meses = {d.data.replace(day=1) for d in despesas_rateadas if d.data}
+        rateios = ItemDespesaRateioMensal.objects.filter(
+            item_despesa_id__in=itens_ids,
+            data_referencia__lte=max(meses, default=date.min),
+            ativo=True,
+        ).order_by('data_referencia')
+        for rateio in rateios:
+            rateios_por_item_socio.setdefault(rateio.item_despesa_id, {}).setdefault(
+                rateio.socio_id, []
+            ).append(rateio)
+
+    # Monta (sem gravar) os lançamentos, aguardando a descrição definitiva
+    pendentes = []
+    for despesa in despesas_rateadas:
+        if not (despesa.data and despesa.valor and despesa.valor > 0 and despesa.item_despesa_id):
+            continue
+        nome_descricao = _nome_descricao(despesa.item_despesa)
+        for rateio in _rateios_vigentes(rateios_por_item_socio.get(despesa.item_despesa_id, {}), despesa.data):
+            if not rateio.percentual_rateio:
+                continue
+            valor_apropriado = despesa.valor * (rateio.percentual_rateio / 100)
+            if valor_apropriado <= 0:
+                continue
+            historico_identificador = f'Despesa Rateada ID: {despesa.id} - Sócio: {rateio.socio_id}'
+            pendentes.append((nome_descricao, MovimentacaoContaCorrente(
+                empresa_id=empresa_id,
+                socio_id=rateio.socio_id,
+                data_movimentacao=despesa.data,
+                valor=-abs(valor_apropriado),
+                instrumento_bancario=None,
+                numero_documento_bancario='',
+                historico_complementar=(
+                    f"{nome_descricao} (Rateio {rateio.percentual_rateio}% - {historico_identificador})"
+                ),
+                created_by_id=despesa.created_by_id,
+            )))
+
+    for despesa in despesas_socio:
+        if not (despesa.data and despesa.valor and despesa.valor > 0
+                and despesa.socio_id and despesa.item_despesa_id):
+            continue
+        nome_descricao = _nome_descricao(despesa.item_despesa)
+        pendentes.append((nome_descricao, MovimentacaoContaCorrente(
+            empresa_id=empresa_id,
+            socio_id=despesa.socio_id,
+            data_movimentacao=despesa.data,
+            valor=-abs(despesa.valor),
+            instrumento_bancario=None,
+            numero_documento_bancario='',
+            historico_complementar=f"{nome_descricao} (Despesa Sócio ID: {despesa.id})",
+            created_by_id=despesa.created_by_id,
+        )))
+
+    descricoes = _obter_descricoes_debito(empresa_id, {nome for nome, _ in pendentes}, usuario=usuario)
+    lancamentos = []
+    for nome_descricao, lancamento in pendentes:
+        lancamento.descricao_movimentacao = descricoes[nome_descricao]
+        lancamentos.append(lancamento)
+    MovimentacaoContaCorrente.objects.bulk_create(lancamentos, batch_size=500)
+
+    logger.info(
+        f"Débitos de despesas sincronizados em lote: empresa={empresa_id}, "
+        f"removidos={removidos}, criados={len(lancamentos)}"
+    )
+    return {'removidos': removidos, 'criados': len(lancamentos)}
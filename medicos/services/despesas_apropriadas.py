@@ -0,0 +1,161 @@
+"""
+Despesas apropriadas ao sócio calculadas no banco
+
+Uma despesa é "apropriada" ao sócio quando:
+- é uma DespesaSocio do próprio sócio (valor integral, sem taxa de rateio); ou
+- é uma DespesaRateada da empresa, apropriada pelo percentual de rateio do
+  sócio no item (ItemDespesaRateioMensal).
+
+O percentual é resolvido por subquery, com a mesma regra de
+`ItemDespesaRateioMensal.obter_rateio_para_despesa`: rateio ativo do mês de
+competência ou, na falta dele, o mais recente de um mês anterior; sem nenhum,
+0%. Ao contrário daquele método, a leitura não grava cópias de rateio.
+
+O queryset unificado (`despesas_apropriadas`) traz as duas origens com as
+mesmas colunas (dicts via values()), de modo que ordenação e paginação
+acontecem no banco. É compartilhado por ListaDespesasSocioView,
+views_relatorios.relatorio_mensal_socio e montar_relatorio_mensal_socio.
+"""
+from decimal import Decimal
+
+from django.db.models import CharField, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from medicos.models.base import Socio
+from medicos.models.despesas import DespesaRateada, DespesaSocio, ItemDespesaRateioMensal
+
+ORIGEM_RATEADA = 'rateada'
+ORIGEM_SOCIO = 'socio'
+
+TIPO_CLASSIFICACAO_NORMAL = 1
+TIPO_CLASSIFICACAO_PROVISIONADA = 2
+
+# Classificação crescente, depois data decrescente
+ORDENACAO_PADRAO = ('tipo_classificacao', '-data', 'id')
+
+# Colunas comuns às duas origens (campos do modelo + anotações, nesta ordem)
+CAMPOS = ('id', 'data', 'tipo_classificacao')
+ANOTACOES = ('origem', 'socio_nome', 'descricao', 'grupo', 'valor_total', 'taxa_rateio', 'valor_apropriado')
+
+_DECIMAL_VALOR = DecimalField(max_digits=14, decimal_places=2)
+_DECIMAL_PERCENTUAL = DecimalField(max_digits=5, decimal_places=2)
+
+
+def _filtrar_periodo(queryset, ano=None, mes=None):
+    if ano:
+        queryset = queryset.filter(data__year=ano)
+    if mes:
+        queryset = queryset.filter(data__month=mes)
+    return queryset
+
+
+def percentual_rateio_vigente(socio_id):
+    """
+    Expressão com o percentual de rateio do sócio vigente na data da despesa
+    rateada (OuterRef 'item_despesa' / 'data'), ou 0 se não houver.
+    """
+    rateio = ItemDespesaRateioMensal.objects.filter(
+        item_despesa=OuterRef('item_despesa'),
+        socio_id=socio_id,
+        ativo=True,
+        data_referencia__lte=OuterRef('data'),
+    ).order_by('-data_referencia').values('percentual_rateio')[:1]
+    return Coalesce(
+        Subquery(rateio, output_field=_DECIMAL_PERCENTUAL), Value(Decimal('0')),
+        output_field=_DECIMAL_PERCENTUAL,
+    )
+
+
+def despesas_rateadas_do_socio(empresa_id, socio_id, ano=None, mes=None):
+    """
+    DespesaRateada da empresa anotadas com taxa_rateio e valor_apropriado do sócio.
+
+    Com competência (ano e mês) lista todas as despesas do mês, inclusive as
+    de 0%; sem ela, apenas as que o sócio de fato rateia (percentual > 0).
+    """
+    despesas = _filtrar_periodo(
+        DespesaRateada.objects.filter(item_despesa__grupo_despesa__empresa_id=empresa_id), ano, mes
+    )
+    nome_socio = Socio.objects.filter(id=socio_id).values('pessoa__name')[:1]
+    despesas = despesas.annotate(
+        origem=Value(ORIGEM_RATEADA, output_field=CharField()),
+        socio_nome=Subquery(nome_socio, output_field=CharField()),
+        descricao=F('item_despesa__descricao'),
+        grupo=F('item_despesa__grupo_despesa__descricao'),
+        valor_total=F('valor'),
+        taxa_rateio=percentual_rateio_vigente(socio_id),
+    ).annotate(
+        valor_apropriado=Coalesce(
+            F('valor') * F('taxa_rateio') / Value(Decimal('100')), Value(Decimal('0')),
+            output_field=_DECIMAL_VALOR,
+        ),
+    )
+    if not (ano and mes):
+        despesas = despesas.filter(taxa_rateio__gt=0)
+    return despesas
+
+
+def despesas_individuais(empresa_id, socio_id=None, ano=None, mes=None):
+    """DespesaSocio da empresa (de um sócio, se informado) com as colunas de despesa apropriada."""
+    despesas = DespesaSocio.objects.filter(item_despesa__grupo_despesa__empresa_id=empresa_id)
+    if socio_id:
+        despesas = despesas.filter(socio_id=socio_id)
+    return _filtrar_periodo(despesas, ano, mes).annotate(
+        origem=Value(ORIGEM_SOCIO, output_field=CharField()),
+        socio_nome=F('socio__pessoa__name'),
+        descricao=F('item_despesa__descricao'),
+        grupo=F('item_despesa__grupo_despesa__descricao'),
+        valor_total=F('valor'),
+        taxa_rateio=Value(None, output_field=_DECIMAL_PERCENTUAL),
+        valor_apropriado=F('valor'),
+    )
+
+
+def _como_linhas(queryset):
+    return queryset.order_by().values(*CAMPOS, *ANOTACOES)
+
+
+def despesas_apropriadas(empresa_id, socio_id=None, ano=None, mes=None, ordenacao=ORDENACAO_PADRAO):
+    """
+    Queryset (dicts) das despesas apropriadas, pronto para ordenar e paginar no banco.
+
+    Sem `socio_id` retorna apenas as despesas individuais de todos os sócios
+    (não há percentual de rateio a aplicar).
+
+    Chaves: id, data, tipo_classificacao, origem, socio_nome, descricao,
+    grupo, valor_total, taxa_rateio (None nas individuais), valor_apropriado.
+    """
+    individuais = _como_linhas(despesas_individuais(empresa_id, socio_id, ano, mes))
+    if not socio_id:
+        return individuais.order_by(*ordenacao)
+    rateadas = _como_linhas(despesas_rateadas_do_socio(empresa_id, socio_id, ano, mes))
+    return rateadas.union(individuais, all=True).order_by(*ordenacao)
+
+
+def totais_despesas_apropriadas(empresa_id, socio_id=None, ano=None, mes=None):
+    """
+    Totais das despesas apropriadas calculados no banco (uma agregação por origem).
+
+    Returns:
+        dict: {'com_rateio', 'sem_rateio', 'normal', 'provisionadas', 'total'} em Decimal
+    """
+    def agregar(queryset):
+        return queryset.aggregate(
+            total=Sum('valor_apropriado'),
+            normal=Sum('valor_apropriado', filter=Q(tipo_classificacao=TIPO_CLASSIFICACAO_NORMAL)),
+            provisionadas=Sum('valor_apropriado', filter=Q(tipo_classificacao=TIPO_CLASSIFICACAO_PROVISIONADA)),
+        )
+
+    zero = Decimal('0')
+    sem_rateio = agregar(despesas_individuais(empresa_id, socio_id, ano, mes))
+    if socio_id:
+        com_rateio = agregar(despesas_rateadas_do_socio(empresa_id, socio_id, ano, mes))
+    else:
+        com_rateio = {}
+    totais = {
+        chave: (sem_rateio.get(chave) or zero) + (com_rateio.get(chave) or zero)
+        for chave in ('total', 'normal', 'provisionadas')
+    }
+    totais['sem_rateio'] = sem_rateio.get('total') or zero
+    totais['com_rateio'] = com_rateio.get('total') or zero
+    return totais
@@ -0,0 +1,310 @@
+"""
+Consumidor do outbox de eventos do domínio fiscal (EventoDominio)
+
+Os signals de medicos/signals_financeiro.py só registram, na transação que
+grava a nota, o rateio, a despesa ou as alíquotas, um evento compacto com
+`registrar_evento`. Os dados derivados são mantidos aqui, em lote:
+
+- débitos de despesas na conta corrente: recriados set-based por
+  medicos/services/debitos_despesas.py (mesmos lançamentos dos antigos
+  signals, com número constante de queries por lote);
+- cache da apuração trimestral do adicional de IR
+  (medicos/services/adicional_ir.py): trimestres afetados descartados com
+  um único delete_many.
+
+Eventos repetidos da mesma chave no lote são aplicados uma vez (ex: dez
+gravações da mesma despesa geram uma sincronização). Os handlers leem o
+estado atual do banco, então aplicar um evento de novo não muda o
+resultado: `reprocessar_eventos` reconstrói os derivados reaplicando os
+eventos já processados.
+
+Processamento (settings.EVENTOS_DOMINIO_PROCESSAMENTO):
+- 'apos_commit' (padrão): os eventos da transação são aplicados no
+  on_commit, fora da transação que gravou; o que falhar fica pendente.
+- 'worker': só o comando `processar_eventos_dominio` aplica os eventos;
+  as gravações não esperam pelos derivados.
+"""
+import logging
+import threading
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from medicos.models.eventos import EventoDominio
+from medicos.rastreamento import span
+
+logger = logging.getLogger(__name__)
+
+PROCESSAMENTO_APOS_COMMIT = 'apos_commit'
+PROCESSAMENTO_WORKER = 'worker'
+
+DESPESA_SOCIO = 'socio'
+DESPESA_RATEADA = 'rateada'
+
+_estado = threading.local()
+
+
+def _configuracao(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def modo_processamento():
+    return _configuracao('EVENTOS_DOMINIO_PROCESSAMENTO', PROCESSAMENTO_APOS_COMMIT)
+
+
+def tamanho_lote():
+    return _configuracao('EVENTOS_DOMINIO_TAMANHO_LOTE', 500)
+
+
+def maximo_tentativas():
+    """Eventos que falharam esse número de vezes saem da fila (ficam para inspeção no admin)."""
+    return _configuracao('EVENTOS_DOMINIO_MAXIMO_TENTATIVAS', 5)
+
+
+# ===============================
+# Registro (dentro da transação)
+# ===============================
+
+def registrar_evento(tipo, chave, empresa_id=None, **dados):
+    """
+    Grava o evento na transação corrente e, no modo 'apos_commit', agenda o
+    processamento dos eventos desta thread para depois do commit.
+
+        registrar_evento(EventoDominio.TIPO_DESPESA_ALTERADA, f'despesa_socio:{despesa.id}',
+                         empresa_id, despesa_id=despesa.id, tipo_despesa=DESPESA_SOCIO)
+    """
+    evento = EventoDominio.objects.create(tipo=tipo, chave=chave, empresa_id=empresa_id, dados=dados)
+    if modo_processamento() == PROCESSAMENTO_APOS_COMMIT:
+        if not hasattr(_estado, 'ids'):
+            _estado.ids = []
+        _estado.ids.append(evento.id)
+        transaction.on_commit(_processar_apos_commit)
+    return evento
+
+
+def _processar_apos_commit():
+    # Um callback por evento; o primeiro processa todos os da thread e os demais não encontram nada
+    ids = getattr(_estado, 'ids', None)
+    if not ids:
+        return
+    _estado.ids = []
+    try:
+        processar_eventos(ids=ids)
+    except Exception as e:
+        logger.error(f"Erro ao aplicar eventos após o commit (ficam pendentes para o worker): {e}")
+
+
+# ===============================
+# Plano de aplicação (coalescência)
+# ===============================
+
+def _data(valor):
+    if not valor:
+        return None
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor)[:10])
+
+
+class _Plano:
+    """Ações de um lote, agrupadas por empresa e sem repetição."""
+
+    def __init__(self):
+        self.despesas_socio = {}
+        self.despesas_rateadas = {}
+        self.rateios_despesa = {}
+        self.trimestres_adicional = set()
+
+    def trimestre(self, empresa_id, data):
+        data = _data(data)
+        if empresa_id and data:
+            self.trimestres_adicional.add((empresa_id, data.year, (data.month - 1) // 3 + 1))
+
+    def adicionar(self, evento):
+        dados = evento.dados
+        if evento.tipo in (
+            EventoDominio.TIPO_NOTA_EMITIDA, EventoDominio.TIPO_NOTA_ALTERADA, EventoDominio.TIPO_NOTA_RECEBIDA,
+            EventoDominio.TIPO_NOTA_CANCELADA, EventoDominio.TIPO_NOTA_EXCLUIDA,
+            EventoDominio.TIPO_RATEIO_NOTA_ALTERADO,
+        ):
+            self.trimestre(evento.empresa_id, dados.get('dtEmissao'))
+            self.trimestre(
+                dados.get('empresa_id_anterior') or evento.empresa_id,
+                dados.get('dtEmissao_anterior') or dados.get('dtEmissao'),
+            )
+        elif evento.tipo == EventoDominio.TIPO_DESPESA_ALTERADA:
+            destino = self.despesas_socio if dados['tipo_despesa'] == DESPESA_SOCIO else self.despesas_rateadas
+            destino.setdefault(evento.empresa_id, set()).add(dados['despesa_id'])
+        elif evento.tipo == EventoDominio.TIPO_RATEIO_DESPESA_ALTERADO:
+            self.rateios_despesa.setdefault(evento.empresa_id, set()).add(
+                (dados['item_despesa_id'], _data(dados['data_referencia']))
+            )
+        elif evento.tipo == EventoDominio.TIPO_ALIQUOTA_ALTERADA:
+            # Presunção e alíquota de IRPJ mudam a base do adicional em toda a vigência
+            inicio = _data(dados.get('data_vigencia_inicio')) or timezone.localdate()
+            fim = min(_data(dados.get('data_vigencia_fim')) or timezone.localdate(), timezone.localdate())
+            for ano in range(inicio.year, max(inicio.year, fim.year) + 1):
+                for mes in (1, 4, 7, 10):
+                    self.trimestre(evento.empresa_id, date(ano, mes, 1))
+
+    def empresas(self):
+        return set(self.despesas_socio) | set(self.despesas_rateadas) | set(self.rateios_despesa)
+
+
+def _sincronizar_despesas(plano, empresa_id):
+    from medicos.models.despesas import DespesaRateada, DespesaSocio
+    from medicos.services.debitos_despesas import (
+        despesas_rateadas_afetadas,
+        remover_debitos_despesas,
+        sincronizar_debitos_despesas,
+    )
+
+    rateadas_ids = set(plano.despesas_rateadas.get(empresa_id, ()))
+    # Rateio alterado: despesas do mês e dos meses seguintes que herdam o rateio
+    itens_por_mes = {}
+    for item_despesa_id, data_referencia in plano.rateios_despesa.get(empresa_id, ()):
+        itens_por_mes.setdefault(data_referencia.replace(day=1), set()).add(item_despesa_id)
+    for data_referencia, itens_ids in itens_por_mes.items():
+        rateadas_ids.update(
+            despesas_rateadas_afetadas(itens_ids, data_referencia).values_list('id', flat=True)
+        )
+    socio_ids = set(plano.despesas_socio.get(empresa_id, ()))
+
+    rateadas = list(DespesaRateada.objects.filter(id__in=rateadas_ids).select_related('item_despesa'))
+    socio = list(DespesaSocio.objects.filter(id__in=socio_ids).select_related('item_despesa'))
+
+    # Despesas excluídas: só os lançamentos saem
+    excluidas_rateadas = rateadas_ids - {d.id for d in rateadas}
+    excluidas_socio = socio_ids - {d.id for d in socio}
+    removidos = remover_debitos_despesas(excluidas_rateadas, excluidas_socio, empresa_id=empresa_id)
+    resultado = sincronizar_debitos_despesas(empresa_id, rateadas, socio)
+    return {'despesas': len(rateadas) + len(socio), 'removidos': removidos + resultado['removidos'],
+            'criados': resultado['criados']}
+
+
+def _invalidar_adicional_ir(trimestres):
+    from medicos.services.adicional_ir import chave_cache
+
+    if not trimestres:
+        return
+    try:
+        cache.delete_many([chave_cache(empresa_id, ano, trimestre) for empresa_id, ano, trimestre in trimestres])
+    except Exception as e:
+        logger.warning(f"Falha ao invalidar cache do adicional de IR: {e}")
+
+
+def aplicar_eventos(eventos):
+    """
+    Aplica um lote de eventos (coalescidos) e devolve {evento_id: erro} dos
+    eventos que falharam: os malformados (dados incompletos) e os das
+    empresas cuja aplicação falhou. Os demais ficam aplicados.
+    """
+    plano = _Plano()
+    falhas = {}
+    eventos_por_empresa = {}
+    for evento in eventos:
+        try:
+            plano.adicionar(evento)
+        except Exception as e:
+            logger.error(f"Evento de domínio {evento.id} ({evento.tipo}) inválido: {e!r}")
+            falhas[evento.id] = f"Evento inválido: {e!r}"
+            continue
+        eventos_por_empresa.setdefault(evento.empresa_id, []).append(evento.id)
+
+    for empresa_id in sorted(plano.empresas(), key=lambda valor: (valor is None, valor or 0)):
+        try:
+            with transaction.atomic():
+                resultado = _sincronizar_despesas(plano, empresa_id)
+            logger.debug(f"Eventos da empresa {empresa_id} aplicados: {resultado}")
+        except Exception as e:
+            logger.error(f"Erro ao aplicar eventos de despesas da empresa {empresa_id}: {e}")
+            for evento_id in eventos_por_empresa.get(empresa_id, ()):
+                falhas[evento_id] = str(e)
+
+    # Depois das gravações: o próximo cálculo já vê os dados novos
+    _invalidar_adicional_ir(plano.trimestres_adicional)
+    return falhas
+
+
+# ===============================
+# Consumo
+# ===============================
+
+@span('eventos_dominio.processar', logger)
+def processar_eventos(limite=None, ids=None):
+    """
+    Aplica um lote de eventos pendentes (em ordem de gravação) e os marca
+    como processados. Em PostgreSQL, workers concorrentes pegam lotes
+    distintos (SKIP LOCKED).
+
+    Returns:
+        int: Quantidade de eventos processados no lote
+    """
+    limite = limite or tamanho_lote()
+    with transaction.atomic():
+        pendentes = EventoDominio.objects.filter(
+            processado_em__isnull=True,
+            tentativas__lt=maximo_tentativas(),
+        ).order_by('id')
+        if ids is not None:
+            pendentes = pendentes.filter(id__in=ids)
+        if connection.features.has_select_for_update_skip_locked:
+            pendentes = pendentes.select_for_update(skip_locked=True)
+        eventos = list(pendentes[:limite])
+        if not eventos:
+            return 0
+
+        falhas = aplicar_eventos(eventos)
+        com_falha = list(falhas)
+        ids_por_erro = {}
+        for evento_id, erro in falhas.items():
+            ids_por_erro.setdefault(erro, []).append(evento_id)
+        for erro, ids_erro in ids_por_erro.items():
+            EventoDominio.objects.filter(id__in=ids_erro).update(
+                tentativas=F('tentativas') + 1, erro=erro[:2000],
+            )
+        EventoDominio.objects.filter(id__in=[evento.id for evento in eventos]).exclude(id__in=com_falha).update(
+            processado_em=timezone.now(), erro='',
+        )
+
+    processados = len(eventos) - len(com_falha)
+    logger.info(f"{processados} evento(s) de domínio aplicados, {len(com_falha)} com falha")
+    return len(eventos)
+
+
+def reprocessar_eventos(empresa_id=None, desde=None, lote=None):
+    """
+    Reaplica os eventos já processados (a partir de `desde`, da empresa
+    informada) para reconstruir os dados derivados. Idempotente.
+
+    Returns:
+        int: Quantidade de eventos reaplicados
+    """
+    lote = lote or tamanho_lote()
+    eventos = EventoDominio.objects.filter(processado_em__isnull=False).order_by('id')
+    if empresa_id is not None:
+        eventos = eventos.filter(empresa_id=empresa_id)
+    if desde is not None:
+        eventos = eventos.filter(criado_em__date__gte=desde)
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        pagina = list(eventos.filter(id__gt=ultimo_id)[:lote])
+        if not pagina:
+            break
+        falhas = aplicar_eventos(pagina)
+        if falhas:
+            raise RuntimeError(f"Falha ao reaplicar eventos: {falhas}")
+        total += len(pagina)
+        ultimo_id = pagina[-1].id
+    return total
+
+
+def expurgar_eventos(dias):
+    """Remove eventos processados há mais de `dias` dias (limita a janela de reprocessamento)."""
+    limite = timezone.now() - timedelta(days=dias)
+    removidos, _ = EventoDominio.objects.filter(processado_em__lt=limite).delete()
+    return removidos
@@ -0,0 +1,379 @@
+"""
+Pipeline assíncrono de auditoria (ContaAuditLog e LogAuditoriaFinanceiro)
+
+Os registros de auditoria deixam de ser inseridos um a um dentro do request:
+cada evento é enfileirado e gravado depois, em lote (`bulk_create`), fora da
+thread do request. As tabelas de auditoria têm vários índices, então a
+manutenção de índice sai do caminho crítico e passa a ser amortizada.
+
+Backends (settings.AUDITORIA_BACKEND):
+- 'memoria' (padrão): fila em memória drenada por uma thread de fundo do
+  próprio processo; pendências são gravadas no encerramento (atexit).
+- 'redis': eventos serializados em uma lista Redis (RPUSH), gravados pelo
+  comando `processar_fila_auditoria` (worker). Sobrevive a reinício do app.
+  Cada worker move atomicamente (LMOVE) o lote para sua lista de
+  processamento, de modo que dois workers nunca gravam o mesmo evento.
+- 'sincrono': grava imediatamente (comportamento anterior).
+
+Durabilidade: eventos marcados como duráveis (`duravel=True`, ou ações em
+ACOES_CRITICAS_FINANCEIRAS) são sempre gravados de forma síncrona, na mesma
+transação do request, e nunca se perdem por queda do processo.
+
+Falha ao gravar um lote: os eventos são regravados um a um; os que
+continuarem falhando vão para a lista de falhas (`auditoria:fila:falhas`)
+no Redis, ou são registrados no log após novas tentativas na fila em memória.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import InterfaceError, OperationalError, close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MEMORIA = 'memoria'
+BACKEND_REDIS = 'redis'
+BACKEND_SINCRONO = 'sincrono'
+
+CHAVE_FILA_REDIS = 'auditoria:fila'
+CHAVE_FALHAS_REDIS = f'{CHAVE_FILA_REDIS}:falhas'
+PREFIXO_PROCESSANDO_REDIS = f'{CHAVE_FILA_REDIS}:processando'
+
+# Tentativas de um evento na fila em memória antes de ser descartado (com log)
+MAXIMO_TENTATIVAS_MEMORIA = 3
+
+# Falhas de conexão com o banco: o lote é mantido para nova tentativa
+ERROS_TRANSITORIOS = (OperationalError, InterfaceError)
+
+# Ações financeiras que nunca passam pela fila (gravação síncrona e durável)
+ACOES_CRITICAS_FINANCEIRAS = frozenset({
+    'excluir_lancamento',
+    'aprovar_lancamento',
+    'processar_lancamento',
+    'cancelar_lancamento',
+    'fechar_mes',
+    'reabrir_mes',
+    'alterar_configuracao',
+})
+
+
+def _configuracao(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def backend_configurado():
+    return _configuracao('AUDITORIA_BACKEND', BACKEND_MEMORIA)
+
+
+def tamanho_lote():
+    return _configuracao('AUDITORIA_TAMANHO_LOTE', 200)
+
+
+def intervalo_descarga():
+    """Tempo máximo (s) que um evento espera na fila em memória antes de ser gravado."""
+    return _configuracao('AUDITORIA_INTERVALO_DESCARGA', 2.0)
+
+
+# ===============================
+# Serialização dos eventos
+# ===============================
+
+def _rotulo_modelo(instancia):
+    return instancia._meta.label
+
+
+def _serializar(instancia):
+    """Converte a instância (não salva) em dict de attnames, pronto para JSON."""
+    dados = {
+        campo.attname: getattr(instancia, campo.attname)
+        for campo in instancia._meta.concrete_fields
+        if not campo.primary_key
+    }
+    return {'modelo': _rotulo_modelo(instancia), 'dados': dados}
+
+
+def _desserializar(evento):
+    modelo = apps.get_model(evento['modelo'])
+    return modelo(**evento['dados'])
+
+
+def gravar_em_lote(instancias):
+    """
+    Grava instâncias de auditoria agrupadas por modelo com bulk_create.
+
+    Returns:
+        int: Quantidade de registros gravados
+    """
+    por_modelo = {}
+    for instancia in instancias:
+        por_modelo.setdefault(type(instancia), []).append(instancia)
+    total = 0
+    for modelo, registros in por_modelo.items():
+        modelo.objects.bulk_create(registros, batch_size=tamanho_lote())
+        total += len(registros)
+    return total
+
+
+def _gravar_individualmente(itens, converter=lambda item: item):
+    """
+    Grava item a item após a falha de um lote, isolando os registros inválidos.
+
+    Args:
+        itens: Eventos a gravar
+        converter: Função que transforma o item em instância de auditoria
+
+    Returns:
+        tuple: (lista de (item, erro) que falharam, itens não tentados por
+        banco indisponível — vazia quando todos foram processados)
+    """
+    falhas = []
+    for indice, item in enumerate(itens):
+        try:
+            gravar_em_lote([converter(item)])
+        except ERROS_TRANSITORIOS as e:
+            logger.error(f"Banco indisponível ao gravar auditoria: {e}")
+            return falhas, list(itens[indice:])
+        except Exception as e:
+            falhas.append((item, e))
+    return falhas, []
+
+
+# ===============================
+# Fila em memória (thread de fundo)
+# ===============================
+
+class FilaAuditoriaMemoria:
+    """Fila em memória com uma thread daemon que grava em lote."""
+
+    def __init__(self):
+        self._fila = queue.Queue(maxsize=_configuracao('AUDITORIA_TAMANHO_MAXIMO_FILA', 10000))
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _garantir_worker(self):
+        # Após fork (ex: gunicorn), a thread do processo pai não existe no filho
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._executar, name='auditoria-worker', daemon=True)
+            self._thread.start()
+
+    def enfileirar(self, instancia):
+        self._garantir_worker()
+        try:
+            self._fila.put_nowait(instancia)
+        except queue.Full:
+            # Fila saturada: degrada para gravação síncrona em vez de perder o evento
+            logger.warning("Fila de auditoria cheia; gravando evento de forma síncrona")
+            gravar_em_lote([instancia])
+
+    def _coletar_lote(self):
+        lote = [self._fila.get()]
+        limite = time.monotonic() + intervalo_descarga()
+        while len(lote) < tamanho_lote():
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _executar(self):
+        while True:
+            lote = self._coletar_lote()
+            self._gravar(lote)
+
+    def _gravar(self, lote, reenfileirar=True):
+        try:
+            close_old_connections()
+            try:
+                gravar_em_lote(lote)
+                return
+            except ERROS_TRANSITORIOS:
+                falhas, pendentes = [], lote
+            except Exception as e:
+                logger.warning(f"Erro ao gravar lote de auditoria ({len(lote)} eventos), gravando um a um: {e}")
+                falhas, pendentes = _gravar_individualmente(lote)
+            for instancia, erro in falhas:
+                self._descartar(instancia, erro)
+            for instancia in pendentes:
+                if reenfileirar:
+                    self._reenfileirar(instancia)
+                else:
+                    self._descartar(instancia, 'banco indisponível no encerramento')
+            if pendentes and reenfileirar:
+                time.sleep(intervalo_descarga())
+        finally:
+            for _ in lote:
+                self._fila.task_done()
+            close_old_connections()
+
+    def _reenfileirar(self, instancia):
+        """Devolve o evento à fila (banco indisponível), até MAXIMO_TENTATIVAS_MEMORIA."""
+        tentativas = getattr(instancia, '_tentativas_auditoria', 0) + 1
+        if tentativas >= MAXIMO_TENTATIVAS_MEMORIA:
+            self._descartar(instancia, 'banco indisponível')
+            return
+        instancia._tentativas_auditoria = tentativas
+        try:
+            self._fila.put_nowait(instancia)
+        except queue.Full:
+            self._descartar(instancia, 'fila cheia')
+
+    def _descartar(self, instancia, erro):
+        # Sem armazenamento durável na fila em memória: o evento fica no log para reprocessamento manual
+        evento = json.dumps(_serializar(instancia), cls=DjangoJSONEncoder)
+        logger.error(f"Evento de auditoria descartado ({erro}): {evento}")
+
+    def descarregar(self):
+        """Grava imediatamente tudo o que estiver na fila (usado no encerramento)."""
+        lote = []
+        while True:
+            try:
+                lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        if lote:
+            self._gravar(lote, reenfileirar=False)
+        return len(lote)
+
+
+_fila_memoria = FilaAuditoriaMemoria()
+atexit.register(_fila_memoria.descarregar)
+
+
+# ===============================
+# Fila Redis (worker externo)
+# ===============================
+
+def _conexao_redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection('default')
+
+
+def _enfileirar_redis(instancia):
+    _conexao_redis().rpush(CHAVE_FILA_REDIS, json.dumps(_serializar(instancia), cls=DjangoJSONEncoder))
+
+
+def nome_consumidor():
+    """Identifica o worker (lista de processamento própria); estável entre reinícios do container."""
+    return _configuracao('AUDITORIA_CONSUMIDOR', socket.gethostname())
+
+
+def _reservar_lote_redis(redis, processando, limite):
+    """
+    Move atomicamente até `limite` eventos da fila para a lista de
+    processamento do worker (LMOVE em MULTI/EXEC). Eventos que ficaram na
+    lista de processamento por queda do worker são retomados primeiro.
+    """
+    pendentes = redis.lrange(processando, 0, -1)
+    if pendentes:
+        return pendentes
+    pipe = redis.pipeline()
+    for _ in range(limite):
+        pipe.lmove(CHAVE_FILA_REDIS, processando, 'LEFT', 'RIGHT')
+    return [bruto for bruto in pipe.execute() if bruto is not None]
+
+
+def _instancia_do_bruto(bruto):
+    return _desserializar(json.loads(bruto))
+
+
+def processar_fila_redis(limite=None, consumidor=None):
+    """
+    Consome um lote da fila Redis e grava com bulk_create.
+
+    O lote é movido para a lista de processamento do worker antes da gravação
+    e só é removido dela depois; falha de conexão com o banco o mantém lá para
+    a próxima execução. Se o lote falhar por erro de dados, os eventos são
+    gravados um a um e os inválidos vão para CHAVE_FALHAS_REDIS.
+
+    Returns:
+        int: Quantidade de eventos consumidos (gravados ou enviados à lista de falhas)
+    """
+    limite = limite or tamanho_lote()
+    redis = _conexao_redis()
+    processando = f'{PREFIXO_PROCESSANDO_REDIS}:{consumidor or nome_consumidor()}'
+    brutos = _reservar_lote_redis(redis, processando, limite)
+    if not brutos:
+        return 0
+    try:
+        gravar_em_lote([_instancia_do_bruto(bruto) for bruto in brutos])
+    except ERROS_TRANSITORIOS:
+        raise
+    except Exception as e:
+        logger.warning(f"Erro ao gravar lote de auditoria ({len(brutos)} eventos), gravando um a um: {e}")
+        falhas, pendentes = _gravar_individualmente(brutos, converter=_instancia_do_bruto)
+        pipe = redis.pipeline()
+        for bruto, erro in falhas:
+            logger.error(f"Evento de auditoria enviado para {CHAVE_FALHAS_REDIS}: {erro}")
+            pipe.rpush(CHAVE_FALHAS_REDIS, bruto)
+        if pendentes:
+            # Mantém na lista de processamento só o que ainda não foi gravado
+            pipe.delete(processando)
+            pipe.rpush(processando, *pendentes)
+            pipe.execute()
+            raise OperationalError("Banco indisponível ao gravar a fila de auditoria")
+        pipe.execute()
+    redis.delete(processando)
+    return len(brutos)
+
+
+# ===============================
+# API
+# ===============================
+
+def registrar(instancia, duravel=False):
+    """
+    Registra um evento de auditoria (instância não salva de ContaAuditLog ou
+    LogAuditoriaFinanceiro) conforme o backend configurado.
+
+    Args:
+        instancia: Registro de auditoria ainda não salvo
+        duravel (bool): Força gravação síncrona (ações financeiras críticas)
+
+    Eventos enfileirados só entram na fila após o commit da transação
+    corrente (imediatamente, fora de transação): um request que sofre
+    rollback não deixa auditoria de alterações que não aconteceram.
+
+    Returns:
+        A própria instância (com pk apenas quando gravada de forma síncrona)
+    """
+    backend = backend_configurado()
+    if duravel or backend == BACKEND_SINCRONO:
+        instancia.save()
+        return instancia
+
+    transaction.on_commit(lambda: _enfileirar(instancia, backend))
+    return instancia
+
+
+def _enfileirar(instancia, backend):
+    try:
+        if backend == BACKEND_REDIS:
+            _enfileirar_redis(instancia)
+        else:
+            _fila_memoria.enfileirar(instancia)
+    except Exception as e:
+        # Qualquer falha na fila degrada para gravação síncrona
+        logger.warning(f"Falha ao enfileirar auditoria, gravando de forma síncrona: {e}")
+        instancia.save()
+
+
+def descarregar_fila_memoria():
+    """Grava imediatamente os eventos pendentes na fila em memória deste processo."""
+    return _fila_memoria.descarregar()
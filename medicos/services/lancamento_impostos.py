@@ -231,6 +231,7 @@ class LancamentoImpostosService:
         try:
             return MovimentacaoContaCorrente.objects.get(
                 descricao_movimentacao=descricoes[imposto_nome],
+                empresa_id=socio.empresa_id,
                 socio=socio,
                 data_movimentacao__year=data_lancamento.year,
                 data_movimentacao__month=data_lancamento.month,
@@ -243,6 +244,7 @@ class LancamentoImpostosService:
             logger.warning(f"Múltiplos lançamentos encontrados para {imposto_nome} - {competencia_str}")
             return MovimentacaoContaCorrente.objects.filter(
                 descricao_movimentacao=descricoes[imposto_nome],
+                empresa_id=socio.empresa_id,
                 socio=socio,
                 data_movimentacao__year=data_lancamento.year,
                 data_movimentacao__month=data_lancamento.month,
@@ -285,6 +287,7 @@ class LancamentoImpostosService:
         )
         
         lancamentos = MovimentacaoContaCorrente.objects.filter(
+            empresa_id=socio.empresa_id,
             socio=socio,
             descricao_movimentacao__in=descricoes_impostos,
             data_movimentacao__year=data_lancamento.year,
@@ -0,0 +1,149 @@
+"""
+Infraestrutura para tarefas de manutenção em lote (management commands)
+
+Tarefas longas sobre tabelas grandes rodam em páginas por chave (id > último
+id processado), cada página na sua própria transação curta, para não segurar
+locks nem uma transação aberta por minutos enquanto o sistema está em uso:
+
+- `Checkpoint`: último id concluído, guardado no cache, para retomar a tarefa
+  de onde parou (as tarefas são idempotentes, então perder o checkpoint só
+  custa reler as páginas já feitas);
+- `execucao_exclusiva`: impede duas execuções simultâneas da mesma tarefa;
+- `Progresso`: contagem, vazão e ETA para a saída dos comandos.
+"""
+from contextlib import contextmanager
+import logging
+import time
+import uuid
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+TEMPO_LOCK = 15 * 60
+
+
+class TarefaEmExecucao(Exception):
+    """Outra execução da mesma tarefa está em andamento."""
+
+
+class LockIndisponivel(Exception):
+    """O cache que guarda o lock da tarefa não respondeu; a tarefa não é iniciada."""
+
+
+class Checkpoint:
+    """Último id processado de uma tarefa (persistido no cache, sem expiração)."""
+
+    def __init__(self, nome):
+        self.chave = f'manutencao:checkpoint:{nome}'
+
+    def ler(self):
+        try:
+            return cache.get(self.chave) or 0
+        except Exception as e:
+            logger.warning(f"Checkpoint {self.chave} indisponível, recomeçando do início: {e}")
+            return 0
+
+    def gravar(self, ultimo_id):
+        try:
+            cache.set(self.chave, ultimo_id, None)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar checkpoint {self.chave}: {e}")
+
+    def limpar(self):
+        try:
+            cache.delete(self.chave)
+        except Exception as e:
+            logger.warning(f"Falha ao remover checkpoint {self.chave}: {e}")
+
+
+@contextmanager
+def execucao_exclusiva(nome):
+    """
+    Lock da tarefa no cache (cache.add é atômico no Redis). Expira sozinho
+    após TEMPO_LOCK se o processo morrer; `renovar()` estende o prazo a cada
+    página.
+
+    O lock guarda um token da execução: renovar e liberar só agem se o lock
+    ainda for desta execução (se ele expirou e outra execução o pegou, esta
+    para com TarefaEmExecucao em vez de apagar o lock alheio). Sem cache
+    para adquirir o lock a tarefa não começa (LockIndisponivel); falhas do
+    cache ao renovar ou liberar só são registradas no log.
+    """
+    chave = f'manutencao:lock:{nome}'
+    token = uuid.uuid4().hex
+    try:
+        adquirido = cache.add(chave, token, TEMPO_LOCK)
+    except Exception as e:
+        raise LockIndisponivel(f"Não foi possível obter o lock da tarefa '{nome}' (cache indisponível): {e}")
+    if not adquirido:
+        raise TarefaEmExecucao(f"A tarefa '{nome}' já está em execução")
+
+    def renovar():
+        try:
+            dono = cache.get(chave)
+            if dono is not None and dono != token:
+                raise TarefaEmExecucao(f"O lock da tarefa '{nome}' expirou e foi obtido por outra execução")
+            if dono is None:
+                # Expirou sem outra execução: recupera o lock
+                cache.add(chave, token, TEMPO_LOCK)
+            else:
+                cache.touch(chave, TEMPO_LOCK)
+        except TarefaEmExecucao:
+            raise
+        except Exception as e:
+            logger.warning(f"Falha ao renovar o lock da tarefa '{nome}': {e}")
+
+    try:
+        yield renovar
+    finally:
+        try:
+            # get + delete não é atômico, mas o lock só troca de dono após expirar
+            if cache.get(chave) == token:
+                cache.delete(chave)
+        except Exception as e:
+            logger.warning(f"Falha ao liberar o lock da tarefa '{nome}' (expira em {TEMPO_LOCK}s): {e}")
+
+
+def _formatar_duracao(segundos):
+    segundos = int(segundos)
+    horas, resto = divmod(segundos, 3600)
+    minutos, segundos = divmod(resto, 60)
+    return f'{horas}:{minutos:02d}:{segundos:02d}' if horas else f'{minutos:02d}:{segundos:02d}'
+
+
+class Progresso:
+    """Andamento de uma tarefa em lotes: processados/total, vazão e ETA."""
+
+    def __init__(self, total):
+        self.total = total
+        self.processados = 0
+        self.lotes = 0
+        self.inicio = time.monotonic()
+
+    def avancar(self, quantidade):
+        self.processados += quantidade
+        self.lotes += 1
+
+    @property
+    def decorrido(self):
+        return time.monotonic() - self.inicio
+
+    @property
+    def taxa(self):
+        return self.processados / self.decorrido if self.decorrido > 0 else 0.0
+
+    @property
+    def eta(self):
+        """Segundos restantes estimados (None antes do primeiro lote)."""
+        if not self.taxa:
+            return None
+        return max(self.total - self.processados, 0) / self.taxa
+
+    def __str__(self):
+        percentual = 100 * self.processados / self.total if self.total else 100.0
+        eta = _formatar_duracao(self.eta) if self.eta is not None else '--:--'
+        return (
+            f'lote {self.lotes}: {self.processados}/{self.total} ({percentual:.1f}%), '
+            f'{self.taxa:.0f}/s, decorrido {_formatar_duracao(self.decorrido)}, ETA {eta}'
+        )
@@ -0,0 +1,219 @@
+"""
+Tarefas de manutenção dos lançamentos financeiros (Financeiro), em lote
+
+- `migrar_despesas_para_financeiro`: cria o lançamento "Débito - <item>"
+  das despesas de sócio que ainda não o têm (comando
+  migrate_despesas_to_financeiro);
+- `limpar_movimentacoes_orfas`: remove os créditos de nota fiscal que
+  perderam a nota (comando limpar_movimentacoes_orfas).
+
+As duas leem em páginas por id (ver medicos/services/lotes.py), com número
+constante de queries por página, e gravam cada página numa transação curta.
+São idempotentes: rodar de novo não duplica nem remove nada além do devido.
+"""
+import logging
+import time
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, TextField, Value
+from django.db.models.functions import Concat
+
+from medicos.models.despesas import DespesaSocio
+from medicos.models.financeiro import DescricaoMovimentacaoFinanceira, Financeiro
+from medicos.services.lotes import Checkpoint, Progresso, execucao_exclusiva
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_DEBITO = 'Débito - '
+DESCRICAO_CREDITO_NOTA = 'Credito de Nota Fiscal'
+
+
+def nome_tarefa_migracao(empresa_id=None, socio_id=None):
+    return f'migrar_despesas_financeiro:{empresa_id or "todas"}:{socio_id or "todos"}'
+
+
+def _despesas_com_situacao(empresa_id=None, socio_id=None):
+    """
+    Despesas de sócio anotadas com `ja_migrada`: anti-join (EXISTS) contra o
+    lançamento equivalente, pelo mesmo critério do comando original (mesmo
+    sócio, data, valor negativo e descrição "Débito - <item>").
+    """
+    lancamento_equivalente = Financeiro.objects.filter(
+        socio_id=OuterRef('socio_id'),
+        data_movimentacao=OuterRef('data'),
+        valor=-OuterRef('valor'),
+        descricao_movimentacao_financeira__descricao=Concat(
+            Value(PREFIXO_DEBITO), OuterRef('item_despesa__descricao'), output_field=TextField()
+        ),
+    )
+    despesas = DespesaSocio.objects.all()
+    if empresa_id:
+        despesas = despesas.filter(item_despesa__grupo_despesa__empresa_id=empresa_id)
+    if socio_id:
+        despesas = despesas.filter(socio_id=socio_id)
+    return despesas.annotate(ja_migrada=Exists(lancamento_equivalente)).order_by('id')
+
+
+def _obter_descricoes(chaves, usuario=None):
+    """
+    Obtém (criando em lote as ausentes) as descrições {(empresa_id, texto): id}.
+    Com duplicatas já existentes, usa a mais antiga.
+    """
+    descricoes = {}
+    if not chaves:
+        return descricoes
+    for descricao_id, empresa_id, texto in DescricaoMovimentacaoFinanceira.objects.filter(
+        empresa_id__in={empresa_id for empresa_id, _ in chaves},
+        descricao__in={texto for _, texto in chaves},
+    ).order_by('id').values_list('id', 'empresa_id', 'descricao'):
+        descricoes.setdefault((empresa_id, texto), descricao_id)
+    ausentes = [
+        DescricaoMovimentacaoFinanceira(empresa_id=empresa_id, descricao=texto, created_by=usuario)
+        for empresa_id, texto in sorted(chaves - set(descricoes))
+    ]
+    for descricao in DescricaoMovimentacaoFinanceira.objects.bulk_create(ausentes):
+        descricoes[(descricao.empresa_id, descricao.descricao)] = descricao.id
+    return descricoes
+
+
+def _migrar_pagina(pagina, simular, usuario):
+    """Cria os lançamentos de uma página de despesas; devolve o resumo da página."""
+    resultado = {'criados': [], 'existentes': [], 'erros': []}
+    vistos = set()
+    novos = []
+    for despesa in pagina:
+        if despesa['item_despesa__grupo_despesa__empresa_id'] is None:
+            resultado['erros'].append((despesa, 'despesa sem item/grupo de despesa com empresa'))
+            continue
+        texto = f"{PREFIXO_DEBITO}{despesa['item_despesa__descricao']}"
+        chave = (despesa['socio_id'], despesa['data'], -despesa['valor'], texto)
+        # Duas despesas iguais na mesma página: a segunda encontra o lançamento da primeira
+        if despesa['ja_migrada'] or chave in vistos:
+            resultado['existentes'].append(despesa)
+            continue
+        vistos.add(chave)
+        novos.append((despesa, texto))
+        resultado['criados'].append(despesa)
+
+    if simular or not novos:
+        return resultado
+
+    with transaction.atomic():
+        descricoes = _obter_descricoes(
+            {(despesa['item_despesa__grupo_despesa__empresa_id'], texto) for despesa, texto in novos}, usuario
+        )
+        Financeiro.objects.bulk_create([
+            Financeiro(
+                socio_id=despesa['socio_id'],
+                descricao_movimentacao_financeira_id=descricoes[
+                    (despesa['item_despesa__grupo_despesa__empresa_id'], texto)
+                ],
+                data_movimentacao=despesa['data'],
+                valor=-despesa['valor'],
+                created_by=usuario,
+            )
+            for despesa, texto in novos
+        ], batch_size=len(novos))
+    return resultado
+
+
+def migrar_despesas_para_financeiro(empresa_id=None, socio_id=None, tamanho_lote=1000, simular=False,
+                                    usuario=None, reiniciar=False, pausa=0, ao_progredir=None):
+    """
+    Cria os lançamentos financeiros ausentes das despesas de sócio, página a
+    página, retomando do checkpoint da última execução com os mesmos filtros.
+
+    `ao_progredir(progresso, resultado_da_pagina)` é chamado após cada página.
+    `pausa` (segundos) entre páginas alivia o banco em horário de uso.
+
+    Returns:
+        dict: totais de 'processadas', 'criados', 'existentes' e 'erros'
+    """
+    tarefa = nome_tarefa_migracao(empresa_id, socio_id)
+    checkpoint = Checkpoint(tarefa)
+    if reiniciar:
+        checkpoint.limpar()
+    ultimo_id = 0 if simular else checkpoint.ler()
+
+    despesas = _despesas_com_situacao(empresa_id, socio_id)
+    campos = (
+        'id', 'socio_id', 'socio__pessoa__name', 'data', 'valor', 'ja_migrada',
+        'item_despesa__descricao', 'item_despesa__grupo_despesa__empresa_id',
+    )
+    totais = {'processadas': 0, 'criados': 0, 'existentes': 0, 'erros': 0, 'retomado_de': ultimo_id}
+    progresso = Progresso(despesas.filter(id__gt=ultimo_id).count())
+
+    with execucao_exclusiva(tarefa) as renovar:
+        while True:
+            pagina = list(despesas.filter(id__gt=ultimo_id).values(*campos)[:tamanho_lote])
+            if not pagina:
+                break
+            resultado = _migrar_pagina(pagina, simular, usuario)
+            ultimo_id = pagina[-1]['id']
+            if not simular:
+                checkpoint.gravar(ultimo_id)
+
+            totais['processadas'] += len(pagina)
+            for situacao in ('criados', 'existentes', 'erros'):
+                totais[situacao] += len(resultado[situacao])
+            progresso.avancar(len(pagina))
+            if ao_progredir:
+                ao_progredir(progresso, resultado)
+            renovar()
+            if pausa:
+                time.sleep(pausa)
+
+    if not simular:
+        # Concluída: a próxima execução confere tudo de novo (só cria o que faltar)
+        checkpoint.limpar()
+    logger.info(f"Migração de despesas para Financeiro ({tarefa}): {totais}")
+    return totais
+
+
+def movimentacoes_orfas():
+    """Créditos de nota fiscal cuja nota foi excluída (nota_fiscal nula)."""
+    return Financeiro.objects.filter(
+        nota_fiscal__isnull=True,
+        descricao_movimentacao_financeira__descricao=DESCRICAO_CREDITO_NOTA,
+    )
+
+
+def limpar_movimentacoes_orfas(tamanho_lote=1000, simular=False, pausa=0, ao_progredir=None):
+    """
+    Remove as movimentações órfãs em lotes de ids, cada lote na sua
+    transação. A própria exclusão é o checkpoint: interrompida, a próxima
+    execução só encontra as que faltaram.
+
+    `ao_progredir(progresso, linhas)` recebe as linhas (id, sócio, valor,
+    data) de cada lote, lidas com um join em vez de carregar o sócio por linha.
+
+    Returns:
+        int: Quantidade de movimentações removidas (ou que seriam, ao simular)
+    """
+    orfas = movimentacoes_orfas().order_by('id')
+    progresso = Progresso(orfas.count())
+    total = 0
+    ultimo_id = 0
+
+    with execucao_exclusiva('limpar_movimentacoes_orfas') as renovar:
+        while True:
+            linhas = list(orfas.filter(id__gt=ultimo_id).values_list(
+                'id', 'socio__pessoa__name', 'valor', 'data_movimentacao'
+            )[:tamanho_lote])
+            if not linhas:
+                break
+            ids = [linha[0] for linha in linhas]
+            ultimo_id = ids[-1]
+            if not simular:
+                with transaction.atomic():
+                    movimentacoes_orfas().filter(id__in=ids).delete()
+            total += len(ids)
+            progresso.avancar(len(ids))
+            if ao_progredir:
+                ao_progredir(progresso, linhas)
+            renovar()
+            if pausa:
+                time.sleep(pausa)
+
+    logger.info(f"{total} movimentação(ões) órfã(s) {'encontrada(s)' if simular else 'removida(s)'}")
+    return total
@@ -0,0 +1,148 @@
+"""
+Serviço da matriz de rateio mensal (item de despesa x sócio)
+
+Carrega e grava de uma vez a matriz de percentuais de `ItemDespesaRateioMensal`
+de um mês, para um ou vários itens, em número constante de queries:
+1. `carregar_matriz`: uma query para todos os rateios dos itens no mês;
+2. `validar_matriz`: valida em memória faixa (0-100%) e soma de 100% por item;
+3. `salvar_matriz`: bulk_update/bulk_create em uma transação, com os signals
+   de sincronização suspensos, seguido de um único recálculo set-based dos
+   débitos das despesas rateadas afetadas — as do mês e as dos meses seguintes
+   que herdam o rateio (services/debitos_despesas.py).
+
+Substitui as consultas `filter(...).first()` por sócio e os `save()`/`create()`
+individuais de `views_cadastro_rateio.cadastro_rateio_list`, em que cada
+gravação reprocessava todas as despesas rateadas do item no mês.
+"""
+from decimal import Decimal
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from medicos.models.despesas import ItemDespesaRateioMensal
+from medicos.services.debitos_despesas import (
+    despesas_rateadas_afetadas,
+    sincronizar_debitos_despesas,
+)
+from medicos.signals_financeiro import sincronizacao_despesas_suspensa
+
+logger = logging.getLogger(__name__)
+
+CEM_POR_CENTO = Decimal('100.00')
+TOLERANCIA_TOTAL = Decimal('0.01')
+
+
+def carregar_matriz(itens_ids, data_referencia, somente_ativos=False):
+    """
+    Carrega os rateios de vários itens em um mês com uma única query.
+
+    Returns:
+        dict: item_id -> {socio_id: ItemDespesaRateioMensal}
+    """
+    data_referencia = data_referencia.replace(day=1)
+    rateios = ItemDespesaRateioMensal.objects.filter(
+        item_despesa_id__in=list(itens_ids),
+        data_referencia=data_referencia,
+    )
+    if somente_ativos:
+        rateios = rateios.filter(ativo=True)
+    matriz = {item_id: {} for item_id in itens_ids}
+    for rateio in rateios:
+        matriz.setdefault(rateio.item_despesa_id, {})[rateio.socio_id] = rateio
+    return matriz
+
+
+def validar_matriz(percentuais):
+    """
+    Valida em memória a matriz de percentuais informada.
+
+    Args:
+        percentuais (dict): item_id -> {socio_id: Decimal}; apenas os valores
+            informados (valores em branco não entram na matriz)
+
+    Returns:
+        dict: item_id -> (total Decimal, mensagem de erro ou None)
+    """
+    resultado = {}
+    for item_id, por_socio in percentuais.items():
+        total = sum(por_socio.values(), Decimal('0.00'))
+        erro = None
+        fora_da_faixa = [p for p in por_socio.values() if p < 0 or p > CEM_POR_CENTO]
+        if fora_da_faixa:
+            erro = 'Cada percentual deve estar entre 0 e 100%.'
+        elif abs(total - CEM_POR_CENTO) > TOLERANCIA_TOTAL:
+            erro = (
+                f'O total do rateio deve ser exatamente 100%. Total atual: {total:.2f}%. '
+                f'Corrija os percentuais antes de salvar.'
+            )
+        resultado[item_id] = (total, erro)
+    return resultado
+
+
+def salvar_matriz(empresa_id, data_referencia, percentuais, usuario=None):
+    """
+    Grava a matriz de percentuais de um mês e recalcula uma única vez os débitos
+    das despesas rateadas afetadas.
+
+    Sócios sem valor informado mantêm o rateio atual (não são alterados).
+
+    Args:
+        empresa_id (int): empresa dona dos itens (escopo das descrições de débito)
+        data_referencia (date): qualquer dia do mês de competência
+        percentuais (dict): item_id -> {socio_id: Decimal}
+        usuario: usuário responsável (created_by dos novos rateios)
+
+    Raises:
+        ValidationError: se algum item não fechar 100% ou tiver percentual fora da faixa
+
+    Returns:
+        dict: {'criados': int, 'atualizados': int, 'despesas_recalculadas': int}
+    """
+    data_referencia = data_referencia.replace(day=1)
+    erros = [erro for _, erro in validar_matriz(percentuais).values() if erro]
+    if erros:
+        raise ValidationError(erros)
+
+    itens_ids = list(percentuais)
+    agora = timezone.now()
+    novos, alterados = [], []
+
+    with transaction.atomic(), sincronizacao_despesas_suspensa():
+        existentes = carregar_matriz(itens_ids, data_referencia)
+        for item_id, por_socio in percentuais.items():
+            for socio_id, percentual in por_socio.items():
+                rateio = existentes[item_id].get(socio_id)
+                if rateio is None:
+                    novos.append(ItemDespesaRateioMensal(
+                        item_despesa_id=item_id,
+                        socio_id=socio_id,
+                        data_referencia=data_referencia,
+                        percentual_rateio=percentual,
+                        created_by=usuario,
+                    ))
+                elif rateio.percentual_rateio != percentual:
+                    rateio.percentual_rateio = percentual
+                    rateio.updated_at = agora
+                    alterados.append(rateio)
+
+        if alterados:
+            ItemDespesaRateioMensal.objects.bulk_update(
+                alterados, ['percentual_rateio', 'updated_at'], batch_size=500
+            )
+        if novos:
+            ItemDespesaRateioMensal.objects.bulk_create(novos, batch_size=500)
+
+        despesas = []
+        if novos or alterados:
+            # O mês gravado e os seguintes que herdam este rateio
+            despesas = list(despesas_rateadas_afetadas(itens_ids, data_referencia))
+            sincronizar_debitos_despesas(empresa_id, despesas_rateadas=despesas, usuario=usuario)
+
+    resultado = {'criados': len(novos), 'atualizados': len(alterados), 'despesas_recalculadas': len(despesas)}
+    logger.info(
+        f"Matriz de rateio {data_referencia:%m/%Y} gravada (empresa {empresa_id}, "
+        f"{len(itens_ids)} item(ns)): {resultado}"
+    )
+    return resultado
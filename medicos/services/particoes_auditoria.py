@@ -0,0 +1,278 @@
+"""
+Particionamento mensal (RANGE) das tabelas de auditoria no PostgreSQL
+
+Tabelas: `conta_audit_log` (timestamp) e `log_auditoria_financeiro` (data_acao).
+
+`converter_tabelas_auditoria` transforma cada tabela em tabela particionada
+por mês, mantendo os dados atuais. É idempotente e roda no deploy, após o
+`migrate`, via `rotacionar_particoes_auditoria --converter`; também pode ser
+usado numa migração RunPython:
+
+    migrations.RunPython(
+        particoes_auditoria.converter_tabelas_auditoria,
+        particoes_auditoria.reverter_tabelas_auditoria,
+    )
+
+`criar_particoes_futuras` e `remover_particoes_antigas` são usados pelo comando
+`rotacionar_particoes_auditoria`. Em outros bancos (ex: SQLite em
+desenvolvimento) as funções não fazem nada e a retenção cai no DELETE em lotes.
+
+Observação: no PostgreSQL a chave primária de uma tabela particionada precisa
+conter a coluna de partição, por isso a PK passa a ser (id, <coluna de data>);
+o `id` continua vindo da mesma sequence e segue único na prática.
+"""
+from datetime import date
+import logging
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# tabela -> coluna de partição
+TABELAS_PARTICIONADAS = {
+    'conta_audit_log': 'timestamp',
+    'log_auditoria_financeiro': 'data_acao',
+}
+
+SUFIXO_LEGADO = '_legado'
+
+
+def suportado(conexao=None):
+    return (conexao or connection).vendor == 'postgresql'
+
+
+def _somar_meses(data, meses):
+    indice = data.year * 12 + (data.month - 1) + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def data_limite_retencao(meses_retencao):
+    """Primeiro dia do mês mais antigo mantido pela retenção."""
+    return _somar_meses(date.today().replace(day=1), -meses_retencao)
+
+
+def nome_particao(tabela, ano, mes):
+    return f'{tabela}_p{ano:04d}{mes:02d}'
+
+
+def tabela_particionada(tabela, conexao=None):
+    conexao = conexao or connection
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s",
+            [tabela],
+        )
+        return cursor.fetchone() is not None
+
+
+def listar_particoes(tabela, conexao=None):
+    """Retorna os nomes das partições mensais existentes, em ordem."""
+    conexao = conexao or connection
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s ORDER BY c.relname",
+            [tabela],
+        )
+        return [linha[0] for linha in cursor.fetchall() if linha[0].startswith(f'{tabela}_p')]
+
+
+def _limite_particao_legada(tabela, conexao):
+    """Data final (exclusiva) coberta pela partição legada, ou None se não houver."""
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_class c WHERE c.relname = %s",
+            [f'{tabela}{SUFIXO_LEGADO}'],
+        )
+        linha = cursor.fetchone()
+    if not linha or not linha[0]:
+        return None
+    # "FOR VALUES FROM (MINVALUE) TO ('2025-10-01 00:00:00+00')"
+    return date.fromisoformat(linha[0].split(' TO (')[1].strip("')")[:10])
+
+
+def _definicoes_indices(tabela, conexao):
+    """Índices da tabela, exceto a chave primária: [(nome, CREATE INDEX ..., único)]."""
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            "SELECT ci.relname, pg_get_indexdef(ix.indexrelid), ix.indisunique FROM pg_index ix "
+            "JOIN pg_class ct ON ct.oid = ix.indrelid "
+            "JOIN pg_class ci ON ci.oid = ix.indexrelid "
+            "WHERE ct.relname = %s AND NOT ix.indisprimary ORDER BY ci.relname",
+            [tabela],
+        )
+        return cursor.fetchall()
+
+
+def criar_particao_mensal(tabela, ano, mes, conexao=None):
+    """Cria (se não existir) a partição do mês ano/mes."""
+    conexao = conexao or connection
+    coluna = TABELAS_PARTICIONADAS[tabela]
+    inicio = date(ano, mes, 1)
+    fim = _somar_meses(inicio, 1)
+    particao = nome_particao(tabela, ano, mes)
+    qn = conexao.ops.quote_name
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {qn(particao)} PARTITION OF {qn(tabela)} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [inicio.isoformat(), fim.isoformat()],
+        )
+    logger.info(f"Partição {particao} garantida ({coluna} em [{inicio}, {fim}))")
+    return particao
+
+
+def converter_tabelas_auditoria(apps=None, schema_editor=None):
+    """
+    Converte as tabelas de auditoria em particionadas por mês (idempotente).
+
+    A tabela original é renomeada para `<tabela>_legado` e anexada como
+    partição cobrindo todo o período até o fim do mês corrente (inclusive os
+    registros que ainda chegarão neste mês); as partições mensais começam no
+    mês seguinte. Os índices da tabela original são recriados na tabela pai
+    antes do ATTACH, e o PostgreSQL reaproveita os equivalentes da partição
+    legada. As FKs continuam declaradas apenas na partição legada (o ORM não
+    depende delas).
+
+    Returns:
+        list: Tabelas convertidas
+    """
+    conexao = schema_editor.connection if schema_editor else connection
+    if not suportado(conexao):
+        return []
+    qn = conexao.ops.quote_name
+    inicio_proximo_mes = _somar_meses(date.today().replace(day=1), 1)
+
+    convertidas = []
+    for tabela, coluna in TABELAS_PARTICIONADAS.items():
+        if tabela_particionada(tabela, conexao):
+            continue
+        legado = f'{tabela}{SUFIXO_LEGADO}'
+        with transaction.atomic(using=conexao.alias), conexao.cursor() as cursor:
+            indices = _definicoes_indices(tabela, conexao)
+            cursor.execute(f"ALTER TABLE {qn(tabela)} RENAME TO {qn(legado)}")
+            # Nomes de índices são globais no schema: libera-os para a tabela nova
+            for nome_indice, _, _ in indices:
+                cursor.execute(
+                    f"ALTER INDEX {qn(nome_indice)} RENAME TO {qn(nome_indice[:50] + SUFIXO_LEGADO)}"
+                )
+            cursor.execute(
+                f"CREATE TABLE {qn(tabela)} "
+                f"(LIKE {qn(legado)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY) "
+                f"PARTITION BY RANGE ({qn(coluna)})"
+            )
+            cursor.execute(f"ALTER TABLE {qn(tabela)} ADD PRIMARY KEY (id, {qn(coluna)})")
+            # Definições capturadas antes do RENAME já apontam para o nome da tabela nova
+            for nome_indice, definicao, unico in indices:
+                if unico:
+                    logger.warning(f"Índice único {nome_indice} não recriado em {tabela} particionada")
+                    continue
+                cursor.execute(definicao)
+            # A identidade copiada nasce com sequence nova: continua da maior id existente
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {qn(legado)}), false)",
+                [tabela],
+            )
+            cursor.execute(
+                f"ALTER TABLE {qn(tabela)} ATTACH PARTITION {qn(legado)} "
+                f"FOR VALUES FROM (MINVALUE) TO (%s)",
+                [inicio_proximo_mes.isoformat()],
+            )
+            for deslocamento in range(0, 3):
+                mes = _somar_meses(inicio_proximo_mes, deslocamento)
+                criar_particao_mensal(tabela, mes.year, mes.month, conexao)
+        convertidas.append(tabela)
+        logger.info(f"Tabela {tabela} convertida em particionada por {coluna}")
+    return convertidas
+
+
+def reverter_tabelas_auditoria(apps=None, schema_editor=None):
+    """Reverso de converter_tabelas_auditoria: volta a uma tabela comum com todos os dados."""
+    conexao = schema_editor.connection if schema_editor else connection
+    if not suportado(conexao):
+        return
+    qn = conexao.ops.quote_name
+    for tabela in TABELAS_PARTICIONADAS:
+        if not tabela_particionada(tabela, conexao):
+            continue
+        temporaria = f'{tabela}_desparticionada'
+        with transaction.atomic(using=conexao.alias), conexao.cursor() as cursor:
+            indices = _definicoes_indices(tabela, conexao)
+            cursor.execute(
+                f"CREATE TABLE {qn(temporaria)} "
+                f"(LIKE {qn(tabela)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING IDENTITY)"
+            )
+            cursor.execute(f"INSERT INTO {qn(temporaria)} OVERRIDING SYSTEM VALUE SELECT * FROM {qn(tabela)}")
+            cursor.execute(f"DROP TABLE {qn(tabela)} CASCADE")
+            cursor.execute(f"ALTER TABLE {qn(temporaria)} RENAME TO {qn(tabela)}")
+            cursor.execute(f"ALTER TABLE {qn(tabela)} ADD PRIMARY KEY (id)")
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {qn(tabela)}), false)",
+                [tabela],
+            )
+            for _, definicao, _ in indices:
+                # Índices da tabela pai particionada: recriados como índices comuns
+                cursor.execute(definicao.replace(' ON ONLY ', ' ON ', 1))
+
+
+def criar_particoes_futuras(meses_a_frente=3, conexao=None):
+    """
+    Garante as partições do mês corrente e dos próximos `meses_a_frente` meses
+    (exceto os meses ainda cobertos pela partição legada).
+
+    Returns:
+        list: Partições garantidas
+    """
+    conexao = conexao or connection
+    if not suportado(conexao):
+        return []
+    inicio_mes_atual = date.today().replace(day=1)
+    criadas = []
+    for tabela in TABELAS_PARTICIONADAS:
+        if not tabela_particionada(tabela, conexao):
+            continue
+        # Meses ainda cobertos pela partição legada não ganham partição própria
+        limite_legado = _limite_particao_legada(tabela, conexao)
+        for deslocamento in range(0, meses_a_frente + 1):
+            mes = _somar_meses(inicio_mes_atual, deslocamento)
+            if limite_legado and mes < limite_legado:
+                continue
+            criadas.append(criar_particao_mensal(tabela, mes.year, mes.month, conexao))
+    return criadas
+
+
+def remover_particoes_antigas(meses_retencao=12, conexao=None):
+    """
+    Desanexa e remove as partições mensais inteiramente anteriores à retenção.
+
+    Remover uma partição é um DROP TABLE (instantâneo), em vez de um DELETE
+    linha a linha. As contagens continuam disponíveis no resumo diário.
+
+    Returns:
+        list: Partições removidas
+    """
+    conexao = conexao or connection
+    if not suportado(conexao):
+        return []
+    limite = data_limite_retencao(meses_retencao)
+    qn = conexao.ops.quote_name
+    removidas = []
+    for tabela in TABELAS_PARTICIONADAS:
+        if not tabela_particionada(tabela, conexao):
+            continue
+        for particao in listar_particoes(tabela, conexao):
+            sufixo = particao[len(f'{tabela}_p'):]
+            ano, mes = int(sufixo[:4]), int(sufixo[4:6])
+            if date(ano, mes, 1) >= limite:
+                continue
+            with conexao.cursor() as cursor:
+                cursor.execute(f"ALTER TABLE {qn(tabela)} DETACH PARTITION {qn(particao)}")
+                cursor.execute(f"DROP TABLE {qn(particao)}")
+            removidas.append(particao)
+            logger.info(f"Partição {particao} removida (retenção de {meses_retencao} meses)")
+    return removidas
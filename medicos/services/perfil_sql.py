@@ -0,0 +1,363 @@
+"""
+Perfil de SQL por requisição (orçamento de queries e ranking de views)
+
+Coleta, para cada requisição instrumentada por
+`medicos.middleware.perfil_sql.PerfilSQLMiddleware`:
+- quantidade de queries e tempo total de banco (execute_wrapper em todas as conexões);
+- impressões digitais (fingerprints) das queries: SQL normalizado, sem
+  literais nem listas de parâmetros; a mesma forma repetida na requisição é
+  candidata a N+1;
+- tempo de renderização de templates (apenas o template de nível mais alto).
+
+Os totais são agregados no Redis (cache padrão, django-redis), por view e por
+forma de SQL repetida, e lidos pela página de staff `perfil_sql_dashboard`.
+Sem Redis disponível, a agregação fica em memória no processo (útil em
+desenvolvimento com runserver).
+
+Estrutura no Redis (todas as chaves expiram em PERFIL_SQL_TTL segundos):
+- `perfil_sql:views` (zset): view -> total de queries
+- `perfil_sql:max_queries` (zset): view -> maior quantidade de queries em uma requisição
+- `perfil_sql:view:<view>` (hash): requisicoes, queries, duplicadas, tempo_db_ms,
+  tempo_template_ms, tempo_total_ms, acima_orcamento
+- `perfil_sql:sql` (zset): fingerprint -> repetições além da primeira
+- `perfil_sql:sql:texto` / `perfil_sql:sql:view` (hash): SQL normalizado e
+  última view em que a forma se repetiu
+"""
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_CHAVE = 'perfil_sql'
+CHAVE_VIEWS = f'{PREFIXO_CHAVE}:views'
+CHAVE_MAX_QUERIES = f'{PREFIXO_CHAVE}:max_queries'
+CHAVE_SQL = f'{PREFIXO_CHAVE}:sql'
+CHAVE_SQL_TEXTO = f'{PREFIXO_CHAVE}:sql:texto'
+CHAVE_SQL_VIEW = f'{PREFIXO_CHAVE}:sql:view'
+
+TAMANHO_MAXIMO_SQL = 1000
+LIMITE_VIEWS_LIDAS = 500
+
+CAMPOS_VIEW = (
+    'requisicoes', 'queries', 'duplicadas', 'tempo_db_ms', 'tempo_template_ms', 'tempo_total_ms', 'acima_orcamento',
+)
+ORDENACOES = {
+    'queries_media': 'Queries por requisição',
+    'queries_max': 'Pico de queries',
+    'tempo_db_medio_ms': 'Tempo de banco por requisição',
+    'duplicadas_media': 'Queries repetidas por requisição',
+    'tempo_total_medio_ms': 'Tempo total por requisição',
+    'requisicoes': 'Requisições',
+}
+
+_RE_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_RE_LISTA = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_RE_ESPACOS = re.compile(r'\s+')
+
+_estado = threading.local()
+
+
+def perfil_sql_habilitado():
+    return getattr(settings, 'PERFIL_SQL_ENABLED', False)
+
+
+def orcamento_queries():
+    return getattr(settings, 'PERFIL_SQL_ORCAMENTO_QUERIES', 100)
+
+
+def _ttl():
+    return getattr(settings, 'PERFIL_SQL_TTL', 7 * 24 * 3600)
+
+
+def normalizar_sql(sql):
+    """Forma do SQL: literais e placeholders viram '?', listas IN viram '(...)'."""
+    sql = _RE_TEXTO.sub('?', sql).replace('%s', '?')
+    sql = _RE_NUMERO.sub('?', sql)
+    sql = _RE_LISTA.sub('(...)', sql)
+    return _RE_ESPACOS.sub(' ', sql).strip()
+
+
+def fingerprint_sql(sql_normalizado):
+    return hashlib.sha1(sql_normalizado.encode('utf-8')).hexdigest()[:16]
+
+
+class ColetaRequisicao:
+    """Acumula queries, tempo de banco, fingerprints e tempo de template de uma requisição."""
+
+    def __init__(self):
+        self.queries = 0
+        self.tempo_db = 0.0
+        self.tempo_template = 0.0
+        self.por_fingerprint = Counter()
+        self.textos = {}
+        self._cache_normalizacao = {}
+        self._profundidade_template = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_db += time.perf_counter() - inicio
+            self.queries += 1
+            fingerprint = self._cache_normalizacao.get(sql)
+            if fingerprint is None:
+                normalizado = normalizar_sql(sql)
+                fingerprint = fingerprint_sql(normalizado)
+                self._cache_normalizacao[sql] = fingerprint
+                self.textos.setdefault(fingerprint, normalizado[:TAMANHO_MAXIMO_SQL])
+            self.por_fingerprint[fingerprint] += 1
+
+    @property
+    def duplicadas(self):
+        """Quantidade de execuções de formas já vistas nesta requisição."""
+        return sum(quantidade - 1 for quantidade in self.por_fingerprint.values() if quantidade > 1)
+
+    def repetidas(self):
+        """fingerprint -> repetições além da primeira (apenas formas repetidas)."""
+        return {fp: quantidade - 1 for fp, quantidade in self.por_fingerprint.items() if quantidade > 1}
+
+    @contextmanager
+    def ativa(self):
+        """Instala a coleta em todas as conexões e nesta thread durante o bloco."""
+        anterior = getattr(_estado, 'coleta', None)
+        _estado.coleta = self
+        try:
+            with ExitStack() as pilha:
+                for alias in connections:
+                    pilha.enter_context(connections[alias].execute_wrapper(self))
+                yield self
+        finally:
+            _estado.coleta = anterior
+
+
+def coleta_atual():
+    return getattr(_estado, 'coleta', None)
+
+
+_instrumentacao_lock = threading.Lock()
+
+
+def instrumentar_templates():
+    """
+    Mede o tempo de renderização dos templates Django (backend), somando apenas
+    o nível mais alto quando há render_to_string aninhado. Idempotente.
+    """
+    from django.template.backends.django import Template
+
+    with _instrumentacao_lock:
+        if getattr(Template.render, '_perfil_sql', False):
+            return
+        render_original = Template.render
+
+        def render(self, context=None, request=None):
+            coleta = coleta_atual()
+            if coleta is None:
+                return render_original(self, context, request)
+            coleta._profundidade_template += 1
+            inicio = time.perf_counter()
+            try:
+                return render_original(self, context, request)
+            finally:
+                coleta._profundidade_template -= 1
+                if coleta._profundidade_template == 0:
+                    coleta.tempo_template += time.perf_counter() - inicio
+
+        render._perfil_sql = True
+        Template.render = render
+
+
+# ===============================
+# Agregação
+# ===============================
+
+def obter_conexao_redis():
+    """Conexão Redis do cache padrão, ou None se indisponível."""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception as e:
+        logger.debug(f"Perfil de SQL sem Redis, agregando em memória: {e}")
+        return None
+
+
+class _AgregadoMemoria:
+    """Agregação no processo, com a mesma forma da agregação no Redis."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        self.views = defaultdict(lambda: dict.fromkeys(CAMPOS_VIEW, 0))
+        self.max_queries = {}
+        self.sql = Counter()
+        self.sql_texto = {}
+        self.sql_view = {}
+
+
+_memoria = _AgregadoMemoria()
+
+
+def _valores_requisicao(coleta, tempo_total):
+    return {
+        'requisicoes': 1,
+        'queries': coleta.queries,
+        'duplicadas': coleta.duplicadas,
+        'tempo_db_ms': round(coleta.tempo_db * 1000, 3),
+        'tempo_template_ms': round(coleta.tempo_template * 1000, 3),
+        'tempo_total_ms': round(tempo_total * 1000, 3),
+        'acima_orcamento': int(coleta.queries > orcamento_queries()),
+    }
+
+
+def registrar_requisicao(view, coleta, tempo_total):
+    """Soma a requisição aos agregados da view e das formas de SQL repetidas."""
+    valores = _valores_requisicao(coleta, tempo_total)
+    repetidas = coleta.repetidas()
+    redis = obter_conexao_redis()
+    if redis is None:
+        with _memoria.lock:
+            agregado = _memoria.views[view]
+            for campo, valor in valores.items():
+                agregado[campo] += valor
+            _memoria.max_queries[view] = max(_memoria.max_queries.get(view, 0), coleta.queries)
+            for fingerprint, repeticoes in repetidas.items():
+                _memoria.sql[fingerprint] += repeticoes
+                _memoria.sql_texto.setdefault(fingerprint, coleta.textos.get(fingerprint, ''))
+                _memoria.sql_view[fingerprint] = view
+        return
+
+    ttl = _ttl()
+    chave_view = f'{PREFIXO_CHAVE}:view:{view}'
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for campo, valor in valores.items():
+            if isinstance(valor, float):
+                pipe.hincrbyfloat(chave_view, campo, valor)
+            else:
+                pipe.hincrby(chave_view, campo, valor)
+        pipe.zincrby(CHAVE_VIEWS, coleta.queries, view)
+        pipe.zadd(CHAVE_MAX_QUERIES, {view: coleta.queries}, gt=True)
+        for fingerprint, repeticoes in repetidas.items():
+            pipe.zincrby(CHAVE_SQL, repeticoes, fingerprint)
+            pipe.hsetnx(CHAVE_SQL_TEXTO, fingerprint, coleta.textos.get(fingerprint, ''))
+            pipe.hset(CHAVE_SQL_VIEW, fingerprint, view)
+        for chave in (chave_view, CHAVE_VIEWS, CHAVE_MAX_QUERIES, CHAVE_SQL, CHAVE_SQL_TEXTO, CHAVE_SQL_VIEW):
+            pipe.expire(chave, ttl)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Falha ao agregar perfil de SQL no Redis: {e}")
+
+
+def _texto(valor):
+    return valor.decode() if isinstance(valor, bytes) else valor
+
+
+def _linha_view(view, totais, queries_max):
+    requisicoes = int(float(totais.get('requisicoes', 0) or 0))
+    if not requisicoes:
+        return None
+
+    def media(campo):
+        return round(float(totais.get(campo, 0) or 0) / requisicoes, 2)
+
+    return {
+        'view': view,
+        'requisicoes': requisicoes,
+        'queries_media': media('queries'),
+        'queries_max': int(queries_max or 0),
+        'duplicadas_media': media('duplicadas'),
+        'tempo_db_medio_ms': media('tempo_db_ms'),
+        'tempo_template_medio_ms': media('tempo_template_ms'),
+        'tempo_total_medio_ms': media('tempo_total_ms'),
+        'acima_orcamento': int(float(totais.get('acima_orcamento', 0) or 0)),
+    }
+
+
+def relatorio_perfil_sql(ordenar_por='queries_media', limite=20):
+    """
+    Ranking das piores views e das formas de SQL mais repetidas.
+
+    Returns:
+        dict: {'views': [...], 'sql': [...], 'origem': 'redis' | 'memoria',
+               'orcamento_queries': int}
+    """
+    if ordenar_por not in ORDENACOES:
+        ordenar_por = 'queries_media'
+    linhas, formas = [], []
+    redis = obter_conexao_redis()
+    origem = 'memoria' if redis is None else 'redis'
+
+    if redis is None:
+        with _memoria.lock:
+            for view, totais in _memoria.views.items():
+                linha = _linha_view(view, totais, _memoria.max_queries.get(view))
+                if linha:
+                    linhas.append(linha)
+            for fingerprint, repeticoes in _memoria.sql.most_common(limite):
+                formas.append({
+                    'fingerprint': fingerprint,
+                    'repeticoes': repeticoes,
+                    'sql': _memoria.sql_texto.get(fingerprint, ''),
+                    'view': _memoria.sql_view.get(fingerprint, ''),
+                })
+    else:
+        try:
+            views = [_texto(view) for view in redis.zrevrange(CHAVE_VIEWS, 0, LIMITE_VIEWS_LIDAS - 1)]
+            pipe = redis.pipeline(transaction=False)
+            for view in views:
+                pipe.hgetall(f'{PREFIXO_CHAVE}:view:{view}')
+                pipe.zscore(CHAVE_MAX_QUERIES, view)
+            respostas = pipe.execute()
+            for i, view in enumerate(views):
+                totais = {_texto(campo): _texto(valor) for campo, valor in respostas[2 * i].items()}
+                linha = _linha_view(view, totais, respostas[2 * i + 1])
+                if linha:
+                    linhas.append(linha)
+
+            mais_repetidas = redis.zrevrange(CHAVE_SQL, 0, limite - 1, withscores=True)
+            fingerprints = [_texto(fingerprint) for fingerprint, _ in mais_repetidas]
+            textos = redis.hmget(CHAVE_SQL_TEXTO, fingerprints) if fingerprints else []
+            views_sql = redis.hmget(CHAVE_SQL_VIEW, fingerprints) if fingerprints else []
+            for i, (fingerprint, repeticoes) in enumerate(mais_repetidas):
+                formas.append({
+                    'fingerprint': fingerprints[i],
+                    'repeticoes': int(repeticoes),
+                    'sql': _texto(textos[i]) or '',
+                    'view': _texto(views_sql[i]) or '',
+                })
+        except Exception as e:
+            logger.warning(f"Falha ao ler perfil de SQL do Redis: {e}")
+
+    linhas.sort(key=lambda linha: linha[ordenar_por], reverse=True)
+    return {
+        'views': linhas[:limite],
+        'sql': formas,
+        'origem': origem,
+        'orcamento_queries': orcamento_queries(),
+    }
+
+
+def limpar_perfil_sql():
+    """Descarta todos os agregados do perfil de SQL."""
+    redis = obter_conexao_redis()
+    if redis is None:
+        with _memoria.lock:
+            _memoria.limpar()
+        return
+    try:
+        chaves = list(redis.scan_iter(match=f'{PREFIXO_CHAVE}:*', count=500))
+        if chaves:
+            redis.delete(*chaves)
+    except Exception as e:
+        logger.warning(f"Falha ao limpar perfil de SQL no Redis: {e}")
@@ -0,0 +1,208 @@
+"""
+Serviço de rateio de nota fiscal entre médicos (gravação em lote)
+
+Recebe o vetor completo de valores brutos por médico enviado pela matriz de
+rateio e:
+1. Calcula, em uma única passada, percentual e impostos de cada médico
+   proporcionalmente aos valores da nota, com reconciliação de arredondamento
+   (maior resto) para que a soma das parcelas feche exatamente, centavo a
+   centavo, com a nota (ou com a fração rateada, se o rateio for parcial);
+2. Aplica o resultado com bulk_create / bulk_update / delete em uma transação,
+   recalculando os totais de rateio da nota uma única vez.
+
+Substitui o laço por médico de `NotaFiscalRateioListView.post`, que fazia
+exists() + first() + save()/delete() por sócio.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from medicos.models.fiscal import NotaFiscal, NotaFiscalRateioMedico
+from medicos.services.adicional_ir import invalidar_cache_adicional_ir
+from medicos.services.centavos import de_centavos, para_centavos, ratear_centavos
+from medicos.signals_financeiro import totais_rateio_suspensos
+
+logger = logging.getLogger(__name__)
+
+CENTAVO = Decimal('0.01')
+CEM = Decimal('100')
+
+# campo da nota -> campo do rateio
+IMPOSTOS_RATEADOS = (
+    ('val_ISS', 'valor_iss_medico'),
+    ('val_PIS', 'valor_pis_medico'),
+    ('val_COFINS', 'valor_cofins_medico'),
+    ('val_IR', 'valor_ir_medico'),
+    ('val_CSLL', 'valor_csll_medico'),
+)
+
+CAMPOS_CALCULADOS = (
+    'percentual_participacao',
+    'valor_bruto_medico',
+    'valor_iss_medico',
+    'valor_pis_medico',
+    'valor_cofins_medico',
+    'valor_ir_medico',
+    'valor_csll_medico',
+    'valor_liquido_medico',
+)
+
+
+def distribuir_proporcional(total, pesos):
+    """
+    Distribui `total` (já em centavos exatos) proporcionalmente aos `pesos`,
+    pelo método do maior resto (services/centavos.ratear_centavos), de modo
+    que a soma das parcelas seja exatamente `total`.
+
+    Returns:
+        list[Decimal]: parcelas na mesma ordem dos pesos
+    """
+    parcelas = ratear_centavos(para_centavos(total), [para_centavos(peso) for peso in pesos])
+    return [de_centavos(parcela) for parcela in parcelas]
+
+
+def _alvo(valor_nota, fracao_rateada, rateio_integral):
+    """Total a distribuir de um valor da nota (integral ou proporcional à fração rateada)."""
+    valor_nota = Decimal(valor_nota or 0)
+    if rateio_integral:
+        return valor_nota.quantize(CENTAVO)
+    return (valor_nota * fracao_rateada).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def calcular_rateio(nota_fiscal, valores_por_medico):
+    """
+    Calcula percentual, impostos e líquido de cada médico em uma passada.
+
+    Args:
+        nota_fiscal (NotaFiscal): nota a ratear
+        valores_por_medico (dict): medico_id -> valor bruto (Decimal > 0)
+
+    Returns:
+        dict: medico_id -> dict com os CAMPOS_CALCULADOS
+    """
+    medicos = list(valores_por_medico)
+    brutos = [Decimal(valores_por_medico[m]).quantize(CENTAVO) for m in medicos]
+    if not medicos:
+        return {}
+
+    val_bruto_nota = Decimal(nota_fiscal.val_bruto or 0)
+    total_rateado = sum(brutos)
+    rateio_integral = val_bruto_nota > 0 and total_rateado == val_bruto_nota
+    fracao_rateada = total_rateado / val_bruto_nota if val_bruto_nota > 0 else Decimal('0')
+
+    colunas = {'valor_bruto_medico': brutos}
+    colunas['percentual_participacao'] = distribuir_proporcional(
+        _alvo(CEM, fracao_rateada, rateio_integral), brutos
+    )
+    for campo_nota, campo_rateio in IMPOSTOS_RATEADOS:
+        colunas[campo_rateio] = distribuir_proporcional(
+            _alvo(getattr(nota_fiscal, campo_nota), fracao_rateada, rateio_integral), brutos
+        )
+    outros = distribuir_proporcional(_alvo(nota_fiscal.val_outros, fracao_rateada, rateio_integral), brutos)
+    colunas['valor_liquido_medico'] = [
+        bruto - sum(colunas[campo][i] for _, campo in IMPOSTOS_RATEADOS) - outros[i]
+        for i, bruto in enumerate(brutos)
+    ]
+
+    return {
+        medico_id: {campo: colunas[campo][i] for campo in CAMPOS_CALCULADOS}
+        for i, medico_id in enumerate(medicos)
+    }
+
+
+class RateioNotaFiscalService:
+    """
+    Aplica a matriz de rateio de uma nota fiscal em número constante de queries.
+    """
+
+    def __init__(self, nota_fiscal, usuario=None):
+        self.nota_fiscal = nota_fiscal
+        self.usuario = usuario
+
+    def aplicar(self, valores_por_medico, medicos_permitidos=None, tipo_rateio='valor'):
+        """
+        Grava o rateio da nota a partir do vetor de valores brutos por médico.
+
+        Médicos com valor zero (ou fora de `medicos_permitidos`) têm o rateio
+        removido; os demais são criados ou atualizados.
+
+        Args:
+            valores_por_medico (dict): medico_id -> valor bruto (Decimal)
+            medicos_permitidos (iterable): ids dos médicos que podem ter rateio
+                (ex: sócios ativos da empresa); None = não restringe
+            tipo_rateio (str): tipo gravado nos rateios
+
+        Raises:
+            ValidationError: se a soma dos valores exceder o valor bruto da nota
+
+        Returns:
+            dict: {'criados': int, 'atualizados': int, 'removidos': int}
+        """
+        nota = self.nota_fiscal
+        valores = {
+            medico_id: Decimal(valor)
+            for medico_id, valor in valores_por_medico.items()
+            if valor and Decimal(valor) > 0
+        }
+        if medicos_permitidos is not None:
+            permitidos = set(medicos_permitidos)
+            valores = {m: v for m, v in valores.items() if m in permitidos}
+
+        val_bruto_nota = Decimal(nota.val_bruto or 0)
+        if val_bruto_nota > 0 and sum(valores.values()) > val_bruto_nota:
+            raise ValidationError('O total do rateio não pode exceder o valor bruto da nota fiscal.')
+
+        calculados = calcular_rateio(nota, valores)
+        agora = timezone.now()
+
+        with transaction.atomic(), totais_rateio_suspensos():
+            existentes = {
+                rateio.medico_id: rateio
+                for rateio in NotaFiscalRateioMedico.objects.select_for_update().filter(nota_fiscal=nota)
+            }
+
+            novos, alterados = [], []
+            for medico_id, campos in calculados.items():
+                rateio = existentes.get(medico_id)
+                if rateio is None:
+                    novos.append(NotaFiscalRateioMedico(
+                        nota_fiscal=nota,
+                        medico_id=medico_id,
+                        tipo_rateio=tipo_rateio,
+                        data_rateio=agora,
+                        configurado_por=self.usuario,
+                        **campos,
+                    ))
+                    continue
+                if rateio.tipo_rateio == tipo_rateio and all(
+                    getattr(rateio, campo) == valor for campo, valor in campos.items()
+                ):
+                    continue
+                for campo, valor in campos.items():
+                    setattr(rateio, campo, valor)
+                rateio.tipo_rateio = tipo_rateio
+                rateio.updated_at = agora
+                alterados.append(rateio)
+
+            remover = [rateio.pk for medico_id, rateio in existentes.items() if medico_id not in calculados]
+            removidos = 0
+            if remover:
+                removidos, _ = NotaFiscalRateioMedico.objects.filter(pk__in=remover).delete()
+            if alterados:
+                NotaFiscalRateioMedico.objects.bulk_update(
+                    alterados, list(CAMPOS_CALCULADOS) + ['tipo_rateio', 'updated_at'], batch_size=500
+                )
+            if novos:
+                NotaFiscalRateioMedico.objects.bulk_create(novos, batch_size=500)
+
+            NotaFiscal.atualizar_totais_rateio([nota.pk])
+
+        nota.recarregar_totais_rateio()
+        # bulk_create/bulk_update não disparam signals: invalida a apuração do trimestre
+        invalidar_cache_adicional_ir(nota.empresa_destinataria_id, nota.dtEmissao)
+        resultado = {'criados': len(novos), 'atualizados': len(alterados), 'removidos': removidos}
+        logger.info(f"Rateio da NF {nota.numero} (id {nota.pk}) aplicado: {resultado}")
+        return resultado
@@ -0,0 +1,283 @@
+"""
+Snapshots imutáveis dos relatórios de competências fechadas
+
+Depois que uma competência é fechada (todos os SaldoMensalContaCorrente da
+empresa no mês com `fechado=True`), os dados que alimentam os relatórios não
+deveriam mudar; mesmo assim o relatório mensal do sócio, a apuração e o
+resumo executivo recalculavam tudo a partir dos lançamentos a cada visita.
+
+- `congelar_periodo` grava, no fechamento, os payloads de
+  medicos/relatorios/payloads_periodo.py em SnapshotPeriodo (JSON zlib,
+  versionado).
+- As views leem períodos fechados com `obter_ou_congelar`: o snapshot
+  vigente ou, se o período foi fechado antes deste recurso, o cálculo ao
+  vivo congelado na primeira leitura.
+- `invalidar_snapshots` (chamado na reabertura) desativa as versões
+  vigentes; o próximo fechamento ou leitura de período fechado gera a
+  versão seguinte.
+- Todo payload que vai ser congelado é calculado no primário (`primario`),
+  mesmo quando a view lê da réplica: um snapshot imutável não pode guardar
+  o estado atrasado da réplica.
+- `auditar_snapshot` recalcula o payload e devolve as diferenças em relação
+  ao congelado (comando auditar_snapshots_periodo).
+"""
+import logging
+from datetime import date
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from medicos.models.conta_corrente import SaldoMensalContaCorrente
+from medicos.models.relatorios import SnapshotPeriodo
+from medicos.rastreamento import span
+from medicos.replica import alias_leitura, primario
+
+logger = logging.getLogger(__name__)
+
+# Versão da estrutura dos payloads; incrementar ao mudar payloads_periodo.py
+FORMATO_PAYLOAD = 1
+
+ORIGEM_FECHAMENTO = 'fechamento'
+ORIGEM_LEITURA = 'primeira_leitura'
+ORIGEM_AUDITORIA = 'auditoria'
+
+
+def competencia_de(mes_ano):
+    """date do primeiro dia do mês a partir de 'YYYY-MM' (ou de um date)."""
+    if isinstance(mes_ano, date):
+        return mes_ano.replace(day=1)
+    ano, mes = (int(parte) for parte in str(mes_ano).split('-')[:2])
+    return date(ano, mes, 1)
+
+
+def periodo_fechado(empresa_id, competencia, socio_id=None):
+    """True se há saldos da competência e todos estão fechados (do sócio, se informado)."""
+    saldos = SaldoMensalContaCorrente.objects.filter(empresa_id=empresa_id, competencia=competencia)
+    if socio_id is not None:
+        saldos = saldos.filter(socio_id=socio_id)
+    contagem = saldos.aggregate(total=Count('id'), abertos=Count('id', filter=Q(fechado=False)))
+    return contagem['total'] > 0 and contagem['abertos'] == 0
+
+
+def meses_fechados(empresa_id, ano):
+    """Meses do ano com a competência fechada para a empresa, em uma query."""
+    por_mes = (
+        SaldoMensalContaCorrente.objects
+        .filter(empresa_id=empresa_id, competencia__year=int(ano))
+        .values('competencia')
+        .annotate(abertos=Count('id', filter=Q(fechado=False)))
+    )
+    return {linha['competencia'].month for linha in por_mes if linha['abertos'] == 0}
+
+
+def snapshot_vigente(empresa_id, tipo, competencia, chave=''):
+    return SnapshotPeriodo.objects.filter(
+        empresa_id=empresa_id,
+        tipo=tipo,
+        competencia=competencia,
+        chave=str(chave),
+        ativo=True,
+        formato=FORMATO_PAYLOAD,
+    ).first()
+
+
+def construir_payload(tipo, empresa_id, competencia, chave=''):
+    """Calcula ao vivo o payload de um snapshot (sem efeitos como lançamento de impostos)."""
+    from medicos.relatorios import payloads_periodo
+
+    mes_ano = competencia.strftime('%Y-%m')
+    if tipo == SnapshotPeriodo.TIPO_MENSAL_SOCIO:
+        return payloads_periodo.payload_relatorio_mensal_socio(empresa_id, mes_ano, int(chave))
+    if tipo == SnapshotPeriodo.TIPO_EXECUTIVO:
+        return payloads_periodo.payload_resumo_executivo(empresa_id, mes_ano)
+    if tipo == SnapshotPeriodo.TIPO_APURACAO:
+        return payloads_periodo.payload_apuracao_ano(empresa_id, competencia.year)[competencia.month]
+    raise ValueError(f'Tipo de snapshot desconhecido: {tipo}')
+
+
+def congelar(empresa_id, tipo, competencia, dados, chave='', origem=ORIGEM_FECHAMENTO):
+    """
+    Grava `dados` como versão vigente do snapshot.
+
+    Idempotente: se a versão vigente tem o mesmo conteúdo, ela é mantida.
+    Caso contrário a vigente é desativada e uma nova versão é criada.
+    """
+    chave = str(chave)
+    payload, hash_payload, tamanho = SnapshotPeriodo.serializar(dados)
+    filtro = {'empresa_id': empresa_id, 'tipo': tipo, 'competencia': competencia, 'chave': chave}
+    try:
+        with transaction.atomic():
+            vigente = SnapshotPeriodo.objects.select_for_update().filter(ativo=True, **filtro).first()
+            if vigente and vigente.hash_payload == hash_payload and vigente.formato == FORMATO_PAYLOAD:
+                return vigente
+            versao = (SnapshotPeriodo.objects.filter(**filtro).aggregate(maior=Max('versao'))['maior'] or 0) + 1
+            if vigente:
+                vigente.ativo = False
+                vigente.invalidado_em = timezone.now()
+                vigente.motivo_invalidacao = f'Substituído pela versão {versao}'
+                vigente.save(update_fields=['ativo', 'invalidado_em', 'motivo_invalidacao'])
+            return SnapshotPeriodo.objects.create(
+                **filtro,
+                versao=versao,
+                formato=FORMATO_PAYLOAD,
+                payload=payload,
+                hash_payload=hash_payload,
+                tamanho_bruto=tamanho,
+                origem=origem,
+            )
+    except IntegrityError:
+        # Outra requisição congelou o mesmo período ao mesmo tempo
+        vigente = snapshot_vigente(empresa_id, tipo, competencia, chave)
+        if vigente is None:
+            raise
+        return vigente
+
+
+def obter_ou_congelar(tipo, empresa_id, competencia, chave=''):
+    """
+    (dados, snapshot) de um período fechado.
+
+    Lê o snapshot vigente; sem ele (período fechado antes dos snapshots ou
+    formato antigo), calcula ao vivo no primário e congela.
+    """
+    snapshot = snapshot_vigente(empresa_id, tipo, competencia, chave)
+    if snapshot is None:
+        with primario(), span('snapshot.congelar_primeira_leitura', logger, tipo=tipo, empresa_id=empresa_id):
+            # A réplica pode não ter o snapshot recém-gravado por outra requisição
+            snapshot = snapshot_vigente(empresa_id, tipo, competencia, chave)
+            if snapshot is None:
+                dados = construir_payload(tipo, empresa_id, competencia, chave)
+                snapshot = congelar(empresa_id, tipo, competencia, dados, chave, origem=ORIGEM_LEITURA)
+    return snapshot.dados, snapshot
+
+
+def apuracao_congelada(empresa_id, ano):
+    """{mes: payload} das apurações congeladas das competências fechadas do ano."""
+    fechados = meses_fechados(empresa_id, ano)
+    if not fechados:
+        return {}
+    snapshots = SnapshotPeriodo.objects.filter(
+        empresa_id=empresa_id,
+        tipo=SnapshotPeriodo.TIPO_APURACAO,
+        competencia__year=int(ano),
+        chave='',
+        ativo=True,
+        formato=FORMATO_PAYLOAD,
+    )
+    return {s.competencia.month: s.dados for s in snapshots if s.competencia.month in fechados}
+
+
+def congelar_apuracao_ausente(empresa_id, ano, relatorios, congeladas):
+    """
+    Congela os meses fechados ainda sem snapshot.
+
+    Reaproveita os relatórios calculados ao vivo pela view; se eles foram
+    lidos da réplica (`leitura_replica`), a apuração é recalculada no primário.
+    """
+    from medicos.relatorios.payloads_periodo import apuracao_do_mes, payload_apuracao_ano
+
+    leitura_da_replica = alias_leitura() != DEFAULT_DB_ALIAS
+    with primario():
+        ausentes = sorted(meses_fechados(empresa_id, ano) - set(congeladas))
+        if not ausentes:
+            return
+        payloads = payload_apuracao_ano(empresa_id, int(ano)) if leitura_da_replica else None
+        for mes in ausentes:
+            if payloads is not None:
+                dados = payloads[mes]
+            else:
+                try:
+                    dados = apuracao_do_mes(relatorios, mes)
+                except (KeyError, IndexError, TypeError):
+                    continue
+            congelar(empresa_id, SnapshotPeriodo.TIPO_APURACAO, date(int(ano), mes, 1), dados, origem=ORIGEM_LEITURA)
+
+
+@span('snapshot.congelar_periodo', logger)
+def congelar_periodo(empresa_id, competencia, origem=ORIGEM_FECHAMENTO):
+    """
+    Congela os relatórios de uma competência recém-fechada.
+
+    Relatório mensal de cada sócio com saldo fechado; resumo executivo e
+    apuração apenas se a competência inteira da empresa estiver fechada.
+    Retorna {tipo: quantidade de snapshots}.
+    """
+    from medicos.relatorios.payloads_periodo import payload_apuracao_ano
+
+    mes_ano = competencia.strftime('%Y-%m')
+    contagem = {}
+    with primario():
+        socios_fechados = SaldoMensalContaCorrente.objects.filter(
+            empresa_id=empresa_id, competencia=competencia, fechado=True
+        ).values_list('socio_id', flat=True)
+        for socio_id in socios_fechados:
+            dados = construir_payload(SnapshotPeriodo.TIPO_MENSAL_SOCIO, empresa_id, competencia, socio_id)
+            congelar(empresa_id, SnapshotPeriodo.TIPO_MENSAL_SOCIO, competencia, dados, socio_id, origem)
+            contagem[SnapshotPeriodo.TIPO_MENSAL_SOCIO] = contagem.get(SnapshotPeriodo.TIPO_MENSAL_SOCIO, 0) + 1
+
+        if periodo_fechado(empresa_id, competencia):
+            dados = construir_payload(SnapshotPeriodo.TIPO_EXECUTIVO, empresa_id, competencia)
+            congelar(empresa_id, SnapshotPeriodo.TIPO_EXECUTIVO, competencia, dados, origem=origem)
+            dados = payload_apuracao_ano(empresa_id, competencia.year)[competencia.month]
+            congelar(empresa_id, SnapshotPeriodo.TIPO_APURACAO, competencia, dados, origem=origem)
+            contagem[SnapshotPeriodo.TIPO_EXECUTIVO] = contagem[SnapshotPeriodo.TIPO_APURACAO] = 1
+
+    logger.info(f"Competência {mes_ano} da empresa {empresa_id} congelada: {contagem}")
+    return contagem
+
+
+def invalidar_snapshots(empresa_id, competencia, motivo='', socio_id=None):
+    """
+    Desativa os snapshots vigentes da competência (reabertura do período).
+
+    Com `socio_id`, só o relatório daquele sócio e os snapshots da empresa
+    (apuração, resumo executivo), que deixam de valer com qualquer sócio
+    reaberto. Retorna a quantidade desativada.
+    """
+    snapshots = SnapshotPeriodo.objects.filter(empresa_id=empresa_id, competencia=competencia, ativo=True)
+    if socio_id is not None:
+        snapshots = snapshots.filter(
+            ~Q(tipo=SnapshotPeriodo.TIPO_MENSAL_SOCIO) | Q(chave=str(socio_id))
+        )
+    quantidade = snapshots.update(
+        ativo=False,
+        invalidado_em=timezone.now(),
+        motivo_invalidacao=(motivo or 'Período reaberto')[:255],
+    )
+    if quantidade:
+        logger.info(f"{quantidade} snapshot(s) de {competencia:%m/%Y} da empresa {empresa_id} invalidados")
+    return quantidade
+
+
+def comparar_payloads(congelado, recalculado, caminho=''):
+    """Lista de (caminho, congelado, recalculado) das folhas que diferem."""
+    if isinstance(congelado, dict) and isinstance(recalculado, dict):
+        diferencas = []
+        for chave in sorted(set(congelado) | set(recalculado), key=str):
+            diferencas += comparar_payloads(
+                congelado.get(chave), recalculado.get(chave), f'{caminho}.{chave}' if caminho else str(chave)
+            )
+        return diferencas
+    if isinstance(congelado, list) and isinstance(recalculado, list):
+        diferencas = []
+        for indice in range(max(len(congelado), len(recalculado))):
+            diferencas += comparar_payloads(
+                congelado[indice] if indice < len(congelado) else None,
+                recalculado[indice] if indice < len(recalculado) else None,
+                f'{caminho}[{indice}]',
+            )
+        return diferencas
+    return [] if congelado == recalculado else [(caminho, congelado, recalculado)]
+
+
+def auditar_snapshot(snapshot):
+    """
+    Recalcula o payload do snapshot e devolve (recalculado, diferenças).
+
+    As diferenças comparam o JSON normalizado (mesma serialização do
+    snapshot), para que tipos equivalentes não apareçam como diferença.
+    """
+    recalculado = construir_payload(snapshot.tipo, snapshot.empresa_id, snapshot.competencia, snapshot.chave)
+    normalizado = SnapshotPeriodo(payload=SnapshotPeriodo.serializar(recalculado)[0]).dados
+    return recalculado, comparar_payloads(snapshot.dados, normalizado)
@@ -1,16 +1,59 @@
 
 import logging
-from django.db.models.signals import post_save, pre_delete
+import threading
+from contextlib import contextmanager
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from medicos.models.fiscal import NotaFiscal, NotaFiscalRateioMedico
-from medicos.models.financeiro import Financeiro, DescricaoMovimentacaoFinanceira
-from medicos.models.conta_corrente import MovimentacaoContaCorrente
-from medicos.models.despesas import DespesaSocio, DespesaRateada, ItemDespesaRateioMensal
-from django.conf import settings
-from django.utils import timezone
+from medicos.models.base import Socio
+from medicos.models.fiscal import Aliquotas, NotaFiscal, NotaFiscalRateioMedico
+from medicos.models.financeiro import Financeiro
+from medicos.models.despesas import DespesaSocio, DespesaRateada, GrupoDespesa, ItemDespesa, ItemDespesaRateioMensal
+from medicos.models.eventos import EventoDominio
+from medicos.services.busca import invalidar_cache_busca
+from medicos.services.eventos_dominio import DESPESA_RATEADA, DESPESA_SOCIO, registrar_evento
 
 logger = logging.getLogger('medicos.signals_financeiro')
 
+_estado_sincronizacao = threading.local()
+
+
+@contextmanager
+def sincronizacao_despesas_suspensa():
+    """
+    Suspende, na thread atual, os signals de sincronização despesa -> conta corrente.
+
+    Usado por operações em lote (ex: medicos/services/copia_despesas.py) que
+    recalculam os débitos de forma set-based ao final, evitando uma cascata
+    de queries por despesa/sócio.
+    """
+    anterior = getattr(_estado_sincronizacao, 'suspensa', False)
+    _estado_sincronizacao.suspensa = True
+    try:
+        yield
+    finally:
+        _estado_sincronizacao.suspensa = anterior
+
+
+def sincronizacao_despesas_esta_suspensa():
+    """Indica se os signals de sincronização de despesas estão suspensos na thread atual."""
+    return getattr(_estado_sincronizacao, 'suspensa', False)
+
+
+@contextmanager
+def totais_rateio_suspensos():
+    """
+    Suspende, na thread atual, o recálculo dos totais de rateio da nota a cada
+    exclusão de NotaFiscalRateioMedico. Quem suspende deve chamar
+    NotaFiscal.atualizar_totais_rateio ao final (ex: services/rateio_nota_fiscal.py).
+    """
+    anterior = getattr(_estado_sincronizacao, 'totais_rateio_suspensos', False)
+    _estado_sincronizacao.totais_rateio_suspensos = True
+    try:
+        yield
+    finally:
+        _estado_sincronizacao.totais_rateio_suspensos = anterior
+
 
 # @receiver(post_save, sender=NotaFiscal)
 # def criar_ou_atualizar_lancamentos_financeiros(sender, instance, created, **kwargs):
@@ -179,27 +222,18 @@ def remover_lancamentos_financeiros(sender, instance, **kwargs):
     Usamos pre_delete para garantir que a referência nota_fiscal ainda existe
     quando buscarmos as movimentações para removê-las.
     """
-    logger.info(f"=== SIGNAL PRE_DELETE DISPARADO ===")
-    logger.info(f"Preparando exclusão da Nota Fiscal: {instance.numero} (ID: {instance.id})")
-    
     # Buscar movimentações ANTES da exclusão (referência ainda existe)
     movimentacoes = Financeiro.objects.filter(nota_fiscal=instance)
-    count_movimentacoes = movimentacoes.count()
-    
-    if count_movimentacoes > 0:
-        logger.info(f"Removendo {count_movimentacoes} movimentação(ões) financeira(s)")
-        
-        # Listar as movimentações que serão removidas para auditoria
-        for mov in movimentacoes:
-            logger.info(f"  - Movimentação ID: {mov.id}, Sócio: {mov.socio.pessoa.name}, Valor: R$ {mov.valor}")
-        
-        # Remover as movimentações COMPLETAMENTE da tabela
-        movimentacoes.delete()
-        logger.info(f"✅ {count_movimentacoes} movimentação(ões) removida(s) COMPLETAMENTE da tabela")
-    else:
-        logger.info("ℹ️  Nenhuma movimentação financeira associada para remover")
-    
-    logger.info(f"=== PROPAGAÇÃO DE EXCLUSÃO CONCLUÍDA ===")
+
+    if logger.isEnabledFor(logging.DEBUG):
+        # Listagem para auditoria só quando o DEBUG está ligado (custa uma query extra)
+        for mov_id, socio_nome, valor in movimentacoes.values_list('id', 'socio__pessoa__name', 'valor'):
+            logger.debug("Nota fiscal %s: removendo movimentação %s (sócio %s, R$ %s)", instance.id, mov_id, socio_nome, valor)
+
+    # Remover as movimentações COMPLETAMENTE da tabela
+    removidas, _ = movimentacoes.delete()
+    if removidas:
+        logger.info("Nota fiscal %s excluída: %s movimentação(ões) financeira(s) removida(s)", instance.id, removidas)
 
 
 def limpar_movimentacoes_orfas():
@@ -208,403 +242,175 @@ def limpar_movimentacoes_orfas():
     (que perderam a referência da nota fiscal após exclusões anteriores).
     
     Esta função deve ser executada manualmente para corrigir dados históricos.
+    A remoção é feita em lotes por medicos/services/manutencao_financeiro.py.
     """
-    logger.info("=== INICIANDO LIMPEZA DE MOVIMENTAÇÕES ÓRFÃS ===")
-    
-    # Buscar movimentações que eram de notas fiscais mas perderam a referência
-    movimentacoes_orfas = Financeiro.objects.filter(
-        nota_fiscal__isnull=True,
-        descricao_movimentacao_financeira__descricao='Credito de Nota Fiscal'
-    )
-    
-    count_orfas = movimentacoes_orfas.count()
-    
-    if count_orfas > 0:
-        logger.info(f"Encontradas {count_orfas} movimentação(ões) órfã(s) para limpeza")
-        
-        # Listar as movimentações órfãs que serão removidas
-        for mov in movimentacoes_orfas:
-            logger.info(f"  - Movimentação órfã ID: {mov.id}, Sócio: {mov.socio.pessoa.name}, Valor: R$ {mov.valor}, Data: {mov.data_movimentacao}")
-        
-        # Remover as movimentações órfãs
-        movimentacoes_orfas.delete()
-        logger.info(f"✅ {count_orfas} movimentação(ões) órfã(s) removida(s) com sucesso")
-    else:
-        logger.info("ℹ️  Nenhuma movimentação órfã encontrada")
-    
-    logger.info("=== LIMPEZA DE MOVIMENTAÇÕES ÓRFÃS CONCLUÍDA ===")
-    return count_orfas
+    from medicos.services.manutencao_financeiro import limpar_movimentacoes_orfas as limpar_em_lotes
+
+    return limpar_em_lotes()
 
 
 # ===============================
-# SIGNALS PARA DESPESAS DE SÓCIO
+# TOTAIS DE RATEIO DA NOTA FISCAL
 # ===============================
 
-@receiver(post_save, sender=DespesaSocio)
-def criar_ou_atualizar_debito_despesa_socio(sender, instance, created, **kwargs):
+@receiver(post_delete, sender=NotaFiscalRateioMedico)
+def atualizar_totais_rateio_nota_fiscal(sender, instance, **kwargs):
     """
-    Signal disparado quando uma DespesaSocio é salva.
-    Cria ou atualiza um lançamento de débito na conta corrente para a despesa do sócio.
-    
-    Regra: Toda despesa de sócio gera um lançamento de saída na conta corrente.
-    Mudanças na data, valor ou item de despesa são refletidas automaticamente.
+    Mantém os totais desnormalizados da nota (rateio_quantidade, rateio_percentual_total,
+    rateio_valor_total) após a exclusão de um rateio, inclusive em exclusões via queryset.
+    A gravação é tratada em NotaFiscalRateioMedico.save().
     """
-    print(f"=== SIGNAL DESPESA SÓCIO DISPARADO ===")
-    print(f"Despesa Sócio: ID {instance.id}, Sócio: {instance.socio}")
-    print(f"Data: {instance.data}, Valor: R$ {instance.valor}")
-    print(f"Item: {instance.item_despesa}")
-    
-    logger.info(f"=== SIGNAL DESPESA SÓCIO DISPARADO ===")
-    logger.info(f"Despesa Sócio: ID {instance.id}, Sócio: {instance.socio}")
-    logger.info(f"Data: {instance.data}, Valor: R$ {instance.valor}")
-    logger.info(f"Item: {instance.item_despesa}")
-    
-    # Buscar lançamento existente na conta corrente
-    from django.contrib.contenttypes.models import ContentType
-    despesa_content_type = ContentType.objects.get_for_model(DespesaSocio)
-    
-    # Como MovimentacaoContaCorrente não tem um campo genérico para despesas,
-    # vamos usar o histórico_complementar para identificar
-    lancamento_existente = MovimentacaoContaCorrente.objects.filter(
-        socio=instance.socio,
-        historico_complementar__contains=f'Despesa Sócio ID: {instance.id}'
-    ).first()
-    
-    # VALIDAÇÃO: Despesa deve ter todos os dados necessários
-    condicoes_atendidas = (
-        instance.data and 
-        instance.valor and
-        instance.valor > 0 and
-        instance.socio and
-        instance.item_despesa
-    )
-    
-    print(f"Condições para lançamento: data={bool(instance.data)}, "
-          f"valor={bool(instance.valor and instance.valor > 0)}, "
-          f"socio={bool(instance.socio)}, item={bool(instance.item_despesa)}")
-    
-    if condicoes_atendidas:
-        # Criar descrição específica baseada no nome da despesa
-        descricao_despesa = instance.item_despesa.descricao if instance.item_despesa else "Despesa"
-        nome_descricao = f"Débito {descricao_despesa}"
-        
-        # Garantir que existe uma descrição específica para esta despesa
-        descricao, _ = DescricaoMovimentacaoFinanceira.objects.get_or_create(
-            empresa=instance.socio.empresa,
-            descricao=nome_descricao,
-            defaults={
-                'created_by': getattr(instance, 'created_by', None)
-            }
-        )
-        
-        # Histórico complementar para identificação técnica
-        historico_detalhado = f"{nome_descricao} (Despesa Sócio ID: {instance.id})"
-        
-        # Dados do lançamento
-        dados_lancamento = {
-            'descricao_movimentacao': descricao,
-            'socio': instance.socio,
-            'data_movimentacao': instance.data,
-            'valor': -abs(instance.valor),  # Valor negativo = saída da conta (débito para o sócio)
-            'instrumento_bancario': None,  # Despesas não têm instrumento bancário específico
-            'numero_documento_bancario': '',
-            'historico_complementar': historico_detalhado,
-            'created_by': getattr(instance, 'created_by', None)
-        }
-        
-        if lancamento_existente:
-            # Atualizar lançamento existente
-            for campo, valor in dados_lancamento.items():
-                setattr(lancamento_existente, campo, valor)
-            lancamento_existente.save()
-            print(f"✅ Lançamento conta corrente ATUALIZADO (ID: {lancamento_existente.id})")
-            logger.info(f"✅ Lançamento conta corrente ATUALIZADO (ID: {lancamento_existente.id})")
-        else:
-            # Criar novo lançamento
-            novo_lancamento = MovimentacaoContaCorrente.objects.create(**dados_lancamento)
-            print(f"✅ Lançamento conta corrente CRIADO (ID: {novo_lancamento.id})")
-            logger.info(f"✅ Lançamento conta corrente CRIADO (ID: {novo_lancamento.id})")
-            
+    if getattr(_estado_sincronizacao, 'totais_rateio_suspensos', False):
+        return
+    NotaFiscal.atualizar_totais_rateio([instance.nota_fiscal_id])
+
+
+# =====================================================================================
+# EVENTOS DE DOMÍNIO (outbox)
+#
+# Os dados derivados (débitos de despesas na conta corrente, cache do adicional
+# de IR) não são mais mantidos aqui: cada alteração registra um EventoDominio na
+# mesma transação e medicos/services/eventos_dominio.py aplica os eventos em lote,
+# após o commit ou no worker processar_eventos_dominio.
+# =====================================================================================
+
+@receiver(post_save, sender=NotaFiscal)
+def registrar_evento_nota_fiscal(sender, instance, created, **kwargs):
+    """Nota emitida, recebida, cancelada ou alterada."""
+    anterior = getattr(instance, '_estado_salvo', None) or {}
+    status = instance.status_recebimento
+    if created:
+        tipo = EventoDominio.TIPO_NOTA_EMITIDA
+    elif status == 'cancelado' and anterior.get('status_recebimento') != 'cancelado':
+        tipo = EventoDominio.TIPO_NOTA_CANCELADA
+    elif status == 'recebido' and anterior.get('status_recebimento') != 'recebido':
+        tipo = EventoDominio.TIPO_NOTA_RECEBIDA
     else:
-        # Remover lançamento se despesa não tem dados completos
-        if lancamento_existente:
-            lancamento_existente.delete()
-            print(f"🗑️ Lançamento conta corrente REMOVIDO")
-            logger.info(f"🗑️ Lançamento conta corrente REMOVIDO")
-        else:
-            print(f"ℹ️ Nenhum lançamento para remover")
-            logger.info(f"ℹ️ Nenhum lançamento para remover")
-    
-    print(f"=== SIGNAL DESPESA SÓCIO CONCLUÍDO ===")
-    logger.info(f"=== SIGNAL DESPESA SÓCIO CONCLUÍDO ===")
+        tipo = EventoDominio.TIPO_NOTA_ALTERADA
+    registrar_evento(
+        tipo, f'nota:{instance.pk}', instance.empresa_destinataria_id,
+        nota_fiscal_id=instance.pk,
+        dtEmissao=instance.dtEmissao,
+        # Nota movida de trimestre ou de empresa: o trimestre anterior também é invalidado
+        dtEmissao_anterior=anterior.get('dtEmissao'),
+        empresa_id_anterior=anterior.get('empresa_destinataria_id'),
+    )
+    instance._estado_salvo = {
+        'status_recebimento': status,
+        'dtEmissao': instance.dtEmissao,
+        'empresa_destinataria_id': instance.empresa_destinataria_id,
+    }
 
 
-@receiver(pre_delete, sender=DespesaSocio)
-def remover_debito_despesa_socio(sender, instance, **kwargs):
-    """
-    Signal disparado ANTES de uma DespesaSocio ser excluída.
-    Remove automaticamente o lançamento na conta corrente associado.
-    """
-    logger.info(f"=== REMOVENDO LANÇAMENTO DESPESA SÓCIO ===")
-    logger.info(f"Despesa Sócio: ID {instance.id}, Sócio: {instance.socio}")
-    
-    # Buscar e remover lançamento na conta corrente
-    lancamentos_cc = MovimentacaoContaCorrente.objects.filter(
-        socio=instance.socio,
-        historico_complementar__contains=f'Despesa Sócio ID: {instance.id}'
+@receiver(post_delete, sender=NotaFiscal)
+def registrar_exclusao_nota_fiscal(sender, instance, **kwargs):
+    registrar_evento(
+        EventoDominio.TIPO_NOTA_EXCLUIDA, f'nota:{instance.pk}', instance.empresa_destinataria_id,
+        nota_fiscal_id=instance.pk,
+        dtEmissao=instance.dtEmissao,
     )
-    count_lancamentos = lancamentos_cc.count()
-    
-    if count_lancamentos > 0:
-        logger.info(f"Removendo {count_lancamentos} lançamento(s) na conta corrente")
-        for lancamento in lancamentos_cc:
-            logger.info(f"  - Lançamento ID: {lancamento.id}, Valor: R$ {lancamento.valor}, Data: {lancamento.data_movimentacao}")
-        
-        lancamentos_cc.delete()
-        logger.info(f"✅ {count_lancamentos} lançamento(s) conta corrente removido(s)")
-    else:
-        logger.info("ℹ️ Nenhum lançamento na conta corrente para remover")
-    
-    logger.info(f"=== REMOÇÃO DESPESA SÓCIO CONCLUÍDA ===")
 
 
-# =====================================================================================
-# SIGNALS PARA DESPESAS RATEADAS (DespesaRateada + ItemDespesaRateioMensal)
-# =====================================================================================
+@receiver(post_save, sender=NotaFiscalRateioMedico)
+@receiver(post_delete, sender=NotaFiscalRateioMedico)
+def registrar_evento_rateio_nota(sender, instance, **kwargs):
+    """Participação dos sócios na nota mudou (adicional de IR do trimestre)."""
+    if NotaFiscalRateioMedico.nota_fiscal.is_cached(instance):
+        nota = {
+            'empresa_destinataria_id': instance.nota_fiscal.empresa_destinataria_id,
+            'dtEmissao': instance.nota_fiscal.dtEmissao,
+        }
+    else:
+        nota = NotaFiscal.objects.filter(pk=instance.nota_fiscal_id).values('empresa_destinataria_id', 'dtEmissao').first()
+    if not nota:
+        # Exclusão em cascata da nota: o evento nota_excluida já cobre o trimestre
+        return
+    registrar_evento(
+        EventoDominio.TIPO_RATEIO_NOTA_ALTERADO, f'nota:{instance.nota_fiscal_id}', nota['empresa_destinataria_id'],
+        nota_fiscal_id=instance.nota_fiscal_id,
+        dtEmissao=nota['dtEmissao'],
+    )
 
-@receiver(post_save, sender=DespesaRateada)
-def criar_ou_atualizar_debitos_despesa_rateada(sender, instance, created, **kwargs):
-    """
-    Signal disparado quando uma DespesaRateada é salva.
-    Cria ou atualiza lançamentos de débito na conta corrente para cada sócio com rateio.
-    
-    Regra: Toda despesa rateada gera lançamentos proporcionais na conta corrente
-    conforme o percentual de rateio configurado para cada sócio.
-    """
-    print(f"=== SIGNAL DESPESA RATEADA DISPARADO ===")
-    print(f"Despesa Rateada: ID {instance.id}")
-    print(f"Data: {instance.data}, Valor Total: R$ {instance.valor}")
-    print(f"Item: {instance.item_despesa}")
-    
-    logger.info(f"=== SIGNAL DESPESA RATEADA DISPARADO ===")
-    logger.info(f"Despesa Rateada: ID {instance.id}")
-    logger.info(f"Data: {instance.data}, Valor Total: R$ {instance.valor}")
-    logger.info(f"Item: {instance.item_despesa}")
-    
-    # VALIDAÇÃO: Despesa deve ter todos os dados necessários
-    condicoes_atendidas = (
-        instance.data and 
-        instance.valor and
-        instance.valor > 0 and
-        instance.item_despesa
+
+@receiver(post_save, sender=Aliquotas)
+@receiver(post_delete, sender=Aliquotas)
+def registrar_evento_aliquotas(sender, instance, **kwargs):
+    registrar_evento(
+        EventoDominio.TIPO_ALIQUOTA_ALTERADA, f'aliquotas:{instance.pk}', instance.empresa_id,
+        data_vigencia_inicio=instance.data_vigencia_inicio,
+        data_vigencia_fim=instance.data_vigencia_fim,
     )
-    
-    if not condicoes_atendidas:
-        print(f"❌ Condições não atendidas para processar despesa rateada")
-        logger.info(f"❌ Condições não atendidas para processar despesa rateada")
-        # Remover lançamentos existentes se despesa não tem dados completos
-        _remover_lancamentos_despesa_rateada(instance)
-        return
-    
-    # Calcular rateio para todos os sócios
-    rateios_calculados = instance.calcular_rateio_dinamico()
-    
-    if not rateios_calculados:
-        print(f"⚠️ Nenhum rateio configurado para esta despesa")
-        logger.info(f"⚠️ Nenhum rateio configurado para esta despesa")
-        # Remover lançamentos existentes se não há rateio
-        _remover_lancamentos_despesa_rateada(instance)
-        return
-    
-    print(f"📊 {len(rateios_calculados)} rateio(s) encontrado(s)")
-    logger.info(f"📊 {len(rateios_calculados)} rateio(s) encontrado(s)")
-    
-    # Processar cada rateio
-    for rateio in rateios_calculados:
-        socio = rateio['socio']
-        valor_apropriado = rateio['valor_rateio']
-        percentual = rateio['percentual']
-        
-        print(f"  → {socio}: {percentual}% = R$ {valor_apropriado:.2f}")
-        logger.info(f"  → {socio}: {percentual}% = R$ {valor_apropriado:.2f}")
-        
-        # Pular sócios com valor zero
-        if valor_apropriado <= 0:
-            continue
-            
-        # Buscar lançamento existente na conta corrente
-        historico_identificador = f'Despesa Rateada ID: {instance.id} - Sócio: {socio.id}'
-        lancamento_existente = MovimentacaoContaCorrente.objects.filter(
-            socio=socio,
-            historico_complementar__contains=historico_identificador
-        ).first()
-        
-        # Criar descrição específica baseada no nome da despesa
-        descricao_despesa = instance.item_despesa.descricao if instance.item_despesa else "Despesa"
-        nome_descricao = f"Débito {descricao_despesa}"
-        
-        # Garantir que existe uma descrição específica para esta despesa
-        descricao, _ = DescricaoMovimentacaoFinanceira.objects.get_or_create(
-            empresa=socio.empresa,
-            descricao=nome_descricao,
-            defaults={
-                'created_by': getattr(instance, 'created_by', None)
-            }
-        )
-        
-        # Montar descrição detalhada conforme padrão solicitado
-        historico_detalhado = f"{nome_descricao} (Rateio {percentual}% - {historico_identificador})"
-        
-        # Dados do lançamento
-        dados_lancamento = {
-            'descricao_movimentacao': descricao,
-            'socio': socio,
-            'data_movimentacao': instance.data,
-            'valor': -abs(valor_apropriado),  # Valor negativo = saída da conta (débito para o sócio)
-            'instrumento_bancario': None,
-            'numero_documento_bancario': '',
-            'historico_complementar': historico_detalhado,
-            'created_by': getattr(instance, 'created_by', None)
-        }
-        
-        if lancamento_existente:
-            # Atualizar lançamento existente
-            for campo, valor in dados_lancamento.items():
-                setattr(lancamento_existente, campo, valor)
-            lancamento_existente.save()
-            print(f"  ✅ Lançamento ATUALIZADO (ID: {lancamento_existente.id})")
-            logger.info(f"  ✅ Lançamento ATUALIZADO (ID: {lancamento_existente.id})")
-        else:
-            # Criar novo lançamento
-            novo_lancamento = MovimentacaoContaCorrente.objects.create(**dados_lancamento)
-            print(f"  ✅ Lançamento CRIADO (ID: {novo_lancamento.id})")
-            logger.info(f"  ✅ Lançamento CRIADO (ID: {novo_lancamento.id})")
-    
-    print(f"=== SIGNAL DESPESA RATEADA CONCLUÍDO ===")
-    logger.info(f"=== SIGNAL DESPESA RATEADA CONCLUÍDO ===")
 
 
-@receiver(pre_delete, sender=DespesaRateada)
-def remover_debitos_despesa_rateada(sender, instance, **kwargs):
+@receiver(post_save, sender=DespesaSocio)
+@receiver(post_delete, sender=DespesaSocio)
+def registrar_evento_despesa_socio(sender, instance, **kwargs):
     """
-    Signal disparado ANTES de uma DespesaRateada ser excluída.
-    Remove automaticamente todos os lançamentos na conta corrente associados.
+    Despesa de sócio gravada ou excluída: o consumidor recria (ou remove) o
+    débito na conta corrente.
     """
-    logger.info(f"=== REMOVENDO LANÇAMENTOS DESPESA RATEADA ===")
-    logger.info(f"Despesa Rateada: ID {instance.id}")
-    
-    _remover_lancamentos_despesa_rateada(instance)
-    
-    logger.info(f"=== REMOÇÃO DESPESA RATEADA CONCLUÍDA ===")
+    if sincronizacao_despesas_esta_suspensa():
+        return
+    empresa_id = Socio.objects.filter(pk=instance.socio_id).values_list('empresa_id', flat=True).first()
+    registrar_evento(
+        EventoDominio.TIPO_DESPESA_ALTERADA, f'despesa_socio:{instance.pk}', empresa_id,
+        despesa_id=instance.pk,
+        tipo_despesa=DESPESA_SOCIO,
+    )
 
 
-def _remover_lancamentos_despesa_rateada(instance):
+@receiver(post_save, sender=DespesaRateada)
+@receiver(post_delete, sender=DespesaRateada)
+def registrar_evento_despesa_rateada(sender, instance, **kwargs):
     """
-    Função auxiliar para remover todos os lançamentos relacionados a uma despesa rateada.
+    Despesa rateada gravada ou excluída: o consumidor recria (ou remove) os
+    débitos proporcionais de cada sócio.
     """
-    historico_identificador = f'Despesa Rateada ID: {instance.id}'
-    lancamentos_cc = MovimentacaoContaCorrente.objects.filter(
-        historico_complementar__contains=historico_identificador
+    if sincronizacao_despesas_esta_suspensa():
+        return
+    registrar_evento(
+        EventoDominio.TIPO_DESPESA_ALTERADA, f'despesa_rateada:{instance.pk}', _empresa_do_item(instance.item_despesa_id),
+        despesa_id=instance.pk,
+        tipo_despesa=DESPESA_RATEADA,
     )
-    
-    count_lancamentos = lancamentos_cc.count()
-    if count_lancamentos > 0:
-        print(f"🗑️ Removendo {count_lancamentos} lançamento(s) da despesa rateada")
-        logger.info(f"Removendo {count_lancamentos} lançamento(s) na conta corrente")
-        for lancamento in lancamentos_cc:
-            logger.info(f"  - Lançamento ID: {lancamento.id}, Valor: R$ {lancamento.valor}, Data: {lancamento.data_movimentacao}")
-        
-        lancamentos_cc.delete()
-        print(f"✅ {count_lancamentos} lançamento(s) removido(s)")
-        logger.info(f"✅ {count_lancamentos} lançamento(s) conta corrente removido(s)")
-    else:
-        print(f"ℹ️ Nenhum lançamento para remover")
-        logger.info("ℹ️ Nenhum lançamento na conta corrente para remover")
 
 
 @receiver(post_save, sender=ItemDespesaRateioMensal)
-def atualizar_despesas_rateadas_por_mudanca_rateio(sender, instance, created, **kwargs):
+@receiver(post_delete, sender=ItemDespesaRateioMensal)
+def registrar_evento_rateio_despesa(sender, instance, **kwargs):
     """
-    Signal disparado quando um ItemDespesaRateioMensal é salvo.
-    Recalcula e atualiza todos os lançamentos de despesas rateadas afetados.
-    
-    Regra: Mudanças no percentual de rateio devem ser refletidas em todas as 
-    despesas rateadas do item no mês de referência.
+    Percentual de rateio do item no mês mudou: o consumidor recria os débitos
+    de todas as despesas rateadas do item no mês de referência.
     """
-    print(f"=== SIGNAL RATEIO MENSAL DISPARADO ===")
-    print(f"Item: {instance.item_despesa}, Sócio: {instance.socio}")
-    print(f"Data Ref: {instance.data_referencia}, Percentual: {instance.percentual_rateio}%")
-    
-    logger.info(f"=== SIGNAL RATEIO MENSAL DISPARADO ===")
-    logger.info(f"Item: {instance.item_despesa}, Sócio: {instance.socio}")
-    logger.info(f"Data Ref: {instance.data_referencia}, Percentual: {instance.percentual_rateio}%")
-    
-    # Buscar todas as despesas rateadas do item no mês de referência
-    ano = instance.data_referencia.year
-    mes = instance.data_referencia.month
-    
-    despesas_afetadas = DespesaRateada.objects.filter(
-        item_despesa=instance.item_despesa,
-        data__year=ano,
-        data__month=mes
+    if sincronizacao_despesas_esta_suspensa():
+        return
+    referencia = instance.data_referencia.replace(day=1)
+    registrar_evento(
+        EventoDominio.TIPO_RATEIO_DESPESA_ALTERADO,
+        f'rateio_despesa:{instance.item_despesa_id}:{referencia:%Y-%m}',
+        _empresa_do_item(instance.item_despesa_id),
+        item_despesa_id=instance.item_despesa_id,
+        data_referencia=referencia,
     )
-    
-    count_despesas = despesas_afetadas.count()
-    print(f"📊 {count_despesas} despesa(s) rateada(s) afetada(s)")
-    logger.info(f"📊 {count_despesas} despesa(s) rateada(s) afetada(s)")
-    
-    # Reprocessar cada despesa afetada
-    for despesa in despesas_afetadas:
-        print(f"  → Reprocessando despesa ID {despesa.id}")
-        logger.info(f"  → Reprocessando despesa ID {despesa.id}")
-        
-        # Disparar signal de atualização da despesa rateada
-        criar_ou_atualizar_debitos_despesa_rateada(DespesaRateada, despesa, created=False)
-    
-    print(f"=== SIGNAL RATEIO MENSAL CONCLUÍDO ===")
-    logger.info(f"=== SIGNAL RATEIO MENSAL CONCLUÍDO ===")
 
 
-@receiver(pre_delete, sender=ItemDespesaRateioMensal)
-def atualizar_despesas_rateadas_por_remocao_rateio(sender, instance, **kwargs):
-    """
-    Signal disparado ANTES de um ItemDespesaRateioMensal ser excluído.
-    Remove os lançamentos do sócio afetado em todas as despesas rateadas do item no mês.
-    """
-    print(f"=== REMOVENDO RATEIO MENSAL ===")
-    print(f"Item: {instance.item_despesa}, Sócio: {instance.socio}")
-    print(f"Data Ref: {instance.data_referencia}")
-    
-    logger.info(f"=== REMOVENDO RATEIO MENSAL ===")
-    logger.info(f"Item: {instance.item_despesa}, Sócio: {instance.socio}")
-    logger.info(f"Data Ref: {instance.data_referencia}")
-    
-    # Buscar todas as despesas rateadas do item no mês de referência
-    ano = instance.data_referencia.year
-    mes = instance.data_referencia.month
-    
-    despesas_afetadas = DespesaRateada.objects.filter(
-        item_despesa=instance.item_despesa,
-        data__year=ano,
-        data__month=mes
-    )
-    
-    # Para cada despesa afetada, remover lançamentos específicos do sócio
-    for despesa in despesas_afetadas:
-        historico_identificador = f'Despesa Rateada ID: {despesa.id} - Sócio: {instance.socio.id}'
-        lancamentos_cc = MovimentacaoContaCorrente.objects.filter(
-            socio=instance.socio,
-            historico_complementar__contains=historico_identificador
-        )
-        
-        count_lancamentos = lancamentos_cc.count()
-        if count_lancamentos > 0:
-            print(f"  🗑️ Removendo {count_lancamentos} lançamento(s) do sócio {instance.socio}")
-            logger.info(f"  Removendo {count_lancamentos} lançamento(s) do sócio {instance.socio}")
-            
-            lancamentos_cc.delete()
-            print(f"  ✅ Lançamento(s) removido(s)")
-            logger.info(f"  ✅ Lançamento(s) removido(s)")
-    
-    print(f"=== REMOÇÃO RATEIO MENSAL CONCLUÍDA ===")
-    logger.info(f"=== REMOÇÃO RATEIO MENSAL CONCLUÍDA ===")
+def _empresa_do_item(item_despesa_id):
+    return ItemDespesa.objects.filter(pk=item_despesa_id).values_list('grupo_despesa__empresa_id', flat=True).first()
+
+
+# ===============================
+# Cache de prefixos do autocomplete de itens de despesa
+# ===============================
+
+@receiver(post_save, sender=ItemDespesa)
+@receiver(post_delete, sender=ItemDespesa)
+def invalidar_busca_item_despesa(sender, instance, **kwargs):
+    empresa_id = GrupoDespesa.objects.filter(pk=instance.grupo_despesa_id).values_list('empresa_id', flat=True).first()
+    # Depois do commit: antes dele outro request poderia recolocar no cache o resultado antigo
+    transaction.on_commit(lambda: invalidar_cache_busca(empresa_id))
+
+
+@receiver(post_save, sender=GrupoDespesa)
+@receiver(post_delete, sender=GrupoDespesa)
+def invalidar_busca_grupo_despesa(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidar_cache_busca(instance.empresa_id))
@@ -0,0 +1,20 @@
+'use strict';
+// Filtros de changelist com autocomplete (FiltroAutocomplete em medicos/admin.py):
+// ao escolher ou limpar a opção, recarrega a lista com o parâmetro do filtro.
+{
+    const $ = django.jQuery;
+
+    $(function() {
+        $('.filtro-autocomplete').on('change', function() {
+            const url = new URL(window.location.href);
+            const parametro = this.dataset.parametro;
+            if (this.value) {
+                url.searchParams.set(parametro, this.value);
+            } else {
+                url.searchParams.delete(parametro);
+            }
+            url.searchParams.delete('p');
+            window.location.href = url.toString();
+        });
+    });
+}
@@ -10,7 +10,7 @@ from medicos.models.despesas import DespesaSocio, DespesaRateada
 
 class DespesaSocioTable(tables.Table):
     data = tables.DateColumn(verbose_name='Data', format='d/m/Y', attrs={"td": {"style": "min-width: 110px; max-width: 120px; white-space: nowrap;"}})
-    socio = tables.Column(verbose_name='Sócio', attrs={"td": {"style": "min-width: 160px; max-width: 240px; white-space: nowrap;"}})
+    socio = tables.Column(verbose_name='Sócio', accessor='socio_nome', attrs={"td": {"style": "min-width: 160px; max-width: 240px; white-space: nowrap;"}})
     descricao = tables.Column(verbose_name='Descrição', attrs={"td": {"style": "min-width: 220px; max-width: 400px; white-space: normal;"}})
     grupo = tables.Column(verbose_name='Grupo', attrs={"td": {"style": "min-width: 200px; max-width: 340px; white-space: nowrap;"}})
     tipo_classificacao = tables.TemplateColumn(
@@ -39,8 +39,8 @@ class DespesaSocioTable(tables.Table):
         order_by = ('tipo_classificacao', '-data')  # Classificação crescente, depois data decrescente
     acoes = tables.TemplateColumn(
         template_code='''
-        {% if record.id %}
-        {% with empresa_id=record.socio.empresa.id|default:request.resolver_match.kwargs.empresa_id %}
+        {% if record.id and record.origem == 'socio' %}
+        {% with empresa_id=request.resolver_match.kwargs.empresa_id %}
         <a href="{% url 'medicos:despesas_socio_form_edit' empresa_id=empresa_id pk=record.id %}?socio={{ socio_id }}{% if competencia %}&competencia={{ competencia }}{% endif %}" class="btn btn-sm btn-primary me-1">
             <i class="fas fa-edit"></i> Editar
         </a>
@@ -56,10 +56,7 @@ class DespesaSocioTable(tables.Table):
     )
 
     def render_socio(self, record):
-        socio = record.get('socio')
-        if hasattr(socio, 'pessoa'):
-            return getattr(socio.pessoa, 'name', str(socio))
-        return str(socio) if socio else '-'
+        return record.get('socio_nome') or '-'
 
     def render_descricao(self, record):
         val = record.get('descricao', '-')
@@ -163,6 +163,11 @@ path('usuarios/<int:conta_id>/<int:user_id>/excluir/', views_user.UserDeleteView
     # =====================
     path('contacorrente/', include('medicos.urls_contacorrente')),
 
+    # =====================
+    # Exportações (CSV/XLSX em streaming)
+    # =====================
+    path('exportacao/', include('medicos.urls_exportacao')),
+
 # Grupos de Despesa
 path('empresas/<int:empresa_id>/grupos-despesa/', views_despesa_cadastro.lista_grupos_despesa, name='lista_grupos_despesa'),
 path('empresas/<int:empresa_id>/grupos-despesa/<int:grupo_id>/editar/', views_despesa_cadastro.grupo_despesa_edit, name='grupo_despesa_edit'),
@@ -205,6 +210,8 @@ path('relatorio-executivo/<int:empresa_id>/', views_relatorios.relatorio_executi
     path('relatorio-mensal-socio-pdf/<int:empresa_id>/', views_relatorios.relatorio_mensal_socio_pdf, name='relatorio_mensal_socio_pdf'),
 path('relatorio-issqn/<int:empresa_id>/', views_relatorios.relatorio_apuracao, name='relatorio_apuracao'),
     path('relatorio-outros/<int:empresa_id>/', views_relatorios.relatorio_outros, name='relatorio_outros'),
+    path('relatorio-tendencias/<int:empresa_id>/', views_relatorios.relatorio_tendencias, name='relatorio_tendencias'),
+    path('api/tendencias/<int:empresa_id>/', views_relatorios.api_tendencias, name='api_tendencias'),
 
     # =====================
     # Autenticação
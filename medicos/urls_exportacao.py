@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views_exportacao
+
+urlpatterns = [
+    # =====================
+    # Exportações em streaming (CSV/XLSX)
+    # =====================
+    path('empresas/<int:empresa_id>/<str:tipo>/', views_exportacao.exportar_dados, name='exportar_dados'),
+]
@@ -8,6 +8,7 @@ URLs para as novas funcionalidades SaaS:
 - Visualização de logs de auditoria
 - Dashboard de métricas e analytics
 - Exportação de dados
+- Perfil de SQL por view (staff)
 
 Criado em: 10/09/2025
 Fonte: Implementação de melhores práticas SaaS conforme .github/copilot-instructions.md
@@ -41,4 +42,9 @@ urlpatterns = [
     path('conta/<int:conta_id>/saas/export/', 
          views_saas.saas_export_data, 
          name='saas_export_data'),
+
+    # Perfil de SQL por view (staff, global)
+    path('saas/perfil-sql/',
+         views_saas.perfil_sql_dashboard,
+         name='perfil_sql_dashboard'),
 ]
@@ -12,12 +12,18 @@ Criado em: 10/09/2025
 Fonte: Implementação de melhores práticas SaaS conforme .github/copilot-instructions.md
 """
 
+import logging
+
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from .models import Conta, ContaPreferencias, ContaAuditLog, ContaMetrics
+from .services import buffer_metricas, fila_auditoria
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 
 class SaaSPreferencesManager:
     """
@@ -83,9 +89,12 @@ class SaaSAuditManager:
     @staticmethod
     def log_action(conta, user, acao, objeto_tipo=None, objeto_id=None, 
                    objeto_nome=None, descricao=None, dados_anteriores=None, 
-                   dados_novos=None, ip_address=None, user_agent=None):
+                   dados_novos=None, ip_address=None, user_agent=None, duravel=False):
         """
         Registra uma ação de auditoria
+
+        O registro é enfileirado e gravado em lote fora do request
+        (services/fila_auditoria.py), exceto com duravel=True.
         
         Args:
             conta (Conta): Conta relacionada
@@ -99,19 +108,21 @@ class SaaSAuditManager:
             dados_novos (dict): Dados após a modificação
             ip_address (str): IP do usuário
             user_agent (str): User agent do navegador
+            duravel (bool): Grava de forma síncrona, sem passar pela fila
             
         Returns:
-            ContaAuditLog: Registro de auditoria criado
+            ContaAuditLog: Registro de auditoria (sem id enquanto estiver na fila)
         """
-        return ContaAuditLog.objects.create(
+        log = ContaAuditLog(
             conta=conta,
             user=user,
             acao=acao,
-            objeto_tipo=objeto_tipo,
+            objeto_tipo=objeto_tipo or '',
             objeto_id=str(objeto_id) if objeto_id else '',
             descricao=descricao or f'Ação {acao} em {objeto_tipo}',
             ip_address=ip_address
         )
+        return fila_auditoria.registrar(log, duravel=duravel)
     
     @staticmethod
     def log_login(conta, user, ip_address=None, user_agent=None):
@@ -160,6 +171,10 @@ class SaaSAuditManager:
 class SaaSMetricsManager:
     """
     Gerenciador de métricas e analytics da conta
+
+    Os eventos são acumulados no Redis (services/buffer_metricas.py) e
+    persistidos em lote pelo comando `descarregar_metricas_saas`; as leituras
+    mesclam valores persistidos e pendentes.
     """
     
     @staticmethod
@@ -175,13 +190,20 @@ class SaaSMetricsManager:
             metadados (dict): Dados adicionais (não usado no modelo atual)
             
         Returns:
-            ContaMetrics: Métrica criada
+            ContaMetrics: Métrica registrada (não salva, sem id, quando bufferizada)
+
+        Raises:
+            ValidationError: Tipo fora das choices ou valor que não cabe no campo
         """
         if data is None:
             data = timezone.now().date()
+        valor = buffer_metricas.validar_metrica(metrica_tipo, valor)
+
+        if buffer_metricas.registrar_valor(conta.id, metrica_tipo, valor, data):
+            return ContaMetrics(conta=conta, metrica_tipo=metrica_tipo, data=data, valor=valor)
             
-        # Verifica se já existe métrica para o mesmo tipo e data
-        metric, created = ContaMetrics.objects.get_or_create(
+        # Sem buffer: grava diretamente
+        metric, created = ContaMetrics.objects.update_or_create(
             conta=conta,
             metrica_tipo=metrica_tipo,
             data=data,
@@ -190,33 +212,52 @@ class SaaSMetricsManager:
             }
         )
         
-        if not created:
-            # Atualiza valor existente
-            metric.valor = valor
-            metric.save()
-        
         return metric
     
     @staticmethod
     def increment_metric(conta, metrica_tipo, incremento=1, data=None):
         """
         Incrementa uma métrica existente
+
+        Returns:
+            ContaMetrics | None: Métrica atualizada; None quando bufferizada ou inválida
         """
         if data is None:
             data = timezone.now().date()
+        try:
+            buffer_metricas.validar_metrica(metrica_tipo, incremento)
+        except ValidationError as e:
+            # Métrica é acessória: não interrompe a ação que a originou
+            logger.warning(f"Métrica {metrica_tipo} ignorada para a conta {conta.id}: {e}")
+            return None
+
+        if buffer_metricas.incrementar(conta.id, metrica_tipo, incremento, data):
+            return None
             
-        metric, created = ContaMetrics.objects.get_or_create(
-            conta=conta,
-            metrica_tipo=metrica_tipo,
-            data=data,
-            defaults={'valor': incremento}
+        return buffer_metricas.incrementar_no_banco(conta, metrica_tipo, incremento, data)
+
+    @staticmethod
+    def get_daily_values(conta, metrica_tipo, data_inicio, data_fim=None):
+        """
+        Obtém os valores diários de uma métrica (persistidos + pendentes no buffer)
+
+        Returns:
+            dict: data -> Decimal, ordenado por data
+        """
+        if data_fim is None:
+            data_fim = timezone.now().date()
+
+        persistidos = dict(
+            ContaMetrics.objects.filter(
+                conta=conta,
+                metrica_tipo=metrica_tipo,
+                data__gte=data_inicio,
+                data__lte=data_fim,
+            ).values_list('data', 'valor')
         )
-        
-        if not created:
-            metric.valor += incremento
-            metric.save()
-        
-        return metric
+        pendentes = buffer_metricas.valores_pendentes(conta.id, metrica_tipo, data_inicio, data_fim)
+        valores = buffer_metricas.mesclar_valores(persistidos, pendentes)
+        return dict(sorted(valores.items()))
     
     @staticmethod
     def get_metric_summary(conta, metrica_tipo, periodo_dias=30):
@@ -231,39 +272,28 @@ class SaaSMetricsManager:
         Returns:
             dict: Resumo com total, média, máximo, mínimo
         """
-        from django.db.models import Sum, Avg, Max, Min, Count
         from datetime import timedelta
         
         data_inicio = timezone.now().date() - timedelta(days=periodo_dias)
-        
-        metrics = ContaMetrics.objects.filter(
-            conta=conta,
-            metrica_tipo=metrica_tipo,
-            data__gte=data_inicio
-        )
-        
-        summary = metrics.aggregate(
-            total=Sum('valor'),
-            media=Avg('valor'),
-            maximo=Max('valor'),
-            minimo=Min('valor'),
-            count=Count('id')
-        )
+        valores = list(SaaSMetricsManager.get_daily_values(conta, metrica_tipo, data_inicio).values())
         
         return {
             'periodo_dias': periodo_dias,
-            'total_registros': summary['count'] or 0,
-            'total': summary['total'] or 0,
-            'media': summary['media'] or 0,
-            'maximo': summary['maximo'] or 0,
-            'minimo': summary['minimo'] or 0,
+            'total_registros': len(valores),
+            'total': sum(valores) if valores else 0,
+            'media': sum(valores) / len(valores) if valores else 0,
+            'maximo': max(valores) if valores else 0,
+            'minimo': min(valores) if valores else 0,
         }
 
 
 # Decorador para auditoria automática
-def audit_action(acao, objeto_tipo=None):
+def audit_action(acao, objeto_tipo=None, duravel=False):
     """
     Decorador para registrar automaticamente ações de auditoria
+
+    O registro segue pela fila assíncrona de auditoria; use duravel=True em
+    ações críticas para gravá-lo de forma síncrona.
     
     Usage:
         @audit_action('create', 'DespesaSocio')
@@ -285,7 +315,8 @@ def audit_action(acao, objeto_tipo=None):
                         acao=acao,
                         objeto_tipo=objeto_tipo,
                         ip_address=request.META.get('REMOTE_ADDR'),
-                        user_agent=request.META.get('HTTP_USER_AGENT')
+                        user_agent=request.META.get('HTTP_USER_AGENT'),
+                        duravel=duravel
                     )
                 except Exception as e:
                     # Log error mas não interrompe o fluxo
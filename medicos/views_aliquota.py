@@ -3,9 +3,11 @@ from datetime import datetime
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
+from django.core.exceptions import ValidationError
 from django.db import transaction
 from medicos.models.base import Empresa
 from medicos.models.fiscal import Aliquotas
+from medicos.services.clonagem_cadastros import ClonagemCadastrosService
 from django.contrib.auth.decorators import login_required
 from medicos.forms import AliquotaForm
 from django.contrib import messages
@@ -166,37 +168,25 @@ def importar_aliquotas(request, empresa_id):
                 'error': f'Nenhuma alíquota encontrada na empresa {empresa_origem.nome_fantasia or empresa_origem.name}'
             })
         
-        # Executar importação dentro de uma transação
-        with transaction.atomic():
-            aliquotas_importadas = 0
-            
-            for aliquota_origem in aliquotas_origem:
-                # Criar nova alíquota para a empresa destino
-                nova_aliquota = Aliquotas(
-                    empresa=empresa_destino,
-                    ISS=aliquota_origem.ISS,
-                    PIS=aliquota_origem.PIS,
-                    COFINS=aliquota_origem.COFINS,
-                    IRPJ_ALIQUOTA=aliquota_origem.IRPJ_ALIQUOTA,
-                    IRPJ_PRESUNCAO_OUTROS=aliquota_origem.IRPJ_PRESUNCAO_OUTROS,
-                    IRPJ_PRESUNCAO_CONSULTA=aliquota_origem.IRPJ_PRESUNCAO_CONSULTA,
-                    IRPJ_VALOR_BASE_INICIAR_CAL_ADICIONAL=aliquota_origem.IRPJ_VALOR_BASE_INICIAR_CAL_ADICIONAL,
-                    IRPJ_ADICIONAL=aliquota_origem.IRPJ_ADICIONAL,
-                    CSLL_ALIQUOTA=aliquota_origem.CSLL_ALIQUOTA,
-                    CSLL_PRESUNCAO_OUTROS=aliquota_origem.CSLL_PRESUNCAO_OUTROS,
-                    CSLL_PRESUNCAO_CONSULTA=aliquota_origem.CSLL_PRESUNCAO_CONSULTA,
-                    ativa=aliquota_origem.ativa,
-                    data_vigencia_inicio=aliquota_origem.data_vigencia_inicio,
-                    data_vigencia_fim=aliquota_origem.data_vigencia_fim,
-                    created_by=request.user,
-                    observacoes=f"Importado de {empresa_origem.nome_fantasia or empresa_origem.name} - {aliquota_origem.observacoes}"
-                )
-                nova_aliquota.save()
-                aliquotas_importadas += 1
+        # Importação em lote; vigências já existentes ou sobrepostas no destino são ignoradas
+        try:
+            with transaction.atomic():
+                resultado = ClonagemCadastrosService(
+                    empresa_origem, empresa_destino, usuario=request.user
+                ).clonar_aliquotas()
+        except ValidationError as e:
+            return JsonResponse({
+                'success': False,
+                'error': f'Alíquota inválida na empresa origem: {"; ".join(e.messages)}'
+            })
+        aliquotas_importadas = resultado['importadas']
+        mensagem = f'Importação concluída com sucesso! {aliquotas_importadas} alíquota(s) importada(s) de {empresa_origem.nome_fantasia or empresa_origem.name}.'
+        if resultado['sobrepostas']:
+            mensagem += f' {resultado["sobrepostas"]} ignorada(s) por sobrepor a vigência de alíquotas já cadastradas.'
         
         return JsonResponse({
             'success': True,
-            'message': f'Importação concluída com sucesso! {aliquotas_importadas} alíquota(s) importada(s) de {empresa_origem.nome_fantasia or empresa_origem.name}.'
+            'message': mensagem
         })
         
     except Exception as e:
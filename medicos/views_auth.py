@@ -87,14 +87,6 @@ def select_account(request):
 # ---------------------------------------------
 @csrf_protect
 def login_view(request):
-    if request.method == 'POST':
-        print('DEBUG: POST recebido na view login_view')
-        action = request.POST.get('action')
-        print(f'DEBUG: action recebida = {action}')
-        if action == 'login':
-            print('DEBUG: processando login')
-        elif action == 'register':
-            print('DEBUG: processando registro')
     from .forms import CustomUserCreationForm
     from django.contrib.auth.forms import PasswordResetForm
     login_form = EmailAuthenticationForm()
@@ -11,7 +11,9 @@ from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django_filters.views import FilterView
 import django_tables2 as tables
 from django_tables2.views import SingleTableMixin
+from django.core.exceptions import ValidationError
 from medicos.models.despesas import ItemDespesaRateioMensal, ItemDespesa, GrupoDespesa, Socio
+from medicos.services.matriz_rateio import carregar_matriz, salvar_matriz, validar_matriz
 from medicos.forms import ItemDespesaRateioMensalForm
 from medicos.filters_rateio_medico import ItemDespesaRateioMensalFilter
 
@@ -118,50 +120,45 @@ def cadastro_rateio_list(request):
             socios_empresa = Socio.objects.none()
         # Só processa rateio se o item permitir
         if permite_rateio:
+            # Matriz do item no mês carregada de uma vez (sem consulta por sócio)
+            rateios_dict = carregar_matriz([item.id], mes_competencia_date)[item.id]
             if request.method == 'POST':
-                # Validação do total do rateio usando Decimal para precisão
-                total_percentual_post = Decimal('0.00')
-                valores_validos = {}  # Para armazenar valores convertidos
-                
+                # Lê os percentuais informados: rateios existentes usam o id do rateio,
+                # sócios ainda sem rateio usam o id do sócio
+                percentuais_informados = {}
                 for socio in socios_empresa:
-                    r_id = None
+                    rateio_existente = rateios_dict.get(socio.id)
                     val = None
-                    # Verifica se já existe rateio para esse sócio
-                    rateio_existente = ItemDespesaRateioMensal.objects.filter(item_despesa_id=selected_item_id, data_referencia=mes_competencia_date, socio=socio).first()
                     if rateio_existente:
-                        r_id = rateio_existente.id
-                        val = request.POST.get(f'percentual_{r_id}')
-                        chave = f'percentual_{r_id}'
-                    else:
+                        val = request.POST.get(f'percentual_{rateio_existente.id}')
+                    if val is None:
                         val = request.POST.get(f'percentual_socio_{socio.id}')
-                        chave = f'percentual_socio_{socio.id}'
-                    
-                    if val is not None and val != '':
-                        val_decimal = converter_percentual_seguro(val)
-                        if val_decimal is not None:
-                            valores_validos[chave] = val_decimal
-                            total_percentual_post += val_decimal
-                
-                # Permite pequena margem de erro de ponto flutuante (0.01)
-                cem_percent = Decimal('100.00')
-                if abs(total_percentual_post - cem_percent) > Decimal('0.01'):
-                    messages.error(request, f'O total do rateio deve ser exatamente 100%. Total atual: {total_percentual_post:.2f}%. Corrija os percentuais antes de salvar.')
+                    val_decimal = converter_percentual_seguro(val)
+                    if val_decimal is not None:
+                        percentuais_informados[socio.id] = val_decimal
+
+                # Validação do total (100% com margem de 0.01) feita em memória
+                total_percentual_post, erro = validar_matriz({item.id: percentuais_informados})[item.id]
+                if not erro:
+                    try:
+                        salvar_matriz(
+                            empresa_ativa.id,
+                            mes_competencia_date,
+                            {item.id: percentuais_informados},
+                            usuario=request.user if request.user.is_authenticated else None,
+                        )
+                    except ValidationError as e:
+                        erro = e.messages[0]
+                if erro:
+                    messages.error(request, erro)
                     # Monta rateios para reexibir na tela com os valores do POST
                     rateios = []
                     for socio in socios_empresa:
-                        rateio_existente = ItemDespesaRateioMensal.objects.filter(item_despesa_id=selected_item_id, data_referencia=mes_competencia_date, socio=socio).first()
-                        if rateio_existente:
-                            r_id = rateio_existente.id
-                            val = request.POST.get(f'percentual_{r_id}')
-                        else:
-                            val = request.POST.get(f'percentual_socio_{socio.id}')
-                        
-                        percentual = converter_percentual_seguro(val)
-                        
+                        rateio_existente = rateios_dict.get(socio.id)
                         fake = ItemDespesaRateioMensal(
                             item_despesa_id=selected_item_id,
                             socio=socio,
-                            percentual_rateio=percentual,
+                            percentual_rateio=percentuais_informados.get(socio.id),
                             observacoes=getattr(rateio_existente, 'observacoes', ''),
                             data_referencia=mes_competencia_date,
                             ativo=True
@@ -187,28 +184,6 @@ def cadastro_rateio_list(request):
                         'permite_rateio': permite_rateio,
                     }
                     return render(request, 'cadastro/rateio_list.html', context)
-                # Se passou na validação, salva normalmente usando valores já validados
-                rateios_qs = ItemDespesaRateioMensal.objects.filter(item_despesa_id=selected_item_id, data_referencia=mes_competencia_date)
-                rateios_dict = {r.socio_id: r for r in rateios_qs}
-                
-                for socio in socios_empresa:
-                    # Atualiza existentes
-                    r = rateios_dict.get(socio.id)
-                    if r:
-                        chave = f'percentual_{r.id}'
-                        if chave in valores_validos:
-                            r.percentual_rateio = valores_validos[chave]
-                            r.save()
-                    else:
-                        # Cria novos
-                        chave = f'percentual_socio_{socio.id}'
-                        if chave in valores_validos:
-                            ItemDespesaRateioMensal.objects.create(
-                                item_despesa_id=selected_item_id,
-                                socio=socio,
-                                percentual_rateio=valores_validos[chave],
-                                data_referencia=mes_competencia_date
-                            )
                 # Após salvar, redireciona para GET com filtros (PRG pattern)
                 from django.urls import reverse
                 url = reverse('medicos:cadastro_rateio') + f'?mes_competencia={mes_competencia[:7]}&item_despesa={selected_item_id}'
@@ -216,13 +191,12 @@ def cadastro_rateio_list(request):
                     url += f'&filtro_descricao={filtro_descricao}'
                 return redirect(url)
             # Monta contexto para GET
-            rateios_qs = ItemDespesaRateioMensal.objects.filter(item_despesa_id=selected_item_id, data_referencia=mes_competencia_date, ativo=True).select_related('socio__pessoa')
             # Garante que todos os sócios ativos da empresa aparecem, mesmo sem rateio cadastrado
-            rateios_dict = {r.socio_id: r for r in rateios_qs}
             rateios = []
             for socio in socios_empresa:
                 r = rateios_dict.get(socio.id)
-                if r:
+                if r and r.ativo:
+                    r.socio = socio
                     rateios.append(r)
                 else:
                     fake = ItemDespesaRateioMensal(
@@ -9,9 +9,10 @@ from .filters_contacorrente import MovimentacaoContaCorrenteFilter
 from .forms_contacorrente import MovimentacaoContaCorrenteForm
 from core.context_processors import empresa_context
 from medicos.models.base import Empresa
+from medicos.paginacao import PaginacaoCursorMixin
 
 
-class MovimentacaoContaCorrenteListView(SingleTableMixin, FilterView):
+class MovimentacaoContaCorrenteListView(PaginacaoCursorMixin, SingleTableMixin, FilterView):
     """
     View para listagem de lançamentos bancários.
     Exibe tabela filtrável e injeta empresa no contexto para o header.
@@ -26,6 +27,7 @@ class MovimentacaoContaCorrenteListView(SingleTableMixin, FilterView):
     filterset_class = MovimentacaoContaCorrenteFilter
     template_name = 'conta_corrente/lista_lancamentos_bancarios.html'
     paginate_by = 25
+    ordem_cursor = ('-data_movimentacao', '-id')
 
     def get_queryset(self):
         """
@@ -33,16 +35,16 @@ class MovimentacaoContaCorrenteListView(SingleTableMixin, FilterView):
         """
         empresa = empresa_context(self.request).get('empresa')
         if empresa:
-            # Filtrar por empresa através dos relacionamentos disponíveis
+            # empresa é desnormalizada no lançamento: o filtro e a ordenação
+            # usam o índice (empresa, data_movimentacao, id)
             return MovimentacaoContaCorrente.objects.filter(
-                models.Q(socio__empresa=empresa) |  # Através do sócio
-                models.Q(descricao_movimentacao__empresa=empresa)  # Através da descrição
+                empresa=empresa
             ).select_related(
                 'socio__pessoa',  # Para exibir o nome do sócio
                 'nota_fiscal',    # Para exibir dados da nota fiscal
                 'descricao_movimentacao',  # Para exibir a descrição
                 'instrumento_bancario'     # Para exibir o instrumento bancário
-            ).distinct().order_by('-data_movimentacao')
+            ).order_by(*self.ordem_cursor)
         return MovimentacaoContaCorrente.objects.none()
 
     def get_filterset(self, filterset_class):
@@ -68,28 +70,22 @@ class MovimentacaoContaCorrenteListView(SingleTableMixin, FilterView):
         context['titulo_pagina'] = 'Lançamentos de conta corrente'
         context['cenario_nome'] = 'Conta Corrente'
         
-        # Adiciona totalizações das movimentações filtradas
+        # Totalizações das movimentações filtradas, em uma única agregação
+        # (sem ORDER BY nem select_related, que só pesariam no plano)
         from django.db.models import Sum, Count
-        filterset = context['filter']
-        if filterset.qs:
-            totais = filterset.qs.aggregate(
-                total_movimentacoes=Count('id'),
-                total_entradas=Sum('valor', filter=models.Q(valor__gt=0)),  # Entradas na conta
-                total_saidas=Sum('valor', filter=models.Q(valor__lt=0)),   # Saídas da conta
-                saldo_total=Sum('valor')
-            )
-            
-            # Garante que valores None sejam convertidos para 0
-            context['total_movimentacoes'] = totais['total_movimentacoes'] or 0
-            context['total_entradas'] = totais['total_entradas'] or 0
-            context['total_saidas'] = abs(totais['total_saidas'] or 0)  # Valor absoluto para saídas
-            context['saldo_total'] = totais['saldo_total'] or 0
-        else:
-            context['total_movimentacoes'] = 0
-            context['total_entradas'] = 0
-            context['total_saidas'] = 0
-            context['saldo_total'] = 0
-            
+        totais = context['filter'].qs.order_by().select_related(None).aggregate(
+            total_movimentacoes=Count('id'),
+            total_entradas=Sum('valor', filter=models.Q(valor__gt=0)),  # Entradas na conta
+            total_saidas=Sum('valor', filter=models.Q(valor__lt=0)),   # Saídas da conta
+            saldo_total=Sum('valor')
+        )
+
+        # Garante que valores None sejam convertidos para 0
+        context['total_movimentacoes'] = totais['total_movimentacoes'] or 0
+        context['total_entradas'] = totais['total_entradas'] or 0
+        context['total_saidas'] = abs(totais['total_saidas'] or 0)  # Valor absoluto para saídas
+        context['saldo_total'] = totais['saldo_total'] or 0
+
         return context
 
 
@@ -142,7 +138,8 @@ class MovimentacaoContaCorrenteCreateView(CreateView):
         if not empresa:
             form.add_error(None, 'Nenhuma empresa selecionada.')
             return self.form_invalid(form)
-        # A relação com a empresa é feita através do sócio ou descrição_movimentacao
+        # Sem sócio nem descrição que a definam, o lançamento fica na empresa selecionada
+        instance.empresa = empresa
         instance.save()
         return super().form_valid(form)
 
@@ -26,6 +26,7 @@ from django_filters.views import FilterView
 
 # Local
 from .models.financeiro import DescricaoMovimentacaoFinanceira
+from .services.clonagem_cadastros import ClonagemCadastrosService
 from .forms import DescricaoMovimentacaoFinanceiraForm
 from .tables import DescricaoMovimentacaoFinanceiraTable
 from .filters import DescricaoMovimentacaoFinanceiraFilter
@@ -190,29 +191,13 @@ def importar_descricoes_movimentacao(request, empresa_id):
         if not descricoes_origem.exists():
             return JsonResponse({'success': False, 'error': 'Nenhuma descrição de movimentação encontrada na empresa de origem'})
         
-        # Importar descrições em transação
+        # Importação em lote; códigos contábeis já existentes no destino são ignorados
         with transaction.atomic():
-            contador_criadas = 0
-            contador_duplicadas = 0
-            
-            for descricao_origem in descricoes_origem:
-                # Verificar se já existe descrição com o mesmo código na empresa destino
-                existe_duplicata = DescricaoMovimentacaoFinanceira.objects.filter(
-                    empresa=empresa_destino,
-                    codigo_contabil=descricao_origem.codigo_contabil
-                ).exists()
-                
-                if existe_duplicata:
-                    contador_duplicadas += 1
-                    continue
-                
-                # Criar nova descrição na empresa destino
-                DescricaoMovimentacaoFinanceira.objects.create(
-                    empresa=empresa_destino,
-                    descricao=descricao_origem.descricao,
-                    codigo_contabil=descricao_origem.codigo_contabil
-                )
-                contador_criadas += 1
+            resultado = ClonagemCadastrosService(
+                empresa_origem, empresa_destino, usuario=request.user
+            ).clonar_descricoes_movimentacao()
+        contador_criadas = resultado['criadas']
+        contador_duplicadas = resultado['duplicadas']
         
         # Preparar mensagem de sucesso
         if contador_criadas > 0:
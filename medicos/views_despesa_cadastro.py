@@ -10,6 +10,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django_tables2 import SingleTableView
 from medicos.models.base import Empresa
 from medicos.models.despesas import GrupoDespesa, ItemDespesa
+from medicos.services.clonagem_cadastros import ClonagemCadastrosService
 from medicos.forms import GrupoDespesaForm, ItemDespesaForm
 from medicos.filters import GrupoDespesaFilter, ItemDespesaFilter
 from medicos.tables import ItemDespesaTable
@@ -468,52 +469,13 @@ def importar_grupos_despesa(request, empresa_id):
                 'message': 'Não é possível importar da mesma empresa'
             })
         
-        grupos_importados = 0
-        itens_importados = 0
-        
-        # Realizar importação dentro de uma transação
+        # Importação em lote: grupos e itens remapeados em memória pelo código
         with transaction.atomic():
-            # Buscar todos os grupos da empresa de origem
-            grupos_origem = GrupoDespesa.objects.filter(empresa=empresa_origem)
-            
-            for grupo_origem in grupos_origem:
-                # Verificar se já existe um grupo com o mesmo código na empresa destino
-                grupo_existente = GrupoDespesa.objects.filter(
-                    empresa=empresa_destino,
-                    codigo=grupo_origem.codigo
-                ).first()
-                
-                if grupo_existente:
-                    # Se existe, usar o grupo existente
-                    grupo_destino = grupo_existente
-                else:
-                    # Se não existe, criar novo grupo
-                    grupo_destino = GrupoDespesa.objects.create(
-                        empresa=empresa_destino,
-                        codigo=grupo_origem.codigo,
-                        descricao=grupo_origem.descricao,
-                        tipo_rateio=grupo_origem.tipo_rateio,
-                        created_by=request.user
-                    )
-                    grupos_importados += 1
-                
-                # Importar itens do grupo
-                itens_origem = grupo_origem.itens_despesa.all()
-                for item_origem in itens_origem:
-                    # Verificar se já existe um item com o mesmo código no grupo destino
-                    item_existente = grupo_destino.itens_despesa.filter(
-                        codigo=item_origem.codigo
-                    ).first()
-                    
-                    if not item_existente:
-                        # Se não existe, criar novo item
-                        ItemDespesa.objects.create(
-                            grupo_despesa=grupo_destino,
-                            codigo=item_origem.codigo,
-                            descricao=item_origem.descricao,
-                            created_by=request.user
-                        )
-                        itens_importados += 1
+            resultado = ClonagemCadastrosService(
+                empresa_origem, empresa_destino, usuario=request.user
+            ).clonar_grupos_despesa()
+        grupos_importados = resultado['grupos_importados']
+        itens_importados = resultado['itens_importados']
         
         return JsonResponse({
             'success': True,
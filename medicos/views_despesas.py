@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 from django.utils import timezone
 # View para copiar despesas do mês anterior para o mês atual
 from .models.despesas import DespesaRateada, DespesaSocio, ItemDespesa
-from django.db import transaction
+from .services.copia_despesas import CopiaDespesasService, MODO_SUBSTITUIR, MODOS_COPIA
 
 def copiar_despesas_mes_anterior(request, empresa_id):
     """
@@ -30,59 +30,21 @@ def copiar_despesas_mes_anterior(request, empresa_id):
     if ano is None or mes is None:
         return JsonResponse({'success': False, 'message': f'Formato de mês/ano inválido: {mes_ano}. Use MM/YYYY ou YYYY-MM.'}, status=400)
 
-    destino_primeiro_dia = datetime(ano, mes, 1)
-    if mes == 1:
-        origem_ano, origem_mes = ano - 1, 12
-    else:
-        origem_ano, origem_mes = ano, mes - 1
-    print(f"[COPIA DESPESAS] Origem: {origem_mes:02d}/{origem_ano}, Destino: {mes:02d}/{ano}")
-
-    with transaction.atomic():
-        # Apaga todas as despesas do mês de competência (destino)
-        DespesaRateada.objects.filter(
-            item_despesa__grupo_despesa__empresa_id=empresa_id,
-            data=destino_primeiro_dia
-        ).delete()
-        DespesaSocio.objects.filter(
-            item_despesa__grupo_despesa__empresa_id=empresa_id,
-            data=destino_primeiro_dia
-        ).delete()
-
-        # Copia todas as despesas do mês anterior (origem) para o mês de competência (destino)
-        despesas_rateadas = DespesaRateada.objects.filter(
-            item_despesa__grupo_despesa__empresa_id=empresa_id,
-            data__year=origem_ano,
-            data__month=origem_mes
-        )
-        despesas_socios = DespesaSocio.objects.filter(
-            item_despesa__grupo_despesa__empresa_id=empresa_id,
-            data__year=origem_ano,
-            data__month=origem_mes
-        )
-        print(f"[COPIA DESPESAS] Rateadas encontradas: {despesas_rateadas.count()} | Socios encontradas: {despesas_socios.count()}")
-        total_copiadas = 0
-        for despesa in despesas_rateadas:
-            DespesaRateada.objects.create(
-                item_despesa=despesa.item_despesa,
-                data=destino_primeiro_dia,
-                valor=despesa.valor,
-                possui_rateio=despesa.possui_rateio,
-                created_by=request.user
-            )
-        total_copiadas += despesas_rateadas.count()
-        for despesa in despesas_socios:
-            DespesaSocio.objects.create(
-                item_despesa=despesa.item_despesa,
-                socio=despesa.socio,
-                data=destino_primeiro_dia,
-                valor=despesa.valor,
-                possui_rateio=despesa.possui_rateio,
-                created_by=request.user
-            )
-        total_copiadas += despesas_socios.count()
-        print(f"[COPIA DESPESAS] Total copiadas: {total_copiadas}")
-
-    return JsonResponse({'success': True, 'copiadas': total_copiadas, 'message': f'{total_copiadas} despesas copiadas para o mês atual.'})
+    modo = request.POST.get('modo') or request.GET.get('modo') or MODO_SUBSTITUIR
+    if modo not in MODOS_COPIA:
+        return JsonResponse({'success': False, 'message': f'Modo de cópia inválido: {modo}.'}, status=400)
+
+    # Cópia em lote: bulk_create das despesas e débitos de conta corrente
+    # recalculados em uma única passada (ver medicos/services/copia_despesas.py)
+    resultado = CopiaDespesasService(empresa_id, usuario=request.user).copiar(ano, mes, modo=modo)
+    total_copiadas = resultado['copiadas']
+
+    return JsonResponse({
+        'success': True,
+        'copiadas': total_copiadas,
+        'resultado': resultado,
+        'message': f'{total_copiadas} despesas copiadas para o mês atual.',
+    })
 # Imports padrão Python
 
 # Imports de terceiros
@@ -401,7 +363,7 @@ class ListaDespesasSocioView(View):
     def get(self, request, empresa_id):
         from .tables_despesas import DespesaSocioTable
         from medicos.models.base import Socio
-        from .models.despesas import DespesaSocio, DespesaRateada, ItemDespesaRateioMensal
+        from medicos.services.despesas_apropriadas import despesas_apropriadas, totais_despesas_apropriadas
         competencia = request.GET.get('competencia') or request.session.get('mes_ano')
         socios = Socio.objects.filter(empresa_id=empresa_id, ativo=True).values_list('id', 'pessoa__name').order_by('pessoa__name')
         socio_id = request.GET.get('socio')
@@ -415,147 +377,18 @@ class ListaDespesasSocioView(View):
             url = request.path + '?' + urllib.parse.urlencode(params)
             return redirect(url)
 
-        despesas = []
-        total_despesas = 0
-        if socio_id:
-            # Despesas individuais do sócio
-            despesas_individuais = DespesaSocio.objects.filter(
-                socio_id=socio_id,
-                socio__empresa_id=empresa_id
-            )
-            if competencia:
-                try:
-                    ano, mes = competencia.split('-')
-                    despesas_individuais = despesas_individuais.filter(data__year=ano, data__month=mes)
-                except Exception:
-                    pass
-            despesas_individuais = despesas_individuais.select_related('socio', 'item_despesa', 'item_despesa__grupo_despesa')
-
-            # Despesas rateadas do sócio
-            despesas_rateadas = []
-            if competencia:
-                try:
-                    ano, mes = competencia.split('-')
-                    data_ref = f"{ano}-{mes}-01"
-                except Exception:
-                    data_ref = None
-            else:
-                data_ref = None
-            if data_ref:
-                # Buscar todas as despesas rateadas da empresa no mês
-                rateadas_qs = DespesaRateada.objects.filter(
-                    item_despesa__grupo_despesa__empresa_id=empresa_id,
-                    data__year=ano, data__month=mes
-                ).select_related('item_despesa', 'item_despesa__grupo_despesa')
-                for despesa in rateadas_qs:
-                    # Para cada despesa rateada, buscar configuração de rateio do sócio
-                    rateio = ItemDespesaRateioMensal.obter_rateio_para_despesa(
-                        despesa.item_despesa, Socio.objects.get(id=socio_id), despesa.data
-                    )
-                    if rateio is not None:
-                        valor_apropriado = despesa.valor * (rateio.percentual_rateio / 100)
-                        # Cria objeto fake para exibir na tabela, mesmo se percentual for 0%
-                        class FakeGrupoDespesa:
-                            def __init__(self, descricao):
-                                self.descricao = descricao
-                            def __repr__(self):
-                                return f"FakeGrupoDespesa(descricao={self.descricao!r})"
-
-                        class FakeItemDespesa:
-                            def __init__(self, descricao, grupo_despesa):
-                                self.descricao = descricao
-                                self.grupo_despesa = grupo_despesa
-                            def __repr__(self):
-                                return f"FakeItemDespesa(descricao={self.descricao!r}, grupo_despesa={self.grupo_despesa!r})"
-
-                        class FakeDespesa:
-                            def __init__(self, socio, item_despesa, valor_total, taxa_rateio, valor_apropriado, data):
-                                self.socio = socio
-                                self.item_despesa = item_despesa
-                                self.valor_total = valor_total
-                                self.taxa_rateio = taxa_rateio
-                                self.valor_apropriado = valor_apropriado
-                                self.data = data
-                                self.id = None  # Não permite editar/excluir
-                            def __repr__(self):
-                                return f"FakeDespesa(socio={self.socio!r}, item_despesa={self.item_despesa!r}, valor_total={self.valor_total!r}, taxa_rateio={self.taxa_rateio!r}, valor_apropriado={self.valor_apropriado!r}, data={self.data!r})"
-
-                        socio_obj = Socio.objects.get(id=socio_id)
-                        item_desc = getattr(despesa.item_despesa, 'descricao', None) or '-'
-                        grupo_obj = getattr(despesa.item_despesa, 'grupo_despesa', None)
-                        grupo_desc = getattr(grupo_obj, 'descricao', None) or '-'
-                        fake_item = FakeItemDespesa(item_desc, FakeGrupoDespesa(grupo_desc))
-                        fake = FakeDespesa(
-                            socio=socio_obj,
-                            item_despesa=fake_item,
-                            valor_total=despesa.valor,
-                            taxa_rateio=rateio.percentual_rateio,
-                            valor_apropriado=valor_apropriado,
-                            data=despesa.data
-                        )
-                        # Adicionar campo tipo_classificacao
-                        fake.tipo_classificacao = getattr(despesa, 'tipo_classificacao', 1)
-                        despesas_rateadas.append(fake)
-            # Junta despesas individuais e rateadas, ambos como dicionários padronizados
-            despesas = []
-            for fake in despesas_rateadas:
-                despesas.append({
-                    'data': getattr(fake, 'data', None),
-                    'socio': fake.socio,
-                    'descricao': getattr(fake.item_despesa, 'descricao', '-'),
-                    'grupo': getattr(getattr(fake.item_despesa, 'grupo_despesa', None), 'descricao', '-'),
-                    'tipo_classificacao': getattr(fake, 'tipo_classificacao', 1),
-                    'valor_total': fake.valor_total,
-                    'taxa_rateio': fake.taxa_rateio,
-                    'valor_apropriado': fake.valor_apropriado,
-                    'id': getattr(fake, 'id', None),
-                })
-            for d in despesas_individuais:
-                despesas.append({
-                    'data': getattr(d, 'data', None),
-                    'socio': d.socio,
-                    'descricao': getattr(d.item_despesa, 'descricao', '-'),
-                    'grupo': getattr(getattr(d.item_despesa, 'grupo_despesa', None), 'descricao', '-'),
-                    'tipo_classificacao': getattr(d, 'tipo_classificacao', 1),
-                    'valor_total': getattr(d, 'valor', 0),
-                    'taxa_rateio': '-',
-                    'valor_apropriado': getattr(d, 'valor', 0),
-                    'id': d.id
-                })
-            total_despesas = sum([d.get('valor_apropriado', 0) or 0 for d in despesas])
-            
-            # Ordenar lista mista por classificação e data decrescente
-            from datetime import date
-            despesas.sort(key=lambda x: (
-                x.get('tipo_classificacao', 1), 
-                -(x.get('data') or date.today()).toordinal()
-            ))
-        else:
-            # Se não filtrar por sócio, mostra todas as despesas individuais
-            despesas_qs = DespesaSocio.objects.filter(
-                socio__empresa_id=empresa_id
-            ).order_by('tipo_classificacao', '-data')  # Ordenação aplicada no queryset
-            if competencia:
-                try:
-                    ano, mes = competencia.split('-')
-                    despesas_qs = despesas_qs.filter(data__year=ano, data__month=mes)
-                except Exception:
-                    pass
-            despesas_qs = despesas_qs.select_related('socio', 'item_despesa', 'item_despesa__grupo_despesa')
-            despesas = []
-            for d in despesas_qs:
-                despesas.append({
-                    'data': getattr(d, 'data', None),
-                    'socio': d.socio,
-                    'descricao': getattr(d.item_despesa, 'descricao', '-'),
-                    'grupo': getattr(getattr(d.item_despesa, 'grupo_despesa', None), 'descricao', '-'),
-                    'tipo_classificacao': getattr(d, 'tipo_classificacao', 1),
-                    'valor_total': getattr(d, 'valor', 0),
-                    'taxa_rateio': '-',
-                    'valor_apropriado': getattr(d, 'valor', 0),
-                    'id': d.id,
-                })
-            total_despesas = sum([d.get('valor_apropriado', 0) or 0 for d in despesas])
+        ano = mes = None
+        if competencia:
+            try:
+                ano, mes = (int(parte) for parte in competencia.split('-'))
+            except Exception:
+                ano = mes = None
+        if socio_id and not str(socio_id).isdigit():
+            socio_id = None
+
+        # Despesas individuais + rateadas apropriadas ao sócio, ordenadas e paginadas no banco
+        despesas = despesas_apropriadas(empresa_id, socio_id=socio_id, ano=ano, mes=mes)
+        total_despesas = totais_despesas_apropriadas(empresa_id, socio_id=socio_id, ano=ano, mes=mes)['total']
 
         table = DespesaSocioTable(despesas)
         import django_tables2 as tables
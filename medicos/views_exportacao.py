@@ -0,0 +1,37 @@
+"""
+Views de exportação em streaming (CSV/XLSX) de notas fiscais, despesas e lançamentos.
+
+Os filtros aceitos são os mesmos das telas de listagem (FilterSets existentes),
+repassados via querystring, além de `formato` (csv|xlsx) e `ano` opcional.
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponseBadRequest
+from django.shortcuts import get_object_or_404
+
+from medicos.models.base import Empresa
+from medicos.replica import leitura_replica
+from .exportacao import DEFINICOES_EXPORTACAO, FORMATO_CSV, FORMATOS_EXPORTACAO, exportar
+
+
+@login_required
+@leitura_replica()
+def exportar_dados(request, empresa_id, tipo):
+    definicao = DEFINICOES_EXPORTACAO.get(tipo)
+    if definicao is None:
+        raise Http404('Tipo de exportação inválido')
+
+    formato = request.GET.get('formato', FORMATO_CSV)
+    if formato not in FORMATOS_EXPORTACAO:
+        return HttpResponseBadRequest('Formato de exportação inválido')
+
+    ano = request.GET.get('ano') or None
+    if ano is not None and not ano.isdigit():
+        return HttpResponseBadRequest('Ano inválido')
+
+    empresas = Empresa.objects.all()
+    conta = getattr(request, 'conta_ativa', None)
+    if conta is not None:
+        empresas = empresas.filter(conta=conta)
+    empresa = get_object_or_404(empresas, id=empresa_id)
+
+    return exportar(definicao, empresa, formato, request=request, ano=ano)
@@ -15,6 +15,7 @@ from .tables_notafiscal_lista import NotaFiscalListaTable
 from .filters_notafiscal import NotaFiscalFilter
 from .forms_notafiscal import NotaFiscalForm
 from core.context_processors import empresa_context
+from medicos.paginacao import PaginacaoCursorMixin
 
 class NotaFiscalCreateView(CreateView):
     model = NotaFiscal
@@ -230,12 +231,13 @@ class NotaFiscalDeleteView(DeleteView):
         return context
 
 @method_decorator(login_required, name='dispatch')
-class NotaFiscalListView(SingleTableMixin, FilterView):
+class NotaFiscalListView(PaginacaoCursorMixin, SingleTableMixin, FilterView):
     model = NotaFiscal
     table_class = NotaFiscalListaTable
     filterset_class = NotaFiscalFilter
     template_name = 'faturamento/lista_notas_fiscais.html'
     paginate_by = 20
+    ordem_cursor = ('-dtEmissao', '-id')
 
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
@@ -244,7 +246,7 @@ class NotaFiscalListView(SingleTableMixin, FilterView):
         import datetime
         # Empresa sempre existe
         empresa_id = self.request.session['empresa_id']
-        qs = NotaFiscal.objects.filter(empresa_destinataria__id=int(empresa_id)).order_by('-dtEmissao')
+        qs = NotaFiscal.objects.filter(empresa_destinataria__id=int(empresa_id)).order_by(*self.ordem_cursor)
         
         # Filtrar por mês/ano de emissão
         mes_ano_emissao = self.request.GET.get('mes_ano_emissao')
@@ -263,7 +265,7 @@ class NotaFiscalListView(SingleTableMixin, FilterView):
 
     def get_context_data(self, **kwargs):
         import datetime
-        from django.db.models import Sum
+        from django.db.models import Count, Q, Sum
         context = super().get_context_data(**kwargs)
         mes_ano_emissao = self.request.GET.get('mes_ano_emissao')
         if not mes_ano_emissao:
@@ -272,33 +274,31 @@ class NotaFiscalListView(SingleTableMixin, FilterView):
         
         # Calcular totalizações usando o queryset filtrado do filterset
         # Isso garante que os totais reflitam exatamente os registros exibidos na tabela
-        # EXCLUINDO notas fiscais canceladas da totalização
-        if hasattr(self, 'filterset') and self.filterset is not None:
-            queryset_filtrado = self.filterset.qs.exclude(status_recebimento='cancelado')
-        else:
-            queryset_filtrado = self.get_queryset().exclude(status_recebimento='cancelado')
-            
-        totais = queryset_filtrado.aggregate(
-            total_bruto=Sum('val_bruto'),
-            total_iss=Sum('val_ISS'),
-            total_pis=Sum('val_PIS'),
-            total_cofins=Sum('val_COFINS'),
-            total_ir=Sum('val_IR'),
-            total_csll=Sum('val_CSLL'),
-            total_outros=Sum('val_outros'),
-            total_liquido=Sum('val_liquido')
-        )
-        
-        # Contar notas canceladas para informação adicional
+        # EXCLUINDO notas fiscais canceladas da totalização.
+        # Somas e contagens saem de uma única agregação sobre o conjunto filtrado
         if hasattr(self, 'filterset') and self.filterset is not None:
             queryset_base = self.filterset.qs
         else:
             queryset_base = self.get_queryset()
-            
-        total_notas = queryset_base.count()
-        notas_canceladas = queryset_base.filter(status_recebimento='cancelado').count()
+
+        validas = ~Q(status_recebimento='cancelado')
+        agregado = queryset_base.order_by().aggregate(
+            total_bruto=Sum('val_bruto', filter=validas),
+            total_iss=Sum('val_ISS', filter=validas),
+            total_pis=Sum('val_PIS', filter=validas),
+            total_cofins=Sum('val_COFINS', filter=validas),
+            total_ir=Sum('val_IR', filter=validas),
+            total_csll=Sum('val_CSLL', filter=validas),
+            total_outros=Sum('val_outros', filter=validas),
+            total_liquido=Sum('val_liquido', filter=validas),
+            total_notas=Count('id'),
+            notas_canceladas=Count('id', filter=Q(status_recebimento='cancelado')),
+        )
+        total_notas = agregado.pop('total_notas')
+        notas_canceladas = agregado.pop('notas_canceladas')
         notas_validas = total_notas - notas_canceladas
-        
+        totais = agregado
+
         # Garantir que valores None sejam convertidos para 0
         for key, value in totais.items():
             if value is None:
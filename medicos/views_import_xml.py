@@ -8,6 +8,10 @@ from core.context_processors import empresa_context
 import xml.etree.ElementTree as ET
 from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required
+from medicos.rastreamento import span
+import logging
+
+logger = logging.getLogger(__name__)
 
 @method_decorator(login_required, name='dispatch')
 class NotaFiscalImportXMLView(View):
@@ -32,6 +36,7 @@ class NotaFiscalImportXMLView(View):
         form = self.form_class()
         return render(request, self.template_name, {'form': form, 'titulo_pagina': 'Importar XML de Nota Fiscal'})
 
+    @span('importacao.nota_fiscal_xml', logger)
     def post(self, request, *args, **kwargs):
         form = self.form_class(request.POST, request.FILES)
         empresa = empresa_context(request).get('empresa')
@@ -105,28 +110,23 @@ class NotaFiscalImportXMLView(View):
                         if iss_retido_el is not None:
                             try:
                                 iss_retido = int(iss_retido_el.text)
-                                print(f"DEBUG: IssRetido encontrado = {iss_retido}")
                             except (ValueError, TypeError):
                                 iss_retido = None
-                                print(f"DEBUG: IssRetido inválido = {iss_retido_el.text}")
-                        else:
-                            print("DEBUG: IssRetido não encontrado no XML")
+                                logger.debug("XML %s: IssRetido inválido (%r)", f.name, iss_retido_el.text)
                         
                         # Aplicar regra do IssRetido
                         if iss_retido == 1:
                             # ISS foi retido - importar o valor
                             val_iss = to_decimal(val_iss_el.text)
-                            print(f"DEBUG: IssRetido=1 - Importando ISS = R$ {val_iss}")
                         elif iss_retido == 2:
                             # ISS não foi retido - não considerar (valor = 0)
                             val_iss = Decimal('0.00')
-                            print(f"DEBUG: IssRetido=2 - Zerando ISS = R$ {val_iss}")
                         else:
                             # Se IssRetido não está presente ou valor inválido, importar o valor normalmente
                             val_iss = to_decimal(val_iss_el.text)
-                            print(f"DEBUG: IssRetido ausente/inválido - Importando ISS normalmente = R$ {val_iss}")
+                        logger.debug("XML %s: IssRetido=%s, ISS importado R$ %s", f.name, iss_retido, val_iss)
                     else:
-                        print("DEBUG: ValorIss não encontrado no XML")
+                        logger.debug("XML %s: ValorIss não encontrado", f.name)
                     
                     val_liquido = to_decimal(val_liquido_el.text) if val_liquido_el is not None else Decimal('0.00')
                     val_pis = to_decimal(val_pis_el.text) if val_pis_el is not None else Decimal('0.00')
@@ -183,10 +183,8 @@ class NotaFiscalImportXMLView(View):
                     else:
                         erro = True
                         total_erros += 1
-                except Exception as e:
-                    import traceback
-                    print('Erro ao importar nota fiscal XML:', e)
-                    traceback.print_exc()
+                except Exception:
+                    logger.exception("Erro ao importar nota fiscal XML %s", getattr(f, 'name', ''))
                     erro = True
                     total_erros += 1
             if total_importadas:
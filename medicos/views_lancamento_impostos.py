@@ -11,6 +11,7 @@ from django.utils import timezone
 from decimal import Decimal
 from datetime import date, timedelta
 from django.db import transaction
+import logging
 
 from medicos.models.base import Empresa, Socio
 from medicos.models.conta_corrente import MovimentacaoContaCorrente
@@ -18,6 +19,8 @@ from medicos.models.financeiro import DescricaoMovimentacaoFinanceira, MeioPagam
 from medicos.relatorios.builders import montar_relatorio_mensal_socio
 from core.context_processors import empresa_context
 
+logger = logging.getLogger(__name__)
+
 
 @login_required
 @require_http_methods(["POST"])
@@ -26,51 +29,37 @@ def lancar_impostos_conta_corrente(request, empresa_id, socio_id, mes, ano):
     Cria lançamentos automáticos dos impostos na conta corrente do mês seguinte
     baseado no relatório mensal do sócio.
     """
-    print(f"DEBUG: Iniciando lançamento de impostos - empresa_id={empresa_id}, socio_id={socio_id}, mes={mes}, ano={ano}")
-    
     try:
         # Validações básicas
-        print(f"DEBUG: Buscando empresa {empresa_id}")
         empresa = get_object_or_404(Empresa, id=empresa_id)
-        print(f"DEBUG: Empresa encontrada: {empresa.razao_social}")
         
-        print(f"DEBUG: Buscando sócio {socio_id}")
         socio = get_object_or_404(Socio, id=socio_id, empresa=empresa)
-        print(f"DEBUG: Sócio encontrado: {socio.nome}")
         
         # Validar se o usuário tem acesso à empresa (verificação simplificada)
-        print(f"DEBUG: Verificando acesso do usuário à empresa")
         user_has_access = empresa.conta.contamembership_set.filter(
             usuario=request.user,
             ativo=True
         ).exists()
         
         if not user_has_access:
-            print(f"DEBUG: Usuário sem acesso à empresa")
             return JsonResponse({
                 'success': False,
                 'message': 'Acesso negado à empresa.'
             })
         
-        print(f"DEBUG: Usuário tem acesso, continuando...")
-        
         # Gerar o relatório do mês para obter os valores dos impostos
-        print(f"DEBUG: Gerando relatório mensal do sócio")
         try:
             mes_ano = f"{ano}-{mes:02d}"
-            print(f"DEBUG: Chamando montar_relatorio_mensal_socio com: empresa_id={empresa_id}, mes_ano={mes_ano}, socio_id={socio_id}")
             relatorio_dict = montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=socio_id)
             relatorio = relatorio_dict.get('relatorio')
             
             if not relatorio:
-                print(f"DEBUG: Relatório não encontrado")
                 return JsonResponse({
                     'success': False,
                     'message': 'Não foi possível gerar o relatório mensal do sócio.'
                 })
-            print(f"DEBUG: Relatório gerado com sucesso")
         except Exception as e:
-            print(f"DEBUG: Erro ao gerar relatório: {str(e)}")
+            logger.exception("Erro ao gerar relatório mensal do sócio %s (%s)", socio_id, mes_ano)
             return JsonResponse({
                 'success': False,
                 'message': f'Erro ao gerar relatório: {str(e)}'
@@ -152,6 +141,7 @@ def lancar_impostos_conta_corrente(request, empresa_id, socio_id, mes, ano):
                     # Verificar se já existe lançamento para este imposto neste período
                     lancamento_existente = MovimentacaoContaCorrente.objects.filter(
                         descricao_movimentacao=descricoes_impostos[imposto_nome],
+                        empresa_id=socio.empresa_id,
                         socio=socio,
                         data_movimentacao__year=ano_lancamento,
                         data_movimentacao__month=mes_lancamento,
@@ -205,35 +195,25 @@ def preview_lancamentos_impostos(request, empresa_id, socio_id, mes, ano):
     Visualiza os impostos que serão lançados na conta corrente
     sem efetuar os lançamentos.
     """
-    print(f"DEBUG PREVIEW: Iniciando preview - empresa_id={empresa_id}, socio_id={socio_id}, mes={mes}, ano={ano}")
-    
     try:
         # Validações básicas
-        print(f"DEBUG PREVIEW: Buscando empresa {empresa_id}")
         empresa = get_object_or_404(Empresa, id=empresa_id)
-        print(f"DEBUG PREVIEW: Empresa encontrada: {empresa.razao_social}")
         
-        print(f"DEBUG PREVIEW: Buscando sócio {socio_id}")
         socio = get_object_or_404(Socio, id=socio_id, empresa=empresa)
-        print(f"DEBUG PREVIEW: Sócio encontrado: {socio.nome}")
         
         # Gerar o relatório do mês para obter os valores dos impostos
-        print(f"DEBUG PREVIEW: Gerando relatório mensal do sócio")
         try:
             mes_ano = f"{ano}-{mes:02d}"
-            print(f"DEBUG PREVIEW: Chamando montar_relatorio_mensal_socio com: empresa_id={empresa_id}, mes_ano={mes_ano}, socio_id={socio_id}")
             relatorio_dict = montar_relatorio_mensal_socio(empresa_id, mes_ano, socio_id=socio_id)
             relatorio = relatorio_dict.get('relatorio')
             
             if not relatorio:
-                print(f"DEBUG PREVIEW: Relatório não encontrado")
                 return JsonResponse({
                     'success': False,
                     'message': 'Não foi possível gerar o relatório mensal do sócio.'
                 })
-            print(f"DEBUG PREVIEW: Relatório gerado com sucesso")
         except Exception as e:
-            print(f"DEBUG PREVIEW: Erro ao gerar relatório: {str(e)}")
+            logger.exception("Erro ao gerar relatório mensal do sócio %s (%s)", socio_id, mes_ano)
             return JsonResponse({
                 'success': False,
                 'message': f'Erro ao gerar relatório: {str(e)}'
@@ -272,6 +252,7 @@ def preview_lancamentos_impostos(request, empresa_id, socio_id, mes, ano):
                     )
                     ja_existe = MovimentacaoContaCorrente.objects.filter(
                         descricao_movimentacao=desc_obj,
+                        empresa_id=socio.empresa_id,
                         socio=socio,
                         data_movimentacao__year=ano_lancamento,
                         data_movimentacao__month=mes_lancamento,
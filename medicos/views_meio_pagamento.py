@@ -8,6 +8,7 @@ from django_tables2.views import SingleTableView
 from django.shortcuts import get_object_or_404
 from medicos.models.financeiro import MeioPagamento, Conta
 from medicos.models.base import Empresa
+from medicos.services.clonagem_cadastros import ClonagemCadastrosService
 from .forms_meio_pagamento import MeioPagamentoForm
 
 from medicos.tables_meio_pagamento import MeioPagamentoTable
@@ -171,32 +172,13 @@ def importar_meios_pagamento(request, empresa_id):
                 'error': f'Nenhum meio de pagamento encontrado na empresa {empresa_origem.nome_fantasia or empresa_origem.name}'
             })
         
-        # Executar importação dentro de uma transação
+        # Importação em lote (uma leitura por lado e um bulk_create)
         with transaction.atomic():
-            meios_importados = 0
-            meios_ignorados = 0
-            
-            for meio_origem in meios_pagamento_origem:
-                # Verificar se já existe um meio com o mesmo código na empresa destino
-                meio_existente = MeioPagamento.objects.filter(
-                    empresa=empresa_destino,
-                    codigo=meio_origem.codigo
-                ).exists()
-                
-                if meio_existente:
-                    meios_ignorados += 1
-                    continue
-                
-                # Criar novo meio de pagamento para a empresa destino
-                novo_meio = MeioPagamento(
-                    empresa=empresa_destino,
-                    codigo=meio_origem.codigo,
-                    nome=meio_origem.nome,
-                    ativo=meio_origem.ativo,
-                    created_by=request.user
-                )
-                novo_meio.save()
-                meios_importados += 1
+            resultado = ClonagemCadastrosService(
+                empresa_origem, empresa_destino, usuario=request.user
+            ).clonar_meios_pagamento()
+        meios_importados = resultado['importados']
+        meios_ignorados = resultado['ignorados']
         
         mensagem = f'Importação concluída! {meios_importados} meio(s) de pagamento importado(s) de {empresa_origem.nome_fantasia or empresa_origem.name}.'
         if meios_ignorados > 0:
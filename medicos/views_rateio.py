@@ -12,6 +12,8 @@ from django.db import models
 from medicos.models.fiscal import NotaFiscal, NotaFiscalRateioMedico
 from medicos.models.base import Empresa, Socio
 from .tables_rateio import NotaFiscalRateioTable
+from .services.rateio_nota_fiscal import RateioNotaFiscalService
+from decimal import Decimal, InvalidOperation
 from .forms import NotaFiscalRateioMedicoForm, NotaFiscalRateioMedicoFilter, NotaFiscalRateioFilter
 
 # Mixin para contexto do cenário de faturamento
@@ -50,55 +52,28 @@ class NotaFiscalRateioListView(RateioContextMixin, FilterView):
             messages.error(request, 'Não é possível salvar rateio para nota fiscal cancelada.')
             return self.get(request, *args, **kwargs)
             
-        # Get all active medicos for empresa
-        medicos_empresa = []
+        # Sócios ativos da empresa (colunas da matriz de rateio)
+        medicos_ids = []
         if empresa:
-            medicos_empresa = Socio.objects.filter(empresa=empresa, ativo=True)
-        # Save rateio for each medico
-        from medicos.models.fiscal import NotaFiscalRateioMedico
-        from decimal import Decimal, InvalidOperation
-        valores_brutos = []
-        for medico in medicos_empresa:
-            field_name = f"valor_bruto_medico_{medico.id}"
-            valor_bruto = request.POST.get(field_name)
+            medicos_ids = list(Socio.objects.filter(empresa=empresa, ativo=True).values_list('id', flat=True))
+        valores_por_medico = {}
+        for medico_id in medicos_ids:
+            valor_bruto = request.POST.get(f"valor_bruto_medico_{medico_id}")
             try:
                 valor_bruto = Decimal(valor_bruto) if valor_bruto else Decimal('0')
             except (InvalidOperation, TypeError, ValueError):
                 valor_bruto = Decimal('0')
-            valores_brutos.append(valor_bruto)
-        total_rateio = sum(valores_brutos)
+            valores_por_medico[medico_id] = valor_bruto if valor_bruto.is_finite() else Decimal('0')
+
+        # Grava todo o vetor de uma vez (cálculo vetorizado + bulk create/update/delete)
         try:
-            val_bruto_nota = Decimal(nota_fiscal.val_bruto)
-        except (InvalidOperation, TypeError, ValueError):
-            val_bruto_nota = Decimal('0')
-        if val_bruto_nota > 0 and total_rateio > val_bruto_nota:
+            RateioNotaFiscalService(nota_fiscal, usuario=request.user).aplicar(
+                valores_por_medico, medicos_permitidos=medicos_ids
+            )
+        except ValidationError as e:
             from django.contrib import messages
-            messages.error(request, 'O total do rateio não pode exceder o valor bruto da nota fiscal.')
+            messages.error(request, e.messages[0])
             return self.get(request, *args, **kwargs)
-        # Se não excedeu, salva normalmente
-        for idx, medico in enumerate(medicos_empresa):
-            valor_bruto = valores_brutos[idx]
-            if valor_bruto > 0:
-                percentual_participacao = (valor_bruto / val_bruto_nota) * Decimal('100') if val_bruto_nota > 0 else Decimal('0')
-                rateio_obj_qs = NotaFiscalRateioMedico.objects.filter(nota_fiscal=nota_fiscal, medico=medico)
-                if rateio_obj_qs.exists():
-                    rateio_obj = rateio_obj_qs.first()
-                    rateio_obj.valor_bruto_medico = valor_bruto
-                    rateio_obj.percentual_participacao = percentual_participacao
-                    rateio_obj.tipo_rateio = 'valor'
-                    rateio_obj.save()
-                else:
-                    rateio_obj = NotaFiscalRateioMedico(
-                        nota_fiscal=nota_fiscal,
-                        medico=medico,
-                        valor_bruto_medico=valor_bruto,
-                        percentual_participacao=percentual_participacao,
-                        tipo_rateio='valor'
-                    )
-                    rateio_obj.save()
-            else:
-                NotaFiscalRateioMedico.objects.filter(nota_fiscal=nota_fiscal, medico=medico).delete()
-        nota_fiscal.rateios_medicos.exclude(medico__in=medicos_empresa).delete()
         
         # Preservar TODOS os filtros originais ao retornar após salvar rateio
         params = []
@@ -146,16 +121,9 @@ class NotaFiscalRateioListView(RateioContextMixin, FilterView):
         has_filters = any(filter_params.get(field) for field in ['mes_emissao', 'mes_recebimento', 'numero', 'tomador', 'cnpj_tomador'])
         
         if not has_filters:
-            # Filtrar notas com rateio diferente de 100%
-            # Usar annotate com Sum para calcular o total rateado
-            from django.db.models import Sum, Case, When, Value
-            
-            qs = qs.annotate(
-                total_rateado=Sum('rateios_medicos__percentual_participacao')
-            ).filter(
-                models.Q(total_rateado__isnull=True) |  # Sem rateio
-                models.Q(total_rateado__lt=99.99)       # Rateio incompleto (menor que 100%)
-            )
+            # Filtrar notas com rateio diferente de 100% (sem rateio ou incompleto),
+            # usando o total de rateio mantido na própria nota
+            qs = qs.filter(rateio_percentual_total__lt=99.99)
             
         self.filter = self.filterset_class(filter_params, queryset=qs)
         # Aplica ordenação padrão por data de emissão descendente se não houver ordenação específica
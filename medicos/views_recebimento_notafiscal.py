@@ -11,29 +11,29 @@ from medicos.models.fiscal import NotaFiscal
 from .tables_recebimento_notafiscal import NotaFiscalRecebimentoTable
 from .filters_recebimento_notafiscal import NotaFiscalRecebimentoFilter
 from .forms_notafiscal import NotaFiscalForm
+from medicos.paginacao import PaginacaoCursorMixin
 
 @method_decorator(login_required, name='dispatch')
-class NotaFiscalRecebimentoListView(SingleTableMixin, FilterView):
+class NotaFiscalRecebimentoListView(PaginacaoCursorMixin, SingleTableMixin, FilterView):
     model = NotaFiscal
     table_class = NotaFiscalRecebimentoTable
     filterset_class = NotaFiscalRecebimentoFilter
     template_name = 'financeiro/recebimento_notas_fiscais.html'
     paginate_by = 20
+    ordem_cursor = ('-dtEmissao', '-id')
 
     def get_queryset(self):
         empresa_id = self.request.session.get('empresa_id')
         if not empresa_id:
             return NotaFiscal.objects.none()
             
-        # Carregar relacionamentos necessários para as propriedades de rateio
+        # tem_rateio/rateio_completo leem os totais mantidos na própria nota
         qs = NotaFiscal.objects.filter(
             empresa_destinataria__id=int(empresa_id)
         ).select_related(
             'empresa_destinataria', 
             'meio_pagamento'
-        ).prefetch_related(
-            'rateios_medicos'  # Essencial para tem_rateio e rateio_completo
-        ).order_by('-dtEmissao')
+        ).order_by(*self.ordem_cursor)
         
         # Filtro por mês/ano de emissão - só aplica se explicitamente informado
         mes_ano_emissao = self.request.GET.get('mes_ano_emissao')
@@ -80,28 +80,26 @@ class NotaFiscalRecebimentoListView(SingleTableMixin, FilterView):
         mes_ano_recebimento = self.request.GET.get('mes_ano_recebimento', '')
         context['mes_ano_recebimento_default'] = mes_ano_recebimento
         
-        # Calcula totais das notas fiscais filtradas EXCLUINDO notas canceladas
-        queryset_filtrado = self.get_queryset()
-        queryset_para_totalizacao = queryset_filtrado.exclude(status_recebimento='cancelado')
-        
-        totais = queryset_para_totalizacao.aggregate(
-            total_val_bruto=Sum('val_bruto'),
-            total_val_liquido=Sum('val_liquido'),
-            total_val_ISS=Sum('val_ISS'),
-            total_val_PIS=Sum('val_PIS'),
-            total_val_COFINS=Sum('val_COFINS'),
-            total_val_IR=Sum('val_IR'),
-            total_val_CSLL=Sum('val_CSLL'),
-            total_val_outros=Sum('val_outros')
-        )
-        
-        # Calcula quantidade de notas fiscais por status (considera todas, incluindo canceladas)
-        status_count = queryset_filtrado.aggregate(
+        # Calcula totais das notas fiscais filtradas EXCLUINDO notas canceladas e a
+        # quantidade por status (considera todas, incluindo canceladas) em uma única agregação
+        queryset_filtrado = self.get_queryset().order_by().select_related(None)
+        validas = ~Q(status_recebimento='cancelado')
+
+        totais = queryset_filtrado.aggregate(
+            total_val_bruto=Sum('val_bruto', filter=validas),
+            total_val_liquido=Sum('val_liquido', filter=validas),
+            total_val_ISS=Sum('val_ISS', filter=validas),
+            total_val_PIS=Sum('val_PIS', filter=validas),
+            total_val_COFINS=Sum('val_COFINS', filter=validas),
+            total_val_IR=Sum('val_IR', filter=validas),
+            total_val_CSLL=Sum('val_CSLL', filter=validas),
+            total_val_outros=Sum('val_outros', filter=validas),
             total_notas=models.Count('id'),
             pendentes=models.Count('id', filter=Q(status_recebimento='pendente')),
             recebidas=models.Count('id', filter=Q(status_recebimento='recebido')),
             canceladas=models.Count('id', filter=Q(status_recebimento='cancelado'))
         )
+        status_count = totais
         
         # Adiciona totais ao contexto, garantindo que valores None sejam convertidos para 0
         context['totais'] = {
@@ -6,12 +6,15 @@ Fonte: .github/documentacao_especifica_instructions.md, seção Relatórios
 # Imports padrão Python
 from datetime import datetime, date
 from decimal import Decimal
+from functools import partial
 import calendar
+import logging
 
 # Imports de terceiros
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
-from django.http import HttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.utils import timezone
 from django.db.models import Sum
 
@@ -19,7 +22,10 @@ from django.db.models import Sum
 from medicos.models import Empresa
 from medicos.models.base import Socio
 from medicos.models.fiscal import NotaFiscal, Aliquotas
+from medicos.models.relatorios import SnapshotPeriodo
+from medicos.replica import leitura_replica
 from medicos.utils_saas import SaaSPreferencesManager
+from medicos.services.adicional_ir import apurar_adicional_ir_ano
 
 # Imports locais - Builders e relatórios
 from medicos.relatorios.builders import (
@@ -34,6 +40,25 @@ from medicos.relatorios.apuracao_cofins import montar_relatorio_cofins_persisten
 from medicos.relatorios.apuracao_irpj import montar_relatorio_irpj_persistente
 from medicos.relatorios.apuracao_irpj_mensal import montar_relatorio_irpj_mensal_persistente
 from medicos.relatorios.apuracao_csll import montar_relatorio_csll_persistente
+from medicos.relatorios.concorrencia import executar_etapas
+from medicos.relatorios.tendencias import MAXIMO_ANOS, ROTULOS_SERIES, SERIES, montar_tendencias_tributarias
+from medicos.relatorios.payloads_periodo import (
+    aplicar_apuracao_congelada,
+    carregar_despesas_apropriadas as _carregar_despesas_apropriadas,
+    impostos_congelados,
+    payload_relatorio_mensal_socio,
+    processar_movimentacoes_financeiras as _processar_movimentacoes_financeiras,
+    restaurar_resumo_executivo,
+)
+from medicos.services.snapshots_periodo import (
+    apuracao_congelada,
+    competencia_de,
+    congelar_apuracao_ausente,
+    obter_ou_congelar,
+    periodo_fechado,
+)
+
+logger = logging.getLogger(__name__)
 
 # Helpers
 def _obter_mes_ano(request):
@@ -67,6 +92,7 @@ def _contexto_base(request, empresa, menu_nome='Relatórios', cenario_nome=None)
 
 # Views
 @login_required
+@leitura_replica()
 def relatorio_executivo(request, empresa_id):
     """
     View simplificada para relatório executivo anual da empresa.
@@ -83,8 +109,13 @@ def relatorio_executivo(request, empresa_id):
     if not mes_ano:
         mes_ano = datetime.now().strftime('%Y-%m')
     
-    # Dados do resumo demonstrativo por sócio
-    resumo_demonstrativo = montar_resumo_demonstrativo_socios(empresa_id, mes_ano)
+    # Dados do resumo demonstrativo por sócio (do snapshot, se a competência está fechada)
+    competencia = competencia_de(mes_ano)
+    if periodo_fechado(empresa_id, competencia):
+        dados, _snapshot = obter_ou_congelar(SnapshotPeriodo.TIPO_EXECUTIVO, empresa_id, competencia)
+        resumo_demonstrativo = restaurar_resumo_executivo(dados)
+    else:
+        resumo_demonstrativo = montar_resumo_demonstrativo_socios(empresa_id, mes_ano)
     
     context = _contexto_base(request, empresa=empresa, menu_nome='Demonstrativo', cenario_nome='Relatório Executivo')
     context.update({
@@ -135,20 +166,6 @@ def _obter_socio_selecionado(empresa, socio_id_raw):
     
     return socios, socio_selecionado, socio_id
 
-def _processar_movimentacoes_financeiras(relatorio_obj):
-    """
-    Processa e normaliza movimentações financeiras.
-    """
-    lista_movimentacoes = getattr(relatorio_obj, 'lista_movimentacoes_financeiras', [])
-    for mov in lista_movimentacoes:
-        if isinstance(mov, dict):
-            if 'tipo' not in mov or mov['tipo'] in (None, ''):
-                mov['tipo'] = mov.get('descricao', '-')
-        else:
-            if not hasattr(mov, 'tipo') or mov.tipo in (None, ''):
-                mov.tipo = getattr(mov, 'descricao', '-')
-    return lista_movimentacoes
-
 # Views
 @login_required
 def relatorio_financeiro_empresa(request, empresa_id):
@@ -193,6 +210,10 @@ def relatorio_mensal_socio(request, empresa_id):
     View padronizada para relatório mensal do sócio.
     Fonte: .github/documentacao_especifica_instructions.md, seção Relatórios
     Template: relatorios/relatorio_mensal_socio.html
+
+    Competência fechada: os dados vêm do snapshot congelado no fechamento
+    (medicos/services/snapshots_periodo.py), sem recalcular nem relançar
+    impostos.
     """
     empresa = Empresa.objects.get(id=empresa_id)
     mes_ano = _obter_mes_ano(request)
@@ -201,207 +222,35 @@ def relatorio_mensal_socio(request, empresa_id):
     socio_id_raw = request.GET.get('socio_id')
     socios, socio_selecionado, socio_id = _obter_socio_selecionado(empresa, socio_id_raw)
     
-    # Lançamento automático sempre ativado (sem opções de configuração)
-    auto_lancar_impostos = True
-    atualizar_lancamentos = True
-    
-    # Obter dados do relatório com lançamento automático sempre ativado
-    relatorio_dict = montar_relatorio_mensal_socio(
-        empresa_id, 
-        mes_ano, 
-        socio_id=socio_id,
-        auto_lancar_impostos=auto_lancar_impostos,
-        atualizar_lancamentos_existentes=atualizar_lancamentos
-    )
-    relatorio_obj = relatorio_dict['relatorio']
-    
-    # Processar movimentações financeiras
-    lista_movimentacoes = _processar_movimentacoes_financeiras(relatorio_obj)
-    
-    # Extrato Conta Corrente removido conforme solicitado
-    mes_fechado = False
+    competencia = competencia_de(mes_ano)
+    mes_fechado = bool(socio_id) and periodo_fechado(empresa_id, competencia, socio_id)
+    if mes_fechado:
+        dados, snapshot = obter_ou_congelar(SnapshotPeriodo.TIPO_MENSAL_SOCIO, empresa_id, competencia, socio_id)
+        data_geracao = timezone.localtime(snapshot.criado_em)
+        auto_lancar_impostos = False
+    else:
+        # Lançamento automático sempre ativado (sem opções de configuração)
+        auto_lancar_impostos = True
+        dados = payload_relatorio_mensal_socio(empresa_id, mes_ano, socio_id, auto_lancar_impostos=True)
+        data_geracao = timezone.now()
     
-    # Montar dicionário do relatório com todos os dados necessários
-    # Carregar Despesas Apropriadas (mesmo código da view despesas_socio_lista)
-    from medicos.models.despesas import DespesaSocio, DespesaRateada, ItemDespesaRateioMensal
-    despesas_apropriadas = []
-    total_despesas_apropriadas = 0
-    total_despesas_provisionadas = 0
-    if socio_id and mes_ano:
-        try:
-            ano_str, mes_str = mes_ano.split('-')
-            ano = int(ano_str)
-            mes = int(mes_str)
-            
-            # Despesas individuais do sócio
-            despesas_individuais = DespesaSocio.objects.filter(
-                socio_id=socio_id,
-                socio__empresa_id=empresa_id,
-                data__year=ano, 
-                data__month=mes
-            ).select_related('socio', 'item_despesa', 'item_despesa__grupo_despesa')
-
-            # Despesas rateadas do sócio
-            rateadas_qs = DespesaRateada.objects.filter(
-                item_despesa__grupo_despesa__empresa_id=empresa_id,
-                data__year=ano, data__month=mes
-            ).select_related('item_despesa', 'item_despesa__grupo_despesa')
-            
-            # Processar despesas rateadas
-            for despesa in rateadas_qs:
-                rateio = ItemDespesaRateioMensal.obter_rateio_para_despesa(
-                    despesa.item_despesa, Socio.objects.get(id=socio_id), despesa.data
-                )
-                if rateio is not None:
-                    valor_apropriado = despesa.valor * (rateio.percentual_rateio / 100)
-                    socio_obj = Socio.objects.get(id=socio_id)
-                    item_desc = getattr(despesa.item_despesa, 'descricao', None) or '-'
-                    grupo_obj = getattr(despesa.item_despesa, 'grupo_despesa', None)
-                    grupo_desc = getattr(grupo_obj, 'descricao', None) or '-'
-                    
-                    despesas_apropriadas.append({
-                        'data': despesa.data,
-                        'socio': socio_obj,
-                        'descricao': item_desc,
-                        'grupo': grupo_desc,
-                        'tipo_classificacao': getattr(despesa, 'tipo_classificacao', 1),
-                        'valor_total': despesa.valor,
-                        'taxa_rateio': rateio.percentual_rateio,
-                        'valor_apropriado': valor_apropriado,
-                        'id': None,  # Não permite editar/excluir no relatório
-                    })
-
-            # Processar despesas individuais
-            for d in despesas_individuais:
-                despesas_apropriadas.append({
-                    'data': d.data,
-                    'socio': d.socio,
-                    'descricao': getattr(d.item_despesa, 'descricao', '-'),
-                    'grupo': getattr(getattr(d.item_despesa, 'grupo_despesa', None), 'descricao', '-'),
-                    'tipo_classificacao': getattr(d, 'tipo_classificacao', 1),
-                    'valor_total': d.valor,
-                    'taxa_rateio': '-',
-                    'valor_apropriado': d.valor,
-                    'id': d.id,
-                })
-            # Calcular total de despesas classificação normal
-            total_despesas_normal = sum([
-                d.get('valor_apropriado', 0) or 0
-                for d in despesas_apropriadas
-                if d.get('tipo_classificacao', 1) == 1
-            ])
-            # Calcular total de despesas classificação provisionada
-            total_despesas_provisionadas = sum([
-                d.get('valor_apropriado', 0) or 0
-                for d in despesas_apropriadas
-                if d.get('tipo_classificacao', 1) == 2
-            ])
-            total_despesas_apropriadas = sum([d.get('valor_apropriado', 0) or 0 for d in despesas_apropriadas])
-            # Ordenar despesas apropriadas por classificação (crescente) e depois por data (decrescente)
-            despesas_apropriadas.sort(key=lambda x: (x.get('tipo_classificacao', 1), -x['data'].toordinal() if x['data'] else 0))
-            
-        except Exception as e:
-            print(f"ERROR View: erro ao carregar despesas apropriadas: {e}")
-            despesas_apropriadas = []
-            total_despesas_apropriadas = 0
-
     relatorio = {
         'socios': list(socios),
         'socio_id': socio_id,
         'socio_nome': socio_selecionado.pessoa.name if socio_selecionado else '',
-        'competencia': mes_ano,
-        'data_geracao': timezone.now().strftime('%d/%m/%Y %H:%M'),
-            'total_despesas_normal': total_despesas_normal,
-            'total_despesas_provisionadas': total_despesas_provisionadas,
-        # Dados financeiros básicos
-        'despesa_geral': getattr(relatorio_obj, 'despesa_geral', 0),
-        'despesas_total': getattr(relatorio_obj, 'despesas_total', 0),
-        # Despesas Apropriadas (nova funcionalidade)
-        'despesas_apropriadas': despesas_apropriadas,
-        'total_despesas_apropriadas': total_despesas_apropriadas,
-    'movimentacoes_financeiras': lista_movimentacoes,
-        'saldo_movimentacao_financeira': getattr(relatorio_obj, 'saldo_movimentacao_financeira', 0),
-        'notas_fiscais': getattr(relatorio_obj, 'lista_notas_fiscais', []),
-        # Totais da empresa
-        'total_notas_emitidas_mes': getattr(relatorio_obj, 'total_notas_emitidas_mes', 0),
-        'total_notas_bruto': getattr(relatorio_obj, 'total_notas_bruto', 0),
-        'total_notas_liquido': getattr(relatorio_obj, 'total_notas_liquido', 0),
-        # Impostos do sócio
-        'total_iss': getattr(relatorio_obj, 'total_iss', 0),
-        'total_pis': getattr(relatorio_obj, 'total_pis', 0),
-        'total_cofins': getattr(relatorio_obj, 'total_cofins', 0),
-        'total_irpj': getattr(relatorio_obj, 'total_irpj', 0),
-        'total_irpj_adicional': getattr(relatorio_obj, 'total_irpj_adicional', 0),
-        'total_csll': getattr(relatorio_obj, 'total_csll', 0),
-        # Impostos devidos do sócio
-        'total_iss_devido': getattr(relatorio_obj, 'total_iss_devido', 0),
-        'total_pis_devido': getattr(relatorio_obj, 'total_pis_devido', 0),
-        'total_cofins_devido': getattr(relatorio_obj, 'total_cofins_devido', 0),
-        'total_irpj_devido': getattr(relatorio_obj, 'total_irpj_devido', 0),
-        'total_csll_devido': getattr(relatorio_obj, 'total_csll_devido', 0),
-        'total_iss_retido': getattr(relatorio_obj, 'total_iss_retido', 0),
-        'total_pis_retido': getattr(relatorio_obj, 'total_pis_retido', 0),
-        'total_cofins_retido': getattr(relatorio_obj, 'total_cofins_retido', 0),
-        'total_irpj_retido': getattr(relatorio_obj, 'total_irpj_retido', 0),
-        'total_csll_retido': getattr(relatorio_obj, 'total_csll_retido', 0),
-        # Dados de apuração
-        'receita_bruta_recebida': getattr(relatorio_obj, 'receita_bruta_recebida', 0),
-        'receita_liquida': getattr(relatorio_obj, 'receita_liquida', 0),
-        'impostos_total': getattr(relatorio_obj, 'impostos_total', 0),
-        'impostos_devido_total': getattr(relatorio_obj, 'impostos_devido_total', 0),
-        'impostos_retido_total': getattr(relatorio_obj, 'impostos_retido_total', 0),
-        'saldo_apurado': getattr(relatorio_obj, 'saldo_apurado', 0),
-        'saldo_a_transferir': getattr(relatorio_obj, 'saldo_a_transferir', 0),
-        'imposto_provisionado_mes_anterior': getattr(relatorio_obj, 'imposto_provisionado_mes_anterior', 0),
-        'imposto_provisionado_mes_anterior': getattr(relatorio_obj, 'imposto_provisionado_mes_anterior', 0),
-        # Totais das notas fiscais do sócio (para linha de totais da tabela)
-        'total_nf_valor_bruto': getattr(relatorio_obj, 'total_nf_valor_bruto', 0),
-        'total_nf_iss': getattr(relatorio_obj, 'total_nf_iss', 0),
-        'total_nf_pis': getattr(relatorio_obj, 'total_nf_pis', 0),
-        'total_nf_cofins': getattr(relatorio_obj, 'total_nf_cofins', 0),
-        'total_nf_irpj': getattr(relatorio_obj, 'total_nf_irpj', 0),
-        'total_nf_csll': getattr(relatorio_obj, 'total_nf_csll', 0),
-        'total_nf_outros': getattr(relatorio_obj, 'total_nf_outros', 0),
-        'total_nf_valor_liquido': getattr(relatorio_obj, 'total_nf_valor_liquido', 0),
-        # Totais das notas fiscais emitidas do sócio (para linha de totais da tabela)
-        'notas_fiscais_emitidas': getattr(relatorio_obj, 'lista_notas_fiscais_emitidas', []),
-        'total_nf_emitidas_valor_bruto': getattr(relatorio_obj, 'total_nf_emitidas_valor_bruto', 0),
-        'total_nf_emitidas_iss': getattr(relatorio_obj, 'total_nf_emitidas_iss', 0),
-        'total_nf_emitidas_pis': getattr(relatorio_obj, 'total_nf_emitidas_pis', 0),
-        'total_nf_emitidas_cofins': getattr(relatorio_obj, 'total_nf_emitidas_cofins', 0),
-        'total_nf_emitidas_irpj': getattr(relatorio_obj, 'total_nf_emitidas_irpj', 0),
-        'total_nf_emitidas_csll': getattr(relatorio_obj, 'total_nf_emitidas_csll', 0),
-        'total_nf_emitidas_outros': getattr(relatorio_obj, 'total_nf_emitidas_outros', 0),
-        'total_nf_emitidas_valor_liquido': getattr(relatorio_obj, 'total_nf_emitidas_valor_liquido', 0),
-        # Campos específicos para o cálculo de IRPJ utilizados no template
-        'base_calculo_consultas': relatorio_dict.get('base_calculo_consultas', 0),
-        'base_calculo_outros': relatorio_dict.get('base_calculo_outros', 0),
-        'base_calculo_ir_total': relatorio_dict.get('base_calculo_ir_total', 0),
-        # Faturamento por tipo de serviço
-        'faturamento_consultas': getattr(relatorio_obj, 'faturamento_consultas', 0),
-        'faturamento_plantao': getattr(relatorio_obj, 'faturamento_plantao', 0),
-        'faturamento_outros': getattr(relatorio_obj, 'faturamento_outros', 0),
+        'data_geracao': data_geracao.strftime('%d/%m/%Y %H:%M'),
+        **dados['relatorio'],
     }
-    # debug prints removed
     
     # Montar contexto final
     context = _contexto_base(request, empresa=empresa, menu_nome='Demonstrativo', cenario_nome='Relatório Mensal Sócio')
-    print(f"DEBUG View: total_receitas do relatorio_dict = {relatorio_dict.get('total_receitas', 'NÃO ENCONTRADO')}")
-    print(f"DEBUG View: total_despesas_outros do relatorio_dict = {relatorio_dict.get('total_despesas_outros', 'NÃO ENCONTRADO')}")
-    print(f"DEBUG View: despesas_provisionadas do relatorio_dict = {relatorio_dict.get('despesas_provisionadas', 'NÃO ENCONTRADO')}")
-    print(f"DEBUG View: base_consultas_socio_regime = {relatorio_dict.get('base_consultas_socio_regime', 'NÃO ENCONTRADO')}")
-    print(f"DEBUG View: base_outros_socio_regime = {relatorio_dict.get('base_outros_socio_regime', 'NÃO ENCONTRADO')}")
     context.update({
         'relatorio': relatorio,
         # Regra do projeto: título deve ser passado via 'titulo_pagina'
         'titulo_pagina': 'Relatório Mensal do Sócio',
-        'valor_adicional_rateio': relatorio_dict.get('valor_adicional_rateio', 0),
-        'receita_bruta_socio': relatorio_dict.get('receita_bruta_socio', 0),
-        'total_receitas': relatorio_dict.get('total_receitas', 0),
-        'total_despesas_outros': relatorio_dict.get('total_despesas_outros', 0),
-        'despesas_provisionadas': relatorio_dict.get('despesas_provisionadas', 0),  # Adicionar despesas provisionadas
+        **dados['contexto'],
         # Resultado do lançamento automático de impostos (se solicitado)
-        'resultado_lancamento_automatico': relatorio_dict.get('resultado_lancamento_automatico'),
+        'resultado_lancamento_automatico': dados.get('resultado_lancamento_automatico'),
         'auto_lancar_impostos': auto_lancar_impostos,
         # Quadro Resumo Conta Corrente removido
         'mes_fechado': mes_fechado,
@@ -436,20 +285,6 @@ def relatorio_mensal_socio(request, empresa_id):
             'ano': hoje.year,
         })
     
-    # Adicionar campos auxiliares para o template
-    context.update({
-        'base_consultas_medicas': relatorio_dict.get('base_consultas_medicas', 0),
-        'base_outros_servicos': relatorio_dict.get('base_outros_servicos', 0),
-        'base_consultas_socio_regime': relatorio_dict.get('base_consultas_socio_regime', 0),
-        'base_outros_socio_regime': relatorio_dict.get('base_outros_socio_regime', 0),
-        # Alíquotas dos impostos
-        'aliquota_pis': relatorio_dict.get('aliquota_pis', 0),
-        'aliquota_cofins': relatorio_dict.get('aliquota_cofins', 0),
-        'aliquota_irpj': relatorio_dict.get('aliquota_irpj', 0),
-        'aliquota_csll': relatorio_dict.get('aliquota_csll', 0),
-        'aliquota_iss': relatorio_dict.get('aliquota_iss', 0),
-    })
-    
     return render(request, 'relatorios/relatorio_mensal_socio.html', context)
 
 
@@ -530,87 +365,11 @@ def relatorio_mensal_socio_pdf(request, empresa_id):
     relatorio_obj = relatorio_dict['relatorio']
     lista_movimentacoes = _processar_movimentacoes_financeiras(relatorio_obj)
     
-    # Carregar Despesas Apropriadas (mesmo código da view HTML)
-    from medicos.models.despesas import DespesaSocio, DespesaRateada, ItemDespesaRateioMensal
-    despesas_apropriadas = []
-    total_despesas_apropriadas = 0
-    total_despesas_provisionadas = 0
-    if socio_id and mes_ano:
-        try:
-            ano_str, mes_str = mes_ano.split('-')
-            ano = int(ano_str)
-            mes = int(mes_str)
-            
-            # Despesas individuais do sócio
-            despesas_individuais = DespesaSocio.objects.filter(
-                socio_id=socio_id,
-                socio__empresa_id=empresa_id,
-                data__year=ano, 
-                data__month=mes
-            ).select_related('socio', 'item_despesa', 'item_despesa__grupo_despesa')
-
-            # Despesas rateadas do sócio
-            rateadas_qs = DespesaRateada.objects.filter(
-                item_despesa__grupo_despesa__empresa_id=empresa_id,
-                data__year=ano, data__month=mes
-            ).select_related('item_despesa', 'item_despesa__grupo_despesa')
-            
-            # Processar despesas rateadas
-            for despesa in rateadas_qs:
-                rateio = ItemDespesaRateioMensal.obter_rateio_para_despesa(
-                    despesa.item_despesa, Socio.objects.get(id=socio_id), despesa.data
-                )
-                if rateio is not None:
-                    valor_apropriado = despesa.valor * (rateio.percentual_rateio / 100)
-                    socio_obj = Socio.objects.get(id=socio_id)
-                    item_desc = getattr(despesa.item_despesa, 'descricao', None) or '-'
-                    grupo_obj = getattr(despesa.item_despesa, 'grupo_despesa', None)
-                    grupo_desc = getattr(grupo_obj, 'descricao', None) or '-'
-                    
-                    despesas_apropriadas.append({
-                        'data': despesa.data,
-                        'socio': socio_obj,
-                        'descricao': item_desc,
-                        'grupo': grupo_desc,
-                        'tipo_classificacao': getattr(despesa, 'tipo_classificacao', 1),
-                        'valor_total': despesa.valor,
-                        'taxa_rateio': rateio.percentual_rateio,
-                        'valor_apropriado': valor_apropriado,
-                        'id': None,
-                    })
-
-            # Processar despesas individuais
-            for d in despesas_individuais:
-                despesas_apropriadas.append({
-                    'data': d.data,
-                    'socio': d.socio,
-                    'descricao': getattr(d.item_despesa, 'descricao', '-'),
-                    'grupo': getattr(getattr(d.item_despesa, 'grupo_despesa', None), 'descricao', '-'),
-                    'tipo_classificacao': getattr(d, 'tipo_classificacao', 1),
-                    'valor_total': d.valor,
-                    'taxa_rateio': '-',
-                    'valor_apropriado': d.valor,
-                    'id': d.id,
-                })
-            
-            # Calcular totais
-            total_despesas_normal = sum([
-                d.get('valor_apropriado', 0) or 0
-                for d in despesas_apropriadas
-                if d.get('tipo_classificacao', 1) == 1
-            ])
-            total_despesas_provisionadas = sum([
-                d.get('valor_apropriado', 0) or 0
-                for d in despesas_apropriadas
-                if d.get('tipo_classificacao', 1) == 2
-            ])
-            total_despesas_apropriadas = sum([d.get('valor_apropriado', 0) or 0 for d in despesas_apropriadas])
-            despesas_apropriadas.sort(key=lambda x: (x.get('tipo_classificacao', 1), -x['data'].toordinal() if x['data'] else 0))
-            
-        except Exception as e:
-            print(f"ERROR View PDF: erro ao carregar despesas apropriadas: {e}")
-            despesas_apropriadas = []
-            total_despesas_apropriadas = 0
+    # Carregar Despesas Apropriadas (mesmo queryset da view HTML)
+    despesas_apropriadas, totais_despesas = _carregar_despesas_apropriadas(empresa_id, socio_id, mes_ano)
+    total_despesas_apropriadas = totais_despesas['total']
+    total_despesas_normal = totais_despesas['normal']
+    total_despesas_provisionadas = totais_despesas['provisionadas']
 
     # Montar dicionário do relatório (mesma estrutura da view HTML)
     relatorio = {
@@ -1038,79 +797,59 @@ def calcular_adicional_ir_trimestral(empresa_id, ano):
     """
     Calcula o adicional de IR trimestral sempre considerando data de emissão das notas.
     Lei 9.249/1995, Art. 3º, §1º - adicional sempre por competência (data emissão).
+    Fonte única: medicos/services/adicional_ir.py
     """
     empresa = Empresa.objects.get(id=empresa_id)
-    aliquotas = Aliquotas.obter_aliquota_vigente(empresa)
-    
-    # Definir trimestres
-    trimestres = [
-        (1, [1, 2, 3]),    # T1: Jan, Fev, Mar
-        (2, [4, 5, 6]),    # T2: Abr, Mai, Jun
-        (3, [7, 8, 9]),    # T3: Jul, Ago, Set
-        (4, [10, 11, 12])  # T4: Out, Nov, Dez
-    ]
-    
-    resultado_trimestral = []
-    
-    for num_tri, meses in trimestres:
-        # ADICIONAL DE IR: SEMPRE considera data de emissão (independente do regime da empresa)
-        notas_adicional = NotaFiscal.objects.filter(
-            empresa_destinataria=empresa,
-            dtEmissao__year=ano,
-            dtEmissao__month__in=meses
-        ).exclude(status_recebimento='cancelado')  # Excluir notas canceladas
-        
-        # Receitas por tipo de serviço (sempre por data de emissão)
-        receita_consultas = notas_adicional.filter(tipo_servico=NotaFiscal.TIPO_SERVICO_CONSULTAS).aggregate(
-            total=Sum('val_bruto')
-        )['total'] or Decimal('0')
-        
-        receita_outros = notas_adicional.exclude(tipo_servico=NotaFiscal.TIPO_SERVICO_CONSULTAS).aggregate(
-            total=Sum('val_bruto')
-        )['total'] or Decimal('0')
-        
-        receita_bruta = receita_consultas + receita_outros
-        
-        # Base de cálculo aplicando presunções sobre receitas por data de emissão
-        base_consultas = receita_consultas * (aliquotas.IRPJ_PRESUNCAO_CONSULTA / Decimal('100'))
-        base_outros = receita_outros * (aliquotas.IRPJ_PRESUNCAO_OUTROS / Decimal('100'))
-        base_total = base_consultas + base_outros
-        
-        # Adicional trimestral
-        limite_trimestral = Decimal('60000.00')  # R$ 60.000,00/trimestre
-        excedente = max(Decimal('0'), base_total - limite_trimestral)
-        adicional = excedente * Decimal('0.10')  # 10%
-        
-        resultado_trimestral.append({
-            'trimestre': f'T{num_tri}',
-            'receita_consultas': receita_consultas,
-            'receita_outros': receita_outros,
-            'receita_bruta': receita_bruta,
-            'base_consultas': base_consultas,
-            'base_outros': base_outros,
-            'base_total': base_total,
-            'limite_trimestral': limite_trimestral,
-            'excedente': excedente,
-            'adicional': adicional,
-        })
-    
-    return resultado_trimestral
+    return [apuracao.como_dict() for apuracao in apurar_adicional_ir_ano(empresa, int(ano))]
 
 @login_required
-def relatorio_apuracao(request, empresa_id):
+@leitura_replica()
+async def relatorio_apuracao(request, empresa_id):
     """
     View padronizada para apuração de impostos (ISSQN, PIS, COFINS, etc).
     Fonte: .github/documentacao_especifica_instructions.md, seção Relatórios
     Template: relatorios/apuracao_de_impostos.html
+
+    Assíncrona: os builders de cada imposto são independentes e rodam
+    concorrentemente (medicos/relatorios/concorrencia.py, limite em
+    RELATORIOS_CONCORRENCIA_MAXIMA); a consolidação e o render rodam na thread
+    síncrona da requisição.
+
+    Competências fechadas vêm dos snapshots (medicos/services/snapshots_periodo.py);
+    o builder de um imposto só deixa de rodar quando todas as suas linhas do
+    ano estão congeladas. As tabelas de conferência das notas fiscais
+    (recebidas, emitidas, retenções) continuam lidas das notas.
     """
-    empresa = Empresa.objects.get(id=empresa_id)
-    mes_ano = _obter_mes_ano(request)
+    mes_ano = await sync_to_async(_obter_mes_ano)(request)
     ano = mes_ano.split('-')[0] if '-' in mes_ano else mes_ano[:4]
+    congeladas = await sync_to_async(apuracao_congelada)(empresa_id, ano)
+    pular = impostos_congelados(congeladas)
+    etapas = {
+        'issqn': partial(montar_relatorio_issqn, empresa_id, mes_ano),
+        'pis': partial(montar_relatorio_pis_persistente, empresa_id, ano),
+        'cofins': partial(montar_relatorio_cofins_persistente, empresa_id, ano),
+        'irpj_mensal': partial(montar_relatorio_irpj_mensal_persistente, empresa_id, ano),
+        'irpj': partial(montar_relatorio_irpj_persistente, empresa_id, ano),
+        'csll': partial(montar_relatorio_csll_persistente, empresa_id, ano),
+        'adicional_trimestral': partial(calcular_adicional_ir_trimestral, empresa_id, ano),
+    }
+    relatorios = await executar_etapas({nome: etapa for nome, etapa in etapas.items() if nome not in pular})
+    try:
+        await sync_to_async(congelar_apuracao_ausente)(empresa_id, ano, relatorios, congeladas)
+    except Exception as e:
+        logger.error(f"Erro ao congelar apuração de {ano} da empresa {empresa_id}: {e}")
+    relatorios = aplicar_apuracao_congelada(relatorios, congeladas)
+    return await sync_to_async(_renderizar_relatorio_apuracao)(request, empresa_id, mes_ano, ano, relatorios)
+
+
+def _renderizar_relatorio_apuracao(request, empresa_id, mes_ano, ano, relatorios):
+    """Consolida os relatórios de `relatorio_apuracao` e renderiza a página."""
+    empresa = Empresa.objects.get(id=empresa_id)
     competencias = [f'{mes:02d}/{ano}' for mes in range(1, 13)]
     trimestres = [f'T{n}' for n in range(1, 5)]
     
     # Relatório ISSQN
-    relatorio_issqn = montar_relatorio_issqn(empresa_id, mes_ano)
+    relatorio_issqn = relatorios['issqn']
     # Obter alíquota ISSQN para exibir na descrição (geralmente é a mesma para todo o ano)
     aliquota_issqn = relatorio_issqn['linhas'][0].get('aliquota', 0) if relatorio_issqn['linhas'] else 0
     linhas_issqn = [
@@ -1121,7 +860,7 @@ def relatorio_apuracao(request, empresa_id):
     ]
 
     # Relatório PIS
-    relatorio_pis = montar_relatorio_pis_persistente(empresa_id, ano)
+    relatorio_pis = relatorios['pis']
     # Obter alíquota PIS para exibir na descrição (geralmente é a mesma para todo o ano)
     aliquota_pis = relatorio_pis['linhas'][0].get('aliquota', 0) if relatorio_pis['linhas'] else 0
     linhas_pis = [
@@ -1134,7 +873,7 @@ def relatorio_apuracao(request, empresa_id):
     ]
 
     # Relatório COFINS
-    relatorio_cofins = montar_relatorio_cofins_persistente(empresa_id, ano)
+    relatorio_cofins = relatorios['cofins']
     # Obter alíquota COFINS para exibir na descrição (geralmente é a mesma para todo o ano)
     aliquota_cofins = relatorio_cofins['linhas'][0].get('aliquota', 0) if relatorio_cofins['linhas'] else 0
     linhas_cofins = [
@@ -1147,7 +886,7 @@ def relatorio_apuracao(request, empresa_id):
     ]
 
     # Relatório IRPJ Mensal
-    relatorio_irpj_mensal = montar_relatorio_irpj_mensal_persistente(empresa_id, ano)
+    relatorio_irpj_mensal = relatorios['irpj_mensal']
     # Obter alíquota IRPJ para exibir na descrição (geralmente é a mesma para todo o ano)
     aliquota_irpj = relatorio_irpj_mensal['linhas'][0].get('aliquota', 0) if relatorio_irpj_mensal['linhas'] else 0
     
@@ -1166,7 +905,7 @@ def relatorio_apuracao(request, empresa_id):
     ]
 
     # Relatório IRPJ
-    relatorio_irpj = montar_relatorio_irpj_persistente(empresa_id, ano)
+    relatorio_irpj = relatorios['irpj']
     linhas_irpj = [
         {'descricao': 'Receita consultas', 'valores': [linha.get('receita_consultas', 0) for linha in relatorio_irpj['linhas']]},
         {'descricao': 'Receita outros', 'valores': [linha.get('receita_outros', 0) for linha in relatorio_irpj['linhas']]},
@@ -1182,7 +921,7 @@ def relatorio_apuracao(request, empresa_id):
     ]
 
     # Relatório CSLL
-    relatorio_csll = montar_relatorio_csll_persistente(empresa_id, ano)
+    relatorio_csll = relatorios['csll']
     # Obter alíquotas da empresa para exibir percentuais corretos
     aliquotas_empresa = Aliquotas.obter_aliquota_vigente(empresa)
     linhas_csll = [
@@ -1200,7 +939,7 @@ def relatorio_apuracao(request, empresa_id):
     ]
 
     # Espelho do Adicional de IR Trimestral (sempre por data de emissão)
-    dados_adicional_trimestral = calcular_adicional_ir_trimestral(empresa_id, ano)
+    dados_adicional_trimestral = relatorios['adicional_trimestral']
     
     espelho_adicional_trimestral = []
     for dados in dados_adicional_trimestral:
@@ -1674,6 +1413,7 @@ def relatorio_outros(request, empresa_id):
 
 
 @login_required
+@leitura_replica()
 def relatorio_executivo_pdf(request, conta_id):
     """
     View padronizada para geração do PDF do relatório executivo.
@@ -1689,3 +1429,108 @@ def relatorio_executivo_pdf(request, conta_id):
         'titulo_pagina': 'Relatório Executivo PDF',
     })
     return render(request, 'relatorios/relatorio_executivo.html', context)
+
+
+def _parametros_tendencias(request, empresa_id):
+    """
+    Empresas (a da URL mais as de `empresas=1,2`, sempre da conta ativa) e
+    anos da querystring; padrão: os últimos 5 anos.
+
+    Raises:
+        ValueError: parâmetros inválidos
+    """
+    ano_atual = date.today().year
+    ano_final = int(request.GET.get('ano_final') or ano_atual)
+    ano_inicial = int(request.GET.get('ano_inicial') or ano_final - 4)
+    if ano_final < ano_inicial or ano_final - ano_inicial + 1 > MAXIMO_ANOS:
+        raise ValueError(f'Informe um período de 1 a {MAXIMO_ANOS} anos')
+
+    ids = [empresa_id]
+    for valor in request.GET.get('empresas', '').split(','):
+        valor = valor.strip()
+        if valor and int(valor) not in ids:
+            ids.append(int(valor))
+
+    empresas = Empresa.objects.all()
+    conta = getattr(request, 'conta_ativa', None)
+    if conta is not None:
+        empresas = empresas.filter(conta=conta)
+    get_object_or_404(empresas, id=empresa_id)
+    por_id = empresas.in_bulk(ids)
+    if len(por_id) != len(ids):
+        raise ValueError('Empresa inválida em empresas')
+    return [por_id[id_] for id_ in ids], ano_inicial, ano_final
+
+
+def _tabelas_tendencias(titulo, serie):
+    """Linhas do template: por ano/mês, uma coluna por série (valor, YoY, alíquota efetiva)."""
+    return {
+        'titulo': titulo,
+        'anual': [
+            {
+                'ano': linha['ano'],
+                'colunas': [
+                    {
+                        'valor': linha['valores'][nome],
+                        'variacao': linha['variacao_anual'][nome],
+                        'aliquota': linha['aliquota_efetiva'].get(nome),
+                    }
+                    for nome in SERIES
+                ],
+            }
+            for linha in serie['anual']
+        ],
+        'acumulado_12m': [
+            {
+                'competencia': linha['competencia'],
+                'colunas': [
+                    {'valor': linha['acumulado_12m'][nome], 'aliquota': linha['aliquota_efetiva_12m'].get(nome)}
+                    for nome in SERIES
+                ],
+            }
+            for linha in serie['mensal']
+        ],
+    }
+
+
+@login_required
+@leitura_replica()
+def relatorio_tendencias(request, empresa_id):
+    """
+    Evolução plurianual de receita, tributos e alíquota efetiva, lida das
+    apurações persistidas (medicos/relatorios/tendencias.py).
+    Template: relatorios/relatorio_tendencias.html
+    """
+    try:
+        empresas, ano_inicial, ano_final = _parametros_tendencias(request, empresa_id)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    dados = montar_tendencias_tributarias(empresas, ano_inicial, ano_final)
+    context = _contexto_base(request, empresa=empresas[0], menu_nome='Relatórios', cenario_nome='Tendências')
+    blocos = [_tabelas_tendencias(serie['nome'], serie) for serie in dados['empresas']]
+    if dados['consolidado']:
+        blocos.append(_tabelas_tendencias('Consolidado', dados['consolidado']))
+    context.update({
+        'titulo_pagina': 'Tendências Tributárias',
+        'tendencias': dados,
+        'blocos': blocos,
+        'rotulos_series': [ROTULOS_SERIES[nome] for nome in SERIES],
+        'empresas_comparadas': ','.join(str(empresa.id) for empresa in empresas[1:]),
+        'anos_disponiveis': range(date.today().year - MAXIMO_ANOS + 1, date.today().year + 1),
+    })
+    return render(request, 'relatorios/relatorio_tendencias.html', context)
+
+
+@login_required
+@leitura_replica()
+def api_tendencias(request, empresa_id):
+    """
+    JSON das tendências (mesmos parâmetros da página). `mensal=0` omite a
+    série mês a mês. Valores monetários em string decimal; percentuais em número.
+    """
+    try:
+        empresas, ano_inicial, ano_final = _parametros_tendencias(request, empresa_id)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    incluir_mensal = request.GET.get('mensal', '1') != '0'
+    return JsonResponse(montar_tendencias_tributarias(empresas, ano_inicial, ano_final, incluir_mensal))
@@ -14,16 +14,20 @@ Fonte: Implementação de melhores práticas SaaS conforme .github/copilot-instr
 
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
 from django.db.models import Q
 from datetime import datetime, timedelta
 import json
 
-from .models import Conta, ContaPreferencias, ContaAuditLog, ContaMetrics, ContaMembership
+from .models import Conta, ContaPreferencias, ContaAuditLog, ContaMetrics, ContaMembership, ResumoAuditoriaDiario
 from .utils_saas import SaaSPreferencesManager, SaaSAuditManager, SaaSMetricsManager, audit_action
+from .replica import leitura_replica
+from .services.perfil_sql import ORDENACOES, limpar_perfil_sql, perfil_sql_habilitado, relatorio_perfil_sql
 
 
 @login_required
@@ -151,6 +155,9 @@ def saas_auditoria(request, conta_id):
     user_filter = request.GET.get('user', '')
     data_inicio = request.GET.get('data_inicio', '')
     data_fim = request.GET.get('data_fim', '')
+    if not data_inicio and not data_fim:
+        # Sem período informado, lista apenas o mês corrente (partição corrente)
+        data_inicio = datetime.now().date().replace(day=1).strftime('%Y-%m-%d')
     
     # Query base
     logs = ContaAuditLog.objects.filter(conta=conta).order_by('-timestamp')
@@ -184,7 +191,7 @@ def saas_auditoria(request, conta_id):
     page_obj = paginator.get_page(page_number)
     
     # Opções para filtros
-    acoes_disponiveis = ContaAuditLog.objects.filter(conta=conta).values_list('acao', flat=True).distinct()
+    acoes_disponiveis = ResumoAuditoriaDiario.acoes_registradas(ResumoAuditoriaDiario.ORIGEM_CONTA, conta)
     
     context.update({
         'page_obj': page_obj,
@@ -201,6 +208,7 @@ def saas_auditoria(request, conta_id):
 
 
 @login_required
+@leitura_replica()
 def saas_metrics_dashboard(request, conta_id):
     """
     Dashboard de métricas e analytics da conta
@@ -254,15 +262,11 @@ def saas_metrics_dashboard(request, conta_id):
     chart_data = {}
     
     for metrica in metricas_principais[:3]:  # Só as 3 principais para o gráfico
-        daily_data = ContaMetrics.objects.filter(
-            conta=conta,
-            metrica_tipo=metrica,
-            data__gte=data_inicio
-        ).order_by('data')
+        daily_data = SaaSMetricsManager.get_daily_values(conta, metrica, data_inicio)
         
         chart_data[metrica] = {
-            'dates': [item.data.strftime('%d/%m') for item in daily_data],
-            'values': [float(item.valor) for item in daily_data]
+            'dates': [data.strftime('%d/%m') for data in daily_data],
+            'values': [float(valor) for valor in daily_data.values()]
         }
     
     # Estatísticas gerais da conta
@@ -309,7 +313,7 @@ def saas_collect_metric(request, conta_id):
         if not metrica_tipo:
             return JsonResponse({'error': 'Tipo de métrica é obrigatório'}, status=400)
         
-        # Registra a métrica
+        # Registra a métrica (bufferizada: ainda sem id no banco)
         metric = SaaSMetricsManager.record_metric(
             conta=conta,
             metrica_tipo=metrica_tipo,
@@ -319,10 +323,14 @@ def saas_collect_metric(request, conta_id):
         
         return JsonResponse({
             'success': True,
-            'metric_id': metric.id,
-            'valor': float(metric.valor)
+            'metrica_tipo': metric.metrica_tipo,
+            'data': metric.data.isoformat(),
+            'valor': float(metric.valor),
+            'pendente': metric.pk is None,
         })
         
+    except ValidationError as e:
+        return JsonResponse({'error': '; '.join(e.messages)}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -332,9 +340,8 @@ def saas_export_data(request, conta_id):
     """
     Exportação de dados da conta (auditoria, métricas, etc.)
     """
-    import csv
-    from django.http import HttpResponse
-    
+    from .exportacao import resposta_streaming, FORMATO_CSV
+
     # Obtém a conta através do membership
     membership = ContaMembership.objects.filter(user=request.user, is_active=True).first()
     conta = membership.conta if membership else None
@@ -346,23 +353,30 @@ def saas_export_data(request, conta_id):
     export_type = request.GET.get('type', 'audit')
     
     if export_type == 'audit':
-        # Exportar logs de auditoria
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="auditoria_{conta.name}_{datetime.now().strftime("%Y%m%d")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Data/Hora', 'Usuário', 'Ação', 'Objeto', 'Descrição', 'IP'])
-        
-        logs = ContaAuditLog.objects.filter(conta=conta).order_by('-timestamp')
-        for log in logs:
-            writer.writerow([
-                log.timestamp.strftime('%d/%m/%Y %H:%M:%S'),
-                log.user.email if log.user else 'Sistema',
-                log.get_acao_display(),
-                f"{log.objeto_tipo} - {log.objeto_nome}" if log.objeto_tipo else '',
-                log.descricao,
-                log.ip_address or ''
-            ])
+        # Exportar logs de auditoria (streaming; usuário carregado via JOIN, sem N+1)
+        acoes = dict(ContaAuditLog._meta.get_field('acao').flatchoices)
+        logs = (
+            ContaAuditLog.objects.filter(conta=conta)
+            .order_by('-timestamp')
+            .values_list('timestamp', 'user__email', 'acao', 'objeto_tipo', 'objeto_nome', 'descricao', 'ip_address')
+        )
+        linhas = (
+            [
+                timestamp.strftime('%d/%m/%Y %H:%M:%S'),
+                email or 'Sistema',
+                acoes.get(acao, acao),
+                f"{objeto_tipo} - {objeto_nome}" if objeto_tipo else '',
+                descricao,
+                ip_address or '',
+            ]
+            for timestamp, email, acao, objeto_tipo, objeto_nome, descricao, ip_address in logs.iterator(chunk_size=2000)
+        )
+        response = resposta_streaming(
+            ['Data/Hora', 'Usuário', 'Ação', 'Objeto', 'Descrição', 'IP'],
+            linhas,
+            FORMATO_CSV,
+            f'auditoria_{conta.name}_{datetime.now().strftime("%Y%m%d")}',
+        )
         
         # Registra a exportação
         SaaSAuditManager.log_action(
@@ -377,22 +391,27 @@ def saas_export_data(request, conta_id):
         return response
     
     elif export_type == 'metrics':
-        # Exportar métricas
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="metricas_{conta.name}_{datetime.now().strftime("%Y%m%d")}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow(['Data', 'Tipo de Métrica', 'Valor', 'Unidade', 'Período'])
-        
-        metrics = ContaMetrics.objects.filter(conta=conta).order_by('-data')
-        for metric in metrics:
-            writer.writerow([
-                metric.data.strftime('%d/%m/%Y'),
-                metric.get_metrica_tipo_display(),
-                metric.valor,
-                metric.unidade,
-                metric.get_periodo_tipo_display()
-            ])
+        # Exportar métricas (streaming)
+        tipos_metrica = dict(ContaMetrics._meta.get_field('metrica_tipo').flatchoices)
+        metrics = (
+            ContaMetrics.objects.filter(conta=conta)
+            .order_by('-data')
+            .values_list('data', 'metrica_tipo', 'valor')
+        )
+        linhas = (
+            [
+                data.strftime('%d/%m/%Y'),
+                tipos_metrica.get(metrica_tipo, metrica_tipo),
+                valor,
+            ]
+            for data, metrica_tipo, valor in metrics.iterator(chunk_size=2000)
+        )
+        response = resposta_streaming(
+            ['Data', 'Tipo de Métrica', 'Valor'],
+            linhas,
+            FORMATO_CSV,
+            f'metricas_{conta.name}_{datetime.now().strftime("%Y%m%d")}',
+        )
         
         # Registra a exportação
         SaaSAuditManager.log_action(
@@ -409,3 +428,33 @@ def saas_export_data(request, conta_id):
     else:
         messages.error(request, 'Tipo de exportação inválido')
         return redirect('medicos:saas_metrics_dashboard', conta_id=conta_id)
+
+
+@staff_member_required
+@require_http_methods(["GET", "POST"])
+def perfil_sql_dashboard(request):
+    """
+    Ranking (staff) das views com mais queries por requisição e das formas de
+    SQL mais repetidas, a partir do perfil coletado por PerfilSQLMiddleware.
+    """
+    if request.method == 'POST' and request.POST.get('acao') == 'limpar':
+        limpar_perfil_sql()
+        messages.success(request, 'Perfil de SQL limpo.')
+        return redirect('medicos:perfil_sql_dashboard')
+
+    ordenar_por = request.GET.get('ordenar', 'queries_media')
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 20)), 200))
+    except ValueError:
+        limite = 20
+    perfil = relatorio_perfil_sql(ordenar_por=ordenar_por, limite=limite)
+
+    context = {
+        'titulo_pagina': 'Perfil de SQL por View',
+        'habilitado': perfil_sql_habilitado(),
+        'ordenacoes': ORDENACOES,
+        'ordenar_por': ordenar_por if ordenar_por in ORDENACOES else 'queries_media',
+        'limite': limite,
+        **perfil,
+    }
+    return render(request, 'saas/perfil_sql.html', context)
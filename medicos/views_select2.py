@@ -1,6 +1,6 @@
 from django.http import JsonResponse
 from django.views import View
-from medicos.models.despesas import ItemDespesa, GrupoDespesa
+from medicos.services.busca import buscar_itens_despesa
 
 class ItemDespesaSelect2Ajax(View):
     def get(self, request, *args, **kwargs):
@@ -8,14 +8,6 @@ class ItemDespesaSelect2Ajax(View):
         term = request.GET.get('term', '')
         results = []
         if empresa_id:
-            qs = ItemDespesa.objects.filter(
-                grupo_despesa__empresa_id=empresa_id,
-                grupo_despesa__tipo_rateio=GrupoDespesa.Tipo_t.COM_RATEIO,
-                descricao__icontains=term
-            )[:20]
-            for item in qs:
-                results.append({
-                    'id': item.pk,
-                    'text': f"{item.descricao} ({item.grupo_despesa.descricao})"
-                })
+            # Busca na descrição normalizada (sem acentos/caixa), prefixos curtos em cache
+            results = buscar_itens_despesa(empresa_id, term, limite=20)
         return JsonResponse({'results': results})
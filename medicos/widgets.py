@@ -1,19 +1,18 @@
+from django.db.models import Q
 from django_select2.forms import ModelSelect2Widget
 
 
 from medicos.models.despesas import ItemDespesa, GrupoDespesa
+from medicos.services.busca import filtro_busca
 
 class ItemDespesaSelect2Widget(ModelSelect2Widget):
     def get_value_queryset(self, value):
-        print(f"[DEBUG get_value_queryset] value recebido: {value}")
-        qs = ItemDespesa.objects.filter(pk=value)
-        print(f"[DEBUG get_value_queryset] queryset: {list(qs)}")
-        return qs
+        return ItemDespesa.objects.filter(pk=value)
     def label_from_instance(self, obj):
         # Garante que o valor selecionado sempre aparece corretamente no Select2
         return str(obj)
     search_fields = [
-        'descricao__icontains',
+        'descricao_busca__contains',
         'grupo_despesa__descricao__icontains',
     ]
     # Permite mostrar todos os itens ao abrir o dropdown
@@ -28,7 +27,6 @@ class ItemDespesaSelect2Widget(ModelSelect2Widget):
 
     def __init__(self, *args, **kwargs):
         self.empresa_id = kwargs.pop('empresa_id', None)
-        print(f"[ItemDespesaSelect2Widget] empresa_id recebido: {self.empresa_id}")
         super().__init__(*args, **kwargs)
 
     def get_queryset(self):
@@ -36,5 +34,17 @@ class ItemDespesaSelect2Widget(ModelSelect2Widget):
             return ItemDespesa.objects.filter(
                 grupo_despesa__empresa_id=self.empresa_id,
                 grupo_despesa__tipo_rateio=GrupoDespesa.Tipo_t.COM_RATEIO
-            )
+            ).select_related('grupo_despesa')
         return ItemDespesa.objects.none()
+
+    def filter_queryset(self, request, term, queryset=None, **dependent_fields):
+        # Descrição do item pela coluna normalizada (ignora acentos/caixa); grupo segue por icontains
+        if queryset is None:
+            queryset = self.get_queryset()
+        for palavra in term.split():
+            queryset = queryset.filter(
+                filtro_busca('descricao_busca', palavra) | Q(grupo_despesa__descricao__icontains=palavra)
+            )
+        if dependent_fields:
+            queryset = queryset.filter(**dependent_fields)
+        return queryset.select_related('grupo_despesa')
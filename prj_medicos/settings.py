@@ -1,13 +1,59 @@
 # Desabilita injeção automática de JS/CSS do django-select2 (controle manual no template)
 SELECT2_JS = ''
 SELECT2_CSS = ''
-# LOGGING para debug de despesas
+"""
+Django settings for prj_medicos project.
+...
+"""
+
+from pathlib import Path
+import environ
+import os
+
+# Adiciona a leitura da versão
+
+from core.version import get_version
+APP_VERSION = get_version(force_file=True)
+
+#------------------------------------------------------------------------
+env = environ.Env(
+    DEBUG=(bool, True)
+)
+DEBUG = env('DEBUG')
+
+# LOGGING: registros estruturados, amostrados e escritos fora da thread da
+# requisição (medicos/rastreamento.py). LOG_FORMATO=json para agregadores;
+# RASTREAMENTO_LIMITE_LENTO_MS define quando um span sobe para WARNING.
+LOG_NIVEL = env('LOG_NIVEL', default='INFO')
+LOG_FORMATO = env('LOG_FORMATO', default='texto')
+RASTREAMENTO_LIMITE_LENTO_MS = env.float('RASTREAMENTO_LIMITE_LENTO_MS', default=1000)
+# Fração dos registros abaixo de WARNING mantida, por prefixo de logger
+RASTREAMENTO_AMOSTRAGEM = {
+    'medicos.signals_financeiro': env.float('RASTREAMENTO_AMOSTRAGEM_SIGNALS', default=1.0),
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'texto': {
+            'format': '%(asctime)s %(levelname)s %(name)s: %(message)s',
+        },
+        'json': {
+            '()': 'medicos.rastreamento.FormatadorEstruturado',
+        },
+    },
+    'filters': {
+        'amostragem': {
+            '()': 'medicos.rastreamento.FiltroAmostragem',
+            'taxas': RASTREAMENTO_AMOSTRAGEM,
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            'class': 'medicos.rastreamento.HandlerFila',
+            'formatter': 'json' if LOG_FORMATO == 'json' else 'texto',
+            'filters': ['amostragem'],
         },
     },
     'loggers': {
@@ -20,14 +66,9 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
-        'medicos.signals_financeiro': {
+        'medicos': {
             'handlers': ['console'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-        'medicos.views_faturamento': {
-            'handlers': ['console'],
-            'level': 'INFO',
+            'level': LOG_NIVEL,
             'propagate': False,
         },
     },
@@ -36,25 +77,6 @@ LOGGING = {
         'level': 'INFO',
     },
 }
-"""
-Django settings for prj_medicos project.
-...
-"""
-
-from pathlib import Path
-import environ
-import os
-
-# Adiciona a leitura da versão
-
-from core.version import get_version
-APP_VERSION = get_version(force_file=True)
-
-#------------------------------------------------------------------------
-env = environ.Env(
-    DEBUG=(bool, True)
-)
-DEBUG = env('DEBUG')
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -107,12 +129,16 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Leitura das próprias escritas com réplica (sai da cadeia sem REPLICA_DATABASE_HOST)
+    'medicos.middleware.replica.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     # SaaS Multi-tenant Middleware (reabilitado)
     'medicos.middleware.tenant_middleware.TenantMiddleware',
     'medicos.middleware.tenant_middleware.LicenseValidationMiddleware',
+    # Perfil de SQL por requisição (opt-in: PERFIL_SQL_ENABLED)
+    'medicos.middleware.perfil_sql.PerfilSQLMiddleware',
     'medicos.middleware.tenant_middleware.UserLimitMiddleware',
 ]
 
@@ -164,6 +190,39 @@ DATABASES = {
     }
 }
 
+# Réplica de leitura (medicos/replica.py): relatórios, exportações e dashboards
+# marcados com leitura_replica leem daqui; sem REPLICA_DATABASE_HOST, tudo no default
+REPLICA_DATABASE_HOST = os.environ.get('REPLICA_DATABASE_HOST')
+if REPLICA_DATABASE_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('REPLICA_DATABASE_NAME', DATABASE_NAME),
+        'USER': os.environ.get('REPLICA_DATABASE_USER', DATABASE_USER),
+        'PASSWORD': os.environ.get('REPLICA_DATABASE_PASSWORD', DATABASE_PASSWORD),
+        'HOST': REPLICA_DATABASE_HOST,
+        'PORT': os.environ.get('REPLICA_DATABASE_PORT', DATABASE_PORT),
+        'OPTIONS': {**DATABASES['default']['OPTIONS'], 'connect_timeout': 3},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['medicos.replica.RoteadorReplica']
+REPLICA_LAG_MAXIMO_SEGUNDOS = float(os.getenv('REPLICA_LAG_MAXIMO_SEGUNDOS', '30'))
+REPLICA_LEITURA_PROPRIA_SEGUNDOS = float(os.getenv('REPLICA_LEITURA_PROPRIA_SEGUNDOS', '15'))
+REPLICA_VERIFICACAO_SEGUNDOS = 10
+
+# Etapas independentes de um relatório rodando ao mesmo tempo por requisição
+# (medicos/relatorios/concorrencia.py); cada etapa ocupa uma conexão. 1 = em sequência
+RELATORIOS_CONCORRENCIA_MAXIMA = int(os.getenv('RELATORIOS_CONCORRENCIA_MAXIMA', '4'))
+
+# Benchmarks locais (benchmark_relatorios / gerar_dados_sinteticos) em SQLite:
+# definido, substitui o Postgres pelo arquivo informado
+BENCHMARK_SQLITE_PATH = os.getenv('BENCHMARK_SQLITE_PATH')
+if BENCHMARK_SQLITE_PATH:
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BENCHMARK_SQLITE_PATH,
+    }
+    DATABASES.pop('replica', None)
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -219,6 +278,43 @@ CACHES = {
 }
 
 SELECT2_CACHE_BACKEND = "select2"
+
+# Métricas SaaS acumuladas no Redis (cache default) e persistidas pelo
+# comando descarregar_metricas_saas; False grava direto em ContaMetrics
+SAAS_METRICS_BUFFER_ENABLED = os.getenv('SAAS_METRICS_BUFFER_ENABLED', 'True') == 'True'
+
+# Auditoria gravada em lote fora do request: 'memoria' (thread de fundo),
+# 'redis' (worker processar_fila_auditoria) ou 'sincrono'
+AUDITORIA_BACKEND = os.getenv('AUDITORIA_BACKEND', 'memoria')
+AUDITORIA_TAMANHO_LOTE = 200
+AUDITORIA_INTERVALO_DESCARGA = 2.0
+
+# Outbox de eventos do domínio fiscal (medicos/services/eventos_dominio.py):
+# 'apos_commit' aplica os eventos ao fim da transação; 'worker' deixa para o
+# comando processar_eventos_dominio
+EVENTOS_DOMINIO_PROCESSAMENTO = os.getenv('EVENTOS_DOMINIO_PROCESSAMENTO', 'apos_commit')
+EVENTOS_DOMINIO_TAMANHO_LOTE = 500
+EVENTOS_DOMINIO_MAXIMO_TENTATIVAS = 5
+
+# Perfil de SQL por requisição (medicos/middleware/perfil_sql.py), agregado no
+# Redis e exibido em /medicos/saas/perfil-sql/ (staff); desligado não custa nada
+PERFIL_SQL_ENABLED = os.getenv('PERFIL_SQL_ENABLED', 'False') == 'True'
+PERFIL_SQL_AMOSTRAGEM = float(os.getenv('PERFIL_SQL_AMOSTRAGEM', '1.0'))
+PERFIL_SQL_ORCAMENTO_QUERIES = int(os.getenv('PERFIL_SQL_ORCAMENTO_QUERIES', '100'))
+PERFIL_SQL_TTL = 7 * 24 * 3600
+
+# Apuração do adicional de IR trimestral em cache (segundos); invalidada por
+# alterações em notas fiscais e rateios do trimestre
+ADICIONAL_IR_CACHE_TIMEOUT = 300
+
+# Autocomplete de itens de despesa (medicos/services/busca.py): resultados de
+# termos com até BUSCA_CACHE_PREFIXO_MAXIMO caracteres ficam em cache por empresa
+BUSCA_CACHE_TIMEOUT = 60
+BUSCA_CACHE_PREFIXO_MAXIMO = 3
+
+# Changelists do admin (ListaOtimizadaAdminMixin): acima deste número de linhas
+# estimadas pelo PostgreSQL, a paginação usa a estimativa em vez do COUNT(*)
+ADMIN_CONTAGEM_EXATA_ATE = 10000
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 CRISPY_ALLOWED_TEMPLATE_PACKS = ["bootstrap5"]
 